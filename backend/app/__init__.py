@@ -5,9 +5,10 @@ from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 from werkzeug.middleware.proxy_fix import ProxyFix
 from config import config
+from app.services.db_routing import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 bcrypt = Bcrypt()
 
@@ -31,8 +32,29 @@ def create_app(config_name='default'):
     bcrypt.init_app(app)
     CORS(app, origins=app.config['CORS_ORIGINS'])
 
+    from app.services.cache import init_cache
+    from app.services.change_log import init_change_log
+    from app.services.compression import init_compression
+    from app.services.db_routing import init_db_routing
+    from app.services.instrumentation import init_instrumentation
+    from app.services.json_provider import init_json_provider
+    from app.services.metrics import init_metrics
+    from app.services.profiling import init_profiling
+    from app.services.smart_playlists import init_smart_playlists
+    # First, so its after_request hook runs last and sees the final body
+    init_instrumentation(app)
+    init_metrics(app)
+    init_cache(app)
+    init_compression(app)
+    init_json_provider(app)
+    init_smart_playlists(app)
+    init_change_log(app)
+    init_db_routing(app)
+    # Last, so its after_request hook runs first and profiles streamed bodies
+    init_profiling(app)
+
     # Register blueprints
-    from app.routes import auth, songs, styles, webhooks, playlists, roku
+    from app.routes import auth, songs, styles, webhooks, playlists, roku, speech, sync
 
     api_prefix = app.config['API_PREFIX']
     app.register_blueprint(auth.bp, url_prefix=f'{api_prefix}/auth')
@@ -41,6 +63,8 @@ def create_app(config_name='default'):
     app.register_blueprint(webhooks.bp, url_prefix=f'{api_prefix}/webhooks')
     app.register_blueprint(playlists.bp, url_prefix=f'{api_prefix}/playlists')
     app.register_blueprint(roku.bp, url_prefix=f'{api_prefix}/roku')
+    app.register_blueprint(speech.bp, url_prefix=f'{api_prefix}/speech')
+    app.register_blueprint(sync.bp, url_prefix=f'{api_prefix}/sync')
 
     # Health check endpoint
     @app.route('/health')
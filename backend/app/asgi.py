@@ -0,0 +1,163 @@
+"""ASGI adapter for the Flask app (served by backend/asgi.py under uvicorn).
+
+The upstream-bound endpoints in ASYNC_VIEWS are served natively. Each
+handler is the async body of the Flask view with the same endpoint name.
+It awaits httpx for Suno, Azure or Microsoft and does its DB work in
+sync_to_async calls, so a request waiting on one of them holds no thread.
+Everything else goes through asgiref's WsgiToAsgi. Each of those requests
+gets its own thread (a ThreadSensitiveContext) for as long as it runs, and
+at most ASGI_THREADS run at once, as under a gthread worker.
+"""
+import asyncio
+import os
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from asgiref.wsgi import WsgiToAsgi
+from flask_jwt_extended import verify_jwt_in_request
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+
+from app import create_app
+from app.routes import auth, songs, speech
+
+# WSGI requests running at once per process
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 16))
+
+
+def _jwt_required(view):
+    async def checked(**view_args):
+        verify_jwt_in_request()
+        return await view(**view_args)
+    return checked
+
+
+# Endpoint -> native handler. The Flask views run these same bodies through
+# async_to_sync under WSGI; their decorators are repeated here.
+ASYNC_VIEWS = {
+    'songs.check_song_status': _jwt_required(songs.check_song_status_async),
+    'songs.check_all_submitted': _jwt_required(songs.check_all_submitted_async),
+    'songs.reconcile_stuck_songs': songs.reconcile_stuck_songs_async,
+    'speech.synthesize_speech': _jwt_required(speech.synthesize_speech_async),
+    'auth.microsoft_callback': auth.microsoft_callback_async,
+}
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return body
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+def _environ(scope, body):
+    """WSGI environ for an ASGI request, so native handlers see a normal Flask request."""
+    headers = Headers([(name.decode('latin1'), value.decode('latin1')) for name, value in scope['headers']])
+    host, port = scope.get('server') or ('localhost', 80)
+    builder = EnvironBuilder(
+        path=scope['path'],
+        base_url=f"{scope.get('scheme', 'http')}://{headers.get('Host', f'{host}:{port}')}{scope.get('root_path', '')}",
+        query_string=scope['query_string'].decode('latin1'),
+        method=scope['method'],
+        headers=headers,
+        data=body,
+        environ_base={'REMOTE_ADDR': scope['client'][0]} if scope.get('client') else None,
+    )
+    try:
+        return builder.get_environ()
+    finally:
+        builder.close()
+
+
+async def _send_response(response, environ, send):
+    app_iter, status, headers = response.get_wsgi_response(environ)
+    try:
+        body = b''.join(await sync_to_async(list)(app_iter))
+    finally:
+        if hasattr(app_iter, 'close'):
+            await sync_to_async(app_iter.close)()
+
+    await send({
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class FlaskAsgi:
+    """Serve ASYNC_VIEWS natively and the rest of the app through WsgiToAsgi."""
+
+    def __init__(self, flask_app, threads=ASGI_THREADS):
+        # Named as on WsgiToAsgi, which services/prefork.py unwraps
+        self.wsgi_application = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.wsgi_slots = asyncio.Semaphore(threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            # No startup/shutdown work; just acknowledge the server
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        view = self._native_view(scope) if scope['type'] == 'http' else None
+        # Each request gets its own thread for sync work; stock WsgiToAsgi
+        # would otherwise run every request on one shared thread
+        if view is not None:
+            async with ThreadSensitiveContext():
+                await self._serve(view, scope, receive, send)
+        else:
+            async with self.wsgi_slots, ThreadSensitiveContext():
+                await self.wsgi(scope, receive, send)
+
+    def _native_view(self, scope):
+        app = self.wsgi_application
+        adapter = app.url_map.bind(app.config.get('SERVER_NAME') or 'localhost')
+        try:
+            endpoint, view_args = adapter.match(scope['path'], scope['method'])
+        except HTTPException:
+            # 404, 405 and redirects: let Flask answer those
+            return None
+        view = ASYNC_VIEWS.get(endpoint)
+        return view and (lambda: view(**view_args))
+
+    async def _serve(self, view, scope, receive, send):
+        """Flask's wsgi_app, awaiting the view instead of calling it."""
+        environ = _environ(scope, await _read_body(receive))
+        ctx = self.wsgi_application.request_context(environ)
+        error = None
+        try:
+            try:
+                ctx.push()
+                response = await self._dispatch(view)
+            except Exception as e:
+                error = e
+                response = await sync_to_async(self.wsgi_application.handle_exception)(e)
+            await _send_response(response, environ, send)
+        finally:
+            ctx.pop(error)
+
+    async def _dispatch(self, view):
+        """Flask's full_dispatch_request: before_request hooks, view, error handlers, after_request hooks."""
+        app = self.wsgi_application
+        try:
+            rv = await sync_to_async(app.preprocess_request)()
+            if rv is None:
+                rv = await view()
+        except Exception as e:
+            rv = await sync_to_async(app.handle_user_exception)(e)
+        return await sync_to_async(app.finalize_request)(rv)
+
+
+def create_asgi_app(config_name='default'):
+    """Build the Flask app and wrap it for an ASGI server."""
+    return FlaskAsgi(create_app(config_name))
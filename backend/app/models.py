@@ -13,8 +13,9 @@ vocal_gender_enum = PgEnum('male', 'female', 'other', name='vocal_gender_enum',
 playlist_songs = db.Table('playlist_songs',
     db.Column('playlist_id', db.Integer, db.ForeignKey('playlists.id', ondelete='CASCADE'), primary_key=True),
     db.Column('song_id', db.Integer, db.ForeignKey('songs.id', ondelete='CASCADE'), primary_key=True),
-    db.Column('position', db.Integer, default=0),
-    db.Column('added_at', db.DateTime, default=datetime.utcnow)
+    db.Column('position', db.Integer, default=0),  # see services/playlist_order.py
+    db.Column('added_at', db.DateTime, default=datetime.utcnow),
+    db.Index('idx_playlist_songs_playlist_position', 'playlist_id', 'position')
 )
 
 
@@ -100,6 +101,16 @@ class Song(db.Model):
     """Song model for music creation tracking."""
 
     __tablename__ = 'songs'
+    # Indexes for the hot query shapes (migration 012): the per-user
+    # library newest first, per-user status counts (stats), the reconcile
+    # sweep over submitted songs and the Roku feed of playable songs
+    __table_args__ = (
+        db.Index('idx_songs_user_created', 'user_id', db.text('created_at DESC')),
+        db.Index('idx_songs_user_status', 'user_id', 'status'),
+        db.Index('idx_songs_submitted_created', 'created_at', postgresql_where=db.text("status = 'submitted'")),
+        db.Index('idx_songs_playable_title', 'specific_title',
+                 postgresql_where=db.text("status = 'completed' AND has_audio")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
@@ -127,16 +138,54 @@ class Song(db.Model):
     downloaded_url_2 = db.Column(db.Boolean, default=False)
     archived_url_1 = db.Column(db.String(1000))
     archived_url_2 = db.Column(db.String(1000))
+    # Has a playable URL in any of the fields above; maintained by the database
+    has_audio = db.Column(db.Boolean, db.Computed(
+        'archived_url_1 IS NOT NULL OR archived_url IS NOT NULL '
+        'OR download_url_1 IS NOT NULL OR download_url IS NOT NULL', persisted=True))
     
     suno_task_id = db.Column(db.String(255), index=True)  # Suno API task ID
     is_archived = db.Column(db.Boolean, default=False, index=True)
     archived_at = db.Column(db.DateTime)
     file_size_bytes = db.Column(db.Integer)  # Total size of both tracks
+    archive_checksum = db.Column(db.String(64))  # SHA-256 of the archived file
+    archive_verified_at = db.Column(db.DateTime)  # Last integrity scrub (or archive time)
+    # Loudness analysis (see services/loudness.py); NULL until analyzed
+    loudness_lufs = db.Column(db.Float)
+    replay_gain_db = db.Column(db.Float)  # ReplayGain 2.0 track gain (-18 LUFS reference)
+    replay_gain_peak = db.Column(db.Float)  # Linear sample peak, for clipping prevention
+    loudness_analyzed_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self, include_user=False, include_style=True, include_playlists=False):
-        """Convert song to dictionary."""
+    # Relationships
+    renditions = db.relationship('SongRendition', backref='song', lazy='selectin',
+                                 cascade='all, delete-orphan', order_by='SongRendition.bitrate_kbps')
+
+    def get_rendition(self, bitrate_kbps=None):
+        """Return the highest-bitrate rendition at or below the hint.
+
+        A hint below every rendition gets the lowest one, which is still
+        closer to it than the original. None without a hint or renditions.
+        """
+        if not bitrate_kbps or not self.renditions:
+            return None
+        fitting = [r for r in self.renditions if r.bitrate_kbps <= bitrate_kbps]
+        return fitting[-1] if fitting else self.renditions[0]
+
+    def get_stream_url(self, bitrate_kbps=None):
+        """Pick the URL a client should stream: a fitting rendition, else the original."""
+        rendition = self.get_rendition(bitrate_kbps)
+        if rendition:
+            return rendition.url
+
+        return self.archived_url or self.archived_url_1 or self.download_url or self.download_url_1
+
+    def to_dict(self, include_user=False, include_style=True, include_playlists=False, bitrate_kbps=None):
+        """Convert song to dictionary.
+
+        bitrate_kbps is the client's rendition hint (see
+        transcoder.parse_quality_hint) and only affects 'stream_url'.
+        """
         # Use new single-track fields, fall back to legacy fields for old songs
         effective_download_url = self.download_url or self.download_url_1
         effective_archived_url = self.archived_url or self.archived_url_1
@@ -170,6 +219,11 @@ class Song(db.Model):
             'is_archived': self.is_archived or False,
             'archived_at': self.archived_at.isoformat() if self.archived_at else None,
             'file_size_bytes': self.file_size_bytes,
+            'loudness_lufs': self.loudness_lufs,
+            'replay_gain_db': self.replay_gain_db,
+            'replay_gain_peak': self.replay_gain_peak,
+            'stream_url': self.get_stream_url(bitrate_kbps),
+            'renditions': [r.to_dict() for r in self.renditions],
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -190,6 +244,30 @@ class Song(db.Model):
         return data
 
 
+class SongRendition(db.Model):
+    """Lower-bitrate transcode of a song's archived audio (for Roku/mobile)."""
+
+    __tablename__ = 'song_renditions'
+    __table_args__ = (
+        db.UniqueConstraint('song_id', 'bitrate_kbps', name='uq_song_renditions_song_bitrate'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    song_id = db.Column(db.Integer, db.ForeignKey('songs.id', ondelete='CASCADE'), nullable=False)
+    bitrate_kbps = db.Column(db.Integer, nullable=False)
+    url = db.Column(db.String(1000), nullable=False)
+    file_size_bytes = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert rendition to dictionary."""
+        return {
+            'bitrate_kbps': self.bitrate_kbps,
+            'url': self.url,
+            'file_size_bytes': self.file_size_bytes
+        }
+
+
 class Playlist(db.Model):
     """Playlist model for organizing songs."""
 
@@ -200,19 +278,26 @@ class Playlist(db.Model):
     description = db.Column(db.Text)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
     is_public = db.Column(db.Boolean, default=True)
+    # Filter spec of a smart playlist (None for hand-made ones); its songs
+    # are kept in playlist_songs by services/smart_playlists.py
+    smart_filter = db.Column(db.JSON(none_as_null=True))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
+    # In play order; add/move songs with services/playlist_order.py, which
+    # assigns positions (appending here would put them all at position 0)
     songs = db.relationship('Song', secondary=playlist_songs, lazy='dynamic',
+                           order_by=(playlist_songs.c.position, playlist_songs.c.song_id),
                            backref=db.backref('playlists', lazy='dynamic'))
 
-    def to_dict(self, include_songs=False, song_count=None):
+    def to_dict(self, include_songs=False, song_count=None, bitrate_kbps=None):
         """Convert playlist to dictionary.
 
         Pass song_count when listing many playlists at once (see
         playlists.py's get_playlists) to avoid a per-playlist COUNT query —
         falls back to counting here for single-playlist call sites.
+        bitrate_kbps is passed through to each song's stream_url.
         """
         data = {
             'id': self.id,
@@ -222,12 +307,40 @@ class Playlist(db.Model):
             'created_by_id': self.created_by,
             'is_public': self.is_public,
             'song_count': self.songs.count() if song_count is None else song_count,
+            'is_smart': self.smart_filter is not None,
+            'smart_filter': self.smart_filter,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
         if include_songs:
-            data['songs'] = [song.to_dict(include_user=True, include_style=True)
+            data['songs'] = [song.to_dict(include_user=True, include_style=True, bitrate_kbps=bitrate_kbps)
                            for song in self.songs]
 
         return data
+
+
+class ChangeLog(db.Model):
+    """Append-only log of song, style and playlist writes, read by GET /sync.
+
+    Written by services/change_log.py in the same transaction as the
+    change itself. seq orders the rows in commit order. prune() keeps it
+    to about one row per entity.
+    """
+
+    __tablename__ = 'change_log'
+    # Latest row per entity (compaction, pruning superseded rows) and the
+    # retention floor (migration 013)
+    __table_args__ = (
+        db.Index('idx_change_log_entity', 'entity', 'entity_id', 'seq'),
+        db.Index('idx_change_log_changed_at', 'changed_at'),
+    )
+
+    seq = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    entity = db.Column(db.String(16), nullable=False)  # 'song', 'style' or 'playlist'
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(8), nullable=False)  # 'upsert' or 'delete'
+    # Owner of a song, so a user's sync skips other users' songs. No foreign
+    # key: the rows outlive the song (and the user)
+    user_id = db.Column(db.Integer)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -3,8 +3,12 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 from datetime import datetime, timedelta
 from app import db, bcrypt
 from app.models import User, OAuthLoginCode
+from app.services.http import async_http_client
+from app.services.cache import cached_json, invalidate
+from app.services.db_routing import primary_db
+from asgiref.sync import async_to_sync, sync_to_async
+import httpx
 import os
-import requests
 from urllib.parse import urlencode
 import secrets
 
@@ -16,14 +20,18 @@ MICROSOFT_CLIENT_SECRET = os.getenv('MICROSOFT_CLIENT_SECRET')
 MICROSOFT_TENANT_ID = os.getenv('MICROSOFT_TENANT_ID', 'common')  # 'common' allows both personal and work/school accounts
 MICROSOFT_REDIRECT_URI = os.getenv('MICROSOFT_REDIRECT_URI', 'https://music.aiacopilot.com/api/v1/auth/microsoft/callback')
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'https://music.aiacopilot.com')
-SIGNUP_ACCESS_CODE = os.getenv('SIGNUP_ACCESS_CODE')
-
-if not SIGNUP_ACCESS_CODE:
-    raise RuntimeError('SIGNUP_ACCESS_CODE environment variable is not set')
 
 LOGIN_CODE_TTL_MINUTES = 2
 
 
+@bp.record_once
+def _require_signup_access_code(state):
+    # Checked when an app is built, against its config, rather than when
+    # this module is imported
+    if not state.app.config.get('SIGNUP_ACCESS_CODE'):
+        raise RuntimeError('SIGNUP_ACCESS_CODE environment variable is not set')
+
+
 @bp.route('/register', methods=['POST'])
 def register():
     """Register a new user."""
@@ -51,6 +59,7 @@ def register():
     try:
         db.session.add(user)
         db.session.commit()
+        invalidate('users')
         return jsonify({
             'message': 'User created successfully',
             'user': user.to_dict()
@@ -131,6 +140,7 @@ def get_current_user():
 
 @bp.route('/users', methods=['GET'])
 @jwt_required()
+@cached_json(('users',))
 def get_users():
     """Get active users for the song-owner-reassignment picker.
 
@@ -172,8 +182,14 @@ def microsoft_login():
 
 
 @bp.route('/microsoft/callback', methods=['GET'])
+@primary_db
 def microsoft_callback():
     """Handle Microsoft OAuth callback."""
+    return async_to_sync(microsoft_callback_async)()
+
+
+async def microsoft_callback_async():
+    """microsoft_callback's body; app/asgi.py serves it natively."""
     error = request.args.get('error')
     if error:
         error_desc = request.args.get('error_description', 'Unknown error')
@@ -196,75 +212,81 @@ def microsoft_callback():
             'scope': 'openid email profile User.Read'
         }
 
-        token_response = requests.post(token_url, data=token_data, timeout=30)
-        if token_response.status_code != 200:
-            current_app.logger.error(f"Token exchange failed: {token_response.status_code} - {token_response.text}")
-            return redirect(f'{FRONTEND_URL}?error=token_exchange_failed&message={token_response.text[:100]}')
-        tokens = token_response.json()
-
-        access_token = tokens.get('access_token')
-        if not access_token:
-            current_app.logger.error("No access token in response")
-            return redirect(f'{FRONTEND_URL}?error=no_token')
-
-        # Get user info from Microsoft Graph API
-        graph_url = 'https://graph.microsoft.com/v1.0/me'
-        headers = {'Authorization': f'Bearer {access_token}'}
-        user_response = requests.get(graph_url, headers=headers, timeout=30)
-        user_response.raise_for_status()
-        ms_user = user_response.json()
-
-        ms_id = ms_user.get('id')
-        email = ms_user.get('mail') or ms_user.get('userPrincipalName')
-        display_name = ms_user.get('displayName') or email.split('@')[0]
-
-        current_app.logger.info(f"Microsoft user info: id={ms_id}, email={email}, name={display_name}")
-
-        # Find existing user by OAuth or email
-        user = User.query.filter_by(oauth_provider='microsoft', oauth_id=ms_id).first()
-        current_app.logger.info(f"Found user by oauth_id: {user.id if user else 'None'}")
-
-        if not user:
-            # Check if user exists with same email
-            user = User.query.filter_by(email=email).first()
-            current_app.logger.info(f"Found user by email: {user.id if user else 'None'}")
-            if user:
-                # Link existing account to Microsoft
-                user.oauth_provider = 'microsoft'
-                user.oauth_id = ms_id
-                db.session.commit()
-            else:
-                # New user - redirect to signup page with Microsoft info
-                from urllib.parse import quote
-                return redirect(f'{FRONTEND_URL}/signup?ms_id={ms_id}&email={quote(email)}&name={quote(display_name)}&need_signup=true')
-
-        if not user.is_active:
-            return redirect(f'{FRONTEND_URL}?error=account_deactivated')
-
-        # Issue a short-lived, single-use code instead of the JWT itself —
-        # putting the real token in the redirect URL would land it in
-        # server access logs and Referer headers. The frontend exchanges
-        # this code for the actual token via POST /auth/exchange-code.
-        login_code = secrets.token_urlsafe(32)
-        db.session.add(OAuthLoginCode(
-            code=login_code,
-            user_id=user.id,
-            expires_at=datetime.utcnow() + timedelta(minutes=LOGIN_CODE_TTL_MINUTES)
-        ))
-        db.session.commit()
-        current_app.logger.info(f"Issued login code for user {user.id} ({user.username}), redirecting to frontend")
+        async with async_http_client(timeout=30) as client:
+            token_response = await client.post(token_url, data=token_data)
+            if token_response.status_code != 200:
+                current_app.logger.error(f"Token exchange failed: {token_response.status_code} - {token_response.text}")
+                return redirect(f'{FRONTEND_URL}?error=token_exchange_failed&message={token_response.text[:100]}')
+            tokens = token_response.json()
+
+            access_token = tokens.get('access_token')
+            if not access_token:
+                current_app.logger.error("No access token in response")
+                return redirect(f'{FRONTEND_URL}?error=no_token')
+
+            # Get user info from Microsoft Graph API
+            graph_url = 'https://graph.microsoft.com/v1.0/me'
+            headers = {'Authorization': f'Bearer {access_token}'}
+            user_response = await client.get(graph_url, headers=headers)
+            user_response.raise_for_status()
+            ms_user = user_response.json()
 
-        return redirect(f'{FRONTEND_URL}?login_code={login_code}')
+        return await sync_to_async(_log_in_microsoft_user)(ms_user)
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         current_app.logger.error(f"Microsoft OAuth request error: {str(e)}")
         return redirect(f'{FRONTEND_URL}?error=oauth_request_failed&message={str(e)[:100]}')
     except Exception as e:
         current_app.logger.error(f"Microsoft OAuth error: {str(e)}", exc_info=True)
-        db.session.rollback()
+        await sync_to_async(db.session.rollback)()
         return redirect(f'{FRONTEND_URL}?error=oauth_failed&message={str(e)[:100]}')
 
 
+def _log_in_microsoft_user(ms_user):
+    """Find or link the user for a Microsoft Graph profile; redirect with a login code."""
+    ms_id = ms_user.get('id')
+    email = ms_user.get('mail') or ms_user.get('userPrincipalName')
+    display_name = ms_user.get('displayName') or email.split('@')[0]
+
+    current_app.logger.info(f"Microsoft user info: id={ms_id}, email={email}, name={display_name}")
+
+    # Find existing user by OAuth or email
+    user = User.query.filter_by(oauth_provider='microsoft', oauth_id=ms_id).first()
+    current_app.logger.info(f"Found user by oauth_id: {user.id if user else 'None'}")
+
+    if not user:
+        # Check if user exists with same email
+        user = User.query.filter_by(email=email).first()
+        current_app.logger.info(f"Found user by email: {user.id if user else 'None'}")
+        if user:
+            # Link existing account to Microsoft
+            user.oauth_provider = 'microsoft'
+            user.oauth_id = ms_id
+            db.session.commit()
+        else:
+            # New user - redirect to signup page with Microsoft info
+            from urllib.parse import quote
+            return redirect(f'{FRONTEND_URL}/signup?ms_id={ms_id}&email={quote(email)}&name={quote(display_name)}&need_signup=true')
+
+    if not user.is_active:
+        return redirect(f'{FRONTEND_URL}?error=account_deactivated')
+
+    # Issue a short-lived, single-use code instead of the JWT itself —
+    # putting the real token in the redirect URL would land it in
+    # server access logs and Referer headers. The frontend exchanges
+    # this code for the actual token via POST /auth/exchange-code.
+    login_code = secrets.token_urlsafe(32)
+    db.session.add(OAuthLoginCode(
+        code=login_code,
+        user_id=user.id,
+        expires_at=datetime.utcnow() + timedelta(minutes=LOGIN_CODE_TTL_MINUTES)
+    ))
+    db.session.commit()
+    current_app.logger.info(f"Issued login code for user {user.id} ({user.username}), redirecting to frontend")
+
+    return redirect(f'{FRONTEND_URL}?login_code={login_code}')
+
+
 @bp.route('/microsoft/complete-signup', methods=['POST'])
 def complete_microsoft_signup():
     """Complete signup for new Microsoft OAuth users after access code verification."""
@@ -279,7 +301,7 @@ def complete_microsoft_signup():
         return jsonify({'error': 'Missing required fields'}), 400
 
     # Verify access code
-    if access_code != SIGNUP_ACCESS_CODE:
+    if access_code != current_app.config['SIGNUP_ACCESS_CODE']:
         return jsonify({'error': 'Invalid access code'}), 403
 
     # Check if user already exists
@@ -310,6 +332,7 @@ def complete_microsoft_signup():
         )
         db.session.add(user)
         db.session.commit()
+        invalidate('users')
         current_app.logger.info(f"Created new user from Microsoft signup: {username}")
 
         # Create JWT token
@@ -1,13 +1,34 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import tuple_
+from sqlalchemy.orm import defer, joinedload
 from app import db
-from app.models import Playlist, Song, playlist_songs
+from app.models import Playlist, Song, Style, playlist_songs
+from app.serializers import requested_song_schema, song_serializer
+from app.services import playlist_membership, playlist_order, prefetch, smart_playlists
+from app.services.transcoder import parse_quality_hint
+from app.services.cache import cached_json, invalidate
+from app.services.json_stream import JSON_STREAM_BATCH_SIZE, StreamedArray, stream_json
 
 bp = Blueprint('playlists', __name__)
 
+# Largest song window GET /playlists/:id returns per request
+PLAYLIST_PAGE_MAX = 500
+
+
+def _smart_playlist_error():
+    return jsonify({'error': "A smart playlist's songs follow its smart_filter; edit the filter instead"}), 409
+
+
+def _parse_cursor(cursor):
+    """'<position>:<song_id>' of the last song of the previous window."""
+    position, _, song_id = cursor.partition(':')
+    return int(position), int(song_id)
+
 
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@cached_json(('playlists', 'users'), per_user=True)
 def get_playlists():
     """Get all playlists (user's own + public from others)."""
     user_id = get_jwt_identity()
@@ -47,7 +68,64 @@ def get_playlist(playlist_id):
     if playlist.created_by != user_id and not playlist.is_public:
         return jsonify({'error': 'Unauthorized to view this playlist'}), 403
 
-    return jsonify({'playlist': playlist.to_dict(include_songs=True)}), 200
+    bitrate_kbps = parse_quality_hint(request.args.get('quality'),
+                                      request.headers.get('Save-Data', '').lower() == 'on')
+
+    include_lyrics = request.args.get('lyrics', 'true').lower() not in ('0', 'false', 'no')
+    data = playlist.to_dict(song_count=playlist_order.song_count(playlist.id))
+    songs = playlist.songs.options(
+        joinedload(Song.style).joinedload(Style.creator),
+        joinedload(Song.creator)
+    )
+    if not include_lyrics:
+        songs = songs.options(defer(Song.specific_lyrics))
+    serialize = song_serializer(requested_song_schema(), include_user=True, include_style=True,
+                                include_lyrics=include_lyrics)
+
+    limit = request.args.get('limit', type=int)
+    if limit is None:
+        # Same shape as playlist.to_dict(include_songs=True), but the songs
+        # are streamed in batches instead of built up front
+        data['songs'] = StreamedArray(songs.yield_per(JSON_STREAM_BATCH_SIZE),
+                                      lambda song: serialize(song, bitrate_kbps))
+        return stream_json({'playlist': data})
+
+    # A window of the playlist: ?cursor= (keyset on (position, song_id),
+    # served straight off the playlist_songs index) or ?offset= to jump
+    if limit < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    limit = min(limit, PLAYLIST_PAGE_MAX)
+    offset = request.args.get('offset', 0, type=int)
+    cursor = request.args.get('cursor')
+
+    window = songs.add_columns(playlist_songs.c.position)
+    if cursor:
+        try:
+            after = _parse_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        window = window.filter(tuple_(playlist_songs.c.position, playlist_songs.c.song_id) > tuple_(*after))
+        offset = None
+    elif offset > 0:
+        window = window.offset(offset)
+    else:
+        offset = 0
+
+    # One row past the window tells whether there is a next one
+    rows = window.limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = f'{page[-1][1]}:{page[-1][0].id}' if len(rows) > limit else None
+
+    data['songs'] = [serialize(song, bitrate_kbps) for song, _ in page]
+    return jsonify({
+        'playlist': data,
+        'pagination': {
+            'total': data['song_count'],
+            'limit': limit,
+            'offset': offset,
+            'next_cursor': next_cursor
+        }
+    }), 200
 
 
 @bp.route('/', methods=['POST'])
@@ -60,16 +138,28 @@ def create_playlist():
     if not data or not data.get('name'):
         return jsonify({'error': 'Playlist name is required'}), 400
 
+    smart_filter = None
+    if data.get('smart_filter') is not None:
+        try:
+            smart_filter = smart_playlists.validate_spec(data['smart_filter'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
     playlist = Playlist(
         name=data['name'].strip(),
         description=data.get('description', ''),
         created_by=user_id,
-        is_public=data.get('is_public', True)
+        is_public=data.get('is_public', True),
+        smart_filter=smart_filter
     )
 
     try:
         db.session.add(playlist)
+        if smart_filter is not None:
+            db.session.flush()
+            smart_playlists.refresh(playlist)
         db.session.commit()
+        invalidate('playlists')
         return jsonify({
             'message': 'Playlist created successfully',
             'playlist': playlist.to_dict()
@@ -100,9 +190,19 @@ def update_playlist(playlist_id):
         playlist.description = data['description']
     if 'is_public' in data:
         playlist.is_public = data['is_public']
+    if 'smart_filter' in data:
+        # null turns it into a hand-made playlist that keeps its current songs
+        try:
+            playlist.smart_filter = (None if data['smart_filter'] is None
+                                     else smart_playlists.validate_spec(data['smart_filter']))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
     try:
+        if 'smart_filter' in data and playlist.smart_filter is not None:
+            smart_playlists.refresh(playlist)
         db.session.commit()
+        invalidate('playlists')
         return jsonify({
             'message': 'Playlist updated successfully',
             'playlist': playlist.to_dict()
@@ -128,6 +228,7 @@ def delete_playlist(playlist_id):
     try:
         db.session.delete(playlist)
         db.session.commit()
+        invalidate('playlists')
         return jsonify({'message': 'Playlist deleted successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -147,6 +248,9 @@ def add_song_to_playlist(playlist_id):
     if playlist.created_by != user_id:
         return jsonify({'error': 'You can only add songs to your own playlists'}), 403
 
+    if playlist.smart_filter is not None:
+        return _smart_playlist_error()
+
     data = request.get_json()
     song_id = data.get('song_id')
 
@@ -157,16 +261,21 @@ def add_song_to_playlist(playlist_id):
     if not song:
         return jsonify({'error': 'Song not found'}), 404
 
-    if song in playlist.songs:
+    if playlist_membership.is_member(playlist.id, song.id):
         return jsonify({'error': 'Song is already in this playlist'}), 409
 
     try:
-        playlist.songs.append(song)
+        # Appended unless the client says where (after_song_id)
+        playlist_order.add_song(playlist.id, song.id, after_song_id=data.get('after_song_id'))
         db.session.commit()
+        invalidate('playlists')
         return jsonify({
             'message': 'Song added to playlist',
             'playlist': playlist.to_dict()
         }), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -185,22 +294,171 @@ def remove_song_from_playlist(playlist_id, song_id):
     if playlist.created_by != user_id:
         return jsonify({'error': 'You can only remove songs from your own playlists'}), 403
 
+    if playlist.smart_filter is not None:
+        return _smart_playlist_error()
+
     song = Song.query.get(song_id)
     if not song:
         return jsonify({'error': 'Song not found'}), 404
 
-    if song not in playlist.songs:
+    if not playlist_membership.is_member(playlist.id, song.id):
         return jsonify({'error': 'Song is not in this playlist'}), 404
 
     try:
-        playlist.songs.remove(song)
+        playlist_membership.remove_songs([playlist.id], [song.id])
         db.session.commit()
+        invalidate('playlists')
         return jsonify({'message': 'Song removed from playlist'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/<int:playlist_id>/songs/<int:song_id>/position', methods=['PUT'])
+@jwt_required()
+def move_song_in_playlist(playlist_id, song_id):
+    """Move a song within a playlist.
+
+    Body: {"after_song_id": <id or null for the top>} or {"index": <0-based>}.
+    """
+    user_id = get_jwt_identity()
+    playlist = Playlist.query.get(playlist_id)
+
+    if not playlist:
+        return jsonify({'error': 'Playlist not found'}), 404
+
+    if playlist.created_by != user_id:
+        return jsonify({'error': 'You can only reorder your own playlists'}), 403
+
+    if playlist.smart_filter is not None:
+        return _smart_playlist_error()
+
+    data = request.get_json() or {}
+    if 'index' not in data and 'after_song_id' not in data:
+        return jsonify({'error': 'index or after_song_id is required'}), 400
+
+    try:
+        if 'index' in data:
+            position = playlist_order.move_song_to_index(playlist_id, song_id, int(data['index']))
+        else:
+            position = playlist_order.move_song(playlist_id, song_id, data['after_song_id'])
+        db.session.commit()
+        invalidate('playlists')
+        return jsonify({'message': 'Song moved', 'song_id': song_id, 'position': position}), 200
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:playlist_id>/order', methods=['PUT'])
+@jwt_required()
+def reorder_playlist(playlist_id):
+    """Set the full song order. Body: {"song_ids": [...every song in the playlist...]}."""
+    user_id = get_jwt_identity()
+    playlist = Playlist.query.get(playlist_id)
+
+    if not playlist:
+        return jsonify({'error': 'Playlist not found'}), 404
+
+    if playlist.created_by != user_id:
+        return jsonify({'error': 'You can only reorder your own playlists'}), 403
+
+    if playlist.smart_filter is not None:
+        return _smart_playlist_error()
+
+    data = request.get_json() or {}
+    song_ids = data.get('song_ids')
+    if not isinstance(song_ids, list):
+        return jsonify({'error': 'song_ids must be a list'}), 400
+
+    try:
+        playlist_order.reorder_songs(playlist_id, song_ids)
+        db.session.commit()
+        invalidate('playlists')
+        return jsonify({'message': 'Playlist reordered', 'song_ids': song_ids}), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:playlist_id>/refresh', methods=['POST'])
+@jwt_required()
+def refresh_smart_playlist(playlist_id):
+    """Rebuild a smart playlist's songs from its filter.
+
+    Song writes keep smart playlists current on their own; this is for
+    after bulk changes made outside the app.
+    """
+    user_id = get_jwt_identity()
+    playlist = Playlist.query.get(playlist_id)
+
+    if not playlist:
+        return jsonify({'error': 'Playlist not found'}), 404
+
+    if playlist.created_by != user_id:
+        return jsonify({'error': 'You can only refresh your own playlists'}), 403
+
+    if playlist.smart_filter is None:
+        return jsonify({'error': 'Not a smart playlist'}), 400
+
+    try:
+        song_count = smart_playlists.refresh(playlist)
+        db.session.commit()
+        invalidate('playlists')
+        return jsonify({'message': 'Smart playlist refreshed', 'song_count': song_count}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:playlist_id>/prefetch', methods=['GET'])
+@jwt_required()
+def get_prefetch_manifest(playlist_id):
+    """The next ?count= playable tracks after ?after_song_id= (default: from the top).
+
+    For the service worker to download ahead of playback; see
+    services/prefetch.py.
+    """
+    user_id = get_jwt_identity()
+    playlist = Playlist.query.get(playlist_id)
+
+    if not playlist:
+        return jsonify({'error': 'Playlist not found'}), 404
+
+    if playlist.created_by != user_id and not playlist.is_public:
+        return jsonify({'error': 'Unauthorized to view this playlist'}), 403
+
+    try:
+        count = prefetch.parse_count(request.args.get('count'))
+    except ValueError:
+        return jsonify({'error': 'count must be a positive integer'}), 400
+
+    songs = playlist.songs.filter(Song.status == 'completed', Song.has_audio)
+    after_song_id = request.args.get('after_song_id', type=int)
+    if after_song_id is not None:
+        position = db.session.query(playlist_songs.c.position).filter(
+            playlist_songs.c.playlist_id == playlist_id,
+            playlist_songs.c.song_id == after_song_id
+        ).scalar()
+        if position is None:
+            return jsonify({'error': 'Song not in playlist'}), 404
+        songs = songs.filter(
+            tuple_(playlist_songs.c.position, playlist_songs.c.song_id) > tuple_(position, after_song_id))
+
+    bitrate_kbps = parse_quality_hint(request.args.get('quality'),
+                                      request.headers.get('Save-Data', '').lower() == 'on')
+    return jsonify({
+        'playlist_id': playlist_id,
+        'tracks': prefetch.manifest(songs.limit(count).all(), bitrate_kbps)
+    }), 200
+
+
 @bp.route('/song/<int:song_id>/assign', methods=['POST'])
 @jwt_required()
 def assign_song_to_playlists(song_id):
@@ -214,28 +472,19 @@ def assign_song_to_playlists(song_id):
     data = request.get_json()
     playlist_ids = data.get('playlist_ids', [])
 
-    # Get all user's playlists
-    user_playlists = Playlist.query.filter_by(created_by=user_id).all()
-    user_playlist_ids = {p.id for p in user_playlists}
-
     # Validate all playlist_ids belong to user
+    owned = playlist_membership.owned_playlist_ids(user_id, playlist_ids)
     for pid in playlist_ids:
-        if pid not in user_playlist_ids:
+        if pid not in owned:
             return jsonify({'error': f'Playlist {pid} not found or not owned by you'}), 403
+    if smart_playlists.smart_playlist_ids(playlist_ids):
+        return _smart_playlist_error()
 
     try:
-        # Remove song from all user's playlists first
-        for playlist in user_playlists:
-            if song in playlist.songs:
-                playlist.songs.remove(song)
-
-        # Add song to selected playlists
-        for pid in playlist_ids:
-            playlist = Playlist.query.get(pid)
-            if song not in playlist.songs:
-                playlist.songs.append(song)
-
+        # Playlists it stays in keep its position; new ones get it at the end
+        playlist_membership.replace_memberships(user_id, [song.id], playlist_ids)
         db.session.commit()
+        invalidate('playlists')
         return jsonify({
             'message': 'Song playlist assignments updated',
             'assigned_playlists': playlist_ids
@@ -245,6 +494,96 @@ def assign_song_to_playlists(song_id):
         return jsonify({'error': str(e)}), 500
 
 
+def _bulk_ids(data, key):
+    """Validated list of ids from a bulk request body, or an error string."""
+    ids = data.get(key)
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return None, f'{key} must be a list of ids'
+    if len(ids) > playlist_membership.BULK_MAX_IDS:
+        return None, f'At most {playlist_membership.BULK_MAX_IDS} {key} per request'
+    return list(dict.fromkeys(ids)), None
+
+
+def _bulk_request(user_id):
+    """Parse and authorize {"playlist_ids": [...], "song_ids": [...]}.
+
+    Returns (playlist_ids, song_ids, None) or (None, None, error response).
+    """
+    data = request.get_json() or {}
+    playlist_ids, error = _bulk_ids(data, 'playlist_ids')
+    if error is None:
+        song_ids, error = _bulk_ids(data, 'song_ids')
+    if error:
+        return None, None, (jsonify({'error': error}), 400)
+
+    not_owned = set(playlist_ids) - playlist_membership.owned_playlist_ids(user_id, playlist_ids)
+    if not_owned:
+        return None, None, (jsonify({'error': f'Playlists not found or not owned by you: {sorted(not_owned)}'}), 403)
+    if smart_playlists.smart_playlist_ids(playlist_ids):
+        return None, None, _smart_playlist_error()
+
+    missing = set(song_ids) - playlist_membership.existing_song_ids(song_ids)
+    if missing:
+        return None, None, (jsonify({'error': f'Songs not found: {sorted(missing)}'}), 404)
+
+    return playlist_ids, song_ids, None
+
+
+@bp.route('/bulk/add', methods=['POST'])
+@jwt_required()
+def bulk_add_songs():
+    """Add many songs to many of the user's playlists (appended, existing entries kept)."""
+    playlist_ids, song_ids, error = _bulk_request(get_jwt_identity())
+    if error:
+        return error
+
+    try:
+        added = playlist_membership.add_songs(playlist_ids, song_ids)
+        db.session.commit()
+        invalidate('playlists')
+        return jsonify({'message': 'Songs added to playlists', 'added': added}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/bulk/remove', methods=['POST'])
+@jwt_required()
+def bulk_remove_songs():
+    """Remove many songs from many of the user's playlists."""
+    playlist_ids, song_ids, error = _bulk_request(get_jwt_identity())
+    if error:
+        return error
+
+    try:
+        removed = playlist_membership.remove_songs(playlist_ids, song_ids)
+        db.session.commit()
+        invalidate('playlists')
+        return jsonify({'message': 'Songs removed from playlists', 'removed': removed}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/bulk/assign', methods=['PUT'])
+@jwt_required()
+def bulk_assign_songs():
+    """Make playlist_ids exactly the user's playlists containing each song."""
+    user_id = get_jwt_identity()
+    playlist_ids, song_ids, error = _bulk_request(user_id)
+    if error:
+        return error
+
+    try:
+        added, removed = playlist_membership.replace_memberships(user_id, song_ids, playlist_ids)
+        db.session.commit()
+        invalidate('playlists')
+        return jsonify({'message': 'Song playlist assignments updated', 'added': added, 'removed': removed}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/song/<int:song_id>/playlists', methods=['GET'])
 @jwt_required()
 def get_song_playlists(song_id):
@@ -1,7 +1,11 @@
 import os
 from flask import Blueprint, jsonify, request, abort
-from app import db
+from sqlalchemy.orm import joinedload
 from app.models import Playlist, Song, playlist_songs
+from app.services import change_log, playlist_order
+from app.services.db_routing import primary_db
+from app.services.json_stream import JSON_STREAM_BATCH_SIZE, StreamedArray, stream_json
+from app.services.transcoder import parse_quality_hint
 
 bp = Blueprint('roku', __name__)
 
@@ -14,11 +18,20 @@ def _validate_key(secret_key):
         abort(403)
 
 
-def _song_to_roku(song):
-    # Resolve audio URL: prefer archived (served locally), fall back to download URL.
+def _quality_hint():
+    """Target bitrate from ?quality= (e.g. low/medium/original), or None."""
+    return parse_quality_hint(request.args.get('quality'))
+
+
+def _song_to_roku(song, bitrate_kbps=None):
+    # Resolve audio URL: prefer a transcoded rendition matching the client's
+    # quality hint, then archived (served locally), then the download URL.
     # Support both new per-track fields (_1/_2) and legacy single-track fields.
     audio_url = None
-    if song.archived_url_1:
+    rendition = song.get_rendition(bitrate_kbps)
+    if rendition:
+        audio_url = f"{BASE_URL}{rendition.url}"
+    elif song.archived_url_1:
         audio_url = f"{BASE_URL}{song.archived_url_1}"
     elif song.archived_url:
         audio_url = f"{BASE_URL}{song.archived_url}"
@@ -45,17 +58,23 @@ def _song_to_roku(song):
         'style': song.style.name if song.style else None,
         'star_rating': song.star_rating or 0,
         'duration': None,
+        'replay_gain_db': song.replay_gain_db,
+        'replay_gain_peak': song.replay_gain_peak,
     }
 
 
+def _roku_eager():
+    """Loader options for the creator and style _song_to_roku reads per song."""
+    return joinedload(Song.creator), joinedload(Song.style)
+
+
 def _has_audio():
-    """Filter condition: song has at least one playable audio URL (new or legacy fields)."""
-    return db.or_(
-        Song.archived_url_1.isnot(None),
-        Song.archived_url.isnot(None),
-        Song.download_url_1.isnot(None),
-        Song.download_url.isnot(None),
-    )
+    """Filter condition: song has at least one playable audio URL (new or legacy fields).
+
+    Song.has_audio is the generated column for exactly this, which the
+    partial index idx_songs_playable_title covers together with status.
+    """
+    return Song.has_audio
 
 
 @bp.route('/<secret_key>/playlists', methods=['GET'])
@@ -80,21 +99,25 @@ def get_playlist_songs(secret_key, playlist_id):
     if not playlist:
         return jsonify({'error': 'Playlist not found'}), 404
 
-    songs = playlist.songs.filter(
-        Song.status == 'completed',
-        _has_audio()
-    ).order_by(Song.specific_title).all()
+    bitrate_kbps = _quality_hint()
+    songs = StreamedArray(
+        playlist.songs.filter(
+            Song.status == 'completed',
+            _has_audio()
+        ).options(*_roku_eager()).yield_per(JSON_STREAM_BATCH_SIZE),  # in playlist order
+        lambda s: _song_to_roku(s, bitrate_kbps)
+    )
 
     # Nest songs inside playlist to match what Roku BrightScript expects
-    return jsonify({
+    return stream_json({
         'playlist': {
             'id': playlist.id,
             'name': playlist.name,
             'description': playlist.description,
-            'songs': [_song_to_roku(s) for s in songs],
+            'songs': songs,
         },
-        'total': len(songs)
-    }), 200
+        'total': songs.length
+    })
 
 
 @bp.route('/<secret_key>/songs', methods=['GET'])
@@ -111,14 +134,66 @@ def get_songs(secret_key):
     if playlist_id:
         query = query.join(playlist_songs).filter(
             playlist_songs.c.playlist_id == int(playlist_id)
-        )
+        ).order_by(playlist_songs.c.position, playlist_songs.c.song_id)
+    else:
+        query = query.order_by(Song.specific_title)
 
     if search:
         query = query.filter(Song.specific_title.ilike(f'%{search}%'))
 
-    songs = query.order_by(Song.specific_title).all()
+    bitrate_kbps = _quality_hint()
+    songs = StreamedArray(
+        query.options(*_roku_eager()).yield_per(JSON_STREAM_BATCH_SIZE),
+        lambda s: _song_to_roku(s, bitrate_kbps)
+    )
+
+    return stream_json({'songs': songs, 'total': songs.length})
+
 
+@bp.route('/<secret_key>/sync', methods=['GET'])
+@primary_db
+def sync(secret_key):
+    """Changes to the feeds above since ?since=<seq>, like GET /sync.
+
+    Songs that stopped being playable and playlists made private come back
+    as deleted; playlists list their playable songs' ids in order.
+    """
+    _validate_key(secret_key)
+    try:
+        since, limit = change_log.parse_sync_args(request.args)
+    except ValueError:
+        return jsonify({'error': 'since must be a non-negative integer and limit a positive one'}), 400
+    try:
+        page = change_log.changes_since(since, limit, entities=('song', 'playlist'))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'resync': True}), 410
+
+    deleted = {'song': page.deleted['song'], 'playlist': page.deleted['playlist']}
+    playable = (Song.status == 'completed', _has_audio())
+
+    songs = Song.query.filter(Song.id.in_(page.upserted['song']), *playable).options(*_roku_eager()) \
+        .order_by(Song.id).all() \
+        if page.upserted['song'] else []
+    deleted['song'] += sorted(set(page.upserted['song']) - {song.id for song in songs})
+
+    playlists = Playlist.query.filter(Playlist.id.in_(page.upserted['playlist']), Playlist.is_public == True) \
+        .order_by(Playlist.id).all() \
+        if page.upserted['playlist'] else []
+    deleted['playlist'] += sorted(set(page.upserted['playlist']) - {p.id for p in playlists})
+    members = playlist_order.ordered_song_ids_by_playlist([p.id for p in playlists], *playable)
+
+    bitrate_kbps = _quality_hint()
     return jsonify({
-        'songs': [_song_to_roku(s) for s in songs],
-        'total': len(songs)
+        'since': since,
+        'next_seq': page.next_seq,
+        'has_more': page.has_more,
+        'songs': [_song_to_roku(song, bitrate_kbps) for song in songs],
+        'playlists': [{
+            'id': p.id,
+            'name': p.name,
+            'description': p.description,
+            'song_count': len(members[p.id]),
+            'song_ids': members[p.id],
+        } for p in playlists],
+        'deleted': deleted,
     }), 200
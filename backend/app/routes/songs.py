@@ -1,60 +1,38 @@
-from flask import Blueprint, request, jsonify, current_app, abort
+from flask import Blueprint, request, jsonify, current_app, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
 from sqlalchemy.orm import joinedload
 from app import db
 from app.models import Song, Style, Playlist, playlist_songs
 from app.services.audio_storage import get_storage_service
+from app.services.http import get_http_session, async_http_client
+from app.services.metrics import suno_call
+from app.services.archiver import archive_song_to_storage as _archive_song_to_storage
 from app.services.suno_status import classify_suno_status
+from app.services.audio_decode import AudioDecodeError
+from app.services.waveform import generate_pending_waveforms
+from app.services.transcoder import parse_quality_hint, transcode_pending_renditions
+from app.services.loudness import analyze_pending_songs
+from app.services.archive_scrubber import scrub_archive, SCRUB_TIME_BUDGET_SECONDS
+from app.services.archive_scheduler import enqueue_completed_songs, run_archive_sweep, SWEEP_TIME_BUDGET_SECONDS
+from app.services import playlist_order, prefetch
+from app.services.cache import cached_json, invalidate, invalidate_songs
+from app.services.cron_auth import require_cron_key
+from app.serializers import requested_song_schema, song_serializer
+from app.services.json_stream import JSON_STREAM_BATCH_SIZE, StreamedArray, stream_json
+import asyncio
+from asgiref.sync import async_to_sync, sync_to_async
+import httpx
 import requests
 import os
-import hmac
 
 bp = Blueprint('songs', __name__)
 
 
-def _archive_song_to_storage(song):
-    """Archive song audio file to local storage."""
-    storage = get_storage_service()
-
-    if not storage.is_configured():
-        current_app.logger.warning("Local storage not configured, skipping archive")
-        return False
-
-    if song.is_archived:
-        current_app.logger.info(f"Song {song.id} already archived")
-        return True
-
-    # Get the effective download URL (new field or legacy fallback)
-    download_url = song.download_url or song.download_url_1
-
-    if not download_url:
-        current_app.logger.warning(f"Song {song.id} has no download URL to archive")
-        return False
-
-    try:
-        # Archive single track (pass None for second URL)
-        result = storage.archive_song_tracks(
-            song.id,
-            download_url,
-            None  # No second URL in new single-track model
-        )
-
-        if result.get('local_url_1'):
-            song.archived_url = result['local_url_1']
-            song.is_archived = True
-            song.archived_at = datetime.utcnow()
-            song.file_size_bytes = result.get('total_size', 0)
-            db.session.commit()
-            current_app.logger.info(f"Song {song.id} archived locally: {result}")
-            return True
-        else:
-            current_app.logger.warning(f"No track archived for song {song.id}")
-            return False
-
-    except Exception as e:
-        current_app.logger.error(f"Failed to archive song {song.id}: {e}")
-        return False
+def _quality_hint():
+    """Target rendition bitrate from ?quality= or a Save-Data header, or None."""
+    return parse_quality_hint(request.args.get('quality'),
+                              request.headers.get('Save-Data', '').lower() == 'on')
 
 
 def _submit_to_suno(song):
@@ -109,7 +87,9 @@ def _submit_to_suno(song):
     }
 
     try:
-        response = requests.post(suno_api_url, json=payload, headers=headers, timeout=10)
+        with suno_call('submit') as call:
+            response = get_http_session().post(suno_api_url, json=payload, headers=headers, timeout=10)
+            call.status_code = response.status_code
 
         # Log the status code and response for debugging
         current_app.logger.info(f"Suno API Status: {response.status_code}")
@@ -247,16 +227,43 @@ def get_songs():
     # Order by creation date (newest first)
     query = query.order_by(Song.created_at.desc())
 
-    songs = query.all()
+    bitrate_kbps = _quality_hint()
+    serialize = song_serializer(requested_song_schema(), include_user=show_all_users, include_style=True,
+                                include_playlists=True)
 
-    return jsonify({
-        'songs': [song.to_dict(include_user=show_all_users, include_style=True, include_playlists=True) for song in songs],
-        'total': len(songs)
-    }), 200
+    # Streamed in batches so memory stays flat however many songs there are
+    songs = StreamedArray(
+        query.yield_per(JSON_STREAM_BATCH_SIZE),
+        lambda song: serialize(song, bitrate_kbps)
+    )
+    return stream_json({'songs': songs, 'total': songs.length})
+
+
+@bp.route('/prefetch', methods=['GET'])
+@jwt_required()
+def get_prefetch_manifest():
+    """Prefetch manifest for a play queue: ?ids=4,9,2 in play order.
+
+    Songs that don't exist or have nothing to play yet are left out; see
+    services/prefetch.py.
+    """
+    try:
+        song_ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of song ids'}), 400
+    if len(song_ids) > prefetch.PREFETCH_MAX:
+        return jsonify({'error': f'At most {prefetch.PREFETCH_MAX} songs per manifest'}), 400
+
+    songs = Song.query.filter(Song.id.in_(song_ids), Song.status == 'completed', Song.has_audio).all() \
+        if song_ids else []
+    by_id = {song.id: song for song in songs}
+    queue = [by_id[song_id] for song_id in dict.fromkeys(song_ids) if song_id in by_id]
+    return jsonify({'tracks': prefetch.manifest(queue, _quality_hint())}), 200
 
 
 @bp.route('/<int:song_id>', methods=['GET'])
 @jwt_required()
+@cached_json(('song:{song_id}', 'styles', 'users'), vary_headers=('Save-Data',))
 def get_song(song_id):
     """Get a specific song."""
     song = Song.query.get(song_id)
@@ -264,7 +271,8 @@ def get_song(song_id):
     if not song:
         return jsonify({'error': 'Song not found'}), 404
 
-    return jsonify({'song': song.to_dict(include_user=True, include_style=True)}), 200
+    serialize = song_serializer(requested_song_schema(), include_user=True, include_style=True)
+    return jsonify({'song': serialize(song, _quality_hint())}), 200
 
 
 @bp.route('/', methods=['POST'])
@@ -374,6 +382,7 @@ def update_song(song_id):
 
     try:
         db.session.commit()
+        invalidate_songs([song_id])
         return jsonify({
             'message': 'Song updated successfully',
             'song': song.to_dict(include_user=True, include_style=True)
@@ -405,6 +414,8 @@ def delete_song(song_id):
 
         db.session.delete(song)
         db.session.commit()
+        invalidate_songs([song_id])
+        invalidate('playlists')
         return jsonify({'message': 'Song deleted successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -422,15 +433,9 @@ def get_stats():
     # Build base query
     base_query = Song.query if show_all_users else Song.query.filter_by(user_id=user_id)
 
-    # Count completed songs that actually have audio files
-    # Check both new (download_url) and legacy (download_url_1) fields
-    completed_with_audio = base_query.filter(
-        Song.status == 'completed',
-        db.or_(
-            Song.download_url.isnot(None),
-            Song.download_url_1.isnot(None)
-        )
-    ).count()
+    # Count completed songs that actually have audio files (any URL field,
+    # so uploads, which only have an archived copy, count too)
+    completed_with_audio = base_query.filter(Song.status == 'completed', Song.has_audio).count()
 
     stats = {
         'total': base_query.count(),
@@ -444,142 +449,217 @@ def get_stats():
     return jsonify(stats), 200
 
 
-def _check_suno_status(song):
-    """Check the status of a song generation task with Suno API.
-    
-    Creates separate song records for each audio track returned.
-    """
+def _suno_status_request(task_id):
+    """URL and headers for Suno's record-info call for a submitted song's task."""
     suno_api_key = os.getenv('SUNO_API_KEY')
 
     if not suno_api_key:
         raise Exception('Suno API key is not configured')
 
-    if not song.suno_task_id:
+    if not task_id:
         raise Exception('No task ID for this song')
 
     # Suno API endpoint for checking status
-    status_url = f"https://api.sunoapi.org/api/v1/generate/record-info?taskId={song.suno_task_id}"
+    status_url = os.getenv('SUNO_STATUS_URL', 'https://api.sunoapi.org/api/v1/generate/record-info')
+    status_url = f"{status_url}?taskId={task_id}"
 
     headers = {
         'Authorization': f'Bearer {suno_api_key}',
         'Content-Type': 'application/json'
     }
 
-    try:
-        response = requests.get(status_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        result = response.json()
+    return status_url, headers
 
-        current_app.logger.info(f"Suno status check for song {song.id}: {result}")
 
-        if result.get('code') != 200:
-            error_msg = result.get('msg', 'Unknown error')
-            raise Exception(f'Suno API error: {error_msg}')
+async def _fetch_suno_status(client, song_id, task_id):
+    """Fetch a song's Suno record. Takes ids, not the Song, so it can't touch the DB."""
+    status_url, headers = _suno_status_request(task_id)
 
-        data = result.get('data', {})
-        status = data.get('status', '')
-        classification = classify_suno_status(status)
+    try:
+        with suno_call('status') as call:
+            response = await client.get(status_url, headers=headers)
+            call.status_code = response.status_code
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPError as e:
+        current_app.logger.error(f"Error checking Suno status for song {song_id}: {str(e)}")
+        raise Exception(f'Failed to check status: {str(e)}')
 
-        if classification == 'success':
-            # Extract audio URLs from sunoData
-            response_data = data.get('response', {})
-            suno_data = response_data.get('sunoData', [])
 
-            if suno_data and len(suno_data) > 0:
-                created_songs = []
-                task_id = song.suno_task_id
+def _apply_suno_status(song, result):
+    """Apply a Suno record-info response to a song.
+    
+    Creates separate song records for each audio track returned.
+    """
+    current_app.logger.info(f"Suno status check for song {song.id}: {result}")
+
+    if result.get('code') != 200:
+        error_msg = result.get('msg', 'Unknown error')
+        raise Exception(f'Suno API error: {error_msg}')
+
+    data = result.get('data', {})
+    status = data.get('status', '')
+    classification = classify_suno_status(status)
+
+    if classification == 'success':
+        # Extract audio URLs from sunoData
+        response_data = data.get('response', {})
+        suno_data = response_data.get('sunoData', [])
+
+        if suno_data and len(suno_data) > 0:
+            created_songs = []
+            task_id = song.suno_task_id
+            
+            for idx, track_data in enumerate(suno_data):
+                audio_url = track_data.get('audioUrl')
+                if not audio_url:
+                    continue
+                
+                track_number = idx + 1
                 
-                for idx, track_data in enumerate(suno_data):
-                    audio_url = track_data.get('audioUrl')
-                    if not audio_url:
-                        continue
-                    
-                    track_number = idx + 1
-                    
-                    if idx == 0:
-                        # Update the original song with the first track
-                        song.download_url = audio_url
-                        song.sibling_group_id = task_id
-                        song.track_number = track_number
-                        song.status = 'completed'
-                        created_songs.append(song)
+                if idx == 0:
+                    # Update the original song with the first track
+                    song.download_url = audio_url
+                    song.sibling_group_id = task_id
+                    song.track_number = track_number
+                    song.status = 'completed'
+                    created_songs.append(song)
+                else:
+                    # Upsert: check if sibling already exists for this track (Suno fires callback multiple times)
+                    existing_sibling = Song.query.filter_by(
+                        sibling_group_id=task_id,
+                        track_number=track_number
+                    ).first()
+
+                    if existing_sibling:
+                        existing_sibling.download_url = audio_url
+                        existing_sibling.status = 'completed'
+                        created_songs.append(existing_sibling)
                     else:
-                        # Upsert: check if sibling already exists for this track (Suno fires callback multiple times)
-                        existing_sibling = Song.query.filter_by(
+                        # Create a new song for additional tracks
+                        new_song = Song(
+                            user_id=song.user_id,
+                            source_type=song.source_type,
+                            status='completed',
+                            specific_title=song.specific_title or 'Untitled',
+                            version=song.version,
+                            specific_lyrics=song.specific_lyrics,
+                            prompt_to_generate=song.prompt_to_generate,
+                            style_id=song.style_id,
+                            vocal_gender=song.vocal_gender,
+                            voice_name=song.voice_name,
+                            download_url=audio_url,
                             sibling_group_id=task_id,
-                            track_number=track_number
-                        ).first()
-
-                        if existing_sibling:
-                            existing_sibling.download_url = audio_url
-                            existing_sibling.status = 'completed'
-                            created_songs.append(existing_sibling)
-                        else:
-                            # Create a new song for additional tracks
-                            new_song = Song(
-                                user_id=song.user_id,
-                                source_type=song.source_type,
-                                status='completed',
-                                specific_title=song.specific_title or 'Untitled',
-                                version=song.version,
-                                specific_lyrics=song.specific_lyrics,
-                                prompt_to_generate=song.prompt_to_generate,
-                                style_id=song.style_id,
-                                vocal_gender=song.vocal_gender,
-                                voice_name=song.voice_name,
-                                download_url=audio_url,
-                                sibling_group_id=task_id,
-                                track_number=track_number,
-                                suno_task_id=task_id
-                            )
-                            db.session.add(new_song)
-                            # Auto-add sibling to the same playlists as the original song
-                            for playlist in song.playlists.all():
-                                new_song.playlists.append(playlist)
-                            created_songs.append(new_song)
-
-                db.session.commit()
-                current_app.logger.info(f"Created/updated {len(created_songs)} songs for task {task_id}")
-
-                # Auto-archive each song
-                for s in created_songs:
-                    _archive_song_to_storage(s)
-
-                return {
-                    'status': 'completed',
-                    'songs': [s.to_dict() for s in created_songs],
-                    'song': song.to_dict()  # Legacy: return original song
-                }
-            else:
-                current_app.logger.warning(f"Song {song.id} marked SUCCESS but no audio URLs found")
-                return {'status': 'pending', 'message': 'Waiting for audio URLs'}
-
-        elif classification == 'failed':
-            # Covers Suno's real error codes (SENSITIVE_WORD_ERROR,
-            # CREATE_TASK_FAILED, GENERATE_AUDIO_FAILED, CALLBACK_EXCEPTION,
-            # etc.) as well as any unrecognized non-success/non-pending
-            # status — these used to fall through to 'pending' and leave
-            # the song stuck until the reconcile job's hard timeout.
-            error_msg = data.get('errorMessage') or f'Suno generation failed ({status})'
-            song.status = 'failed'
-            db.session.commit()
-            current_app.logger.error(f"Song {song.id} failed: {error_msg}")
-            return {'status': 'failed', 'error': error_msg}
+                            track_number=track_number,
+                            suno_task_id=task_id
+                        )
+                        db.session.add(new_song)
+                        db.session.flush()
+                        # Auto-add sibling to the same playlists, right after the original song
+                        for playlist in song.playlists.all():
+                            playlist_order.add_song(playlist.id, new_song.id, after_song_id=song.id)
+                        created_songs.append(new_song)
 
+            db.session.commit()
+            invalidate_songs(created_songs)
+            invalidate('playlists')  # new siblings join the original's playlists
+            current_app.logger.info(f"Created/updated {len(created_songs)} songs for task {task_id}")
+
+            # Archive in the background before the Suno URLs expire
+            enqueue_completed_songs(created_songs)
+
+            return {
+                'status': 'completed',
+                'songs': [s.to_dict() for s in created_songs],
+                'song': song.to_dict()  # Legacy: return original song
+            }
         else:
-            return {'status': 'pending', 'suno_status': status or 'unknown'}
+            current_app.logger.warning(f"Song {song.id} marked SUCCESS but no audio URLs found")
+            return {'status': 'pending', 'message': 'Waiting for audio URLs'}
+
+    elif classification == 'failed':
+        # Covers Suno's real error codes (SENSITIVE_WORD_ERROR,
+        # CREATE_TASK_FAILED, GENERATE_AUDIO_FAILED, CALLBACK_EXCEPTION,
+        # etc.) as well as any unrecognized non-success/non-pending
+        # status — these used to fall through to 'pending' and leave
+        # the song stuck until the reconcile job's hard timeout.
+        error_msg = data.get('errorMessage') or f'Suno generation failed ({status})'
+        song.status = 'failed'
+        db.session.commit()
+        invalidate_songs([song])
+        current_app.logger.error(f"Song {song.id} failed: {error_msg}")
+        return {'status': 'failed', 'error': error_msg}
 
-    except requests.exceptions.RequestException as e:
-        current_app.logger.error(f"Error checking Suno status for song {song.id}: {str(e)}")
-        raise Exception(f'Failed to check status: {str(e)}')
+    else:
+        return {'status': 'pending', 'suno_status': status or 'unknown'}
+
+
+# Max Suno status requests in flight at once from one check-submitted or
+# reconcile call, so a big backlog doesn't trip Suno's rate limit.
+SUNO_STATUS_CONCURRENCY = int(os.getenv('SUNO_STATUS_CONCURRENCY', 8))
+
+
+async def _fetch_suno_statuses(checks):
+    """Suno records for many (song id, task id) pairs (or the Exception each raised), in order."""
+    semaphore = asyncio.Semaphore(SUNO_STATUS_CONCURRENCY)
+
+    async def fetch(client, song_id, task_id):
+        async with semaphore:
+            return await _fetch_suno_status(client, song_id, task_id)
+
+    async with async_http_client(timeout=30) as client:
+        return await asyncio.gather(*(fetch(client, *check) for check in checks), return_exceptions=True)
+
+
+def _end_read(songs):
+    """The songs' (id, task id) pairs, ending the read transaction so no DB connection waits on Suno."""
+    checks = [(s.id, s.suno_task_id) for s in songs]
+    db.session.commit()
+    return checks
+
+
+def _apply_suno_statuses(songs, records):
+    """Apply fetched Suno records one song at a time, since they share the request's session."""
+    outcomes = {}
+    for song, record in zip(songs, records):
+        if isinstance(record, Exception):
+            outcomes[song.id] = record
+            continue
+        try:
+            outcomes[song.id] = _apply_suno_status(song, record)
+        except Exception as e:
+            db.session.rollback()
+            outcomes[song.id] = e
+
+    return outcomes
+
+
+async def _check_suno_statuses(songs):
+    """Check songs against Suno concurrently, then apply the results in order.
+
+    The DB work runs in sync_to_async calls, on the request's thread. In
+    between, the HTTP calls overlap (at most SUNO_STATUS_CONCURRENCY at
+    once) holding neither a thread nor a DB connection. Returns {song id:
+    result dict or Exception}. The songs come back expired, so read them
+    only from sync code.
+    """
+    if not songs:
+        return {}
+    checks = await sync_to_async(_end_read)(songs)
+    records = await _fetch_suno_statuses(checks)
+    return await sync_to_async(_apply_suno_statuses)(songs, records)
 
 
 @bp.route('/<int:song_id>/check-status', methods=['POST'])
 @jwt_required()
 def check_song_status(song_id):
     """Check the generation status of a submitted song."""
-    user_id = get_jwt_identity()
-    song = Song.query.get(song_id)
+    return async_to_sync(check_song_status_async)(song_id)
+
+
+async def check_song_status_async(song_id):
+    """check_song_status's body; app/asgi.py serves it natively."""
+    song = await sync_to_async(Song.query.get)(song_id)
 
     if not song:
         return jsonify({'error': 'Song not found'}), 404
@@ -594,22 +674,27 @@ def check_song_status(song_id):
     if not song.suno_task_id:
         return jsonify({'error': 'No task ID for this song'}), 400
 
-    try:
-        result = _check_suno_status(song)
-        return jsonify(result), 200
-    except Exception as e:
-        current_app.logger.error(f"Error checking status for song {song_id}: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    result = (await _check_suno_statuses([song]))[song_id]
+    if isinstance(result, Exception):
+        current_app.logger.error(f"Error checking status for song {song_id}: {str(result)}")
+        return jsonify({'error': str(result)}), 500
+
+    return jsonify(result), 200
 
 
 @bp.route('/check-submitted', methods=['POST'])
 @jwt_required()
 def check_all_submitted():
     """Check status of all submitted songs for the current user."""
+    return async_to_sync(check_all_submitted_async)()
+
+
+async def check_all_submitted_async():
+    """check_all_submitted's body; app/asgi.py serves it natively."""
     user_id = get_jwt_identity()
 
     # Get all submitted songs for this user
-    submitted_songs = Song.query.filter_by(user_id=user_id, status='submitted').all()
+    submitted_songs = await sync_to_async(Song.query.filter_by(user_id=user_id, status='submitted').all)()
 
     if not submitted_songs:
         return jsonify({
@@ -624,31 +709,35 @@ def check_all_submitted():
     updated_count = 0
     error_count = 0
 
-    for song in submitted_songs:
-        if song.suno_task_id:
-            try:
-                result = _check_suno_status(song)
+    # Read before the check, which leaves the songs expired
+    checked = [(s.id, s.specific_title, s.suno_task_id) for s in submitted_songs]
+    outcomes = await _check_suno_statuses([s for s in submitted_songs if s.suno_task_id])
+
+    for song_id, title, task_id in checked:
+        if task_id:
+            result = outcomes[song_id]
+            if isinstance(result, Exception):
+                results.append({
+                    'song_id': song_id,
+                    'title': title,
+                    'status': 'error',
+                    'error': str(result)
+                })
+                error_count += 1
+            else:
                 results.append({
-                    'song_id': song.id,
-                    'title': song.specific_title,
+                    'song_id': song_id,
+                    'title': title,
                     **result
                 })
                 if result.get('status') == 'completed':
                     updated_count += 1
                 elif result.get('status') == 'failed':
                     error_count += 1
-            except Exception as e:
-                results.append({
-                    'song_id': song.id,
-                    'title': song.specific_title,
-                    'status': 'error',
-                    'error': str(e)
-                })
-                error_count += 1
         else:
             results.append({
-                'song_id': song.id,
-                'title': song.specific_title,
+                'song_id': song_id,
+                'title': title,
                 'status': 'error',
                 'error': 'No task ID'
             })
@@ -680,54 +769,61 @@ def reconcile_stuck_songs():
     Mirrors check-submitted's logic but runs across all users and applies
     a hard timeout so songs can't spin forever if Suno never resolves them.
     """
-    expected = os.getenv('ROKU_SECRET_KEY', '')
-    provided = request.headers.get('X-Reconcile-Key', '')
-    if not expected or not hmac.compare_digest(expected, provided):
-        abort(403)
+    return async_to_sync(reconcile_stuck_songs_async)()
+
+
+async def reconcile_stuck_songs_async():
+    """reconcile_stuck_songs's body; app/asgi.py serves it natively."""
+    require_cron_key()
 
     cutoff = datetime.utcnow() - timedelta(minutes=RECONCILE_MIN_AGE_MINUTES)
     timeout_cutoff = datetime.utcnow() - timedelta(minutes=RECONCILE_TIMEOUT_MINUTES)
 
-    stuck_songs = Song.query.filter(
+    stuck_songs = await sync_to_async(Song.query.filter(
         Song.status == 'submitted',
         Song.created_at < cutoff
-    ).all()
+    ).all)()
 
+    checked_songs = [s for s in stuck_songs if s.suno_task_id]
+    outcomes = await _check_suno_statuses(checked_songs)
+    counts = await sync_to_async(_settle_reconciled)(checked_songs, outcomes, timeout_cutoff)
+
+    return jsonify({'candidates': len(stuck_songs), **counts}), 200
+
+
+def _settle_reconciled(songs, outcomes, timeout_cutoff):
+    """Count reconcile's outcomes and fail the songs still stuck past the hard timeout."""
     checked = 0
     updated = 0
     timed_out = 0
     errors = 0
 
-    for song in stuck_songs:
-        if not song.suno_task_id:
-            continue
-
+    for song in songs:
+        result = outcomes[song.id]
         checked += 1
-        try:
-            result = _check_suno_status(song)
-            if result.get('status') == 'completed':
-                updated += 1
-            elif result.get('status') == 'failed':
-                updated += 1
-        except Exception as e:
+        if isinstance(result, Exception):
             errors += 1
-            current_app.logger.error(f"Reconcile: error checking song {song.id}: {str(e)}")
+            current_app.logger.error(f"Reconcile: error checking song {song.id}: {str(result)}")
+        elif result.get('status') == 'completed':
+            updated += 1
+        elif result.get('status') == 'failed':
+            updated += 1
 
         # Re-check status after the attempt above; if still stuck and past
         # the hard timeout, fail it so it stops spinning in the UI.
         if song.status == 'submitted' and song.created_at < timeout_cutoff:
             song.status = 'failed'
             db.session.commit()
+            invalidate_songs([song])
             timed_out += 1
             current_app.logger.warning(f"Reconcile: song {song.id} timed out after {RECONCILE_TIMEOUT_MINUTES} min, marked failed")
 
-    return jsonify({
-        'candidates': len(stuck_songs),
+    return {
         'checked': checked,
         'updated': updated,
         'timed_out': timed_out,
         'errors': errors
-    }), 200
+    }
 
 
 @bp.route('/<int:song_id>/archive', methods=['POST'])
@@ -745,7 +841,7 @@ def archive_song(song_id):
         return jsonify({'error': 'Unauthorized'}), 403
 
     # Check if song has audio to archive
-    if not song.download_url_1 and not song.download_url_2:
+    if not song.download_url and not song.download_url_1:
         return jsonify({'error': 'Song has no audio files to archive'}), 400
 
     if song.is_archived:
@@ -784,7 +880,7 @@ def archive_all_songs():
         Song.user_id == user_id,
         Song.status == 'completed',
         Song.is_archived == False,
-        db.or_(Song.download_url_1.isnot(None), Song.download_url_2.isnot(None))
+        db.or_(Song.download_url.isnot(None), Song.download_url_1.isnot(None))
     ).all()
 
     if not songs:
@@ -811,6 +907,48 @@ def archive_all_songs():
     }), 200
 
 
+@bp.route('/archive/scrub', methods=['POST'])
+def scrub_archived_songs():
+    """Cron job: verify one batch of archived files against size/checksum.
+
+    Damaged files are queued for re-archival from Suno while the download
+    URL is still valid. Reads are throttled (SCRUB_MAX_BYTES_PER_SEC) to
+    spare streaming, and the batch stops after SCRUB_TIME_BUDGET_SECONDS.
+    """
+    require_cron_key()
+
+    batch_size = min(request.args.get('batch_size', 200, type=int), 1000)
+
+    report = scrub_archive(batch_size=batch_size, logger=current_app.logger,
+                           time_budget=SCRUB_TIME_BUDGET_SECONDS)
+    current_app.logger.info(f"Archive scrub: {report}")
+
+    return jsonify(report), 200
+
+
+@bp.route('/archive/sweep', methods=['POST'])
+def sweep_unarchived_songs():
+    """Cron job: archive completed songs the background queue missed.
+
+    Songs whose Suno URLs expire soonest go first; downloads run
+    ARCHIVE_CONCURRENCY at a time under the shared bandwidth cap. No new
+    download starts after SWEEP_TIME_BUDGET_SECONDS; the report's
+    'remaining' count is left for the next run.
+    """
+    require_cron_key()
+
+    storage = get_storage_service()
+    if not storage.is_configured():
+        return jsonify({'error': 'Audio storage not configured'}), 503
+
+    limit = min(request.args.get('limit', 50, type=int), 500)
+
+    report = run_archive_sweep(limit=limit, logger=current_app.logger, time_budget=SWEEP_TIME_BUDGET_SECONDS)
+    current_app.logger.info(f"Archive sweep: {report}")
+
+    return jsonify(report), 200
+
+
 @bp.route('/storage/stats', methods=['GET'])
 @jwt_required()
 def get_storage_stats():
@@ -828,6 +966,92 @@ def get_storage_stats():
     }), 200
 
 
+# Waveforms are immutable until a song is re-archived (which changes the
+# ETag), so let clients hold on to them for a day before revalidating.
+WAVEFORM_CACHE_SECONDS = 86400
+
+
+@bp.route('/waveforms/generate', methods=['POST'])
+def generate_waveforms():
+    """Cron job: precompute waveform peaks for newly archived songs."""
+    require_cron_key()
+
+    limit = min(request.args.get('limit', 50, type=int), 500)
+
+    try:
+        result = generate_pending_waveforms(limit=limit, logger=current_app.logger)
+    except AudioDecodeError as e:
+        current_app.logger.error(f"Waveform generation unavailable: {e}")
+        return jsonify({'error': str(e)}), 503
+
+    return jsonify(result), 200
+
+
+@bp.route('/renditions/transcode', methods=['POST'])
+def transcode_renditions():
+    """Cron job: transcode newly archived songs to low-bitrate renditions."""
+    require_cron_key()
+
+    limit = min(request.args.get('limit', 20, type=int), 200)
+
+    try:
+        result = transcode_pending_renditions(limit=limit, logger=current_app.logger)
+    except AudioDecodeError as e:
+        current_app.logger.error(f"Rendition transcoding unavailable: {e}")
+        return jsonify({'error': str(e)}), 503
+
+    return jsonify(result), 200
+
+
+@bp.route('/loudness/analyze', methods=['POST'])
+def analyze_loudness():
+    """Cron job: measure loudness and ReplayGain for newly archived songs."""
+    require_cron_key()
+
+    limit = min(request.args.get('limit', 20, type=int), 200)
+
+    try:
+        result = analyze_pending_songs(limit=limit, logger=current_app.logger)
+    except AudioDecodeError as e:
+        current_app.logger.error(f"Loudness analysis unavailable: {e}")
+        return jsonify({'error': str(e)}), 503
+
+    return jsonify(result), 200
+
+
+@bp.route('/<int:song_id>/waveform', methods=['GET'])
+@jwt_required()
+def get_waveform(song_id):
+    """Get a song's precomputed waveform peaks.
+
+    Body is a flat int8 array of (min, max) pairs. The file only changes when
+    the song is re-archived, so clients can cache it and revalidate with
+    If-None-Match.
+    """
+    song = Song.query.get(song_id)
+
+    if not song:
+        return jsonify({'error': 'Song not found'}), 404
+
+    waveform_path = get_storage_service().get_waveform_path(song_id)
+
+    # An empty file marks a track that failed to decode
+    if not waveform_path.exists() or waveform_path.stat().st_size == 0:
+        return jsonify({'error': 'Waveform not available'}), 404
+
+    response = send_file(
+        waveform_path,
+        mimetype='application/octet-stream',
+        conditional=True,
+        etag=True,
+        max_age=WAVEFORM_CACHE_SECONDS
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.headers['X-Waveform-Bins'] = str(waveform_path.stat().st_size // 2)
+    return response
+
+
 @bp.route('/upload', methods=['POST'])
 @jwt_required()
 def upload_song():
@@ -896,6 +1120,8 @@ def upload_song():
         actual_size = file_path.stat().st_size
         song.archived_url = f"{storage.base_url}/songs/{song.id}/{filename}"
         song.file_size_bytes = actual_size
+        song.archive_checksum = storage.file_checksum(file_path)
+        song.archive_verified_at = datetime.utcnow()
 
         db.session.commit()
 
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify, Response, current_app
 from flask_jwt_extended import jwt_required
-import requests
+from asgiref.sync import async_to_sync
+import httpx
 import os
+from app.services.http import async_http_client
 
 bp = Blueprint('speech', __name__)
 
@@ -10,6 +12,11 @@ bp = Blueprint('speech', __name__)
 @jwt_required()
 def synthesize_speech():
     """Synthesize speech from text using Azure Speech API."""
+    return async_to_sync(synthesize_speech_async)()
+
+
+async def synthesize_speech_async():
+    """synthesize_speech's body; app/asgi.py serves it natively."""
     data = request.get_json()
 
     text = data.get('text', '').strip()
@@ -45,7 +52,8 @@ def synthesize_speech():
     }
 
     try:
-        response = requests.post(tts_endpoint, data=ssml.encode('utf-8'), headers=headers, timeout=30)
+        async with async_http_client(timeout=30) as client:
+            response = await client.post(tts_endpoint, content=ssml.encode('utf-8'), headers=headers)
 
         if response.status_code == 401:
             return jsonify({'error': 'Azure Speech API authentication failed'}), 500
@@ -67,9 +75,9 @@ def synthesize_speech():
             }
         )
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         return jsonify({'error': 'Request timed out'}), 504
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         current_app.logger.error(f"Speech synthesis error: {str(e)}")
         return jsonify({'error': 'Failed to synthesize speech'}), 500
 
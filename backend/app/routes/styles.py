@@ -2,12 +2,14 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import Style, Song
+from app.services.cache import cached_json, invalidate
 
 bp = Blueprint('styles', __name__)
 
 
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@cached_json(('styles', 'users'))
 def get_styles():
     """Get all styles."""
     styles = Style.query.order_by(Style.name).all()
@@ -54,6 +56,7 @@ def create_style():
     try:
         db.session.add(style)
         db.session.commit()
+        invalidate('styles')
         return jsonify({
             'message': 'Style created successfully',
             'style': style.to_dict()
@@ -97,6 +100,7 @@ def update_style(style_id):
 
     try:
         db.session.commit()
+        invalidate('styles')
         return jsonify({
             'message': 'Style updated successfully',
             'style': style.to_dict()
@@ -159,6 +163,7 @@ def delete_style(style_id):
     try:
         db.session.delete(style)
         db.session.commit()
+        invalidate('styles')
         return jsonify({
             'message': 'Style deleted successfully',
             'songs_reassigned': songs_count
@@ -0,0 +1,80 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
+from app.models import Playlist, Song, Style
+from app.serializers import requested_song_schema, song_serializer
+from app.services import change_log, playlist_order
+from app.services.cron_auth import require_cron_key
+from app.services.db_routing import primary_db
+from app.services.transcoder import parse_quality_hint
+
+bp = Blueprint('sync', __name__)
+
+
+# Reads the primary: a client's next_seq may come from there, and a
+# lagging replica would see it as ahead of the log
+@bp.route('/', methods=['GET'])
+@primary_db
+@jwt_required()
+def sync():
+    """What changed since ?since=<seq>: entities to upsert and ids to delete.
+
+    A client stores next_seq and passes it as since next time; since=0 (or
+    none) returns everything. Repeat while has_more is true.
+    """
+    user_id = get_jwt_identity()
+    show_all_users = request.args.get('all_users', 'false').lower() == 'true'
+    try:
+        since, limit = change_log.parse_sync_args(request.args)
+    except ValueError:
+        return jsonify({'error': 'since must be a non-negative integer and limit a positive one'}), 400
+
+    try:
+        page = change_log.changes_since(since, limit, song_owner=None if show_all_users else user_id)
+    except ValueError as e:
+        # From another database, or older than the log keeps: start over
+        return jsonify({'error': str(e), 'resync': True}), 410
+
+    deleted = page.deleted
+
+    songs = Song.query.filter(Song.id.in_(page.upserted['song'])).options(
+        joinedload(Song.style).joinedload(Style.creator),
+        joinedload(Song.creator)
+    ).order_by(Song.id).all() if page.upserted['song'] else []
+    # Deleted since the log was read: report it now (it comes again next time)
+    deleted['song'] += sorted(set(page.upserted['song']) - {song.id for song in songs})
+
+    playlists = Playlist.query.filter(Playlist.id.in_(page.upserted['playlist'])).order_by(Playlist.id).all() \
+        if page.upserted['playlist'] else []
+    visible = [p for p in playlists if p.created_by == user_id or p.is_public]
+    # Made private by its owner: gone, as far as this user is concerned
+    deleted['playlist'] += sorted(set(page.upserted['playlist']) - {p.id for p in visible})
+    members = playlist_order.ordered_song_ids_by_playlist([p.id for p in visible])
+
+    styles = Style.query.filter(Style.id.in_(page.upserted['style'])).order_by(Style.id).all() \
+        if page.upserted['style'] else []
+    deleted['style'] += sorted(set(page.upserted['style']) - {style.id for style in styles})
+
+    bitrate_kbps = parse_quality_hint(request.args.get('quality'),
+                                      request.headers.get('Save-Data', '').lower() == 'on')
+    serialize = song_serializer(requested_song_schema(), include_user=show_all_users, include_style=True,
+                                include_playlists=True)
+
+    return jsonify({
+        'since': since,
+        'next_seq': page.next_seq,
+        'has_more': page.has_more,
+        'songs': [serialize(song, bitrate_kbps) for song in songs],
+        'playlists': [dict(p.to_dict(song_count=len(members[p.id])), song_ids=members[p.id]) for p in visible],
+        'styles': [style.to_dict() for style in styles],
+        'deleted': deleted,
+    }), 200
+
+
+@bp.route('/prune', methods=['POST'])
+def prune_change_log():
+    """Cron job: compact the change log and drop expired deletes."""
+    require_cron_key()
+    removed = change_log.prune()
+    current_app.logger.info(f"Change log prune: removed {removed} rows")
+    return jsonify({'removed': removed, 'retention_days': change_log.CHANGE_LOG_RETENTION_DAYS}), 200
@@ -2,12 +2,17 @@ from flask import Blueprint, request, jsonify, current_app
 from app import db
 from app.models import Song
 from app.services.suno_status import classify_suno_status
+from app.services.archive_scheduler import enqueue_completed_songs
+from app.services import playlist_order
+from app.services.cache import invalidate, invalidate_songs
+from app.services.metrics import timed_webhook
 import json
 
 bp = Blueprint('webhooks', __name__)
 
 
 @bp.route('/azure-speech-callback', methods=['POST'])
+@timed_webhook('azure_speech')
 def azure_speech_callback():
     """
     Webhook endpoint for Azure Speech API callbacks.
@@ -79,6 +84,7 @@ def azure_speech_callback():
         current_app.logger.error(f"Azure Speech callback: Song {song.id} generation failed: {msg}")
         try:
             db.session.commit()
+            invalidate_songs([song])
             return jsonify({
                 'message': 'Song marked as failed',
                 'error': msg
@@ -138,6 +144,7 @@ def azure_speech_callback():
 
         try:
             db.session.commit()
+            invalidate_songs([song])
             current_app.logger.info(f"Azure Speech callback: Song {song.id} updated successfully")
             return jsonify({
                 'message': 'Song updated successfully',
@@ -158,6 +165,7 @@ def azure_speech_callback():
 
 
 @bp.route('/suno-callback', methods=['POST'])
+@timed_webhook('suno')
 def suno_callback():
     """
     Webhook endpoint for Suno API callbacks.
@@ -215,6 +223,7 @@ def suno_callback():
         current_app.logger.error(f"Suno callback: Song {original_song.id} generation failed ({status}): {msg}")
         try:
             db.session.commit()
+            invalidate_songs([original_song])
             return jsonify({'message': 'Song marked as failed', 'error': msg or status}), 200
         except Exception as e:
             db.session.rollback()
@@ -315,15 +324,22 @@ def suno_callback():
                         suno_task_id=task_id
                     )
                     db.session.add(new_song)
-                    # Auto-add sibling to the same playlists as the original song
+                    db.session.flush()
+                    # Auto-add sibling to the same playlists, right after the original song
                     for playlist in original_song.playlists.all():
-                        new_song.playlists.append(playlist)
+                        playlist_order.add_song(playlist.id, new_song.id, after_song_id=original_song.id)
                     created_songs.append(new_song)
                     current_app.logger.info(f"Suno callback: Created new song for track {track_number}")
 
         db.session.commit()
         
         current_app.logger.info(f"Suno callback: Created/updated {len(created_songs)} songs for task {task_id}")
+
+        invalidate_songs(created_songs)
+        invalidate('playlists')  # new siblings join the original's playlists
+
+        # Archive in the background before the Suno URLs expire
+        enqueue_completed_songs(created_songs)
         
         return jsonify({
             'message': f'Created {len(created_songs)} songs successfully',
@@ -0,0 +1,181 @@
+"""Versioned song serializers for the listing and detail endpoints.
+
+Song.to_dict() rebuilds its mapping for every row: ~30 keys, the legacy
+per-track fallbacks, and two isoformat() calls. The hot read paths
+(GET /songs, GET /songs/:id, GET /playlists/:id) use a compiled
+serializer instead. Each schema is a table of (key, expression) pairs.
+It is turned into a single Python function the first time it is
+requested with a given set of options, so serializing a row is one dict
+literal. Columns are read straight from the instance __dict__ (all
+loaded columns live there), skipping the ORM attribute machinery;
+instances with expired or unset columns take the normal attribute path.
+See benchmarks/bench_serializers.py.
+
+Schemas (picked by the client with ?schema=, unknown names fall back to
+v1 so old clients never break):
+
+- 'v1' (legacy, default): exactly what Song.to_dict() returns.
+- 'v2': the same data without the deprecated duplicates
+  (download_url_1/_2, downloaded_url_1/_2, archived_url_1/_2) and with
+  the style as style_id/style_name instead of a nested style dict.
+
+Datetimes are left as datetime objects; the JSON provider encodes them
+as ISO 8601, the same string to_dict() builds by hand.
+"""
+import functools
+import re
+
+from flask import request
+
+# Fields both schemas share. Each expression reads the song as `s`; the
+# URL fields fall back to the legacy per-track columns for old songs.
+_COMMON_FIELDS = (
+    ('id', 's.id'),
+    ('source_type', "s.source_type or 'suno'"),
+    ('status', 's.status'),
+    ('specific_title', 's.specific_title'),
+    ('version', "s.version or 'v1'"),
+    ('star_rating', 's.star_rating or 0'),
+    ('specific_lyrics', 's.specific_lyrics'),
+    ('prompt_to_generate', 's.prompt_to_generate'),
+    ('vocal_gender', 's.vocal_gender'),
+    ('voice_name', 's.voice_name'),
+    ('download_url', 'download_url'),
+    ('downloaded', 'downloaded'),
+    ('archived_url', 'archived_url'),
+    ('sibling_group_id', 's.sibling_group_id'),
+    ('track_number', 's.track_number or 1'),
+)
+
+_LEGACY_FIELDS = (
+    ('download_url_1', 'download_url'),
+    ('downloaded_url_1', 'downloaded'),
+    ('download_url_2', 's.download_url_2 if not s.download_url else None'),
+    ('downloaded_url_2', 's.downloaded_url_2 if not s.download_url else False'),
+    ('archived_url_1', 'archived_url'),
+    ('archived_url_2', 's.archived_url_2 if not s.archived_url else None'),
+)
+
+_TRAILING_FIELDS = (
+    ('suno_task_id', 's.suno_task_id'),
+    ('is_archived', 's.is_archived or False'),
+    ('archived_at', 's.archived_at'),
+    ('file_size_bytes', 's.file_size_bytes'),
+    ('loudness_lufs', 's.loudness_lufs'),
+    ('replay_gain_db', 's.replay_gain_db'),
+    ('replay_gain_peak', 's.replay_gain_peak'),
+    ('stream_url', 's.get_stream_url(bitrate_kbps)'),
+    ('renditions', '[r.to_dict() for r in s.renditions]'),
+    ('created_at', 's.created_at'),
+    ('updated_at', 's.updated_at'),
+)
+
+_USER_FIELDS = (
+    ('creator', 's.creator.username if s.creator else None'),
+    ('user_id', 's.user_id'),
+)
+
+_PLAYLIST_FIELDS = (
+    ('playlists', "[{'id': p.id, 'name': p.name} for p in s.playlists]"),
+)
+
+# Evaluated once per row before the dict is built
+_PREAMBLE = (
+    'download_url = s.download_url or s.download_url_1',
+    'archived_url = s.archived_url or s.archived_url_1',
+    'downloaded = s.downloaded if s.downloaded is not None else (s.downloaded_url_1 or False)',
+)
+
+# How the style is attached when include_style is set, per schema
+_STYLE_CODE = {
+    'v1': (
+        'style = s.style',
+        'if style is not None:',
+        "    d['style'] = {'id': style.id, 'name': style.name, 'style_prompt': style.style_prompt,",
+        "                  'created_by': style.creator.username if style.creator else None,",
+        "                  'created_by_id': style.created_by, 'created_at': style.created_at,",
+        "                  'updated_at': style.updated_at}",
+        "    d['style_name'] = style.name",
+        'else:',
+        "    d['style_id'] = s.style_id",
+    ),
+    'v2': (
+        'style = s.style',
+        "d['style_id'] = s.style_id",
+        "d['style_name'] = style.name if style is not None else None",
+    ),
+}
+
+SONG_SCHEMAS = {
+    'v1': _COMMON_FIELDS + _LEGACY_FIELDS + _TRAILING_FIELDS,
+    'v2': _COMMON_FIELDS + _TRAILING_FIELDS,
+}
+DEFAULT_SONG_SCHEMA = 'v1'
+
+# Names read off `s` in the expressions above that aren't plain columns
+_NOT_COLUMNS = {'renditions', 'style', 'creator', 'playlists', 'get_stream_url'}
+
+
+def _source(name, schema, fields, include_style, include_playlists, columns_from_dict):
+    lines = list(_PREAMBLE)
+    lines.append('d = {')
+    lines += [f'    {key!r}: {expr},' for key, expr in fields]
+    lines.append('}')
+    if include_style:
+        lines += _STYLE_CODE[schema]
+    else:
+        lines.append("d['style_id'] = s.style_id")
+    if include_playlists:
+        lines += [f'd[{key!r}] = {expr}' for key, expr in _PLAYLIST_FIELDS]
+    lines.append('return d')
+
+    body = '\n'.join(f'    {line}' for line in lines)
+    if columns_from_dict:
+        # s.column -> v['column']: a plain dict lookup instead of the ORM
+        # attribute descriptor. Relationships and methods still go through
+        # the instance.
+        body = '    v = s.__dict__\n' + re.sub(
+            r'\bs\.(\w+)\b(?!\()',
+            lambda m: m.group(0) if m.group(1) in _NOT_COLUMNS else f'v[{m.group(1)!r}]',
+            body
+        )
+    return f'def {name}(s, bitrate_kbps=None):\n{body}'
+
+
+@functools.lru_cache(maxsize=None)
+def song_serializer(schema=DEFAULT_SONG_SCHEMA, include_user=False, include_style=True, include_playlists=False,
+                    include_lyrics=True):
+    """Compiled `serialize(song, bitrate_kbps=None) -> dict` for a schema.
+
+    Takes the same include_* options as Song.to_dict(), plus include_lyrics:
+    list views that never show lyrics drop specific_lyrics (the bulk of a
+    song's payload) and can defer loading the column. Compiled once per
+    combination and cached.
+    """
+    fields = SONG_SCHEMAS[schema]
+    if not include_lyrics:
+        fields = tuple(field for field in fields if field[0] != 'specific_lyrics')
+    if include_user:
+        fields += _USER_FIELDS
+
+    namespace = {}
+    for name, from_dict in (('_fast', True), ('_slow', False)):
+        source = _source(name, schema, fields, include_style, include_playlists, from_dict)
+        exec(compile(source, f'<song serializer {schema} {name}>', 'exec'), namespace)
+    fast, slow = namespace['_fast'], namespace['_slow']
+
+    def serialize(song, bitrate_kbps=None):
+        try:
+            return fast(song, bitrate_kbps)
+        except KeyError:
+            # Expired (e.g. after a commit) or not-yet-set columns aren't in
+            # __dict__; the attribute path loads or defaults them
+            return slow(song, bitrate_kbps)
+
+    return serialize
+
+
+def requested_song_schema():
+    """Schema named by ?schema= on the current request, or the default."""
+    schema = request.args.get('schema', DEFAULT_SONG_SCHEMA)
+    return schema if schema in SONG_SCHEMAS else DEFAULT_SONG_SCHEMA
@@ -0,0 +1,210 @@
+"""Expiry-aware archival of completed songs before their Suno URLs expire.
+
+Suno download URLs stop working SUNO_URL_TTL_DAYS after generation, so
+every completed song has a deadline. Two paths feed archival:
+
+- enqueue_completed_songs() is called right after a song completes (Suno
+  webhook or status poll). It hands the song to a per-process background
+  queue, ordered by URL expiry, so the request returns immediately.
+- run_archive_sweep() is the cron backstop for anything the queue missed
+  (worker restarts, downloads that failed). It archives the most urgent
+  unarchived songs first: URLs still live and closest to expiry, then
+  already-expired ones as a last-ditch attempt.
+
+Both run downloads ARCHIVE_CONCURRENCY at a time and share one RateLimiter,
+so archival never takes more than ARCHIVE_MAX_BYTES_PER_SEC of the uplink.
+"""
+import heapq
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import Song
+from app.services.archiver import archive_song_to_storage, suno_url_expires_at, SUNO_URL_TTL_DAYS
+from app.services.throttle import RateLimiter
+
+ARCHIVE_CONCURRENCY = int(os.getenv('ARCHIVE_CONCURRENCY', 3))
+ARCHIVE_MAX_BYTES_PER_SEC = int(os.getenv('ARCHIVE_MAX_BYTES_PER_SEC', 4 * 1024 * 1024))
+
+# Seconds a cron-triggered sweep may start new downloads for, so the
+# request finishes well inside the gunicorn worker timeout
+SWEEP_TIME_BUDGET_SECONDS = float(os.getenv('SWEEP_TIME_BUDGET_SECONDS', 20))
+
+
+def _archive_by_id(app, song_id, throttle):
+    """Archive one song in its own app context (and so its own DB session)."""
+    with app.app_context():
+        try:
+            song = db.session.get(Song, song_id)
+            if not song:
+                return False
+            return archive_song_to_storage(song, throttle=throttle)
+        finally:
+            db.session.remove()
+
+
+class ArchiveScheduler:
+    """Per-process priority queue of songs to archive, drained by worker threads."""
+
+    def __init__(self, concurrency=ARCHIVE_CONCURRENCY, max_bytes_per_sec=ARCHIVE_MAX_BYTES_PER_SEC):
+        self.concurrency = concurrency
+        self.throttle = RateLimiter(max_bytes_per_sec)
+        self._heap = []
+        self._queued = set()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._pid = None
+
+    def enqueue(self, app, song_id, expires_at=None):
+        """Queue a song for archival; earlier expires_at is served first."""
+        priority = expires_at.timestamp() if expires_at else float('inf')
+
+        with self._cond:
+            if song_id in self._queued:
+                return False
+            self._queued.add(song_id)
+            heapq.heappush(self._heap, (priority, song_id))
+            self._ensure_workers(app)
+            self._cond.notify()
+        return True
+
+    def pending(self):
+        """Number of songs waiting in this process's queue."""
+        with self._cond:
+            return len(self._heap)
+
+    def _ensure_workers(self, app):
+        # Threads don't survive fork: with gunicorn's preload_app the master
+        # may have enqueued before forking, so start workers per process.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._workers = []
+
+        while len(self._workers) < self.concurrency:
+            worker = threading.Thread(target=self._work, args=(app,), name='archive-worker', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self, app):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, song_id = heapq.heappop(self._heap)
+
+            try:
+                _archive_by_id(app, song_id, self.throttle)
+            except Exception as e:
+                app.logger.error(f"Archive worker: song {song_id} failed: {e}")
+            finally:
+                with self._cond:
+                    self._queued.discard(song_id)
+
+
+# Singleton instance
+_archive_scheduler = None
+
+
+def get_archive_scheduler() -> ArchiveScheduler:
+    """Get or create the archive scheduler singleton."""
+    global _archive_scheduler
+    if _archive_scheduler is None:
+        _archive_scheduler = ArchiveScheduler()
+    return _archive_scheduler
+
+
+def enqueue_completed_songs(songs):
+    """Queue freshly completed songs for archival without blocking the request.
+
+    Disabled with ARCHIVE_ON_COMPLETE=False (the test config), in which case
+    the cron sweep is the only archival path.
+    """
+    if not current_app.config.get('ARCHIVE_ON_COMPLETE', True):
+        return 0
+
+    app = current_app._get_current_object()
+    scheduler = get_archive_scheduler()
+    queued = 0
+
+    for song in songs:
+        if song.is_archived or not (song.download_url or song.download_url_1):
+            continue
+        if scheduler.enqueue(app, song.id, suno_url_expires_at(song)):
+            queued += 1
+
+    return queued
+
+
+def _sweep_candidates(limit, now):
+    """Unarchived completed songs, most urgent first.
+
+    Live URLs come first, oldest (least lifetime left) first; songs past the
+    nominal expiry follow, newest first, since Suno sometimes keeps files a
+    little longer and the newest of those are likeliest to still download.
+    """
+    expiry_cutoff = now - timedelta(days=SUNO_URL_TTL_DAYS)
+    expired = Song.created_at < expiry_cutoff
+
+    return Song.query.filter(
+        Song.status == 'completed',
+        Song.is_archived == False,
+        db.or_(Song.download_url.isnot(None), Song.download_url_1.isnot(None))
+    ).order_by(
+        db.case((expired, 1), else_=0),
+        db.case((expired, None), else_=Song.created_at).asc(),
+        Song.created_at.desc()
+    ).limit(limit).all()
+
+
+def run_archive_sweep(limit=50, concurrency=ARCHIVE_CONCURRENCY, logger=None, time_budget=None):
+    """Archive the most urgent unarchived songs, concurrently and bandwidth-capped.
+
+    Returns counts plus how many URLs are within a day of expiring, so a
+    growing backlog shows up in the cron log before tracks are lost. With
+    time_budget (seconds), no new download starts once it is spent; the
+    songs not started are counted in 'remaining' for the next run.
+    """
+    started = time.monotonic()
+    now = datetime.utcnow()
+    app = current_app._get_current_object()
+    songs = _sweep_candidates(limit, now)
+
+    song_ids = [s.id for s in songs]
+    expiring_soon = sum(
+        1 for s in songs
+        if s.created_at and now < suno_url_expires_at(s) <= now + timedelta(days=1)
+    )
+    expired = sum(1 for s in songs if s.created_at and suno_url_expires_at(s) <= now)
+
+    # Release this session's connection while workers use their own
+    db.session.remove()
+
+    throttle = get_archive_scheduler().throttle
+
+    def archive(song_id):
+        if time_budget is not None and time.monotonic() - started >= time_budget:
+            return None
+        return _archive_by_id(app, song_id, throttle)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(archive, song_ids))
+
+    archived = sum(1 for ok in results if ok)
+    failed = [song_id for song_id, ok in zip(song_ids, results) if ok is False]
+
+    if failed and logger:
+        logger.warning(f"Archive sweep: failed to archive songs {failed}")
+
+    return {
+        'candidates': len(song_ids),
+        'archived': archived,
+        'failed': failed,
+        'remaining': sum(1 for ok in results if ok is None),
+        'expiring_within_day': expiring_soon,
+        'past_expiry': expired,
+    }
@@ -0,0 +1,152 @@
+"""Integrity scrubber for the local audio archive.
+
+Walks archived songs oldest-verified first, in bounded batches, and checks
+that each file behind archived_url still exists with the size and SHA-256
+recorded at archive time. Reads go through a RateLimiter so a scrub never
+competes with nginx for disk bandwidth during live streaming.
+
+A damaged file whose Suno download_url is still within its lifetime is
+marked unarchived and handed to the archive scheduler, which downloads it
+in the background (the cron sweep picks it up if the queue doesn't).
+Past that lifetime it's reported as unrecoverable so someone can restore
+it from backup (see deploy/BACKUP.md).
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Song
+from app.services.archiver import suno_url_expires_at
+from app.services.audio_storage import get_storage_service
+from app.services.cache import invalidate_songs
+from app.services.throttle import RateLimiter
+
+SCRUB_BATCH_SIZE = int(os.getenv('SCRUB_BATCH_SIZE', 200))
+SCRUB_MAX_BYTES_PER_SEC = int(os.getenv('SCRUB_MAX_BYTES_PER_SEC', 5 * 1024 * 1024))
+
+# A file verified more recently than this is skipped by the scheduled job,
+# so a daily cron re-checks the whole archive roughly weekly.
+SCRUB_INTERVAL_DAYS = int(os.getenv('SCRUB_INTERVAL_DAYS', 7))
+
+# Wall-clock budget of one cron scrub, well inside gunicorn's timeout; the
+# songs left over are the first of the next batch
+SCRUB_TIME_BUDGET_SECONDS = float(os.getenv('SCRUB_TIME_BUDGET_SECONDS', 20))
+
+
+def _check_file(storage, song, throttle):
+    """Return (problem, digest) for one song; problem is None when intact."""
+    file_path = storage.get_local_path(song.archived_url)
+    if not file_path or not file_path.exists():
+        return 'missing', None
+
+    # Sizes are only exact for songs archived since checksums were recorded;
+    # legacy rows may hold the combined size of both tracks.
+    if song.archive_checksum and song.file_size_bytes is not None:
+        if file_path.stat().st_size != song.file_size_bytes:
+            return 'size_mismatch', None
+
+    digest = storage.file_checksum(file_path, throttle=throttle)
+    if song.archive_checksum and digest != song.archive_checksum:
+        return 'checksum_mismatch', digest
+
+    return None, digest
+
+
+def _mark_for_rearchive(song, now):
+    """Flag a damaged song for re-download if its Suno URL should still work."""
+    download_url = song.download_url or song.download_url_1
+    expires_at = suno_url_expires_at(song)
+
+    if not download_url or not expires_at or expires_at <= now:
+        return False
+
+    song.is_archived = False
+    return True
+
+
+def scrub_archive(batch_size=SCRUB_BATCH_SIZE, max_bytes_per_sec=SCRUB_MAX_BYTES_PER_SEC,
+                  verified_before=None, logger=None, time_budget=None, enqueue=True):
+    """Verify one batch of archived files against their DB records.
+
+    Args:
+        batch_size: Max songs to check in this call
+        max_bytes_per_sec: Read throttle for hashing (0 disables)
+        verified_before: Only check songs not verified since this time;
+            defaults to SCRUB_INTERVAL_DAYS ago
+        logger: Optional logger for per-song problems
+        time_budget: Stop starting new files after this many seconds
+            (None: check the whole batch)
+        enqueue: Hand requeued songs to the archive scheduler; without it
+            the caller re-archives them (or leaves them to the sweep)
+
+    Returns:
+        Report dict: counts plus the song ids in each problem bucket.
+        'requeued' songs are marked unarchived, not yet downloaded.
+    """
+    started = time.monotonic()
+    now = datetime.utcnow()
+    if verified_before is None:
+        verified_before = now - timedelta(days=SCRUB_INTERVAL_DAYS)
+
+    storage = get_storage_service()
+    throttle = RateLimiter(max_bytes_per_sec)
+
+    songs = Song.query.filter(
+        Song.is_archived == True,
+        Song.archived_url.isnot(None),
+        db.or_(Song.archive_verified_at.is_(None), Song.archive_verified_at < verified_before)
+    ).order_by(Song.archive_verified_at.asc().nullsfirst(), Song.id).limit(batch_size).all()
+
+    report = {
+        'checked': 0,
+        'ok': 0,
+        'backfilled': 0,
+        'missing': [],
+        'size_mismatch': [],
+        'checksum_mismatch': [],
+        'requeued': [],
+        'unrecoverable': [],
+        'stopped_early': False,
+    }
+    requeued = []
+
+    for song in songs:
+        if time_budget is not None and report['checked'] and time.monotonic() - started >= time_budget:
+            report['stopped_early'] = True
+            break
+        report['checked'] += 1
+        problem, digest = _check_file(storage, song, throttle)
+        song.archive_verified_at = now
+
+        if problem is None:
+            report['ok'] += 1
+            if not song.archive_checksum:
+                # Archived before checksums were recorded — trust the
+                # current file as the baseline from here on.
+                song.archive_checksum = digest
+                report['backfilled'] += 1
+            db.session.commit()
+            continue
+
+        report[problem].append(song.id)
+        if logger:
+            logger.warning(f"Archive scrub: song {song.id} {problem} ({song.archived_url})")
+
+        marked = _mark_for_rearchive(song, now)
+        if marked:
+            report['requeued'].append(song.id)
+            requeued.append(song)
+        else:
+            report['unrecoverable'].append(song.id)
+        db.session.commit()
+        if marked:
+            # Cached song details still point at the damaged file
+            invalidate_songs([song])
+
+    if requeued and enqueue:
+        # Imported here: archive_scheduler imports archiver too, keep this module light
+        from app.services.archive_scheduler import enqueue_completed_songs
+        enqueue_completed_songs(requeued)
+
+    return report
@@ -0,0 +1,77 @@
+"""Archive a song's Suno audio to local storage and record it on the song.
+
+Shared by the request paths in routes/songs.py, the archive scrubber and
+the import scripts, so every path stores the same metadata (URL, size,
+checksum) and resets the derived media (renditions, loudness) the same way.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.services.audio_storage import get_storage_service
+from app.services.cache import invalidate_songs
+
+# Suno download URLs stop working this long after generation (see README).
+SUNO_URL_TTL_DAYS = 15
+
+
+def suno_url_expires_at(song):
+    """When the song's Suno download URL is expected to expire, or None."""
+    if not song.created_at:
+        return None
+    return song.created_at + timedelta(days=SUNO_URL_TTL_DAYS)
+
+
+def archive_song_to_storage(song, throttle=None):
+    """Archive song audio file to local storage.
+
+    Pass the archive scheduler's throttle from background jobs so their
+    downloads count against the shared bandwidth cap.
+    """
+    storage = get_storage_service()
+
+    if not storage.is_configured():
+        current_app.logger.warning("Local storage not configured, skipping archive")
+        return False
+
+    if song.is_archived:
+        current_app.logger.info(f"Song {song.id} already archived")
+        return True
+
+    # Get the effective download URL (new field or legacy fallback)
+    download_url = song.download_url or song.download_url_1
+
+    if not download_url:
+        current_app.logger.warning(f"Song {song.id} has no download URL to archive")
+        return False
+
+    try:
+        # Archive single track (pass None for second URL)
+        result = storage.archive_song_tracks(
+            song.id,
+            download_url,
+            None,  # No second URL in new single-track model
+            throttle=throttle
+        )
+
+        if result.get('local_url_1'):
+            # Renditions/analysis of a previous copy are stale; let the
+            # transcode and loudness jobs rebuild them from the new file.
+            song.renditions.clear()
+            song.loudness_analyzed_at = None
+            song.archived_url = result['local_url_1']
+            song.archive_checksum = result['checksum_1']
+            song.is_archived = True
+            song.archived_at = datetime.utcnow()
+            song.archive_verified_at = song.archived_at
+            song.file_size_bytes = result.get('total_size', 0)
+            db.session.commit()
+            invalidate_songs([song])
+            current_app.logger.info(f"Song {song.id} archived locally: {result}")
+            return True
+        else:
+            current_app.logger.warning(f"No track archived for song {song.id}")
+            return False
+
+    except Exception as e:
+        current_app.logger.error(f"Failed to archive song {song.id}: {e}")
+        return False
@@ -0,0 +1,65 @@
+"""Decode archived audio files to PCM for server-side analysis.
+
+Shells out to a local ffmpeg binary (installed in the Docker image) rather
+than pulling in a Python MP3 decoder — ffmpeg does the resampling/downmix
+for us, so callers always get one predictable format: float32 in [-1, 1].
+"""
+import os
+import shutil
+import subprocess
+
+import numpy as np
+
+FFMPEG_BIN = os.getenv('FFMPEG_BIN', 'ffmpeg')
+
+# Decoding a single track should take a second or two; anything longer is a
+# wedged ffmpeg or a pathological file, not a slow song.
+DECODE_TIMEOUT_SECONDS = 120
+
+
+class AudioDecodeError(Exception):
+    """Raised when ffmpeg is missing or cannot decode the input file."""
+
+
+def ffmpeg_available():
+    """Check whether the configured ffmpeg binary can be found."""
+    return shutil.which(FFMPEG_BIN) is not None
+
+
+def decode_to_pcm(path, sample_rate=8000, channels=1):
+    """Decode an audio file to a float32 numpy array.
+
+    Args:
+        path: Local filesystem path to the audio file
+        sample_rate: Output sample rate in Hz
+        channels: Output channel count (1 = downmix to mono)
+
+    Returns:
+        np.ndarray of float32 samples in [-1, 1]. Multi-channel output is
+        shaped (frames, channels); mono output is 1-D.
+    """
+    cmd = [
+        FFMPEG_BIN, '-v', 'error', '-nostdin',
+        '-i', str(path),
+        '-f', 's16le', '-acodec', 'pcm_s16le',
+        '-ac', str(channels), '-ar', str(sample_rate),
+        'pipe:1',
+    ]
+
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=DECODE_TIMEOUT_SECONDS)
+    except FileNotFoundError:
+        raise AudioDecodeError(f"ffmpeg not found (looked for '{FFMPEG_BIN}')")
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError(f"ffmpeg timed out decoding {path}")
+
+    if proc.returncode != 0:
+        stderr = proc.stderr.decode('utf-8', errors='replace').strip()
+        raise AudioDecodeError(f"ffmpeg failed decoding {path}: {stderr[:200]}")
+
+    samples = np.frombuffer(proc.stdout, dtype='<i2').astype(np.float32) / 32768.0
+
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+
+    return samples
@@ -1,10 +1,15 @@
 """Local filesystem storage service for permanent audio archival."""
 import os
 import shutil
-import requests
+import hashlib
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 
+from app.services.http import get_http_session
+from app.services.metrics import record_archive
+
 
 class AudioStorageService:
     """Service for storing and managing audio files on local filesystem."""
@@ -26,7 +31,39 @@ class AudioStorageService:
         """Get the directory path for a song's audio files."""
         return self.base_path / "songs" / str(song_id)
 
-    def archive_song(self, song_id: int, suno_url: str, track_num: int) -> dict:
+    def get_local_path(self, url_path: str):
+        """
+        Map an archived URL (e.g. /audio/songs/12/track_1.mp3) back to its file.
+
+        Returns None for URLs outside this storage's base_url (e.g. a raw
+        Suno URL) or that would resolve outside base_path.
+        """
+        if not url_path:
+            return None
+
+        prefix = self.base_url.rstrip('/') + '/'
+        if not url_path.startswith(prefix):
+            return None
+
+        local_path = (self.base_path / url_path[len(prefix):]).resolve()
+        if self.base_path.resolve() not in local_path.parents:
+            return None
+
+        return local_path
+
+    def get_waveform_path(self, song_id: int) -> Path:
+        """Get the path of a song's precomputed waveform peaks file."""
+        return self.get_song_dir(song_id) / "waveform.bin"
+
+    def get_rendition_path(self, song_id: int, bitrate_kbps: int) -> Path:
+        """Get the path of a song's transcoded rendition at a given bitrate."""
+        return self.get_song_dir(song_id) / f"track_1_{bitrate_kbps}k.mp3"
+
+    def get_rendition_url(self, song_id: int, bitrate_kbps: int) -> str:
+        """Get the URL path (served by nginx) of a song's rendition."""
+        return f"{self.base_url}/songs/{song_id}/track_1_{bitrate_kbps}k.mp3"
+
+    def archive_song(self, song_id: int, suno_url: str, track_num: int, throttle=None) -> dict:
         """
         Download audio from Suno and save to local filesystem.
 
@@ -34,9 +71,10 @@ class AudioStorageService:
             song_id: The database song ID
             suno_url: The Suno-provided download URL
             track_num: Which track (1 or 2)
+            throttle: Optional RateLimiter capping download bandwidth
 
         Returns:
-            dict with 'url' and 'size' keys, or raises exception
+            dict with 'url', 'size' and 'sha256' keys, or raises exception
         """
         if not self.is_configured():
             raise ValueError("Audio storage not configured or not writable")
@@ -48,29 +86,61 @@ class AudioStorageService:
         song_dir = self.get_song_dir(song_id)
         song_dir.mkdir(parents=True, exist_ok=True)
 
+        started = time.perf_counter()
+        try:
+            result = self._download(song_id, suno_url, track_num, song_dir, throttle)
+        except Exception:
+            record_archive(0, time.perf_counter() - started, outcome='error')
+            raise
+        record_archive(result['size'], time.perf_counter() - started)
+        return result
+
+    def _download(self, song_id, suno_url, track_num, song_dir, throttle):
+        """Fetch one track into song_dir; returns archive_song()'s dict."""
         # Download from Suno
-        response = requests.get(suno_url, stream=True, timeout=120)
+        response = get_http_session().get(suno_url, stream=True, timeout=120)
         response.raise_for_status()
 
-        # Save to local file
+        # Save to a temp file and rename into place, so a failed download
+        # never truncates an existing good copy
         filename = f"track_{track_num}.mp3"
         file_path = song_dir / filename
+        # Unique per writer: the scheduler and a manual archive may race
+        tmp_path = file_path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.part')
+        checksum = hashlib.sha256()
 
-        with open(file_path, 'wb') as f:
+        with open(tmp_path, 'wb') as f:
             for chunk in response.iter_content(chunk_size=8192):
+                if throttle:
+                    throttle.consume(len(chunk))
                 f.write(chunk)
+                checksum.update(chunk)
+
+        file_size = tmp_path.stat().st_size
+        # Content-Length is only comparable when requests didn't decompress
+        expected_size = response.headers.get('Content-Length')
+        if (expected_size and expected_size.isdigit() and not response.headers.get('Content-Encoding')
+                and int(expected_size) != file_size):
+            tmp_path.unlink(missing_ok=True)
+            raise IOError(f"Truncated download for song {song_id}: got {file_size} of {expected_size} bytes")
+
+        tmp_path.replace(file_path)
 
-        file_size = file_path.stat().st_size
+        # Any waveform/renditions derived from a previous copy of this track are stale
+        self.get_waveform_path(song_id).unlink(missing_ok=True)
+        for rendition in song_dir.glob(f"track_{track_num}_*k.mp3"):
+            rendition.unlink(missing_ok=True)
 
         # Return the URL path (served by nginx)
         url_path = f"{self.base_url}/songs/{song_id}/{filename}"
 
         return {
             'url': url_path,
-            'size': file_size
+            'size': file_size,
+            'sha256': checksum.hexdigest()
         }
 
-    def archive_song_tracks(self, song_id: int, url_1: str = None, url_2: str = None) -> dict:
+    def archive_song_tracks(self, song_id: int, url_1: str = None, url_2: str = None, throttle=None) -> dict:
         """
         Archive both tracks of a song.
 
@@ -78,28 +148,33 @@ class AudioStorageService:
             song_id: The database song ID
             url_1: First track Suno URL
             url_2: Second track Suno URL
+            throttle: Optional RateLimiter capping download bandwidth
 
         Returns:
-            dict with 'local_url_1', 'local_url_2', 'total_size'
+            dict with 'local_url_1', 'local_url_2', 'checksum_1', 'checksum_2', 'total_size'
         """
         result = {
             'local_url_1': None,
             'local_url_2': None,
+            'checksum_1': None,
+            'checksum_2': None,
             'total_size': 0
         }
 
         if url_1:
             try:
-                track_1 = self.archive_song(song_id, url_1, 1)
+                track_1 = self.archive_song(song_id, url_1, 1, throttle=throttle)
                 result['local_url_1'] = track_1['url']
+                result['checksum_1'] = track_1['sha256']
                 result['total_size'] += track_1['size']
             except Exception as e:
                 print(f"Failed to archive track 1 for song {song_id}: {e}")
 
         if url_2:
             try:
-                track_2 = self.archive_song(song_id, url_2, 2)
+                track_2 = self.archive_song(song_id, url_2, 2, throttle=throttle)
                 result['local_url_2'] = track_2['url']
+                result['checksum_2'] = track_2['sha256']
                 result['total_size'] += track_2['size']
             except Exception as e:
                 print(f"Failed to archive track 2 for song {song_id}: {e}")
@@ -122,6 +197,26 @@ class AudioStorageService:
             except Exception as e:
                 print(f"Error deleting song files for {song_id}: {e}")
 
+    def file_checksum(self, file_path: Path, chunk_size: int = 65536, throttle=None) -> str:
+        """
+        SHA-256 of a stored file, read in chunks.
+
+        Args:
+            file_path: File to hash
+            chunk_size: Bytes per read
+            throttle: Optional RateLimiter; each read waits for its byte budget
+        """
+        checksum = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            while True:
+                if throttle:
+                    throttle.consume(chunk_size)
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                checksum.update(chunk)
+        return checksum.hexdigest()
+
     def get_storage_stats(self) -> dict:
         """Get storage usage statistics."""
         total_size = 0
@@ -0,0 +1,224 @@
+"""Response cache for hot read endpoints (styles, playlists, users, song detail).
+
+Cached views store their JSON body under a key built from the request
+(path, query string, selected headers, and the user for per-user views)
+plus the current *generation* of each namespace the response depends on,
+e.g. 'styles' or 'song:42'. Write paths call invalidate('styles') to bump
+the generation, which orphans every key built on the old one; orphans
+age out by TTL or LRU. That makes invalidation one counter increment no
+matter how many query/user variants are cached.
+
+Backends (CACHE_BACKEND):
+- 'memory': per-process LRU with TTL. Invalidation only reaches the
+  process that made the write, so gunicorn_config.py refuses it with
+  more than one worker. The default for development and tests.
+- 'redis': any redis-py compatible client at CACHE_REDIS_URL, shared by
+  all workers, so invalidation is immediate everywhere. The default when
+  CACHE_REDIS_URL is set.
+- 'none': caching disabled. The default otherwise.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt_identity
+
+
+class MemoryCache:
+    """Thread-safe LRU of bytes values with per-entry expiry."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Generation counters live outside the LRU: evicting one would
+        # reset it and could resurrect entries built on an old value.
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                if key in self._counters:
+                    values.append(self._counters[key])
+                    continue
+                entry = self._entries.get(key)
+                if entry is None or entry[1] <= now:
+                    self._entries.pop(key, None)
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+        return values
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add_counter(self, key, value):
+        with self._lock:
+            self._counters.setdefault(key, str(value).encode())
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._counters.get(key, b'0')) + 1
+            self._counters[key] = str(value).encode()
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCache:
+    """Same interface on top of a redis-py compatible client."""
+
+    def __init__(self, client, prefix='aiamusic:cache:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        return self.client.mget([self.prefix + k for k in keys])
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def add_counter(self, key, value):
+        self.client.set(self.prefix + key, value, nx=True)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    """Namespace generations and cached bodies over a backend."""
+
+    def __init__(self, backend, default_ttl=60):
+        self.backend = backend
+        self.default_ttl = default_ttl
+
+    def _generations(self, namespaces):
+        counter_keys = [f'gen:{ns}' for ns in namespaces]
+        values = self.backend.get_many(counter_keys)
+        missing = [k for k, v in zip(counter_keys, values) if v is None]
+        if missing:
+            # Seed from the clock rather than 0 so a counter lost to a
+            # Redis restart/eviction can't line up with an old value.
+            for key in missing:
+                self.backend.add_counter(key, time.time_ns())
+            values = self.backend.get_many(counter_keys)
+        return [v.decode() if isinstance(v, bytes) else str(v) for v in values]
+
+    def key(self, namespaces, variant):
+        generations = self._generations(namespaces)
+        digest = hashlib.sha1(variant.encode()).hexdigest()
+        return 'resp:' + ','.join(f'{ns}@{g}' for ns, g in zip(namespaces, generations)) + ':' + digest
+
+    def get(self, key):
+        return self.backend.get_many([key])[0]
+
+    def set(self, key, body, ttl=None):
+        self.backend.set(key, body, ttl or self.default_ttl)
+
+    def invalidate(self, *namespaces):
+        for ns in namespaces:
+            counter_key = f'gen:{ns}'
+            self.backend.add_counter(counter_key, time.time_ns())
+            self.backend.incr(counter_key)
+
+
+def _make_backend(app):
+    backend = app.config.get('CACHE_BACKEND', 'none')
+    if backend == 'none':
+        return None
+    if backend == 'redis':
+        # Optional dependency: only needed when the Redis backend is used
+        import redis
+        return RedisCache(redis.Redis.from_url(app.config['CACHE_REDIS_URL']))
+    if backend == 'memory':
+        return MemoryCache(app.config.get('CACHE_MAX_ENTRIES', 1024))
+    raise ValueError(f'Unknown CACHE_BACKEND {backend!r}')
+
+
+def init_cache(app, backend=None):
+    """Attach a ResponseCache to the app (None when caching is disabled)."""
+    backend = backend or _make_backend(app)
+    app.extensions['response_cache'] = (
+        ResponseCache(backend, app.config.get('CACHE_DEFAULT_TTL', 60)) if backend else None
+    )
+
+
+def get_response_cache():
+    """The current app's ResponseCache, or None when caching is disabled."""
+    return current_app.extensions.get('response_cache')
+
+
+def invalidate(*namespaces):
+    """Bump namespaces after a write so cached responses built on them miss."""
+    cache = get_response_cache()
+    if cache is not None:
+        cache.invalidate(*namespaces)
+
+
+def invalidate_songs(songs_or_ids):
+    """Invalidate the song detail cache for each song (or song id) given."""
+    ids = {getattr(s, 'id', s) for s in songs_or_ids}
+    invalidate(*(f'song:{song_id}' for song_id in sorted(ids) if song_id is not None))
+
+
+def cached_json(namespaces, ttl=None, per_user=False, vary_headers=()):
+    """Cache a JSON view's 200 responses.
+
+    Args:
+        namespaces: Namespaces the response depends on; entries may use
+            the view's URL arguments, e.g. 'song:{song_id}'
+        ttl: Seconds to keep an entry (default CACHE_DEFAULT_TTL)
+        per_user: Key on get_jwt_identity(), for views whose result
+            depends on who is asking (apply below @jwt_required())
+        vary_headers: Request headers that change the response
+
+    Responses carry X-Cache: HIT or MISS.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            if cache is None:
+                return view(*args, **kwargs)
+
+            variant = [request.path, request.query_string.decode()]
+            variant += [request.headers.get(h, '') for h in vary_headers]
+            if per_user:
+                variant.append(f'user={get_jwt_identity()}')
+
+            key = cache.key([ns.format(**kwargs) for ns in namespaces], '\n'.join(variant))
+            body = cache.get(key)
+            if body is not None:
+                response = current_app.response_class(body, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            # Fill from the primary (services/db_routing.py): a body read from a
+            # lagging replica would stay stale for the whole TTL
+            g.pop('_db_read_replica', None)
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and response.mimetype == 'application/json':
+                cache.set(key, response.get_data(), ttl)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,283 @@
+"""Change log: the writes behind GET /sync.
+
+Every commit that creates, updates or deletes a song, style or playlist,
+or changes a playlist's songs, appends one change_log row per entity it
+touched. The rows are written in the same transaction as the change, so
+the log never shows a write that was rolled back or misses one that
+committed. A client keeps the highest seq it has seen and asks for what
+changed after it. That is O(changes), not O(library).
+
+Sources:
+
+- ORM writes are picked up by a session hook. Rendition changes count as
+  changes to their song. A song given to another user is also logged as
+  a delete for its previous owner.
+- Bulk UPDATE/DELETE on songs, styles or playlists (Query.update()) is
+  caught before it runs. The ids it will touch are selected first.
+- Playlist membership and order are written as Core statements on
+  playlist_songs (playlist_order.py, playlist_membership.py,
+  smart_playlists.py). Those call record_playlists() themselves.
+
+seq must grow in commit order, or a client that has already synced past
+a later seq would never see an earlier one that committed after. On
+Postgres the rows are inserted under a transaction-level advisory lock,
+held until the commit. Only that last step of a writing transaction is
+serialized.
+
+changes_since() compacts the log when it is read. Each entity appears
+once, with its latest op. prune() compacts the table itself. Rows older
+than CHANGE_LOG_RETENTION_DAYS are dropped if a later row for the same
+entity supersedes them, which loses nothing, or if they are deletes. A
+client that last synced before that has to start again from 0.
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, exists, func, inspect, or_, select, text
+from sqlalchemy.orm import Session, aliased
+
+from app import db
+from app.models import ChangeLog, Playlist, Song, SongRendition, Style
+
+ENTITIES = {Song: 'song', Style: 'style', Playlist: 'playlist'}
+
+# pg_advisory_xact_lock key serializing change_log inserts ('chlg')
+_LOCK_KEY = 0x63686c67
+
+# Entities per GET /sync response unless ?limit= asks for fewer (or more, up to the max)
+SYNC_PAGE_SIZE = 500
+SYNC_PAGE_MAX = 2000
+
+# How long deletes stay in the log, and so how long a client may go
+# between syncs before it must resync from 0
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv('CHANGE_LOG_RETENTION_DAYS', 30))
+
+# session.info key: {(entity, id): (op, owner user_id)} to write at commit
+_PENDING = 'change_log.pending'
+# session.info key: {song id: {previous owner user_ids}} for reassigned songs
+_DISOWNED = 'change_log.disowned'
+
+
+def _record(session, entity, entity_id, op='upsert', user_id=None):
+    """Note a change to write to the log when `session` commits."""
+    pending = session.info.setdefault(_PENDING, {})
+    previous = pending.get((entity, entity_id))
+    if user_id is None and previous:
+        user_id = previous[1]
+    pending[(entity, entity_id)] = (op, user_id)
+
+
+def record_playlists(playlist_ids):
+    """Note that these playlists' songs or order changed. The caller commits."""
+    for playlist_id in playlist_ids:
+        _record(db.session, 'playlist', playlist_id)
+
+
+def _collect(session, flush_context):
+    for obj in session.new:
+        _note(session, obj, 'upsert')
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            _note(session, obj, 'upsert')
+    for obj in session.deleted:
+        _note(session, obj, 'delete')
+
+
+def _note(session, obj, op):
+    entity = ENTITIES.get(type(obj))
+    if entity:
+        _record(session, entity, obj.id, op, obj.user_id if entity == 'song' else None)
+        if entity == 'song' and op == 'upsert':
+            _note_previous_owner(session, obj)
+    elif isinstance(obj, SongRendition):
+        _record(session, 'song', obj.song_id)
+
+
+def _note_previous_owner(session, song):
+    # The upsert is logged under the new owner only; the old owner's sync
+    # needs a delete or the song stays on their clients
+    previous = {user_id for user_id in inspect(song).attrs.user_id.history.deleted if user_id is not None}
+    if previous:
+        session.info.setdefault(_DISOWNED, {}).setdefault(song.id, set()).update(previous)
+
+
+def _collect_bulk(orm_execute_state):
+    """Ids a bulk UPDATE/DELETE on a logged entity is about to change."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    entity = ENTITIES.get(mapper.class_) if mapper is not None else None
+    if entity is None:
+        return
+
+    model = mapper.class_
+    columns = (model.id, model.user_id) if model is Song else (model.id,)
+    query = select(*columns)
+    if orm_execute_state.statement.whereclause is not None:
+        query = query.where(orm_execute_state.statement.whereclause)
+    op = 'delete' if orm_execute_state.is_delete else 'upsert'
+    session = orm_execute_state.session
+    for row in session.execute(query, orm_execute_state.parameters).all():
+        _record(session, entity, row[0], op, row[1] if model is Song else None)
+
+
+def _write(session):
+    # The hook only sees ORM changes once they're flushed
+    session.flush()
+    pending = session.info.pop(_PENDING, None)
+    disowned = session.info.pop(_DISOWNED, None) or {}
+    if not pending:
+        return
+
+    # Owners of songs changed without loading them (renditions)
+    unknown = [entity_id for (entity, entity_id), (op, user_id) in pending.items()
+               if entity == 'song' and user_id is None]
+    owners = dict(session.execute(select(Song.id, Song.user_id).where(Song.id.in_(unknown))).all()) if unknown else {}
+
+    if session.get_bind(mapper=ChangeLog.__mapper__).dialect.name == 'postgresql':
+        session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _LOCK_KEY})
+    now = datetime.utcnow()
+    # Deletes for previous owners go first, so the entity's latest row
+    # (what an unfiltered sync sees) is still its upsert
+    removed = [
+        {'entity': 'song', 'entity_id': song_id, 'op': 'delete', 'changed_at': now, 'user_id': user_id}
+        for song_id, previous in sorted(disowned.items())
+        for user_id in sorted(previous)
+        if user_id != pending.get(('song', song_id), (None, None))[1]
+    ]
+    session.execute(ChangeLog.__table__.insert(), removed + [
+        {'entity': entity, 'entity_id': entity_id, 'op': op, 'changed_at': now,
+         'user_id': user_id if user_id is not None else owners.get(entity_id)}
+        for (entity, entity_id), (op, user_id) in sorted(pending.items())
+    ])
+
+
+def _discard(session):
+    session.info.pop(_PENDING, None)
+    session.info.pop(_DISOWNED, None)
+
+
+_LISTENERS = (
+    ('after_flush', _collect),
+    ('do_orm_execute', _collect_bulk),
+    ('before_commit', _write),
+    ('after_rollback', _discard),
+)
+
+
+def init_change_log(app):
+    """Log song, style and playlist writes as they're committed.
+
+    Call after init_smart_playlists, whose before_commit hook can still
+    change playlists.
+    """
+    for name, listener in _LISTENERS:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+class SyncPage:
+    """One page of compacted changes; see changes_since()."""
+
+    def __init__(self, next_seq, has_more):
+        self.next_seq = next_seq
+        self.has_more = has_more
+        self.upserted = {entity: [] for entity in ENTITIES.values()}
+        self.deleted = {entity: [] for entity in ENTITIES.values()}
+
+
+def parse_sync_args(args):
+    """(since, limit) from a sync request's query string; raises ValueError if malformed."""
+    since = int(args.get('since', 0))
+    limit = int(args.get('limit', SYNC_PAGE_SIZE))
+    if since < 0 or limit < 1:
+        raise ValueError('since must be >= 0 and limit >= 1')
+    return since, min(limit, SYNC_PAGE_MAX)
+
+
+def head():
+    """Seq of the latest logged change (0 before the first)."""
+    return db.session.execute(select(func.max(ChangeLog.seq))).scalar() or 0
+
+
+def _retention_cutoff(now=None):
+    return (now or datetime.utcnow()) - timedelta(days=CHANGE_LOG_RETENTION_DAYS)
+
+
+def floor():
+    """Oldest `since` (other than 0) the log can still answer.
+
+    prune() only removes rows from before the retention cutoff, so the log
+    after the first row inside it is whole. A client that synced before
+    that row could have missed a pruned delete.
+    """
+    kept = db.session.execute(
+        select(func.min(ChangeLog.seq)).where(ChangeLog.changed_at >= _retention_cutoff())
+    ).scalar()
+    return kept - 1 if kept is not None else head()
+
+
+def prune(now=None):
+    """Drop old rows that are superseded, and old deletes; returns the rows removed.
+
+    Only rows from before the retention cutoff go, so clients that synced
+    since are unaffected. Run from cron (POST /sync/prune). Commits.
+    """
+    cutoff = _retention_cutoff(now)
+    newer = aliased(ChangeLog)
+    superseded = db.session.execute(delete(ChangeLog).where(
+        ChangeLog.changed_at < cutoff,
+        exists().where(
+            newer.entity == ChangeLog.entity,
+            newer.entity_id == ChangeLog.entity_id,
+            newer.seq > ChangeLog.seq,
+        ),
+    ).execution_options(synchronize_session=False)).rowcount
+    expired = db.session.execute(delete(ChangeLog).where(
+        ChangeLog.op == 'delete',
+        ChangeLog.changed_at < cutoff,
+    ).execution_options(synchronize_session=False)).rowcount
+    db.session.commit()
+    return superseded + expired
+
+
+def changes_since(since, limit, song_owner=None, entities=None):
+    """The latest change to each entity after seq `since`, oldest first.
+
+    At most `limit` entities. With has_more, ask again from next_seq; without,
+    next_seq is the head of the log. song_owner limits songs to one user's;
+    entities limits the kinds of entity returned. Raises ValueError if
+    `since` is past the head, i.e. from another database, or older than
+    the log keeps (see floor()).
+    """
+    until = head()
+    if since > until:
+        raise ValueError('since is ahead of the server; sync again from 0')
+    if since and since < floor():
+        raise ValueError(f'Last sync is older than {CHANGE_LOG_RETENTION_DAYS} days; sync again from 0')
+
+    scope = [ChangeLog.seq > since, ChangeLog.seq <= until]
+    if song_owner is not None:
+        scope.append(or_(ChangeLog.entity != 'song', ChangeLog.user_id == song_owner))
+    if entities is not None:
+        scope.append(ChangeLog.entity.in_(entities))
+
+    latest = (
+        select(func.max(ChangeLog.seq).label('seq'))
+        .where(*scope)
+        .group_by(ChangeLog.entity, ChangeLog.entity_id)
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+        .join(latest, latest.c.seq == ChangeLog.seq)
+        .order_by(ChangeLog.seq)
+        .limit(limit + 1)
+    ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    page = SyncPage(rows[-1].seq if has_more else until, has_more)
+    for row in rows:
+        (page.deleted if row.op == 'delete' else page.upserted)[row.entity].append(row.entity_id)
+    return page
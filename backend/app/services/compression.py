@@ -0,0 +1,112 @@
+"""gzip/brotli compression of API responses.
+
+nginx gzips for the Docker deployment, but not for the direct install
+(deploy/nginx_config) or when uvicorn serves asgi.py, and it never does
+brotli. Compressing here covers every deployment; nginx passes a body that
+already has a Content-Encoding through untouched.
+
+Only text-like bodies (JSON, text/*, JS, XML, SVG) of at least
+COMPRESS_MIN_SIZE bytes are compressed; audio, waveforms and send_file()
+responses pass through. Streamed responses are compressed chunk by chunk
+with a flush after each, so the client still receives data as it is
+produced.
+"""
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip only without it
+    brotli = None
+
+_COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/xml',
+    'application/x-ndjson', 'image/svg+xml'
+}
+
+
+def _compressible(response):
+    mimetype = response.mimetype or ''
+    return mimetype.startswith('text/') or mimetype in _COMPRESSIBLE_TYPES
+
+
+def _choose_encoding(app):
+    accepted = request.accept_encodings
+    if brotli is not None and app.config.get('COMPRESS_BROTLI', True) and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _streaming_compressor(encoding, app):
+    """(compress_chunk, finish) pair for one streamed response."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=app.config.get('COMPRESS_BROTLI_QUALITY', 4))
+        return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+
+    # wbits=31: zlib stream with a gzip header and trailer
+    compressor = zlib.compressobj(app.config.get('COMPRESS_GZIP_LEVEL', 6), zlib.DEFLATED, 31)
+    return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+
+def _compress_stream(chunks, encoding, app):
+    compress, finish = _streaming_compressor(encoding, app)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                yield compress(chunk)
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response, app):
+    """Compress `response` in place for the current request, if worthwhile."""
+    if (request.method == 'HEAD'
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or not _compressible(response)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding = _choose_encoding(app)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding, app)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < app.config.get('COMPRESS_MIN_SIZE', 1024):
+            return response
+        if encoding == 'br':
+            body = brotli.compress(body, quality=app.config.get('COMPRESS_BROTLI_QUALITY', 4))
+        else:
+            body = gzip.compress(body, compresslevel=app.config.get('COMPRESS_GZIP_LEVEL', 6), mtime=0)
+        response.set_data(body)
+
+    response.headers['Content-Encoding'] = encoding
+    # The bytes differ per encoding, so a strong validator no longer holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Compress responses from `app` when COMPRESS_RESPONSES is on."""
+    if not app.config.get('COMPRESS_RESPONSES', True):
+        return
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, app)
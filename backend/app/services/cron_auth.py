@@ -0,0 +1,19 @@
+"""Authentication for cron-triggered endpoints.
+
+Server-side jobs (reconcile, waveform generation, change log pruning, ...)
+are hit by cron with no user session. They share ROKU_SECRET_KEY, sent in
+the X-Reconcile-Key header.
+"""
+import hmac
+import os
+
+from flask import abort, request
+
+
+def require_cron_key():
+    """Abort with 403 unless the request carries the cron key."""
+    expected = os.getenv('ROKU_SECRET_KEY', '')
+    provided = request.headers.get('X-Reconcile-Key', '')
+    # As bytes: compare_digest rejects non-ASCII str
+    if not expected or not hmac.compare_digest(expected.encode(), provided.encode()):
+        abort(403)
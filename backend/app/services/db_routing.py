@@ -0,0 +1,170 @@
+"""Read-replica routing.
+
+With a replica configured (DB_REPLICA_HOST, which becomes the 'replica'
+entry of SQLALCHEMY_BINDS), plain SELECTs go to the replica when:
+
+- the request is a GET or HEAD (Roku feeds, listings, stats, ...) whose
+  view isn't marked @primary_db, or
+- a script is reading inside `with read_replica():`.
+
+Everything else goes to the primary: INSERT/UPDATE/DELETE, SELECT ...
+FOR UPDATE, text() statements and every statement in a session after its
+first write, so a request never reads around its own changes.
+
+Read-your-writes: a request that writes sets a short-lived cookie
+(REPLICA_STICKY_SECONDS). GETs from that client read the primary until
+it expires, which gives the replica time to replay the write.
+
+Lag fallback: each worker measures the replica's replay lag at most every
+REPLICA_LAG_CHECK_SECONDS. While it exceeds REPLICA_MAX_LAG_SECONDS, or
+the replica can't be reached, all reads go to the primary.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+STICKY_COOKIE = 'db_primary_until'
+
+# Seconds the replica is behind; 0 when it has replayed everything it received
+_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+# session.info key: the session has written, so it stays on the primary
+_WROTE = 'db_routing.wrote'
+
+_script_replica = contextvars.ContextVar('db_routing_script_replica', default=False)
+
+
+def measure_lag(engine):
+    """Replication lag of `engine` in seconds (0 for non-Postgres engines)."""
+    if engine.dialect.name != 'postgresql':
+        return 0.0
+    with engine.connect() as conn:
+        return float(conn.exec_driver_sql(_LAG_SQL).scalar() or 0)
+
+
+class ReplicaMonitor:
+    """Cached per-worker view of whether the replica is fit to read from."""
+
+    def __init__(self, max_lag, check_interval, logger):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.logger = logger
+        self.lag = None
+        self.checked_at = float('-inf')
+        self._lock = Lock()
+
+    def usable(self, engine):
+        if time.monotonic() - self.checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            # One thread checks; the others use the last result meanwhile
+            try:
+                self._check(engine)
+            finally:
+                self._lock.release()
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def _check(self, engine):
+        was_usable = self.lag is not None and self.lag <= self.max_lag
+        try:
+            self.lag = measure_lag(engine)
+        except Exception as e:
+            self.lag = None
+            if was_usable:
+                self.logger.warning(f'Read replica unreachable, reading from the primary: {e}')
+        else:
+            if was_usable and self.lag > self.max_lag:
+                self.logger.warning(f'Read replica {self.lag:.1f}s behind (limit {self.max_lag}s), '
+                                    'reading from the primary')
+        self.checked_at = time.monotonic()
+
+
+class RoutingSession(Session):
+    """db.session: sends eligible SELECTs to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and clause is not None:
+            if getattr(clause, 'is_dml', False):
+                _mark_wrote(self)
+            elif self._reads_replica(clause):
+                engine = self._db.engines.get(REPLICA_BIND)
+                monitor = current_app.extensions.get('db_routing')
+                if engine is not None and monitor is not None and monitor.usable(engine):
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_replica(self, clause):
+        if not getattr(clause, 'is_select', False) or getattr(clause, '_for_update_arg', None) is not None:
+            return False
+        if self._flushing or self.info.get(_WROTE) or not has_app_context():
+            return False
+        if _script_replica.get():
+            return True
+        return has_request_context() and g.get('_db_read_replica', False)
+
+
+def _mark_wrote(session, *args):
+    session.info[_WROTE] = True
+    if has_request_context():
+        g._db_wrote = True
+
+
+@contextmanager
+def read_replica():
+    """Route this block's reads to the replica, for read-only scripts."""
+    token = _script_replica.set(True)
+    try:
+        yield
+    finally:
+        _script_replica.reset(token)
+
+
+def primary_db(view):
+    """Mark a GET view that must read from the primary (it writes, or can't be stale)."""
+    view._primary_db = True
+    return view
+
+
+def _sticky():
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def init_db_routing(app):
+    """Route reads to the replica bind, if SQLALCHEMY_BINDS has one."""
+    if REPLICA_BIND not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+
+    app.extensions['db_routing'] = ReplicaMonitor(
+        app.config.get('REPLICA_MAX_LAG_SECONDS', 5),
+        app.config.get('REPLICA_LAG_CHECK_SECONDS', 5),
+        app.logger)
+    sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 10)
+
+    if not event.contains(RoutingSession, 'after_flush', _mark_wrote):
+        event.listen(RoutingSession, 'after_flush', _mark_wrote)
+
+    @app.before_request
+    def _choose_database():
+        view = app.view_functions.get(request.endpoint)
+        if (request.method in ('GET', 'HEAD') and view is not None
+                and not getattr(view, '_primary_db', False) and not _sticky()):
+            g._db_read_replica = True
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if g.pop('_db_wrote', False):
+            response.set_cookie(STICKY_COOKIE, str(int(time.time() + sticky_seconds)), max_age=sticky_seconds,
+                                httponly=True, samesite='Lax', secure=request.is_secure)
+        return response
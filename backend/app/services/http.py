@@ -0,0 +1,88 @@
+"""Shared outbound HTTP session for Suno, Azure and Microsoft Graph calls.
+
+One requests.Session per worker process keeps TLS connections to those
+hosts alive between requests instead of handshaking on every call. It is
+safe to share across gthread threads and gevent greenlets: urllib3's
+connection pool is thread-safe, and none of our callers rely on the
+session's cookie jar (the one part of Session that isn't). Under gevent
+the sockets are monkey-patched before this module is imported (see
+gunicorn_config.py), so a slow Suno call yields instead of blocking the
+worker.
+
+The upstream-bound views (Suno status checks, speech synthesis, the
+Microsoft OAuth callback) use async_http_client() instead, so under ASGI
+they wait without holding a thread (see app/asgi.py).
+
+Both time each call into the current request's metrics (see
+services/instrumentation.py).
+"""
+import os
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.services.instrumentation import record_http
+
+# Max pooled connections per host. Size it to the concurrency of a worker
+# (threads or greenlets making outbound calls); extra requests still go
+# through, just on a connection that isn't kept afterwards.
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 20))
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            record_http(time.perf_counter() - start)
+
+
+class _TimedAsyncTransport(httpx.AsyncHTTPTransport):
+    async def handle_async_request(self, request):
+        start = time.perf_counter()
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            record_http(time.perf_counter() - start)
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = _TimedHTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Get the process-wide HTTP session.
+
+    Rebuilt after a fork so workers of a preloaded app never share sockets
+    with the master or each other.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = _build_session()
+                _session_pid = os.getpid()
+    return _session
+
+
+def async_http_client(timeout=30) -> httpx.AsyncClient:
+    """New httpx client for one request's upstream calls; use it as `async with`.
+
+    Not shared like the sync session: an AsyncClient's connections belong
+    to the event loop they were opened on, and under WSGI async_to_sync
+    runs each request's calls on a fresh loop.
+    """
+    limits = httpx.Limits(max_connections=HTTP_POOL_MAXSIZE)
+    return httpx.AsyncClient(timeout=timeout, limits=limits, transport=_TimedAsyncTransport(limits=limits))
@@ -0,0 +1,182 @@
+"""Per-request performance instrumentation.
+
+For every request this records wall time, SQL statement count and time
+(SQLAlchemy engine events), outbound HTTP count and time (the timed
+transports in services/http.py) and response size. Results go out two
+ways:
+
+- A Server-Timing header (`sql`, `http`, `app`), which browser devtools
+  show next to the request. It is sent with the headers, so for streamed
+  responses it covers the time up to the first byte.
+- One log line per request when the response is closed (streamed bodies
+  included), with the numbers as key=value pairs and as a
+  `request_metrics` dict on the record for structured log handlers.
+
+Requests slower than SLOW_REQUEST_MS are logged again at WARNING with
+the SQL they ran and each statement's time.
+
+Work outside a request (background archive threads, cron jobs run from
+scripts) is not recorded.
+"""
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statements kept per request for the slow-request dump (the count stays exact)
+SLOW_REQUEST_MAX_STATEMENTS = 200
+
+
+class RequestMetrics:
+    """Counters for one request."""
+
+    __slots__ = ('start', 'sql_count', 'sql_time', 'statements', 'keep_statements',
+                 'http_count', 'http_time', 'response_bytes')
+
+    def __init__(self, keep_statements=False):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = []
+        self.keep_statements = keep_statements
+        self.http_count = 0
+        self.http_time = 0.0
+        self.response_bytes = 0
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def add_sql(self, statement, seconds):
+        self.sql_count += 1
+        self.sql_time += seconds
+        if self.keep_statements and len(self.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+            self.statements.append((statement, seconds))
+
+    def add_http(self, seconds):
+        self.http_count += 1
+        self.http_time += seconds
+
+    def server_timing(self):
+        return ', '.join((
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'http;dur={self.http_time * 1000:.1f};desc="{self.http_count} calls"',
+            f'app;dur={self.elapsed_ms():.1f}',
+        ))
+
+
+def current_metrics():
+    """The current request's RequestMetrics, or None outside an instrumented request."""
+    if not has_request_context():
+        return None
+    return g.get('_request_metrics')
+
+
+def record_http(seconds):
+    """Add one outbound HTTP call to the current request, if any."""
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.add_http(seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('_query_start')
+    if not stack:
+        return
+    started = stack.pop()
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.add_sql(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; pop its start
+    # here or every later timing on this connection pairs with the wrong one
+    conn = exception_context.connection
+    stack = conn.info.get('_query_start') if conn is not None else None
+    if not stack:
+        return
+    started = stack.pop()
+    metrics = current_metrics()
+    if metrics is not None and exception_context.statement is not None:
+        metrics.add_sql(exception_context.statement, time.perf_counter() - started)
+
+
+def _count_bytes(chunks, metrics):
+    try:
+        for chunk in chunks:
+            metrics.response_bytes += len(chunk)
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _log_request(logger, method, path, status, metrics, slow_ms):
+    fields = {
+        'method': method,
+        'path': path,
+        'status': status,
+        'duration_ms': round(metrics.elapsed_ms(), 1),
+        'sql_count': metrics.sql_count,
+        'sql_ms': round(metrics.sql_time * 1000, 1),
+        'http_count': metrics.http_count,
+        'http_ms': round(metrics.http_time * 1000, 1),
+        'response_bytes': metrics.response_bytes,
+    }
+    logger.info('request ' + ' '.join(f'{key}={value}' for key, value in fields.items()),
+                extra={'request_metrics': fields})
+
+    if slow_ms and fields['duration_ms'] >= slow_ms:
+        statements = '\n'.join(f'  [{seconds * 1000:.1f} ms] {statement}'
+                               for statement, seconds in metrics.statements)
+        logger.warning(f"Slow request {method} {path}: {fields['duration_ms']} ms, "
+                       f"{metrics.sql_count} SQL statements ({fields['sql_ms']} ms)\n{statements}",
+                       extra={'request_metrics': fields})
+
+
+def init_instrumentation(app):
+    """Instrument requests to `app` when REQUEST_INSTRUMENTATION is on.
+
+    Register before other after_request hooks (compression) so the size
+    recorded is what goes on the wire.
+    """
+    if not app.config.get('REQUEST_INSTRUMENTATION', True):
+        return
+
+    for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute),
+                           ('handle_error', _handle_error)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+    slow_ms = app.config.get('SLOW_REQUEST_MS', 1000)
+    send_header = app.config.get('SERVER_TIMING_HEADER', True)
+
+    @app.before_request
+    def _start_metrics():
+        g._request_metrics = RequestMetrics(keep_statements=bool(slow_ms))
+
+    @app.after_request
+    def _finish_metrics(response):
+        # Left on g: streamed bodies keep running SQL in this request context
+        metrics = g.get('_request_metrics')
+        if metrics is None:
+            return response
+
+        if send_header:
+            response.headers.add('Server-Timing', metrics.server_timing())
+
+        if response.is_streamed and not response.direct_passthrough:
+            response.response = _count_bytes(response.response, metrics)
+        else:
+            metrics.response_bytes = response.content_length or 0
+
+        # The request context is gone by the time a streamed body is closed
+        logger, method, path = app.logger, request.method, request.path
+        response.call_on_close(lambda: _log_request(logger, method, path, response.status_code, metrics, slow_ms))
+        return response
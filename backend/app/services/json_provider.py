@@ -0,0 +1,85 @@
+"""orjson-backed JSON provider for jsonify() and request.get_json().
+
+Song lists are the biggest payloads the API sends (lyrics, prompts and a
+nested style per song); orjson encodes them several times faster than
+the stdlib encoder behind Flask's DefaultJSONProvider (see
+benchmarks/bench_song_serialization.py).
+
+Output differences from the default provider, none of which clients see
+as a change in data:
+- Non-ASCII text (Hebrew lyrics) is sent as UTF-8 instead of \\u escapes.
+- datetime/date values are encoded as ISO 8601, the same format the
+  models' to_dict() already produce, rather than HTTP dates.
+- Keys keep the order the dict was built in (to_dict puts 'id' first)
+  instead of being sorted, which is the slowest orjson option.
+
+Selected with JSON_PROVIDER=orjson (the default). With JSON_PROVIDER=default,
+or when orjson isn't installed, Flask's stdlib provider is used, changed
+only to encode datetimes as ISO 8601 too, since the serializers
+(app/serializers.py) hand over raw datetimes.
+"""
+import typing as t
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding and decoding."""
+
+    sort_keys = False
+
+    def _options(self, kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.pop('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.pop('indent', None):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        return self.dumps_bytes(obj, **kwargs).decode()
+
+    def dumps_bytes(self, obj: t.Any, **kwargs: t.Any) -> bytes:
+        """Encode straight to bytes, skipping the str round trip."""
+        return orjson.dumps(obj, default=kwargs.pop('default', self.default), option=self._options(kwargs))
+
+    def loads(self, s: str | bytes, **kwargs: t.Any) -> t.Any:
+        # orjson.JSONDecodeError subclasses ValueError, which Flask turns
+        # into a 400 for request.get_json()
+        return orjson.loads(s)
+
+    def response(self, *args: t.Any, **kwargs: t.Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = None
+        if self.compact is False or (self.compact is None and self._app.debug):
+            indent = 2
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent=indent) + b'\n',
+            mimetype=self.mimetype
+        )
+
+
+def _iso_default(o: t.Any) -> t.Any:
+    if isinstance(o, date):
+        return o.isoformat()
+    return _default(o)
+
+
+class IsoJSONProvider(DefaultJSONProvider):
+    """Flask's stdlib provider, with ISO 8601 datetimes like OrjsonProvider."""
+
+    default = staticmethod(_iso_default)
+
+
+def init_json_provider(app):
+    """Install the provider chosen by JSON_PROVIDER ('orjson' or 'default')."""
+    if app.config.get('JSON_PROVIDER', 'orjson') == 'orjson' and orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        app.json = IsoJSONProvider(app)
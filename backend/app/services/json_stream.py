@@ -0,0 +1,101 @@
+"""Stream large JSON listings instead of building them in memory.
+
+jsonify() needs the whole list of song dicts and then the whole encoded
+string before the first byte goes out, so a worker's peak memory grows
+with the size of the library being listed. stream_json() instead walks a
+response template and encodes it piece by piece: ordinary values are
+encoded as usual, and a StreamedArray is encoded one element at a time
+from an iterator, normally a query with yield_per() so rows are fetched
+in batches too. Only one batch of rows and about one output chunk are
+held at a time.
+
+    songs = StreamedArray(query.yield_per(JSON_STREAM_BATCH_SIZE), Song.to_dict)
+    return stream_json({'songs': songs, 'total': songs.length})
+
+The length of a streamed array is only known once it has been sent, so
+keys after it (like 'total' above) are encoded last; keep them after the
+array in the template. If a row fails mid-stream the client gets a
+truncated body, which no JSON parser will accept as complete.
+"""
+import os
+
+from flask import Response, current_app, stream_with_context
+
+# Rows fetched per round trip while streaming
+JSON_STREAM_BATCH_SIZE = int(os.getenv('JSON_STREAM_BATCH_SIZE', 200))
+
+# Bytes collected before a chunk is handed to the server. Fewer, larger
+# chunks compress better (each chunk is flushed, see compression.py).
+_CHUNK_SIZE = 64 * 1024
+
+
+class StreamedArray:
+    """A JSON array produced lazily from `items`, each passed through `serialize`."""
+
+    def __init__(self, items, serialize=None):
+        self.items = items
+        self.serialize = serialize
+        self.count = 0
+        self.length = _ArrayLength(self)
+
+    def __iter__(self):
+        for item in self.items:
+            self.count += 1
+            yield self.serialize(item) if self.serialize else item
+
+
+class _ArrayLength:
+    """Placeholder encoded as the number of elements its array produced."""
+
+    def __init__(self, array):
+        self.array = array
+
+
+def _encoder():
+    provider = current_app.json
+    if hasattr(provider, 'dumps_bytes'):
+        return provider.dumps_bytes
+    return lambda obj: provider.dumps(obj, separators=(',', ':')).encode()
+
+
+def _iter_encode(value, dumps):
+    if isinstance(value, dict):
+        yield b'{'
+        for i, (key, item) in enumerate(value.items()):
+            yield (b',' if i else b'') + dumps(str(key)) + b':'
+            yield from _iter_encode(item, dumps)
+        yield b'}'
+    elif isinstance(value, StreamedArray):
+        yield b'['
+        for i, element in enumerate(value):
+            yield (b',' if i else b'') + dumps(element)
+        yield b']'
+    elif isinstance(value, _ArrayLength):
+        yield dumps(value.array.count)
+    else:
+        yield dumps(value)
+
+
+def _chunked(pieces, size=_CHUNK_SIZE):
+    buffer = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def stream_json(template, status=200):
+    """Streamed application/json response for a template holding StreamedArrays.
+
+    Must be called inside a request; the request (and its DB session) stays
+    open until the last chunk has been sent.
+    """
+    dumps = _encoder()
+    body = stream_with_context(_chunked(_iter_encode(template, dumps)))
+    return Response(body, status=status, mimetype='application/json')
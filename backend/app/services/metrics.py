@@ -0,0 +1,224 @@
+"""Prometheus metrics, served at /metrics.
+
+Exported series:
+
+- aiamusic_request_duration_seconds{endpoint,method,status}: request
+  latency per Flask endpoint (e.g. songs.get_songs), measured until the
+  body has been sent, so streamed listings count in full
+- aiamusic_db_pool_checked_out / aiamusic_db_pool_overflow: connections
+  in use and overflow connections open, summed over live workers
+- aiamusic_suno_request_duration_seconds{operation} and
+  aiamusic_suno_requests_total{operation,outcome}: Suno submit and status
+  polls; outcome is 2xx/4xx/5xx, timeout or error
+- aiamusic_webhook_duration_seconds{webhook,status}: callback processing
+- aiamusic_archive_bytes_total, aiamusic_archive_duration_seconds and
+  aiamusic_archive_files_total{outcome}: archival throughput is
+  rate(aiamusic_archive_bytes_total[5m]) in bytes/sec
+- aiamusic_storage_bytes / aiamusic_storage_files: archive size on disk,
+  recomputed at most every STORAGE_METRICS_INTERVAL seconds on scrape
+
+Under gunicorn every worker is its own process, so the gunicorn configs
+set PROMETHEUS_MULTIPROC_DIR before the app is imported. Each worker then
+writes its samples to files there, and /metrics aggregates all of them
+whichever worker answers the scrape. The directory is wiped when gunicorn
+starts and a dead worker's gauges are dropped (child_exit). Without the
+variable (tests, flask run) the process-local registry is used.
+
+Set METRICS_TOKEN to require `Authorization: Bearer <token>` on /metrics.
+Production (METRICS_REQUIRE_TOKEN) answers 404 until it is set.
+prometheus_client is optional: without it nothing is recorded and
+/metrics returns 503.
+"""
+import functools
+import hmac
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, jsonify, request
+from sqlalchemy import event
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # optional dependency, no metrics without it
+    prometheus_client = None
+
+# Seconds between storage size walks (they stat every archived file)
+STORAGE_METRICS_INTERVAL = int(os.getenv('STORAGE_METRICS_INTERVAL', 300))
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+if prometheus_client is not None:
+    REQUEST_DURATION = Histogram(
+        'aiamusic_request_duration_seconds', 'Request latency per endpoint',
+        ('endpoint', 'method', 'status'), buckets=_LATENCY_BUCKETS)
+    DB_POOL_CHECKED_OUT = Gauge(
+        'aiamusic_db_pool_checked_out', 'DB connections checked out', multiprocess_mode='livesum')
+    DB_POOL_OVERFLOW = Gauge(
+        'aiamusic_db_pool_overflow', 'DB overflow connections open', multiprocess_mode='livesum')
+    SUNO_DURATION = Histogram(
+        'aiamusic_suno_request_duration_seconds', 'Suno API call latency', ('operation',),
+        buckets=_LATENCY_BUCKETS)
+    SUNO_REQUESTS = Counter(
+        'aiamusic_suno_requests', 'Suno API calls by outcome', ('operation', 'outcome'))
+    WEBHOOK_DURATION = Histogram(
+        'aiamusic_webhook_duration_seconds', 'Webhook processing time', ('webhook', 'status'),
+        buckets=_LATENCY_BUCKETS)
+    ARCHIVE_BYTES = Counter(
+        'aiamusic_archive_bytes', 'Bytes downloaded into the audio archive')
+    ARCHIVE_DURATION = Histogram(
+        'aiamusic_archive_duration_seconds', 'Time to download one track into the archive',
+        buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+    ARCHIVE_FILES = Counter(
+        'aiamusic_archive_files', 'Tracks archived by outcome', ('outcome',))
+    STORAGE_BYTES = Gauge(
+        'aiamusic_storage_bytes', 'Bytes of audio in the archive', multiprocess_mode='mostrecent')
+    STORAGE_FILES = Gauge(
+        'aiamusic_storage_files', 'Audio files in the archive', multiprocess_mode='mostrecent')
+
+_storage_refreshed_at = 0.0
+_storage_lock = threading.Lock()
+
+
+def _status_class(status_code):
+    return f'{status_code // 100}xx'
+
+
+class _Call:
+    status_code = None
+
+
+@contextmanager
+def suno_call(operation):
+    """Time one Suno API call; set `.status_code` on the yielded object.
+
+        with suno_call('submit') as call:
+            response = session.post(...)
+            call.status_code = response.status_code
+    """
+    call = _Call()
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield call
+        outcome = _status_class(call.status_code) if call.status_code else 'error'
+    except Exception as e:
+        outcome = 'timeout' if 'timeout' in type(e).__name__.lower() else 'error'
+        raise
+    finally:
+        if prometheus_client is not None:
+            SUNO_DURATION.labels(operation).observe(time.perf_counter() - start)
+            SUNO_REQUESTS.labels(operation, outcome).inc()
+
+
+def record_archive(size_bytes, seconds, outcome='ok'):
+    """Record one track download into the archive."""
+    if prometheus_client is None:
+        return
+    ARCHIVE_FILES.labels(outcome).inc()
+    if outcome == 'ok':
+        ARCHIVE_BYTES.inc(size_bytes)
+        ARCHIVE_DURATION.observe(seconds)
+
+
+def timed_webhook(name):
+    """Decorator recording a webhook view's processing time and status."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = view(*args, **kwargs)
+                status = response[1] if isinstance(response, tuple) else getattr(response, 'status_code', 200)
+                return response
+            finally:
+                if prometheus_client is not None:
+                    WEBHOOK_DURATION.labels(name, _status_class(status)).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _refresh_storage_metrics():
+    global _storage_refreshed_at
+    if time.monotonic() - _storage_refreshed_at < STORAGE_METRICS_INTERVAL:
+        return
+    with _storage_lock:
+        if time.monotonic() - _storage_refreshed_at < STORAGE_METRICS_INTERVAL:
+            return
+        from app.services.audio_storage import get_storage_service
+        storage = get_storage_service()
+        if storage.is_configured():
+            stats = storage.get_storage_stats()
+            STORAGE_BYTES.set(stats['total_size_bytes'])
+            STORAGE_FILES.set(stats['file_count'])
+        _storage_refreshed_at = time.monotonic()
+
+
+def _registry():
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+def metrics_view():
+    if prometheus_client is None:
+        return jsonify({'error': 'prometheus_client is not installed'}), 503
+
+    token = os.getenv('METRICS_TOKEN', '')
+    if not token and current_app.config.get('METRICS_REQUIRE_TOKEN'):
+        return jsonify({'error': 'Not found'}), 404
+    # As bytes: compare_digest rejects non-ASCII str
+    provided = request.headers.get('Authorization', '')
+    if token and not hmac.compare_digest(provided.encode(), f'Bearer {token}'.encode()):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    _refresh_storage_metrics()
+    return Response(prometheus_client.generate_latest(_registry()), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def _track_pool(engine):
+    def update(*args):
+        pool = engine.pool
+        if hasattr(pool, 'checkedout'):
+            DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        if hasattr(pool, 'overflow'):
+            DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+    # Engine-level pool listeners carry over to the pool engine.dispose() creates
+    for name in ('checkout', 'checkin'):
+        event.listen(engine, name, update)
+
+
+def init_metrics(app):
+    """Record metrics for `app` and serve them at /metrics (METRICS_ENABLED)."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    if app.config.get('METRICS_REQUIRE_TOKEN') and not os.getenv('METRICS_TOKEN'):
+        app.logger.warning('METRICS_TOKEN is not set; /metrics answers 404')
+    if prometheus_client is None:
+        return
+
+    from app import db
+    with app.app_context():
+        _track_pool(db.engine)
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_latency(response):
+        start = g.get('_metrics_start')
+        if start is None or request.endpoint == 'metrics':
+            return response
+        labels = (request.endpoint or 'unmatched', request.method, str(response.status_code))
+        response.call_on_close(
+            lambda: REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - start))
+        return response
@@ -0,0 +1,125 @@
+"""Bulk playlist membership as set-based SQL on playlist_songs.
+
+Adding or removing many songs in many playlists takes one INSERT ... SELECT
+or one DELETE, whatever the sizes. The database computes the diff
+against existing rows, instead of the ORM loading each playlist's songs
+to test `song in playlist.songs`. New entries are appended after each
+playlist's current last position, in the order the songs were given,
+spaced like services/playlist_order.py. Songs already in a playlist keep
+their position.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, case, delete, exists, func, insert, literal, select
+
+from app import db
+from app.models import Playlist, Song, playlist_songs
+from app.services import change_log
+from app.services.playlist_order import POSITION_GAP
+
+# Upper bound on ids per list in one bulk request
+BULK_MAX_IDS = 1000
+
+_ps = playlist_songs.c
+
+
+def is_member(playlist_id, song_id):
+    """Whether the song is in the playlist, without loading the playlist's songs."""
+    return db.session.execute(
+        select(exists().where(_ps.playlist_id == playlist_id, _ps.song_id == song_id))
+    ).scalar()
+
+
+def owned_playlist_ids(user_id, playlist_ids=None):
+    """Ids of the user's playlists, optionally limited to `playlist_ids`."""
+    query = select(Playlist.id).where(Playlist.created_by == user_id)
+    if playlist_ids is not None:
+        query = query.where(Playlist.id.in_(playlist_ids))
+    return set(db.session.execute(query).scalars())
+
+
+def existing_song_ids(song_ids):
+    return set(db.session.execute(select(Song.id).where(Song.id.in_(song_ids))).scalars())
+
+
+def _lock_playlists(playlist_ids):
+    # Id order, so two bulk requests over overlapping playlists can't deadlock
+    db.session.execute(
+        select(Playlist.id).where(Playlist.id.in_(playlist_ids)).order_by(Playlist.id).with_for_update()
+    )
+
+
+def add_songs(playlist_ids, song_ids):
+    """Add every song to every playlist it isn't in yet; returns rows inserted.
+
+    The caller validates ownership and commits.
+    """
+    if not playlist_ids or not song_ids:
+        return 0
+    _lock_playlists(playlist_ids)
+
+    last_position = (
+        select(_ps.playlist_id, func.max(_ps.position).label('last'))
+        .where(_ps.playlist_id.in_(playlist_ids))
+        .group_by(_ps.playlist_id)
+        .subquery()
+    )
+    requested_order = case({song_id: i for i, song_id in enumerate(song_ids)}, value=Song.id)
+    new_rows = (
+        select(
+            Playlist.id,
+            Song.id,
+            func.coalesce(last_position.c.last, 0)
+            + POSITION_GAP * func.row_number().over(partition_by=Playlist.id, order_by=requested_order),
+            literal(datetime.utcnow())
+        )
+        .select_from(Playlist)
+        .join(Song, Song.id.in_(song_ids))
+        .outerjoin(last_position, last_position.c.playlist_id == Playlist.id)
+        .where(
+            Playlist.id.in_(playlist_ids),
+            ~exists().where(and_(_ps.playlist_id == Playlist.id, _ps.song_id == Song.id))
+        )
+    )
+    result = db.session.execute(
+        insert(playlist_songs).from_select(['playlist_id', 'song_id', 'position', 'added_at'], new_rows)
+    )
+    if result.rowcount:
+        change_log.record_playlists(playlist_ids)
+    return result.rowcount
+
+
+def remove_songs(playlist_ids, song_ids):
+    """Remove the songs from the playlists; returns rows deleted. The caller commits."""
+    if not playlist_ids or not song_ids:
+        return 0
+    result = db.session.execute(
+        delete(playlist_songs).where(_ps.playlist_id.in_(playlist_ids), _ps.song_id.in_(song_ids))
+    )
+    if result.rowcount:
+        change_log.record_playlists(playlist_ids)
+    return result.rowcount
+
+
+def replace_memberships(user_id, song_ids, playlist_ids):
+    """Make `playlist_ids` exactly the user's playlists that contain each song.
+
+    Other users' playlists and smart playlists (whose songs follow their
+    filter) are untouched. Returns (added, removed). The caller validates
+    ownership of `playlist_ids` and commits.
+    """
+    removed = 0
+    if song_ids:
+        touched = db.session.execute(
+            delete(playlist_songs).where(
+                _ps.song_id.in_(song_ids),
+                _ps.playlist_id.in_(
+                    select(Playlist.id).where(Playlist.created_by == user_id, Playlist.smart_filter.is_(None))
+                ),
+                _ps.playlist_id.notin_(playlist_ids)
+            ).returning(_ps.playlist_id)
+        ).scalars().all()
+        removed = len(touched)
+        change_log.record_playlists(set(touched))
+    added = add_songs(playlist_ids, song_ids)
+    return added, removed
@@ -0,0 +1,179 @@
+"""Song order within playlists, kept in playlist_songs.position.
+
+Positions are spaced POSITION_GAP apart, so putting a song between two
+others takes the midpoint and writes one row instead of renumbering the
+playlist. Only when two neighbours end up adjacent (after ~10 inserts
+into the same spot) is the playlist renumbered. Reads order by
+(position, song_id), which the (playlist_id, position) index serves as a
+single range scan.
+
+Writers lock the playlist row first, so concurrent moves in the same
+playlist can't compute the same slot.
+"""
+from sqlalchemy import bindparam, func, select
+
+from app import db
+from app.models import Playlist, Song, playlist_songs
+from app.services import change_log
+
+POSITION_GAP = 1024
+
+_ps = playlist_songs.c
+
+
+def _lock_playlist(playlist_id):
+    db.session.execute(select(Playlist.id).where(Playlist.id == playlist_id).with_for_update())
+
+
+def _position_of(playlist_id, song_id):
+    return db.session.execute(
+        select(_ps.position).where(_ps.playlist_id == playlist_id, _ps.song_id == song_id)
+    ).scalar()
+
+
+def _first_position_from(playlist_id, position, exclude):
+    """Smallest position >= `position` (or overall, if None) among other songs."""
+    query = select(func.min(_ps.position)).where(_ps.playlist_id == playlist_id, _ps.song_id.notin_(exclude))
+    if position is not None:
+        query = query.where(_ps.position >= position)
+    return db.session.execute(query).scalar()
+
+
+def _slot(playlist_id, after_song_id, exclude):
+    """Free position right after `after_song_id` (None: at the top), or None if there's no room."""
+    if after_song_id is None:
+        following = _first_position_from(playlist_id, None, exclude)
+        return POSITION_GAP if following is None else following - POSITION_GAP
+
+    previous = _position_of(playlist_id, after_song_id)
+    if previous is None:
+        raise ValueError(f'Song {after_song_id} is not in this playlist')
+    following = _first_position_from(playlist_id, previous, exclude + [after_song_id])
+    if following is None:
+        return previous + POSITION_GAP
+    if following - previous < 2:
+        return None
+    return (previous + following) // 2
+
+
+def _slot_or_rebalance(playlist_id, after_song_id, exclude):
+    position = _slot(playlist_id, after_song_id, exclude)
+    if position is None:
+        rebalance(playlist_id)
+        position = _slot(playlist_id, after_song_id, exclude)
+    return position
+
+
+def _set_positions(playlist_id, song_ids):
+    db.session.execute(
+        playlist_songs.update()
+        .where(_ps.playlist_id == playlist_id, _ps.song_id == bindparam('b_song_id'))
+        .values(position=bindparam('b_position')),
+        [{'b_song_id': song_id, 'b_position': (i + 1) * POSITION_GAP} for i, song_id in enumerate(song_ids)]
+    )
+    change_log.record_playlists([playlist_id])
+
+
+def ordered_song_ids(playlist_id):
+    """Song ids of a playlist in play order."""
+    return db.session.execute(
+        select(_ps.song_id).where(_ps.playlist_id == playlist_id).order_by(_ps.position, _ps.song_id)
+    ).scalars().all()
+
+
+def ordered_song_ids_by_playlist(playlist_ids, *song_conditions):
+    """{playlist_id: song ids in play order} for many playlists in one query.
+
+    song_conditions (on Song) limit which songs are listed.
+    """
+    members = {playlist_id: [] for playlist_id in playlist_ids}
+    if playlist_ids:
+        query = select(_ps.playlist_id, _ps.song_id).where(_ps.playlist_id.in_(playlist_ids))
+        if song_conditions:
+            query = query.join(Song, Song.id == _ps.song_id).where(*song_conditions)
+        rows = db.session.execute(query.order_by(_ps.playlist_id, _ps.position, _ps.song_id))
+        for playlist_id, song_id in rows:
+            members[playlist_id].append(song_id)
+    return members
+
+
+def song_count(playlist_id):
+    """Number of songs in a playlist: one COUNT over the playlist_songs index."""
+    return db.session.execute(
+        select(func.count()).select_from(playlist_songs).where(_ps.playlist_id == playlist_id)
+    ).scalar()
+
+
+def rebalance(playlist_id):
+    """Renumber a playlist's positions POSITION_GAP apart, keeping the order."""
+    song_ids = ordered_song_ids(playlist_id)
+    if song_ids:
+        _set_positions(playlist_id, song_ids)
+
+
+def add_song(playlist_id, song_id, after_song_id=None):
+    """Add a song after `after_song_id`, or at the end when it's None.
+
+    The caller checks membership and commits.
+    """
+    _lock_playlist(playlist_id)
+    if after_song_id is None:
+        last = db.session.execute(
+            select(func.max(_ps.position)).where(_ps.playlist_id == playlist_id)
+        ).scalar()
+        position = (last or 0) + POSITION_GAP
+    else:
+        position = _slot_or_rebalance(playlist_id, after_song_id, [song_id])
+    db.session.execute(playlist_songs.insert().values(playlist_id=playlist_id, song_id=song_id, position=position))
+    change_log.record_playlists([playlist_id])
+    return position
+
+
+def move_song(playlist_id, song_id, after_song_id=None):
+    """Move a song in the playlist to just after `after_song_id` (None: to the top).
+
+    Raises ValueError if either song isn't in the playlist. The caller commits.
+    """
+    _lock_playlist(playlist_id)
+    if _position_of(playlist_id, song_id) is None:
+        raise ValueError(f'Song {song_id} is not in this playlist')
+    if after_song_id == song_id:
+        raise ValueError('A song cannot be moved after itself')
+
+    position = _slot_or_rebalance(playlist_id, after_song_id, [song_id])
+    db.session.execute(
+        playlist_songs.update()
+        .where(_ps.playlist_id == playlist_id, _ps.song_id == song_id)
+        .values(position=position)
+    )
+    change_log.record_playlists([playlist_id])
+    return position
+
+
+def move_song_to_index(playlist_id, song_id, index):
+    """Move a song to a 0-based index (past the end means last)."""
+    if index < 0:
+        raise ValueError('index must be >= 0')
+    after_song_id = None
+    if index > 0:
+        others = select(_ps.song_id).where(_ps.playlist_id == playlist_id, _ps.song_id != song_id)
+        after_song_id = db.session.execute(
+            others.order_by(_ps.position, _ps.song_id).offset(index - 1).limit(1)
+        ).scalar()
+        if after_song_id is None:
+            after_song_id = db.session.execute(
+                others.order_by(_ps.position.desc(), _ps.song_id.desc()).limit(1)
+            ).scalar()
+    return move_song(playlist_id, song_id, after_song_id)
+
+
+def reorder_songs(playlist_id, song_ids):
+    """Replace the whole order; `song_ids` must list every song in the playlist once.
+
+    Raises ValueError otherwise. The caller commits.
+    """
+    _lock_playlist(playlist_id)
+    current = set(ordered_song_ids(playlist_id))
+    if len(song_ids) != len(set(song_ids)) or set(song_ids) != current:
+        raise ValueError('song_ids must list every song in the playlist exactly once')
+    _set_positions(playlist_id, song_ids)
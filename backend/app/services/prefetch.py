@@ -0,0 +1,52 @@
+"""Prefetch manifests: which audio files a player will need next.
+
+The service worker asks for the next few tracks of a playlist or queue and
+downloads them while the network is idle. Each entry names the file it
+should fetch and an etag, an opaque version of that file. A cached copy
+stored under the same etag is still current and is not downloaded again.
+
+- Archived originals use their SHA-256 (archive_checksum), which the
+  scrubber keeps honest, and also report it as sha256.
+- Renditions use the bitrate and the time they were encoded. Transcoding
+  again gives a new etag.
+- Songs that are only on Suno's CDN have no etag. The worker revalidates
+  them with a conditional request instead.
+"""
+
+# Tracks per manifest unless ?count= asks for fewer (or more, up to the
+# service worker's MAX_AUDIO_CACHE_ITEMS)
+PREFETCH_COUNT = 10
+PREFETCH_MAX = 50
+
+
+def parse_count(value):
+    """Tracks to list for a ?count= value; raises ValueError if it isn't a positive integer."""
+    if value is None:
+        return PREFETCH_COUNT
+    count = int(value)
+    if count < 1:
+        raise ValueError('count must be >= 1')
+    return min(count, PREFETCH_MAX)
+
+
+def manifest_entry(song, bitrate_kbps=None):
+    """What to fetch for one song, at the rendition a player would stream."""
+    entry = {'song_id': song.id, 'url': song.get_stream_url(bitrate_kbps),
+             'size_bytes': None, 'etag': None, 'sha256': None}
+
+    rendition = song.get_rendition(bitrate_kbps)
+    if rendition:
+        encoded = int(rendition.created_at.timestamp()) if rendition.created_at else 0
+        entry['size_bytes'] = rendition.file_size_bytes
+        entry['etag'] = f'"{song.id}-{rendition.bitrate_kbps}k-{encoded:x}"'
+    elif song.archive_checksum and entry['url'] in (song.archived_url, song.archived_url_1):
+        # file_size_bytes counts both tracks of a legacy two-track song
+        entry['size_bytes'] = song.file_size_bytes if not song.archived_url_2 else None
+        entry['etag'] = f'"{song.archive_checksum}"'
+        entry['sha256'] = song.archive_checksum
+    return entry
+
+
+def manifest(songs, bitrate_kbps=None):
+    """Manifest entries for `songs`, in the order given."""
+    return [manifest_entry(song, bitrate_kbps) for song in songs]
@@ -0,0 +1,66 @@
+"""Warm-up and fork safety for gunicorn's preload_app.
+
+With preload_app the master imports and builds the app once, then forks
+the workers from it. gunicorn_config.py calls:
+
+- warm_up() from when_ready, in the master just before the first fork.
+  It configures the SQLAlchemy mappers and runs bcrypt and JWT once, so
+  every worker inherits that work instead of doing it on its first
+  request.
+- reset_after_fork() from post_fork, in each new worker. It drops the
+  database connections inherited from the master, which two processes
+  must never share, and opens DB_POOL_WARM connections per engine so the
+  worker's first requests don't wait on connecting.
+
+benchmarks/bench_startup.py measures what warm_up() saves.
+"""
+from flask import Flask
+from flask_jwt_extended import create_access_token, decode_token
+from sqlalchemy.orm import configure_mappers
+
+from app import bcrypt, db
+
+
+def flask_app(application):
+    """The Flask app behind a WSGI or ASGI (app/asgi.py) callable."""
+    while not isinstance(application, Flask):
+        application = application.wsgi_application
+    return application
+
+
+def warm_up(app):
+    """Do the one-off work of a first request now, in the master."""
+    configure_mappers()
+    # Loads the bcrypt backend; 4 rounds is the minimum, the cost doesn't matter here
+    bcrypt.check_password_hash(bcrypt.generate_password_hash('warm-up', rounds=4), 'warm-up')
+    with app.app_context():
+        # Resolves the JWT signing key and algorithm and PyJWT's backends
+        decode_token(create_access_token(identity='warm-up'))
+
+
+def reset_after_fork(app):
+    """Give this worker its own database pools, already holding connections."""
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: the sockets still belong to the master (and its
+            # other children); closing them here would break those
+            engine.dispose(close=False)
+            _warm_pool(app, engine)
+
+
+def _warm_pool(app, engine):
+    count = app.config.get('DB_POOL_WARM', 0)
+    size = getattr(engine.pool, 'size', None)
+    if callable(size):
+        count = min(count, size())
+
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    except Exception as e:
+        # The worker still starts; requests connect as usual once the database is back
+        app.logger.warning(f'Could not pre-open connections to {engine.url.host or engine.url}: {e}')
+    finally:
+        for connection in connections:
+            connection.close()
@@ -0,0 +1,231 @@
+"""On-demand profiling of single requests.
+
+Send `X-Profile: <PROFILE_KEY>` and the request runs under a profiler.
+The key is only read from the header, never the query string, which
+ends up in access logs. pyinstrument (sampling, every
+PROFILE_INTERVAL seconds) is used when installed; otherwise cProfile
+(deterministic, slower). Streamed bodies are generated inside the
+profile, so get_songs is covered end to end.
+
+Output (X-Profile-Format or ?_profile_format=):
+
+- html (default): pyinstrument's call tree, or cProfile's stats table
+- speedscope: JSON for https://www.speedscope.app, pyinstrument only
+- text: plain call tree
+
+Every format includes the SQL timeline: each statement with its offset
+from the start of the request and its duration. In speedscope it is a
+second profile named "SQL" next to the CPU one.
+
+The profile replaces the response body (the original status goes in
+X-Profile-Status). With X-Profile-Mode: store (or ?_profile_mode=store)
+the normal response is returned and the profile is written to
+PROFILE_DIR instead, named in the X-Profile-File header.
+
+Safe to leave on in production: nothing happens without the key, and
+each worker starts at most PROFILE_RATE_PER_MIN profiles a minute
+(burst PROFILE_BURST). Over the limit the request runs unprofiled with
+X-Profile: rate-limited. The Suno fan-out of check-submitted and
+reconcile runs on its own loop thread and shows up only as the wait for
+it.
+"""
+import cProfile
+import hmac
+import html
+import io
+import json
+import os
+import pstats
+import time
+import uuid
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services.throttle import RateLimiter
+
+try:
+    import pyinstrument
+    from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer, SpeedscopeRenderer
+except ImportError:  # optional dependency, cProfile without it
+    pyinstrument = None
+
+PROFILE_FORMATS = ('html', 'speedscope', 'text')
+
+_limiter = None
+
+
+def _requested(name, query_name):
+    return request.headers.get(name) or request.args.get(query_name)
+
+
+def _authorized(key):
+    provided = request.headers.get('X-Profile', '')
+    # As bytes: compare_digest rejects non-ASCII str
+    return bool(key and provided) and hmac.compare_digest(key.encode(), provided.encode())
+
+
+class RequestProfile:
+    """A profiler running for the current request, plus its SQL timeline."""
+
+    def __init__(self, interval):
+        self.started = time.time()
+        self.statements = []
+        if pyinstrument is not None:
+            self.profiler = pyinstrument.Profiler(interval=interval)
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self):
+        if pyinstrument is None:
+            self.profiler.disable()
+        elif self.profiler.is_running:
+            self.profiler.stop()
+
+    def add_sql(self, statement, started, seconds):
+        self.statements.append((started - self.started, seconds, statement))
+
+    def _sql_text(self):
+        return '\n'.join(f'{offset * 1000:9.1f} ms  +{seconds * 1000:7.1f} ms  {" ".join(statement.split())}'
+                         for offset, seconds, statement in self.statements)
+
+    def _cprofile_text(self):
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats('cumulative').print_stats(60)
+        return out.getvalue()
+
+    def render(self, fmt):
+        """(body, mimetype) of the profile in `fmt`."""
+        sql_title = f'SQL timeline ({len(self.statements)} statements)'
+        if fmt == 'speedscope' and pyinstrument is not None:
+            return self._speedscope(), 'application/json'
+
+        if fmt == 'text' or fmt == 'speedscope':
+            tree = (self.profiler.output(ConsoleRenderer(unicode=False, color=False))
+                    if pyinstrument is not None else self._cprofile_text())
+            return f'{tree}\n{sql_title}\n{self._sql_text()}\n', 'text/plain'
+
+        sql_section = (f'<section style="font-family:monospace;padding:1em"><h2>{sql_title}</h2>'
+                       f'<pre>{html.escape(self._sql_text())}</pre></section>')
+        if pyinstrument is not None:
+            page = self.profiler.output(HTMLRenderer())
+            return page.replace('</body>', f'{sql_section}</body>', 1), 'text/html'
+        return (f'<html><body><pre>{html.escape(self._cprofile_text())}</pre>{sql_section}</body></html>',
+                'text/html')
+
+    def _speedscope(self):
+        data = json.loads(self.profiler.output(SpeedscopeRenderer()))
+        frames = data['shared']['frames']
+        events = []
+        for offset, seconds, statement in self.statements:
+            frames.append({'name': ' '.join(statement.split())[:200], 'file': 'SQL'})
+            events.append({'type': 'O', 'at': offset, 'frame': len(frames) - 1})
+            events.append({'type': 'C', 'at': offset + seconds, 'frame': len(frames) - 1})
+        end = max([data['profiles'][0]['endValue']] + [e['at'] for e in events])
+        data['profiles'].append({'type': 'evented', 'name': 'SQL', 'unit': 'seconds',
+                                 'startValue': 0.0, 'endValue': end, 'events': events})
+        return json.dumps(data)
+
+
+def current_profile():
+    """The RequestProfile of the current request, or None."""
+    if not has_request_context():
+        return None
+    return g.get('_request_profile')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile() is not None:
+        conn.info.setdefault('_profile_query_start', []).append(time.time())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    stack = conn.info.get('_profile_query_start')
+    if profile is None or not stack:
+        return
+    started = stack.pop()
+    profile.add_sql(statement, started, time.time() - started)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    stack = conn.info.get('_profile_query_start') if conn is not None else None
+    if stack:
+        stack.pop()
+
+
+def init_profiling(app):
+    """Profile requests to `app` that carry PROFILE_KEY (unset: disabled).
+
+    Register after the other after_request hooks so this one runs first
+    and profiles the whole body before it is compressed.
+    """
+    global _limiter
+    key = app.config.get('PROFILE_KEY') or ''
+    if not key:
+        return
+
+    _limiter = RateLimiter(app.config.get('PROFILE_RATE_PER_MIN', 6) / 60,
+                           burst=app.config.get('PROFILE_BURST', 2))
+    interval = app.config.get('PROFILE_INTERVAL', 0.001)
+    profile_dir = app.config.get('PROFILE_DIR', '/tmp/aiamusic-profiles')
+
+    for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute),
+                           ('handle_error', _handle_error)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+    @app.before_request
+    def _start_profile():
+        if not _authorized(key):
+            return
+        if not _limiter.try_consume(1):
+            g._profile_rate_limited = True
+            return
+        g._request_profile = RequestProfile(interval)
+
+    @app.after_request
+    def _finish_profile(response):
+        if g.pop('_profile_rate_limited', False):
+            response.headers['X-Profile'] = 'rate-limited'
+            return response
+        profile = g.get('_request_profile')
+        if profile is None:
+            return response
+
+        # Generate a streamed body now, while it is being profiled
+        if response.is_streamed and not response.direct_passthrough:
+            response.make_sequence()
+        profile.stop()
+        g.pop('_request_profile', None)
+
+        fmt = _requested('X-Profile-Format', '_profile_format') or 'html'
+        if fmt not in PROFILE_FORMATS:
+            fmt = 'html'
+        body, mimetype = profile.render(fmt)
+
+        if _requested('X-Profile-Mode', '_profile_mode') == 'store':
+            os.makedirs(profile_dir, exist_ok=True)
+            extension = {'html': 'html', 'speedscope': 'speedscope.json', 'text': 'txt'}[fmt]
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.endpoint or 'unmatched'}-{uuid.uuid4().hex[:8]}.{extension}"
+            with open(os.path.join(profile_dir, name), 'w') as f:
+                f.write(body)
+            response.headers['X-Profile-File'] = name
+            return response
+
+        profiled = Response(body, mimetype=mimetype)
+        profiled.headers['X-Profile-Status'] = str(response.status_code)
+        return profiled
+
+    @app.teardown_request
+    def _stop_profile(exc):
+        # A view that raised never reaches after_request
+        profile = g.pop('_request_profile', None)
+        if profile is not None:
+            profile.stop()
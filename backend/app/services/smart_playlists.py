@@ -0,0 +1,285 @@
+"""Smart playlists: playlists whose songs are a saved filter.
+
+A smart playlist keeps its filter spec in playlists.smart_filter, using
+the filters GET /songs takes (plus min_star_rating) and an order:
+
+    {"status": "completed", "style_id": 3, "min_star_rating": 4, "order": "newest"}
+
+The matching songs are materialized into playlist_songs like any other
+playlist's, so get_playlist, its windows, song_count and the Roku feeds
+serve a smart playlist exactly as cheaply as a hand-made one. refresh()
+rebuilds a snapshot with one DELETE and one INSERT ... SELECT, positions
+numbered in the spec's order.
+
+Song writes keep snapshots current incrementally: a session hook notes
+the songs whose filtered columns changed in each flush, and the songs a
+bulk UPDATE on songs (Query.update()) is about to touch, and before the
+commit re-evaluates only those songs against the smart playlists that
+could hold them. Songs that stopped matching are removed; matching ones
+are put at their place in the order (services/playlist_order.py, so one
+row is written) unless they're already there.
+"""
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, insert, inspect, literal, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Playlist, Song, playlist_songs
+from app.services import change_log, playlist_membership, playlist_order
+from app.services.cache import invalidate
+
+# Spec keys and the type each value must have
+FILTER_KEYS = {
+    'status': str,
+    'style_id': int,
+    'vocal_gender': str,
+    'min_star_rating': int,
+    'search': str,
+    'all_users': bool,
+}
+
+# order name -> (sort key columns, descending); the last key is always
+# Song.id so the order is total
+SMART_ORDERS = {
+    'newest': ((Song.created_at, Song.id), True),
+    'oldest': ((Song.created_at, Song.id), False),
+    'rating': ((func.coalesce(Song.star_rating, 0), Song.created_at, Song.id), True),
+    'title': ((func.coalesce(Song.specific_title, ''), Song.id), False),
+}
+DEFAULT_ORDER = 'newest'
+
+# Song columns a spec can depend on; changes to others don't re-evaluate
+_WATCHED_COLUMNS = ('status', 'style_id', 'vocal_gender', 'star_rating', 'specific_title',
+                    'specific_lyrics', 'user_id', 'created_at')
+
+_ps = playlist_songs.c
+
+# session.info keys
+_PENDING = 'smart_playlists.pending_song_ids'
+_APPLYING = 'smart_playlists.applying'
+_CHANGED = 'smart_playlists.changed'
+
+
+def validate_spec(spec):
+    """Normalized copy of a filter spec; raises ValueError if it's malformed."""
+    if not isinstance(spec, dict):
+        raise ValueError('smart_filter must be an object')
+    unknown = set(spec) - set(FILTER_KEYS) - {'order'}
+    if unknown:
+        raise ValueError(f'Unknown smart_filter keys: {sorted(unknown)}')
+
+    normalized = {}
+    for key, value in spec.items():
+        if key == 'order':
+            if value not in SMART_ORDERS:
+                raise ValueError(f'order must be one of {sorted(SMART_ORDERS)}')
+        elif value is None:
+            continue
+        elif not isinstance(value, FILTER_KEYS[key]) or (FILTER_KEYS[key] is int and isinstance(value, bool)):
+            raise ValueError(f'smart_filter.{key} must be {FILTER_KEYS[key].__name__}')
+        normalized[key] = value
+    normalized.setdefault('order', DEFAULT_ORDER)
+    return normalized
+
+
+def _conditions(spec, owner_id):
+    """WHERE clauses selecting the songs a spec matches, as GET /songs filters them."""
+    conditions = []
+    if not spec.get('all_users'):
+        conditions.append(Song.user_id == owner_id)
+    if spec.get('status') and spec['status'] != 'all':
+        conditions.append(Song.status == spec['status'])
+    if spec.get('style_id') is not None:
+        conditions.append(Song.style_id == spec['style_id'])
+    if spec.get('vocal_gender') and spec['vocal_gender'] != 'all':
+        conditions.append(Song.vocal_gender == spec['vocal_gender'])
+    if spec.get('min_star_rating') is not None:
+        conditions.append(Song.star_rating >= spec['min_star_rating'])
+    if spec.get('search'):
+        pattern = f"%{spec['search']}%"
+        conditions.append(db.or_(Song.specific_title.ilike(pattern), Song.specific_lyrics.ilike(pattern)))
+    return conditions
+
+
+def refresh(playlist):
+    """Rebuild a smart playlist's snapshot from its spec; returns the song count.
+
+    The caller commits.
+    """
+    spec = playlist.smart_filter
+    keys, descending = SMART_ORDERS[spec.get('order', DEFAULT_ORDER)]
+    order_by = [key.desc() if descending else key for key in keys]
+
+    db.session.execute(select(Playlist.id).where(Playlist.id == playlist.id).with_for_update())
+    db.session.execute(delete(playlist_songs).where(_ps.playlist_id == playlist.id))
+    matches = select(
+        literal(playlist.id),
+        Song.id,
+        playlist_order.POSITION_GAP * func.row_number().over(order_by=order_by),
+        literal(datetime.utcnow())
+    ).where(*_conditions(spec, playlist.created_by))
+    change_log.record_playlists([playlist.id])
+    return db.session.execute(
+        insert(playlist_songs).from_select(['playlist_id', 'song_id', 'position', 'added_at'], matches)
+    ).rowcount
+
+
+def smart_playlist_ids(playlist_ids):
+    """The smart ones among `playlist_ids`."""
+    return set(db.session.execute(
+        select(Playlist.id).where(Playlist.id.in_(playlist_ids), Playlist.smart_filter.isnot(None))
+    ).scalars())
+
+
+def _predecessor(playlist_id, song_id, keys, descending):
+    """Member that sorts right before the song in the spec's order, or None."""
+    values = db.session.execute(select(*keys).where(Song.id == song_id)).one()
+    song_key = tuple_(*(literal(value, key.type) for key, value in zip(keys, values)))
+    member_key = tuple_(*keys)
+    query = (
+        select(Song.id)
+        .join(playlist_songs, _ps.song_id == Song.id)
+        .where(_ps.playlist_id == playlist_id, Song.id != song_id)
+    )
+    if descending:
+        query = query.where(member_key > song_key).order_by(*keys)
+    else:
+        query = query.where(member_key < song_key).order_by(*(key.desc() for key in keys))
+    return db.session.execute(query.limit(1)).scalar()
+
+
+def _member_before(playlist_id, song_id):
+    """Member right before the song in the playlist's current order, or None."""
+    position = select(_ps.position).where(_ps.playlist_id == playlist_id, _ps.song_id == song_id).scalar_subquery()
+    return db.session.execute(
+        select(_ps.song_id)
+        .where(_ps.playlist_id == playlist_id,
+               tuple_(_ps.position, _ps.song_id) < tuple_(position, literal(song_id)))
+        .order_by(_ps.position.desc(), _ps.song_id.desc())
+        .limit(1)
+    ).scalar()
+
+
+def _place(playlist_id, song_id, keys, descending, present):
+    after = _predecessor(playlist_id, song_id, keys, descending)
+    if present and _member_before(playlist_id, song_id) == after:
+        # Already in place; the usual case for an edit that doesn't move it
+        return
+    if not present:
+        playlist_order.add_song(playlist_id, song_id, after_song_id=after)
+        if after is None:
+            # add_song appends; first in order means the top
+            playlist_order.move_song(playlist_id, song_id, None)
+    else:
+        playlist_order.move_song(playlist_id, song_id, after)
+
+
+def _candidate_playlists(song_ids):
+    """Smart playlists that hold one of the songs or whose spec could match one."""
+    owners = select(Song.user_id).where(Song.id.in_(song_ids))
+    holding = select(_ps.playlist_id).where(_ps.song_id.in_(song_ids))
+    return Playlist.query.filter(
+        Playlist.smart_filter.isnot(None),
+        or_(
+            Playlist.created_by.in_(owners),
+            Playlist.smart_filter['all_users'].as_boolean(),
+            Playlist.id.in_(holding),
+        )
+    ).order_by(Playlist.id)
+
+
+def apply_song_changes(song_ids):
+    """Re-evaluate changed songs against the smart playlists they concern.
+
+    Returns whether any membership changed. The caller commits.
+    """
+    song_ids = sorted(song_ids)
+    changed = False
+    for playlist in _candidate_playlists(song_ids):
+        spec = playlist.smart_filter
+        keys, descending = SMART_ORDERS[spec.get('order', DEFAULT_ORDER)]
+        matching = set(db.session.execute(
+            select(Song.id).where(Song.id.in_(song_ids), *_conditions(spec, playlist.created_by))
+        ).scalars())
+        current = set(db.session.execute(
+            select(_ps.song_id).where(_ps.playlist_id == playlist.id, _ps.song_id.in_(song_ids))
+        ).scalars())
+
+        stale = current - matching
+        if stale:
+            playlist_membership.remove_songs([playlist.id], stale)
+        for song_id in sorted(matching):
+            _place(playlist.id, song_id, keys, descending, present=song_id in current)
+        changed = changed or bool(stale or matching)
+    return changed
+
+
+def _collect_changed_songs(session, flush_context):
+    pending = session.info.setdefault(_PENDING, set())
+    for obj in session.new:
+        if isinstance(obj, Song):
+            pending.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Song):
+            attrs = inspect(obj).attrs
+            if any(attrs[name].history.has_changes() for name in _WATCHED_COLUMNS):
+                pending.add(obj.id)
+
+
+def _collect_bulk_updates(orm_execute_state):
+    """Songs a bulk UPDATE is about to change, selected before it runs.
+
+    Afterwards the WHERE clause may match other rows (or none): reassigning
+    a style's songs changes the very column it filters on.
+    """
+    mapper = orm_execute_state.bind_mapper
+    if not orm_execute_state.is_update or mapper is None or mapper.class_ is not Song:
+        return
+    query = select(Song.id)
+    if orm_execute_state.statement.whereclause is not None:
+        query = query.where(orm_execute_state.statement.whereclause)
+    session = orm_execute_state.session
+    song_ids = session.execute(query, orm_execute_state.parameters).scalars().all()
+    session.info.setdefault(_PENDING, set()).update(song_ids)
+
+
+def _apply_pending(session):
+    if session.info.get(_APPLYING):
+        return
+    session.info[_APPLYING] = True
+    try:
+        session.flush()
+        # Placing songs can flush again; loop until nothing new is pending
+        while session.info.get(_PENDING):
+            if apply_song_changes(session.info.pop(_PENDING)):
+                session.info[_CHANGED] = True
+            session.flush()
+    finally:
+        session.info.pop(_APPLYING, None)
+
+
+def _after_commit(session):
+    if session.info.pop(_CHANGED, False):
+        invalidate('playlists')
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING, None)
+    session.info.pop(_CHANGED, None)
+
+
+_LISTENERS = (
+    ('after_flush', _collect_changed_songs),
+    ('do_orm_execute', _collect_bulk_updates),
+    ('before_commit', _apply_pending),
+    ('after_commit', _after_commit),
+    ('after_rollback', _after_rollback),
+)
+
+
+def init_smart_playlists(app):
+    """Keep smart playlist snapshots current as songs are written."""
+    for name, listener in _LISTENERS:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
@@ -0,0 +1,66 @@
+"""Token-bucket rate limiting for background I/O.
+
+Background jobs (archive scrubbing, bulk downloads) share the disk and
+uplink with live streaming; a RateLimiter caps how many bytes per second
+they move so a long batch can't starve playback.
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token bucket measured in units (usually bytes) per second."""
+
+    def __init__(self, rate_per_sec, burst=None):
+        """
+        Args:
+            rate_per_sec: Sustained rate; 0 or None disables limiting
+            burst: Bucket size (max units consumed without waiting);
+                defaults to one second's worth of rate
+        """
+        self.rate = rate_per_sec or 0
+        self.burst = burst or self.rate
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def consume(self, amount):
+        """Take `amount` units from the bucket, sleeping until they're available.
+
+        Amounts larger than the burst size are allowed; they just wait
+        proportionally longer. Returns the seconds spent waiting.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        # Sleep outside the lock: the debt is already booked, so concurrent
+        # callers queue up behind it instead of blocking on the lock.
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def try_consume(self, amount=1):
+        """Take `amount` units only if the bucket has them now; never waits.
+
+        For callers that would rather skip work than queue for it. Returns
+        whether the units were taken.
+        """
+        if self.rate <= 0:
+            return True
+
+        with self._lock:
+            self._refill()
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
@@ -0,0 +1,173 @@
+"""Low-bitrate renditions of archived songs for Roku and mobile clients.
+
+After a song is archived, the transcode job produces one MP3 per bitrate in
+RENDITION_BITRATES (track_1_64k.mp3, track_1_128k.mp3, ...) next to the
+original and records each in song_renditions. Clients pass a quality hint
+and get the best rendition that fits it via Song.get_stream_url.
+
+ffmpeg does the actual encoding, so the worker pool is threads: each worker
+just waits on a subprocess, and all DB access stays on the calling thread.
+
+A rendition that fails to encode is left as an empty file so it isn't
+retried on every tick, as waveforms are; re-archiving the song clears it.
+"""
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+from app.models import Song, SongRendition
+from app.services.audio_decode import FFMPEG_BIN, ffmpeg_available, AudioDecodeError
+from app.services.audio_storage import get_storage_service
+from app.services.cache import invalidate_songs
+
+RENDITION_BITRATES = tuple(
+    int(b) for b in os.getenv('RENDITION_BITRATES', '64,128').split(',') if b.strip()
+)
+
+# Each worker pins roughly one core while ffmpeg encodes; keep headroom for
+# the gunicorn workers serving requests in the same container.
+TRANSCODE_WORKERS = int(os.getenv('TRANSCODE_WORKERS', 2))
+
+TRANSCODE_TIMEOUT_SECONDS = 300
+
+# Named client hints for ?quality=; 'original' (or no hint) means no rendition.
+QUALITY_HINTS = {
+    'low': 64,
+    'medium': 128,
+    'high': None,
+    'original': None,
+}
+
+
+def parse_quality_hint(quality=None, save_data=False):
+    """Turn a client quality hint into a target bitrate in kbps (or None).
+
+    Accepts a named hint from QUALITY_HINTS or a bare bitrate ('64'). A
+    browser sending `Save-Data: on` gets the low rendition unless it asked
+    for something explicitly.
+    """
+    if quality:
+        quality = quality.strip().lower()
+        if quality in QUALITY_HINTS:
+            return QUALITY_HINTS[quality]
+        if quality.rstrip('k').isdigit():
+            return int(quality.rstrip('k'))
+        return None
+
+    return QUALITY_HINTS['low'] if save_data else None
+
+
+def transcode(source_path, dest_path, bitrate_kbps):
+    """Encode source_path to an MP3 at bitrate_kbps. Returns the output size."""
+    tmp_path = dest_path.with_suffix('.tmp')
+    cmd = [
+        FFMPEG_BIN, '-v', 'error', '-nostdin', '-y',
+        '-i', str(source_path),
+        '-vn', '-map_metadata', '-1',
+        '-codec:a', 'libmp3lame', '-b:a', f'{bitrate_kbps}k',
+        '-f', 'mp3', str(tmp_path),
+    ]
+
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=TRANSCODE_TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired:
+        tmp_path.unlink(missing_ok=True)
+        raise AudioDecodeError(f"ffmpeg timed out transcoding {source_path}")
+
+    if proc.returncode != 0:
+        tmp_path.unlink(missing_ok=True)
+        stderr = proc.stderr.decode('utf-8', errors='replace').strip()
+        raise AudioDecodeError(f"ffmpeg failed transcoding {source_path}: {stderr[:200]}")
+
+    tmp_path.replace(dest_path)
+    return dest_path.stat().st_size
+
+
+def _failed_before(path):
+    try:
+        return path.stat().st_size == 0
+    except OSError:
+        return False
+
+
+def _pending_jobs(limit):
+    """Find (song_id, source_path, bitrate) triples still missing a rendition.
+
+    Bitrates whose last encode failed (an empty file) are skipped.
+    """
+    storage = get_storage_service()
+
+    candidates = Song.query.filter(
+        Song.is_archived == True,
+        Song.archived_url.isnot(None)
+    ).order_by(Song.archived_at.desc()).yield_per(200)
+
+    jobs = []
+    for song in candidates:
+        done = {r.bitrate_kbps for r in song.renditions}
+        missing = [b for b in RENDITION_BITRATES
+                   if b not in done and not _failed_before(storage.get_rendition_path(song.id, b))]
+        if not missing:
+            continue
+
+        source_path = storage.get_local_path(song.archived_url)
+        if not source_path or not source_path.exists():
+            continue
+
+        for bitrate in missing:
+            jobs.append((song.id, source_path, bitrate))
+        if len(jobs) >= limit:
+            break
+
+    return jobs[:limit]
+
+
+def transcode_pending_renditions(limit=20, logger=None):
+    """Transcode archived songs that are missing one or more renditions.
+
+    Intended to run from a cron-triggered job; at most `limit` encodes run
+    per call, TRANSCODE_WORKERS at a time.
+    """
+    if not ffmpeg_available():
+        raise AudioDecodeError("ffmpeg is not installed; cannot transcode renditions")
+
+    storage = get_storage_service()
+    jobs = _pending_jobs(limit)
+
+    def run(job):
+        song_id, source_path, bitrate = job
+        dest_path = storage.get_rendition_path(song_id, bitrate)
+        try:
+            return job, transcode(source_path, dest_path, bitrate), None
+        except (AudioDecodeError, OSError) as e:
+            return job, None, e
+
+    transcoded = 0
+    failed = 0
+    updated_song_ids = set()
+
+    with ThreadPoolExecutor(max_workers=TRANSCODE_WORKERS) as pool:
+        for (song_id, _, bitrate), size, error in pool.map(run, jobs):
+            if error:
+                failed += 1
+                dest_path = storage.get_rendition_path(song_id, bitrate)
+                if dest_path.parent.exists():
+                    dest_path.touch()
+                if logger:
+                    logger.error(f"Transcode to {bitrate}k failed for song {song_id}: {error}")
+                continue
+
+            db.session.add(SongRendition(
+                song_id=song_id,
+                bitrate_kbps=bitrate,
+                url=storage.get_rendition_url(song_id, bitrate),
+                file_size_bytes=size
+            ))
+            updated_song_ids.add(song_id)
+            transcoded += 1
+
+    db.session.commit()
+    invalidate_songs(updated_song_ids)
+
+    return {'transcoded': transcoded, 'failed': failed}
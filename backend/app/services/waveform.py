@@ -0,0 +1,112 @@
+"""Precomputed waveform peaks for the player.
+
+Each archived track is decoded once and reduced to WAVEFORM_BINS (min, max)
+pairs stored as a flat int8 array — min0, max0, min1, max1, ... — in
+waveform.bin next to the audio. At the default 1000 bins that's 2 KB per
+song, so the player can draw a waveform without downloading and decoding
+the full MP3 client-side.
+"""
+import os
+
+import numpy as np
+
+from app import db
+from app.models import Song
+from app.services.audio_decode import decode_to_pcm, ffmpeg_available, AudioDecodeError
+from app.services.audio_storage import get_storage_service
+
+WAVEFORM_BINS = int(os.getenv('WAVEFORM_BINS', 1000))
+
+# Peaks only need to be visually accurate; 8 kHz mono decodes far faster
+# than full-rate stereo and is indistinguishable at 1000 bins.
+WAVEFORM_SAMPLE_RATE = 8000
+
+
+def compute_peaks(samples, bins=WAVEFORM_BINS):
+    """Reduce float samples in [-1, 1] to interleaved int8 (min, max) peaks.
+
+    Trailing samples that don't fill a whole bin are dropped (at most
+    bins - 1 samples, well under a second of audio). Tracks shorter than
+    `bins` samples get one bin per sample.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.size == 0:
+        return np.zeros(0, dtype=np.int8)
+
+    bins = min(bins, samples.size)
+    frames = samples[:samples.size // bins * bins].reshape(bins, -1)
+
+    peaks = np.empty((bins, 2), dtype=np.float32)
+    peaks[:, 0] = frames.min(axis=1)
+    peaks[:, 1] = frames.max(axis=1)
+
+    return np.clip(np.round(peaks * 127), -128, 127).astype(np.int8).ravel()
+
+
+def generate_waveform(song):
+    """Decode a song's archived audio and write its waveform.bin.
+
+    Returns the number of bytes written, or raises AudioDecodeError /
+    ValueError if the song has no local audio to decode.
+    """
+    storage = get_storage_service()
+    audio_path = storage.get_local_path(song.archived_url or song.archived_url_1)
+
+    if not audio_path or not audio_path.exists():
+        raise ValueError(f"Song {song.id} has no local archived audio")
+
+    samples = decode_to_pcm(audio_path, sample_rate=WAVEFORM_SAMPLE_RATE)
+    peaks = compute_peaks(samples)
+
+    # Write-then-rename so a concurrent GET never serves a half-written file.
+    waveform_path = storage.get_waveform_path(song.id)
+    tmp_path = waveform_path.with_suffix('.tmp')
+    tmp_path.write_bytes(peaks.tobytes())
+    tmp_path.replace(waveform_path)
+
+    return peaks.nbytes
+
+
+def generate_pending_waveforms(limit=50, logger=None):
+    """Generate waveforms for archived songs that don't have one yet.
+
+    Intended to run from a cron-triggered job. Songs are processed newest
+    archive first so freshly completed tracks get a waveform on the next
+    tick; at most `limit` decodes run per call.
+
+    A track that fails to decode gets an empty waveform.bin so it isn't
+    retried on every tick (the endpoint treats empty as unavailable);
+    re-archiving the song clears it.
+    """
+    if not ffmpeg_available():
+        raise AudioDecodeError("ffmpeg is not installed; cannot generate waveforms")
+
+    storage = get_storage_service()
+
+    # Legacy two-track songs keep their first track in archived_url_1
+    candidates = Song.query.filter(
+        Song.is_archived == True,
+        db.or_(Song.archived_url.isnot(None), Song.archived_url_1.isnot(None))
+    ).order_by(Song.archived_at.desc()).yield_per(200)
+
+    generated = 0
+    failed = 0
+
+    for song in candidates:
+        if generated + failed >= limit:
+            break
+        if storage.get_waveform_path(song.id).exists():
+            continue
+
+        try:
+            generate_waveform(song)
+            generated += 1
+        except (AudioDecodeError, ValueError, OSError) as e:
+            failed += 1
+            waveform_path = storage.get_waveform_path(song.id)
+            if waveform_path.parent.exists():
+                waveform_path.touch()
+            if logger:
+                logger.error(f"Waveform generation failed for song {song.id}: {e}")
+
+    return {'generated': generated, 'failed': failed}
@@ -0,0 +1,6 @@
+import os
+from app.asgi import create_asgi_app
+
+# Determine environment
+env = os.getenv('FLASK_ENV', 'development')
+app = create_asgi_app(env)
@@ -0,0 +1,206 @@
+"""
+pytest-benchmark suite for the hot API paths on a synthetic large library.
+
+The library is seeded once per run by dataset.seed_library(). Then each
+benchmark times one full request through the test client, body
+included: GET /songs with each filter, /songs/stats, playlist detail
+(whole and windowed), the Roku feeds, both outcomes of the Suno and
+Azure Speech callbacks and Song.to_dict. The response cache is off (see
+dataset.make_app), so every round does the real queries.
+
+Run from backend/ (pip install pytest-benchmark; not part of the
+default `pytest` run, which only collects tests/test_*.py):
+
+    python -m pytest benchmarks/bench_api.py
+    BENCH_SONGS=100000 python -m pytest benchmarks/bench_api.py -k songs
+
+BENCH_SONGS sets the library size (default 10000). BENCH_DATABASE_URL
+runs against another database, e.g. a scratch Postgres; the tables are
+created and seeded and stay there, so use a throwaway database.
+
+Comparing commits: save a run on each, then compare them.
+
+    python -m pytest benchmarks/bench_api.py --benchmark-autosave          # on main
+    python -m pytest benchmarks/bench_api.py --benchmark-compare \\
+        --benchmark-compare-fail=median:10%                               # on the branch
+
+--benchmark-json=out.json writes one run's results as JSON for other
+tooling. Saved runs live in .benchmarks/ and can be listed side by side
+with `pytest-benchmark compare`.
+"""
+
+import itertools
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('ROKU_SECRET_KEY', 'bench-roku-key')
+
+from dataset import make_app, seed_library  # noqa: E402 (sets up the path and env first)
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from app import db  # noqa: E402
+from app.models import Song  # noqa: E402
+
+SONGS = int(os.getenv('BENCH_SONGS', 10000))
+ROKU = f"/api/v1/roku/{os.environ['ROKU_SECRET_KEY']}"
+
+_task_ids = itertools.count()
+
+
+@pytest.fixture(scope='module')
+def app():
+    app = make_app(os.getenv('BENCH_DATABASE_URL'))
+    with app.app_context():
+        db.create_all()
+        app.library = seed_library(SONGS)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture(scope='module')
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='module')
+def headers(app):
+    token = create_access_token(identity=str(app.library['user_ids'][0]))
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture(scope='module')
+def library(app):
+    return app.library
+
+
+def _get(client, url, headers=None):
+    response = client.get(url, headers=headers)
+    # Reading the body runs the streamed part of the view
+    response.get_data()
+    assert response.status_code == 200, response.status_code
+    return response
+
+
+@pytest.mark.parametrize('query', [
+    '',
+    'all_users=true',
+    'status=completed',
+    'style_id={style_id}',
+    'vocal_gender=female',
+    'search=grace',
+    'playlist_id={playlist_id}',
+    'all_users=true&status=completed&vocal_gender=male',
+], ids=['own', 'all_users', 'status', 'style', 'vocal_gender', 'search', 'playlist', 'combined'])
+def test_get_songs(benchmark, client, headers, library, query):
+    url = '/api/v1/songs/?' + query.format(style_id=library['style_ids'][0],
+                                           playlist_id=library['largest_playlist_id'])
+    benchmark(_get, client, url, headers)
+
+
+@pytest.mark.parametrize('query', ['', 'all_users=true'], ids=['own', 'all_users'])
+def test_get_stats(benchmark, client, headers, query):
+    benchmark(_get, client, f'/api/v1/songs/stats?{query}', headers)
+
+
+@pytest.mark.parametrize('query', ['', 'limit=50', 'limit=50&offset=400', 'limit=50&lyrics=false'],
+                         ids=['full', 'window', 'deep_window', 'window_no_lyrics'])
+def test_get_playlist(benchmark, client, headers, library, query):
+    benchmark(_get, client, f"/api/v1/playlists/{library['largest_playlist_id']}?{query}", headers)
+
+
+def test_roku_playlists(benchmark, client):
+    benchmark(_get, client, f'{ROKU}/playlists')
+
+
+def test_roku_playlist_songs(benchmark, client, library):
+    benchmark(_get, client, f"{ROKU}/playlists/{library['largest_playlist_id']}/songs")
+
+
+def test_roku_songs(benchmark, client, library):
+    benchmark(_get, client, f"{ROKU}/songs?playlist_id={library['largest_playlist_id']}")
+
+
+def _submitted_song(library):
+    """A fresh song waiting on its Suno callback, in the big playlist."""
+    from app.services import playlist_order
+
+    task_id = f'bench-callback-{next(_task_ids)}'
+    song = Song(user_id=library['user_ids'][0], status='submitted', suno_task_id=task_id,
+                specific_title='Callback', specific_lyrics='la ' * 600, style_id=library['style_ids'][0],
+                vocal_gender='female')
+    db.session.add(song)
+    db.session.flush()
+    playlist_order.add_song(library['largest_playlist_id'], song.id)
+    db.session.commit()
+    return task_id
+
+
+@pytest.mark.parametrize('outcome', ['success', 'failure'])
+def test_suno_callback(benchmark, client, library, outcome):
+    def setup():
+        task_id = _submitted_song(library)
+        if outcome == 'success':
+            payload = {'task_id': task_id, 'status': 'completed', 'msg': 'All generated successfully.',
+                       'data': [{'audio_url': f'https://cdn1.suno.ai/{task_id}-{n}.mp3'} for n in (1, 2)]}
+        else:
+            payload = {'task_id': task_id, 'status': 'SENSITIVE_WORD_ERROR', 'msg': 'Contains sensitive words'}
+        return (payload,), {}
+
+    def callback(payload):
+        response = client.post('/api/v1/webhooks/suno-callback', json=payload)
+        assert response.status_code == 200, response.get_json()
+
+    # Each round needs its own submitted song, made outside the timing
+    benchmark.pedantic(callback, setup=setup, rounds=50, warmup_rounds=2)
+
+
+def _speech_song(library):
+    """A fresh song waiting on its Azure Speech callback, in the big playlist."""
+    from app.services import playlist_order
+
+    task_id = f'bench-speech-{next(_task_ids)}'
+    song = Song(user_id=library['user_ids'][0], status='submitted', speech_task_id=task_id,
+                specific_title='Speech', specific_lyrics='la ' * 600, style_id=library['style_ids'][0],
+                vocal_gender='female')
+    db.session.add(song)
+    db.session.flush()
+    playlist_order.add_song(library['largest_playlist_id'], song.id)
+    db.session.commit()
+    return task_id
+
+
+# The route looks songs up by speech_task_id; until the model has that
+# column every callback carrying a task id raises, so there is nothing to time
+@pytest.mark.skipif(not hasattr(Song, 'speech_task_id'), reason='Song has no speech_task_id column')
+@pytest.mark.parametrize('outcome', ['success', 'failure'])
+def test_azure_speech_callback(benchmark, client, library, outcome):
+    def setup():
+        task_id = _speech_song(library)
+        if outcome == 'success':
+            payload = {'taskId': task_id, 'status': 'success',
+                       'data': {'data': [{'audioUrl': f'https://bench-speech.blob.core.windows.net/{task_id}-{n}.mp3',
+                                          'title': 'Speech'} for n in (1, 2)]}}
+        else:
+            payload = {'taskId': task_id, 'status': 'failed', 'msg': 'Synthesis canceled: quota exceeded'}
+        return (payload,), {}
+
+    def callback(payload):
+        response = client.post('/api/v1/webhooks/azure-speech-callback', json=payload)
+        assert response.status_code == 200, response.get_json()
+
+    benchmark.pedantic(callback, setup=setup, rounds=50, warmup_rounds=2)
+
+
+def test_song_to_dict(benchmark, app):
+    songs = Song.query.order_by(Song.created_at.desc()).limit(500).all()
+
+    def serialize():
+        return [s.to_dict(include_user=True, include_style=True, include_playlists=True) for s in songs]
+
+    benchmark(serialize)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark Song.to_dict() against the compiled serializers.
+
+Serializes the same loaded songs (style, creator and one rendition each,
+no DB round trips while timing) with Song.to_dict() and with the v1 and v2
+schemas from app/serializers.py, then encodes the result with the app's
+JSON provider. Prints microseconds per song for each step, so the
+serializer cost is visible apart from query and network time (see
+bench_song_serialization.py for the full request).
+
+Run from backend/:
+    python benchmarks/bench_serializers.py
+    python benchmarks/bench_serializers.py --songs 5000 --repeat 7
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+# Add the backend app to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('SECRET_KEY', 'bench-secret-key')
+os.environ.setdefault('JWT_SECRET_KEY', 'bench-jwt-secret')
+os.environ.setdefault('SIGNUP_ACCESS_CODE', 'bench-signup-code')
+
+from sqlalchemy.orm import joinedload
+
+from app import create_app, db
+from app.models import Song, SongRendition, Style, User
+from app.serializers import song_serializer
+
+LYRICS = "[Verse 1]\nIn the morning light I lift my eyes\nTo the hills where my help comes from\n" * 6
+
+
+def load_songs(count):
+    """Seed an in-memory DB and load its songs the way GET /songs does.
+
+    Rows come from a real query (all columns loaded, relationships eager
+    loaded) and stay in the session, so the timed loops below measure
+    serialization only.
+    """
+    user = User(username='bench', email='bench@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    style = Style(name='Worship', style_prompt='warm piano, strings', created_by=user.id)
+    db.session.add(style)
+    db.session.flush()
+
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        song = Song(user_id=user.id, specific_title=f'Song {i}', specific_lyrics=LYRICS,
+                    prompt_to_generate='uplifting ballad', vocal_gender='male', status='completed',
+                    style_id=style.id, download_url=f'https://cdn.example.com/{i}.mp3',
+                    archived_url=f'/audio/{i}.mp3', is_archived=True, archived_at=start,
+                    file_size_bytes=4_000_000, created_at=start + timedelta(minutes=i))
+        song.renditions.append(SongRendition(bitrate_kbps=64, url=f'/audio/{i}_64.mp3', file_size_bytes=900_000))
+        db.session.add(song)
+    db.session.commit()
+
+    return Song.query.options(
+        joinedload(Song.style).joinedload(Style.creator),
+        joinedload(Song.creator)
+    ).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--songs', type=int, default=2000, help='songs per run (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs, best reported (default: %(default)s)')
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        songs = load_songs(args.songs)
+        v1 = song_serializer('v1', include_user=True, include_style=True)
+        v2 = song_serializer('v2', include_user=True, include_style=True)
+        dumps = getattr(app.json, 'dumps_bytes', app.json.dumps)
+
+        cases = {
+            'to_dict': lambda: [s.to_dict(include_user=True, include_style=True, bitrate_kbps=64) for s in songs],
+            'v1 compiled': lambda: [v1(s, 64) for s in songs],
+            'v2 compiled': lambda: [v2(s, 64) for s in songs],
+        }
+
+        print(f'{args.songs} songs, JSON provider {type(app.json).__name__}')
+        print(f'  {"":<12} {"build µs/song":>14} {"+encode µs/song":>16} {"bytes/song":>11}')
+        baseline = None
+        for name, build in cases.items():
+            build_time = min(timeit.repeat(build, number=1, repeat=args.repeat))
+            payload = build()
+            total = min(timeit.repeat(lambda: dumps(build()), number=1, repeat=args.repeat))
+            size = len(dumps(payload)) / args.songs
+            baseline = baseline or total
+            print(f'  {name:<12} {build_time / args.songs * 1e6:14.1f} {total / args.songs * 1e6:16.1f} '
+                  f'{size:11.0f}   {baseline / total:.1f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
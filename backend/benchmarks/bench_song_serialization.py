@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /songs serialization at 1k and 10k songs, before and after.
+
+"Before" is Flask's stdlib JSON provider with no compression, which is
+how the API shipped; "after" is the orjson provider (JSON_PROVIDER) plus
+response compression (COMPRESS_RESPONSES). For each song count this seeds
+an in-memory SQLite DB with songs carrying realistic lyrics, prompts,
+styles and playlists, then reports:
+
+  to_dict   building the response dicts (same in both modes)
+  encode    dict -> JSON bytes with each provider
+  compress  gzip and brotli time and size over the JSON body
+  request   the full GET /songs?all_users=true via the test client
+
+Run from backend/:
+    python benchmarks/bench_song_serialization.py
+    python benchmarks/bench_song_serialization.py --sizes 1000 --repeat 10
+"""
+
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the backend app to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('SECRET_KEY', 'bench-secret-key')
+os.environ.setdefault('JWT_SECRET_KEY', 'bench-jwt-secret')
+os.environ.setdefault('SIGNUP_ACCESS_CODE', 'bench-signup-code')
+
+from flask.json.provider import DefaultJSONProvider
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import Playlist, Song, Style, User
+from app.services.json_provider import OrjsonProvider
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+LYRICS = (
+    "[Verse 1]\nIn the morning light I lift my eyes\nTo the hills where my help "
+    "comes from\nשִׁיר לַמַּעֲלוֹת אֶשָּׂא עֵינַי אֶל הֶהָרִים\n\n[Chorus]\nHallelujah, "
+    "sing it out\nEvery voice and every heart\n"
+) * 4
+PROMPT = "Uplifting worship ballad, warm piano intro, building to a full band chorus, " * 3
+
+
+def seed(count):
+    """Insert `count` songs across 20 styles and 10 playlists."""
+    user = User(username='bench', email='bench@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+
+    styles = [Style(name=f'Style {i}', style_prompt=PROMPT, created_by=user.id) for i in range(20)]
+    playlists = [Playlist(name=f'Playlist {i}', created_by=user.id) for i in range(10)]
+    db.session.add_all(styles + playlists)
+    db.session.flush()
+
+    start = datetime(2024, 1, 1)
+    songs = []
+    for i in range(count):
+        song = Song(
+            user_id=user.id,
+            specific_title=f'Song {i}',
+            specific_lyrics=LYRICS,
+            prompt_to_generate=PROMPT,
+            style_id=styles[i % len(styles)].id,
+            vocal_gender='female' if i % 2 else 'male',
+            status='completed',
+            download_url=f'https://cdn.example.com/{i}.mp3',
+            created_at=start + timedelta(minutes=i)
+        )
+        song.playlists.append(playlists[i % len(playlists)])
+        songs.append(song)
+    db.session.add_all(songs)
+    db.session.commit()
+    return user.id
+
+
+def timed(fn, repeat):
+    """(median seconds, last result) over `repeat` runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def bench_size(count, repeat):
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        user_id = seed(count)
+        token = create_access_token(identity=str(user_id))
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+
+        songs = Song.query.order_by(Song.created_at.desc()).all()
+        t_dict, payload = timed(lambda: {'songs': [
+            s.to_dict(include_user=True, include_style=True, include_playlists=True) for s in songs
+        ], 'total': len(songs)}, repeat)
+
+        stdlib = DefaultJSONProvider(app)
+        fast = OrjsonProvider(app)
+        t_std, body_std = timed(lambda: stdlib.dumps(payload, separators=(',', ':')).encode(), repeat)
+        t_fast, body = timed(lambda: fast.dumps_bytes(payload), repeat)
+
+        t_gzip, gz = timed(lambda: gzip.compress(body, compresslevel=app.config['COMPRESS_GZIP_LEVEL']), repeat)
+        if brotli:
+            t_br, br = timed(lambda: brotli.compress(body, quality=app.config['COMPRESS_BROTLI_QUALITY']), repeat)
+
+        def request_with(provider, accept_encoding):
+            app.json = provider
+            resp = client.get('/api/v1/songs?all_users=true', headers={**headers, 'Accept-Encoding': accept_encoding})
+            assert resp.status_code == 200
+            return resp
+
+        # "identity" leaves the body uncompressed, as before this change
+        t_before, resp_before = timed(lambda: request_with(stdlib, 'identity'), repeat)
+        t_after, resp_after = timed(lambda: request_with(fast, 'br' if brotli else 'gzip'), repeat)
+
+        db.session.remove()
+        db.drop_all()
+
+    kb = 1024
+    print(f'\n{count} songs')
+    print(f'  to_dict            {t_dict * 1000:8.1f} ms')
+    print(f'  encode stdlib      {t_std * 1000:8.1f} ms  {len(body_std) / kb:8.0f} KB')
+    print(f'  encode orjson      {t_fast * 1000:8.1f} ms  {len(body) / kb:8.0f} KB  '
+          f'({t_std / t_fast:.1f}x faster)')
+    print(f'  gzip               {t_gzip * 1000:8.1f} ms  {len(gz) / kb:8.0f} KB  ({len(body) / len(gz):.1f}x smaller)')
+    if brotli:
+        print(f'  brotli             {t_br * 1000:8.1f} ms  {len(br) / kb:8.0f} KB  ({len(body) / len(br):.1f}x smaller)')
+    print(f'  GET /songs before  {t_before * 1000:8.1f} ms  {len(resp_before.data) / kb:8.0f} KB on the wire')
+    print(f'  GET /songs after   {t_after * 1000:8.1f} ms  {len(resp_after.data) / kb:8.0f} KB on the wire '
+          f'({resp_after.headers.get("Content-Encoding")})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000', help='comma-separated song counts (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement, median reported (default: %(default)s)')
+    args = parser.parse_args()
+
+    for count in (int(s) for s in args.sizes.split(',')):
+        bench_size(count, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
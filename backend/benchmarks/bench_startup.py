@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Measure app startup: import, create_app() and the first requests.
+
+Each round runs in a fresh interpreter, like a newly booted worker, and
+times:
+
+  import         importing the app package and config
+  create_app     building the app
+  warm_up        app/services/prefork.py's warm_up() (warm rounds only)
+  first login    POST /auth/login, the first request of the process
+  first list     GET /songs with the token it returned
+  second login   the same login again, for the steady-state cost
+
+Rounds alternate between "cold" (no warm-up, as without preload_app) and
+"warm" (warm_up() before the first request, which is what a worker forked
+from the warmed gunicorn master inherits). The report is the median of
+each step in milliseconds. The user's bcrypt hash uses the minimum cost
+(4 rounds), so the login times show startup overhead rather than hashing.
+
+The database is in-memory SQLite, so connection setup (which post_fork's
+pool warming saves) isn't part of the numbers.
+
+Run from backend/:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --rounds 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STEPS = ('import', 'create_app', 'warm_up', 'first login', 'first list', 'second login')
+
+
+def child(warm):
+    """One round, in this (fresh) process; prints its timings as JSON."""
+    sys.path.insert(0, BACKEND)
+    os.environ.setdefault('SECRET_KEY', 'bench-secret-key')
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-jwt-secret')
+    os.environ.setdefault('SIGNUP_ACCESS_CODE', 'bench-signup-code')
+    timings = {}
+
+    start = time.perf_counter()
+    from app import create_app, db
+    from config import TestingConfig, config
+    timings['import'] = time.perf_counter() - start
+
+    class StartupConfig(TestingConfig):
+        CACHE_BACKEND = 'none'
+        REQUEST_INSTRUMENTATION = False
+
+    config['bench_startup'] = StartupConfig
+    start = time.perf_counter()
+    app = create_app('bench_startup')
+    timings['create_app'] = time.perf_counter() - start
+
+    if warm:
+        from app.services.prefork import warm_up
+        start = time.perf_counter()
+        warm_up(app)
+        timings['warm_up'] = time.perf_counter() - start
+
+    with app.app_context():
+        from app.models import User
+        db.create_all()
+        # Core insert: the ORM would configure the mappers before the timed requests
+        with db.engine.begin() as conn:
+            conn.execute(User.__table__.insert().values(
+                username='bench', email='bench@example.com', is_active=True,
+                password_hash=os.environ['BENCH_PASSWORD_HASH']))
+
+    client = app.test_client()
+    login = {'username': 'bench', 'password': 'bench-password'}
+
+    start = time.perf_counter()
+    token = client.post('/api/v1/auth/login', json=login).get_json()['access_token']
+    timings['first login'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with client.get('/api/v1/songs/', headers={'Authorization': f'Bearer {token}'}) as response:
+        assert response.status_code == 200, response.status_code
+    timings['first list'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.post('/api/v1/auth/login', json=login)
+    timings['second login'] = time.perf_counter() - start
+
+    print(json.dumps(timings))
+
+
+def run_round(warm, env):
+    output = subprocess.run([sys.executable, __file__, '--child', 'warm' if warm else 'cold'],
+                            env=env, cwd=BACKEND, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=7, help='rounds of each mode (default: %(default)s)')
+    parser.add_argument('--child', choices=('cold', 'warm'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child == 'warm')
+        return 0
+
+    import bcrypt
+    env = dict(os.environ, BENCH_PASSWORD_HASH=bcrypt.hashpw(b'bench-password', bcrypt.gensalt(rounds=4)).decode())
+
+    results = {'cold': [], 'warm': []}
+    for _ in range(args.rounds):
+        for mode in results:
+            results[mode].append(run_round(mode == 'warm', env))
+
+    print(f"{'step':<14}{'cold':>10}{'warm':>10}   (median of {args.rounds} rounds, ms)")
+    for step in STEPS:
+        row = f'{step:<14}'
+        for mode in ('cold', 'warm'):
+            values = [r[step] for r in results[mode] if step in r]
+            row += f'{statistics.median(values) * 1000:>10.1f}' if values else f'{"-":>10}'
+        print(row)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
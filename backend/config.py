@@ -7,6 +7,22 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _default_db_pool_size():
+    """Connections per worker process, matched to gunicorn's worker class.
+
+    Each sync worker serves one request at a time; a gthread worker serves
+    GUNICORN_THREADS; a gevent worker can hold hundreds of greenlets, so it
+    gets a fixed pool and greenlets queue for a connection (pool_timeout).
+    Multiply by the worker count to check against Postgres max_connections.
+    """
+    worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+    if worker_class == 'gevent':
+        return 10
+    if worker_class == 'gthread':
+        return int(os.getenv('GUNICORN_THREADS', 8))
+    return 2
+
+
 class Config:
     """Base configuration."""
 
@@ -24,10 +40,35 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f"postgresql://{DB_USER}:{quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': 10,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', _default_db_pool_size())),
+        # Headroom for the archive/transcode worker threads
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
         'pool_recycle': 3600,
         'pool_pre_ping': True,
     }
+    # Connections each gunicorn worker opens per engine as it starts (app/services/prefork.py)
+    DB_POOL_WARM = int(os.getenv('DB_POOL_WARM', 2))
+
+    # Read replica (app/services/db_routing.py): GET requests and read-only
+    # scripts read from it. Same credentials and database name as the primary.
+    DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST', '')
+    DB_REPLICA_PORT = os.getenv('DB_REPLICA_PORT', DB_PORT)
+    SQLALCHEMY_BINDS = {
+        'replica': {
+            'url': f"postgresql://{DB_USER}:{quote_plus(DB_PASSWORD)}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}",
+            # Fail fast to the primary rather than hang on a dead replica
+            'connect_args': {'connect_timeout': int(os.getenv('DB_REPLICA_CONNECT_TIMEOUT', 3))},
+        },
+    } if DB_REPLICA_HOST else {}
+    # Reads fall back to the primary while the replica is further behind than this
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+    REPLICA_LAG_CHECK_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', 5))
+    # After a write, that client reads from the primary for this long
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+    # Microsoft sign-ups must present this code (POST /auth/microsoft/complete-signup)
+    SIGNUP_ACCESS_CODE = os.getenv('SIGNUP_ACCESS_CODE')
 
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
@@ -39,17 +80,65 @@ class Config:
     # API
     API_PREFIX = os.getenv('API_PREFIX', '/api/v1')
 
+    # Archive completed songs in the background as soon as Suno delivers them
+    # (the /songs/archive/sweep cron job catches anything this misses)
+    ARCHIVE_ON_COMPLETE = os.getenv('ARCHIVE_ON_COMPLETE', 'true').lower() == 'true'
+
+    # Response cache for hot read endpoints (app/services/cache.py):
+    # 'redis' (shared by all workers), 'memory' (per process, so only for a
+    # single worker) or 'none'. Off unless CACHE_REDIS_URL is set.
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis' if os.getenv('CACHE_REDIS_URL') else 'none')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', 60))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+
+    # Response compression (app/services/compression.py); brotli is used
+    # when installed and the client accepts it, else gzip
+    COMPRESS_RESPONSES = os.getenv('COMPRESS_RESPONSES', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI = os.getenv('COMPRESS_BROTLI', 'true').lower() == 'true'
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+
+    # Per-request timing (app/services/instrumentation.py): Server-Timing
+    # header and a log line per request; requests slower than
+    # SLOW_REQUEST_MS (0 to disable) also log the SQL they ran
+    REQUEST_INSTRUMENTATION = os.getenv('REQUEST_INSTRUMENTATION', 'true').lower() == 'true'
+    SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+    SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 1000))
+
+    # On-demand request profiling (app/services/profiling.py): requests
+    # carrying X-Profile: <PROFILE_KEY> are profiled, at most
+    # PROFILE_RATE_PER_MIN per worker. Unset disables it.
+    PROFILE_KEY = os.getenv('PROFILE_KEY', '')
+    PROFILE_RATE_PER_MIN = float(os.getenv('PROFILE_RATE_PER_MIN', 6))
+    PROFILE_BURST = int(os.getenv('PROFILE_BURST', 2))
+    PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.001))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/aiamusic-profiles')
+
+    # Prometheus metrics at /metrics (app/services/metrics.py); gunicorn
+    # sets PROMETHEUS_MULTIPROC_DIR so they cover every worker
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    # Serve /metrics only with METRICS_TOKEN set (true in production)
+    METRICS_REQUIRE_TOKEN = False
+
+    # 'orjson' (app/services/json_provider.py) or Flask's 'default'
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
     TESTING = False
+    # The dev server is one process, so the memory cache is coherent
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis' if os.getenv('CACHE_REDIS_URL') else 'memory')
 
 
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
     TESTING = False
+    METRICS_REQUIRE_TOKEN = True
 
 
 class TestingConfig(Config):
@@ -57,6 +146,21 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_BINDS = {}
+    ARCHIVE_ON_COMPLETE = False
+    CACHE_BACKEND = 'memory'
+
+
+def check_cache_workers(workers, config_name=None):
+    """Refuse the memory response cache when several workers would share it.
+
+    It only invalidates the worker that made the write, so the others would
+    keep serving stale bodies. Called from the gunicorn configs' on_starting
+    hook with the worker count in effect, command line included.
+    """
+    settings = config.get(config_name or os.getenv('FLASK_ENV', 'development'), config['default'])
+    if workers > 1 and settings.CACHE_BACKEND == 'memory':
+        raise RuntimeError(f'CACHE_BACKEND=memory needs a single worker, not {workers}; use redis or none')
 
 
 config = {
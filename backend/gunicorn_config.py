@@ -2,18 +2,41 @@
 
 import multiprocessing
 import os
+import shutil
 
 # Server socket
 bind = '0.0.0.0:5000'
 backlog = 2048
 
 # Worker processes
-workers = min(multiprocessing.cpu_count() * 2 + 1, 4)  # Cap at 4 workers for container
-worker_class = 'sync'
-worker_connections = 1000
+# GUNICORN_WORKER_CLASS picks the concurrency model:
+#   gthread (default)  GUNICORN_THREADS threads per worker, so a slow Suno or
+#                      Azure call ties up one thread instead of a whole worker
+#   gevent             GUNICORN_WORKER_CONNECTIONS greenlets per worker; best
+#                      when most request time is spent waiting on upstreams
+#   sync               one request per worker (the old behaviour)
+# config.py sizes each worker's DB pool from the same variables, so keep
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under Postgres max_connections.
+# backend/loadtest/mixed_workload.py compares the profiles.
+workers = int(os.getenv('GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 4)))  # Cap at 4 workers for container
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 200))
 timeout = 120  # Increased for long Azure TTS synthesis
 keepalive = 2
 
+if worker_class == 'gevent':
+    # Must run before preload_app imports the app: requests, ssl and
+    # threading imported unpatched would keep blocking the whole worker.
+    from gevent import monkey
+    monkey.patch_all()
+
+# Prometheus metrics (app/services/metrics.py): each worker writes its
+# samples here and /metrics sums them. Set before the app (and so
+# prometheus_client) is imported, which preload_app does in the master.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/aiamusic-metrics')
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
 # Logging
 accesslog = '/app/logs/gunicorn_access.log' if os.path.exists('/app/logs') else '-'
 errorlog = '/app/logs/gunicorn_error.log' if os.path.exists('/app/logs') else '-'
@@ -35,5 +58,47 @@ limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
 
-# Preload app for faster worker spawn
+# Preload app for faster worker spawn. The master builds the app once and
+# warms it (when_ready); each worker then replaces the inherited database
+# pools with its own (post_fork). See app/services/prefork.py.
 preload_app = True
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from app.services.prefork import flask_app, warm_up
+    warm_up(flask_app(server.app.wsgi()))
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 is a C extension gevent can't patch; route its socket
+        # waits through the gevent hub so queries yield too.
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+    if server.cfg.preload_app:
+        from app.services.prefork import flask_app, reset_after_fork
+        reset_after_fork(flask_app(server.app.wsgi()))
+
+
+def on_starting(server):
+    # config.py is importable here: gunicorn puts its working directory
+    # (backend/) on sys.path before reading this file
+    from config import check_cache_workers
+    check_cache_workers(server.cfg.workers)
+
+    # Samples left by a previous run would be added to this one's
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges (DB pool) from /metrics
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
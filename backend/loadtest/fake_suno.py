@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Suno API, for load and latency tests.
+
+Serves what the app uses from api.sunoapi.org and cdn1.suno.ai:
+
+  POST /api/v1/generate              submit; answers after --latency
+                                     (+- --jitter) seconds with a taskId
+  GET  /api/v1/generate/record-info  status poll, in Suno's record-info shape
+  GET  /audio/<task>-<n>.mp3         the generated track: --mp3-kb of valid
+                                     MPEG frames, streamed at --download-kbps
+
+Once a task is accepted, callbacks go to its callBackUrl the way Suno
+sends them. First comes a text callback with no audio (--text-after
+seconds after submit). Then a partial callback with track 1
+(--first-after). Then the complete one with both tracks (--complete-after).
+
+Errors are injected at random:
+
+  --rate-limit-rate   fraction of submits answered 429
+  --server-error-rate fraction of submits answered 503
+  --sensitive-rate    fraction of accepted tasks that fail with
+                      SENSITIVE_WORD_ERROR, in the callback and record-info
+
+Callbacks are only sent to loopback hosts, so a misconfigured APP_URL
+can't make a test run post to a real deployment.
+
+Point the app at it:
+
+    SUNO_API_URL=http://127.0.0.1:8765/api/v1/generate
+    SUNO_STATUS_URL=http://127.0.0.1:8765/api/v1/generate/record-info
+    APP_URL=http://127.0.0.1:5000
+
+Run from backend/:
+    python loadtest/fake_suno.py --port 8765 --latency 0.5 --rate-limit-rate 0.05
+
+lifecycle.py starts one in-process with start().
+"""
+
+import argparse
+import heapq
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+LOOPBACK_HOSTS = {'127.0.0.1', 'localhost', '::1'}
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding: 417-byte frames
+MP3_FRAME = b'\xff\xfb\x90\x64' + bytes(413)
+CHUNK_SIZE = 64 * 1024
+
+
+class FakeSunoConfig:
+    """Behaviour knobs; see the module docstring."""
+
+    def __init__(self, latency=0.2, jitter=0.1, rate_limit_rate=0.0, server_error_rate=0.0,
+                 sensitive_rate=0.0, text_after=0.5, first_after=1.0, complete_after=2.0,
+                 mp3_kb=512, download_kbps=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.sensitive_rate = sensitive_rate
+        self.text_after = text_after
+        self.first_after = first_after
+        self.complete_after = complete_after
+        self.mp3_kb = mp3_kb
+        self.download_kbps = download_kbps
+        self.random = random.Random(seed)
+
+
+class FakeSuno:
+    """The fake service's state: tasks, pending callbacks and counters."""
+
+    def __init__(self, config):
+        self.config = config
+        self.tasks = {}
+        self.stats = {'submits': 0, 'rate_limited': 0, 'server_errors': 0, 'status_polls': 0,
+                      'callbacks_sent': 0, 'callback_errors': 0, 'downloads': 0, 'download_bytes': 0}
+        self.lock = threading.Lock()
+        self.base_url = None
+        self._server = None
+        self._timers = []
+        self._timer_ready = threading.Condition(self.lock)
+        self._callback_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='fake-suno-callback')
+        self._stopping = False
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def roll(self, rate):
+        with self.lock:
+            return self.config.random.random() < rate
+
+    def delay(self):
+        with self.lock:
+            jitter = self.config.random.uniform(-self.config.jitter, self.config.jitter)
+        time.sleep(max(0.0, self.config.latency + jitter))
+
+    # --- tasks -----------------------------------------------------------
+
+    def accept(self, payload):
+        task_id = uuid.uuid4().hex
+        task = {
+            'task_id': task_id,
+            'submitted_at': time.monotonic(),
+            'sensitive': self.roll(self.config.sensitive_rate),
+            'callback_url': payload.get('callBackUrl'),
+            'title': payload.get('title') or 'Untitled',
+            'prompt': payload.get('prompt', ''),
+        }
+        with self.lock:
+            self.tasks[task_id] = task
+
+        if task['sensitive']:
+            self._schedule(self.config.text_after, task, 'failed')
+        else:
+            self._schedule(self.config.text_after, task, 'text')
+            self._schedule(self.config.first_after, task, 'first')
+            self._schedule(self.config.complete_after, task, 'complete')
+        return task_id
+
+    def task_stage(self, task):
+        """Where a task is now: pending, text, first, complete or failed."""
+        elapsed = time.monotonic() - task['submitted_at']
+        if elapsed < self.config.text_after:
+            return 'pending'
+        if task['sensitive']:
+            return 'failed'
+        if elapsed >= self.config.complete_after:
+            return 'complete'
+        return 'first' if elapsed >= self.config.first_after else 'text'
+
+    def track_urls(self, task, stage):
+        tracks = {'first': (1,), 'complete': (1, 2)}.get(stage, ())
+        return [f"{self.base_url}/audio/{task['task_id']}-{n}.mp3" for n in tracks]
+
+    def record_info(self, task_id):
+        """A record-info response body for `task_id`."""
+        task = self.tasks.get(task_id)
+        if task is None:
+            return {'code': 404, 'msg': 'task not found', 'data': None}
+        stage = self.task_stage(task)
+        status = {'pending': 'PENDING', 'text': 'TEXT_SUCCESS', 'first': 'FIRST_SUCCESS',
+                  'complete': 'SUCCESS', 'failed': 'SENSITIVE_WORD_ERROR'}[stage]
+        data = {'taskId': task_id, 'status': status,
+                'response': {'sunoData': [{'audioUrl': url, 'title': task['title']}
+                                          for url in self.track_urls(task, stage)]}}
+        if stage == 'failed':
+            data['errorMessage'] = 'Song description contains sensitive words'
+        return {'code': 200, 'msg': 'success', 'data': data}
+
+    def callback_payload(self, task, stage):
+        if stage == 'failed':
+            return {'task_id': task['task_id'], 'status': 'SENSITIVE_WORD_ERROR',
+                    'msg': 'Song description contains sensitive words', 'data': []}
+        status = {'text': 'text_success', 'first': 'first_success', 'complete': 'completed'}[stage]
+        msg = 'All generated successfully.' if stage == 'complete' else f'{stage} generation finished'
+        return {'task_id': task['task_id'], 'status': status, 'msg': msg,
+                'data': [{'audio_url': url, 'title': task['title'], 'image_url': ''}
+                         for url in self.track_urls(task, stage)]}
+
+    # --- callbacks -------------------------------------------------------
+
+    def _schedule(self, after, task, stage):
+        url = task['callback_url']
+        if not url or urlparse(url).hostname not in LOOPBACK_HOSTS:
+            return
+        with self._timer_ready:
+            heapq.heappush(self._timers, (time.monotonic() + after, id(task), stage, task))
+            self._timer_ready.notify()
+
+    def _run_timers(self):
+        with self._timer_ready:
+            while not self._stopping:
+                if not self._timers:
+                    self._timer_ready.wait()
+                    continue
+                due, _, stage, task = self._timers[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._timer_ready.wait(wait)
+                    continue
+                heapq.heappop(self._timers)
+                self._callback_pool.submit(self._send_callback, task, stage)
+
+    def _send_callback(self, task, stage):
+        try:
+            response = requests.post(task['callback_url'], json=self.callback_payload(task, stage), timeout=30)
+            self.count('callbacks_sent' if response.ok else 'callback_errors')
+        except requests.exceptions.RequestException:
+            self.count('callback_errors')
+
+    # --- server ----------------------------------------------------------
+
+    def start(self, host='127.0.0.1', port=0):
+        """Serve in background threads; returns the base URL."""
+        handler = type('Handler', (FakeSunoHandler,), {'fake': self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self.base_url = f'http://{host}:{self._server.server_address[1]}'
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._run_timers, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        with self._timer_ready:
+            self._stopping = True
+            self._timer_ready.notify()
+        if self._server is not None:
+            self._server.shutdown()
+        self._callback_pool.shutdown(wait=False, cancel_futures=True)
+
+
+class FakeSunoHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    fake = None  # set on the subclass start() builds
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if urlparse(self.path).path.rstrip('/') != '/api/v1/generate':
+            return self._json(404, {'code': 404, 'msg': 'not found'})
+
+        fake = self.fake
+        fake.count('submits')
+        fake.delay()
+        if fake.roll(fake.config.rate_limit_rate):
+            fake.count('rate_limited')
+            return self._json(429, {'code': 429, 'msg': 'Your call frequency is too high. Please try again later.'})
+        if fake.roll(fake.config.server_error_rate):
+            fake.count('server_errors')
+            return self._json(503, {'code': 503, 'msg': 'Service unavailable'})
+
+        task_id = fake.accept(payload)
+        self._json(200, {'code': 200, 'msg': 'success', 'data': {'taskId': task_id}})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        fake = self.fake
+        if url.path.rstrip('/') == '/api/v1/generate/record-info':
+            fake.count('status_polls')
+            fake.delay()
+            task_id = parse_qs(url.query).get('taskId', [''])[0]
+            return self._json(200, fake.record_info(task_id))
+        if url.path.startswith('/audio/') and url.path.endswith('.mp3'):
+            return self._stream_mp3()
+        self._json(404, {'code': 404, 'msg': 'not found'})
+
+    def _stream_mp3(self):
+        fake = self.fake
+        frames = max(1, fake.config.mp3_kb * 1024 // len(MP3_FRAME))
+        size = frames * len(MP3_FRAME)
+        chunk = MP3_FRAME * (CHUNK_SIZE // len(MP3_FRAME))
+        seconds_per_chunk = len(chunk) / (fake.config.download_kbps * 1024) if fake.config.download_kbps else 0
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/mpeg')
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        sent = 0
+        while sent < size:
+            part = chunk[:size - sent]
+            self.wfile.write(part)
+            sent += len(part)
+            if seconds_per_chunk:
+                time.sleep(seconds_per_chunk * len(part) / len(chunk))
+        fake.count('downloads')
+        fake.count('download_bytes', sent)
+
+    def log_message(self, *args):
+        pass
+
+
+def add_arguments(parser):
+    """The fake's options, shared with lifecycle.py."""
+    group = parser.add_argument_group('fake Suno')
+    group.add_argument('--latency', type=float, default=0.2, help='API response time in seconds (default: %(default)s)')
+    group.add_argument('--jitter', type=float, default=0.1, help='+- random latency in seconds (default: %(default)s)')
+    group.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of submits answered 429')
+    group.add_argument('--server-error-rate', type=float, default=0.0, help='fraction of submits answered 503')
+    group.add_argument('--sensitive-rate', type=float, default=0.0,
+                       help='fraction of tasks failing with SENSITIVE_WORD_ERROR')
+    group.add_argument('--text-after', type=float, default=0.5, help='seconds to the text callback (default: %(default)s)')
+    group.add_argument('--first-after', type=float, default=1.0,
+                       help='seconds to the partial (track 1) callback (default: %(default)s)')
+    group.add_argument('--complete-after', type=float, default=2.0,
+                       help='seconds to the complete callback (default: %(default)s)')
+    group.add_argument('--mp3-kb', type=int, default=512, help='size of each track (default: %(default)s)')
+    group.add_argument('--download-kbps', type=int, default=0, help='track download speed in KB/s, 0 for unlimited')
+    group.add_argument('--seed', type=int, help='random seed for error injection and jitter')
+
+
+def config_from_args(args):
+    return FakeSunoConfig(
+        latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate, sensitive_rate=args.sensitive_rate,
+        text_after=args.text_after, first_after=args.first_after, complete_after=args.complete_after,
+        mp3_kb=args.mp3_kb, download_kbps=args.download_kbps, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    fake = FakeSuno(config_from_args(args))
+    base_url = fake.start(args.host, args.port)
+    print(f'Fake Suno on {base_url}')
+    print(f'  SUNO_API_URL={base_url}/api/v1/generate')
+    print(f'  SUNO_STATUS_URL={base_url}/api/v1/generate/record-info')
+    try:
+        while True:
+            time.sleep(10)
+            print(' '.join(f'{key}={value}' for key, value in fake.stats.items()), flush=True)
+    except KeyboardInterrupt:
+        fake.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Load test the whole generation pipeline against a local fake Suno.
+
+Boots gunicorn (gunicorn_config.py, run:app) with SUNO_API_URL,
+SUNO_STATUS_URL and APP_URL pointing at a fake_suno.py instance and at
+itself, then --concurrency client threads create songs for --duration
+seconds. Each song goes through the real path:
+
+  create    POST /songs, which submits to (fake) Suno
+  callback  Suno's text, partial and complete callbacks, then the song
+            is completed
+  archive   the background archiver downloads the streamed MP3
+
+A monitor thread polls GET /songs/<id> every --poll-interval seconds and
+notes when each song completes, fails and is archived. It keeps going
+for up to --drain seconds after the clients stop. The report has
+throughput plus p50/p95/p99/max for each stage and end to end. It also
+counts the outcomes: archived, failed (SENSITIVE_WORD_ERROR), rejected
+at submit (429/503) and unfinished.
+
+Needs the database the app is configured for (DB_HOST etc.), e.g. the
+docker-compose.dev.yml Postgres. Audio goes to a temporary
+AUDIO_STORAGE_PATH. The response cache is off (CACHE_BACKEND=none) so
+polling sees each write at once whichever worker answers. Songs created
+by the run are left in place under a throwaway "loadtest-*" user.
+
+To test an app that is already running, pass --base-url and start the
+app with the SUNO_* variables and APP_URL this script prints.
+
+Run from backend/:
+    python loadtest/lifecycle.py
+    python loadtest/lifecycle.py --concurrency 32 --duration 120 --rate-limit-rate 0.05 --sensitive-rate 0.1
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from fake_suno import FakeSuno, add_arguments, config_from_args
+from mixed_workload import login, percentile, start_gunicorn
+
+SONG_BODY = {
+    'specific_title': 'Load test hymn',
+    'specific_lyrics': '[Verse 1]\nIn the morning light I lift my eyes\n\n[Chorus]\nHallelujah\n' * 8,
+    'vocal_gender': 'female',
+}
+
+
+class Lifecycle:
+    """Timestamps (time.perf_counter) of one song's trip through the pipeline."""
+
+    __slots__ = ('song_id', 'created', 'submitted', 'completed', 'archived', 'failed')
+
+    def __init__(self, created):
+        self.song_id = None
+        self.created = created
+        self.submitted = None
+        self.completed = None
+        self.archived = None
+        self.failed = None
+
+    @property
+    def done(self):
+        return self.archived is not None or self.failed is not None
+
+
+def run_clients(base_url, token, concurrency, duration, lifecycles, lock):
+    """Create songs until `duration` is up; returns the count of rejected submits."""
+    rejected = [0]
+    stop_at = time.time() + duration
+
+    def client():
+        session = requests.Session()
+        session.headers['Authorization'] = f'Bearer {token}'
+        while time.time() < stop_at:
+            lifecycle = Lifecycle(time.perf_counter())
+            try:
+                response = session.post(f'{base_url}/api/v1/songs/', json=SONG_BODY, timeout=60)
+            except requests.exceptions.RequestException:
+                response = None
+            if response is None or response.status_code != 201:
+                with lock:
+                    rejected[0] += 1
+                # Back off like a client shown "rate limit exceeded" would
+                time.sleep(0.5)
+                continue
+            lifecycle.submitted = time.perf_counter()
+            lifecycle.song_id = response.json()['song']['id']
+            with lock:
+                lifecycles.append(lifecycle)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return rejected[0]
+
+
+def monitor(base_url, token, lifecycles, lock, stop, poll_interval):
+    """Poll unfinished songs, filling in completed/archived/failed times."""
+    session = requests.Session()
+    session.headers['Authorization'] = f'Bearer {token}'
+    while not stop.is_set():
+        with lock:
+            pending = [lc for lc in lifecycles if not lc.done]
+        for lifecycle in pending:
+            try:
+                response = session.get(f'{base_url}/api/v1/songs/{lifecycle.song_id}', timeout=30)
+            except requests.exceptions.RequestException:
+                continue
+            if not response.ok:
+                continue
+            song = response.json()
+            song = song.get('song', song)
+            now = time.perf_counter()
+            if song['status'] == 'failed':
+                lifecycle.failed = now
+            elif song['status'] == 'completed' and lifecycle.completed is None:
+                lifecycle.completed = now
+            if song.get('is_archived') and lifecycle.archived is None:
+                lifecycle.archived = now
+                lifecycle.completed = lifecycle.completed or now
+        stop.wait(poll_interval)
+
+
+def _stats_row(name, values):
+    if not values:
+        return f'{name:<22}{"-":>8}'
+    return (f'{name:<22}{len(values):>8}{percentile(values, 50):>10.2f}s{percentile(values, 95):>9.2f}s'
+            f'{percentile(values, 99):>9.2f}s{max(values):>9.2f}s{statistics.mean(values):>9.2f}s')
+
+
+def report(lifecycles, rejected, duration, fake):
+    archived = [lc for lc in lifecycles if lc.archived is not None]
+    failed = [lc for lc in lifecycles if lc.failed is not None]
+    completed = [lc for lc in lifecycles if lc.completed is not None]
+    unfinished = len(lifecycles) - len(archived) - len(failed)
+
+    print(f"\nSongs created {len(lifecycles)} ({len(lifecycles) / duration:.2f}/s), "
+          f"archived {len(archived)} ({len(archived) / duration:.2f}/s), failed {len(failed)}, "
+          f"rejected at submit {rejected}, unfinished {unfinished}")
+    print(f"{'stage':<22}{'count':>8}{'p50':>11}{'p95':>10}{'p99':>10}{'max':>10}{'mean':>10}")
+    print(_stats_row('create (POST /songs)', [lc.submitted - lc.created for lc in lifecycles]))
+    print(_stats_row('submit -> completed', [lc.completed - lc.submitted for lc in completed]))
+    print(_stats_row('completed -> archived', [lc.archived - lc.completed for lc in archived]))
+    print(_stats_row('submit -> failed', [lc.failed - lc.submitted for lc in failed]))
+    print(_stats_row('end to end', [lc.archived - lc.created for lc in archived]))
+    print('fake Suno: ' + ' '.join(f'{key}={value}' for key, value in fake.stats.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--worker-class', default='gthread', help='gunicorn worker class (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of song creation (default: %(default)s)')
+    parser.add_argument('--drain', type=float, default=60,
+                        help='seconds to wait for in-flight songs afterwards (default: %(default)s)')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='seconds between status polls (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--base-url', help='test an already running app instead of booting gunicorn')
+    parser.add_argument('--suno-port', type=int, default=0, help='fake Suno port (default: any free port)')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    fake = FakeSuno(config_from_args(args))
+    suno_url = fake.start(port=args.suno_port)
+    proc = None
+    storage = tempfile.TemporaryDirectory(prefix='loadtest-audio-')
+
+    try:
+        if args.base_url:
+            base_url = args.base_url.rstrip('/')
+            print(f'Start the app with SUNO_API_URL={suno_url}/api/v1/generate '
+                  f'SUNO_STATUS_URL={suno_url}/api/v1/generate/record-info SUNO_API_KEY=loadtest APP_URL={base_url}')
+        else:
+            base_url = f'http://127.0.0.1:{args.port}'
+            proc, _ = start_gunicorn(
+                args.worker_class, args.port, f'{suno_url}/api/v1/generate', args.workers,
+                SUNO_STATUS_URL=f'{suno_url}/api/v1/generate/record-info',
+                APP_URL=base_url,
+                ARCHIVE_ON_COMPLETE='true',
+                AUDIO_STORAGE_PATH=storage.name,
+                CACHE_BACKEND='none')
+
+        token = login(base_url)
+        lifecycles, lock, stop = [], threading.Lock(), threading.Event()
+        watcher = threading.Thread(target=monitor,
+                                   args=(base_url, token, lifecycles, lock, stop, args.poll_interval))
+        watcher.start()
+
+        rejected = run_clients(base_url, token, args.concurrency, args.duration, lifecycles, lock)
+
+        deadline = time.time() + args.drain
+        while time.time() < deadline and not all(lc.done for lc in lifecycles):
+            time.sleep(0.5)
+        stop.set()
+        watcher.join()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        fake.stop()
+        storage.cleanup()
+
+    target = args.base_url or f'{args.workers} {args.worker_class} workers'
+    print(f"\n{target}, {args.concurrency} clients, {args.duration:.0f}s; "
+          f"Suno latency {args.latency}s, callbacks at {args.text_after}/{args.first_after}/{args.complete_after}s, "
+          f"{args.mp3_kb} KB tracks")
+    report(lifecycles, rejected, args.duration, fake)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
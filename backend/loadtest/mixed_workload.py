@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Compare gunicorn worker classes on a mixed API workload.
+
+For each profile this boots gunicorn (gunicorn_config.py, run:app) with
+GUNICORN_WORKER_CLASS set, points SUNO_API_URL at a local fake Suno that
+answers after --upstream-delay seconds, and drives the API from
+--concurrency client threads for --duration seconds. The mix is mostly
+fast DB reads plus song creation, which blocks on the (slow) Suno submit
+the way real generation requests do. It prints throughput and latency
+per profile, so the effect of a slow upstream on sync workers is visible
+next to gthread/gevent.
+
+Needs the database the app is configured for (DB_HOST etc.), e.g. the
+docker-compose.dev.yml Postgres. Songs created by the run are left in
+place under a throwaway "loadtest-*" user.
+
+Run from backend/:
+    python loadtest/mixed_workload.py
+    python loadtest/mixed_workload.py --profiles sync,gevent --concurrency 64 --upstream-delay 2
+"""
+
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import requests
+
+from fake_suno import FakeSuno, FakeSunoConfig
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (weight, name, method, path, sends a Suno-bound song body)
+WORKLOAD = [
+    # GET /songs/ has no paging: this is the user's whole library, which
+    # grows as create_song runs
+    (35, 'list_songs_full', 'GET', '/api/v1/songs/', False),
+    (15, 'song_stats', 'GET', '/api/v1/songs/stats', False),
+    (15, 'list_playlists', 'GET', '/api/v1/playlists/', False),
+    (15, 'health', 'GET', '/health', False),
+    (20, 'create_song', 'POST', '/api/v1/songs/', True),
+]
+
+
+def start_fake_suno(delay):
+    fake = FakeSuno(FakeSunoConfig(latency=delay, jitter=0))
+    return fake, f'{fake.start()}/api/v1/generate'
+
+
+def start_gunicorn(profile, port, suno_url, workers, **extra_env):
+    env = dict(os.environ,
+               GUNICORN_WORKER_CLASS=profile,
+               GUNICORN_WORKERS=str(workers),
+               SUNO_API_URL=suno_url,
+               SUNO_API_KEY='loadtest',
+               ARCHIVE_ON_COMPLETE='false')
+    env.update(extra_env)
+    proc = subprocess.Popen(
+        ['gunicorn', '--config', 'gunicorn_config.py', '--bind', f'127.0.0.1:{port}',
+         '--access-logfile', '/dev/null', 'run:app'],
+        cwd=BACKEND_DIR, env=env
+    )
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f'{base_url}/health', timeout=1).ok:
+                return proc, base_url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.25)
+
+    proc.terminate()
+    raise RuntimeError(f'gunicorn ({profile}) did not become healthy')
+
+
+def login(base_url):
+    username = f'loadtest-{uuid.uuid4().hex[:8]}'
+    password = uuid.uuid4().hex
+    requests.post(f'{base_url}/api/v1/auth/register', timeout=10,
+                  json={'username': username, 'email': f'{username}@example.com', 'password': password})
+    resp = requests.post(f'{base_url}/api/v1/auth/login', timeout=10,
+                         json={'username': username, 'password': password})
+    resp.raise_for_status()
+    return resp.json()['access_token']
+
+
+def run_clients(base_url, token, concurrency, duration):
+    """Drive the workload; return {name: [latency, ...]} and an error count."""
+    weights = [w[0] for w in WORKLOAD]
+    latencies = {w[1]: [] for w in WORKLOAD}
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client():
+        session = requests.Session()
+        session.headers['Authorization'] = f'Bearer {token}'
+        while time.time() < stop_at:
+            _, name, method, path, creates_song = random.choices(WORKLOAD, weights)[0]
+            body = {'specific_title': 'Load test', 'prompt_to_generate': 'a calm hymn'} if creates_song else None
+            started = time.perf_counter()
+            try:
+                ok = session.request(method, base_url + path, json=body, timeout=60).ok
+            except requests.exceptions.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies[name].append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return latencies, errors[0]
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', default='sync,gthread,gevent',
+                        help='comma-separated worker classes (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=32, help='client threads (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=30, help='seconds per profile (default: %(default)s)')
+    parser.add_argument('--upstream-delay', type=float, default=1.0,
+                        help='fake Suno response time in seconds (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    suno_server, suno_url = start_fake_suno(args.upstream_delay)
+    results = []
+
+    try:
+        for profile in args.profiles.split(','):
+            proc, base_url = start_gunicorn(profile, args.port, suno_url, args.workers)
+            try:
+                token = login(base_url)
+                latencies, errors = run_clients(base_url, token, args.concurrency, args.duration)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+            fast = [v for name, vals in latencies.items() if name != 'create_song' for v in vals]
+            total = sum(len(v) for v in latencies.values())
+            results.append((profile, total / args.duration, errors,
+                            percentile(fast, 50), percentile(fast, 95),
+                            percentile(latencies['create_song'], 50)))
+    finally:
+        suno_server.stop()
+
+    print(f"\n{args.workers} workers, {args.concurrency} clients, {args.duration:.0f}s, "
+          f"Suno delay {args.upstream_delay}s")
+    print(f"{'profile':<10}{'req/s':>10}{'errors':>8}{'read p50':>11}{'read p95':>11}{'create p50':>12}")
+    for profile, rps, errors, p50, p95, create_p50 in results:
+        print(f"{profile:<10}{rps:>10.1f}{errors:>8}{p50 * 1000:>9.0f}ms{p95 * 1000:>9.0f}ms{create_p50:>11.2f}s")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
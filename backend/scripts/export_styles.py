@@ -4,10 +4,11 @@ sys.path.insert(0, '/app')
 
 from app import create_app, db
 from app.models import Style
+from app.services.db_routing import read_replica
 
 app = create_app()
 
-with app.app_context():
+with app.app_context(), read_replica():
     styles = Style.query.order_by(Style.name).all()
 
     print("ID,Name,Prompt")
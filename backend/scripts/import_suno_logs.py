@@ -14,7 +14,7 @@ sys.path.insert(0, '/app')
 
 from app import create_app, db
 from app.models import Song, Style, User
-from app.routes.songs import _archive_song_to_storage
+from app.services.archiver import archive_song_to_storage
 
 
 def parse_logs(filepath):
@@ -186,7 +186,7 @@ def import_song(record, user_id):
 
     # Archive audio files to local storage
     try:
-        _archive_song_to_storage(song)
+        archive_song_to_storage(song)
         print(f"    Archived audio files")
     except Exception as e:
         print(f"    Warning: Failed to archive audio: {e}")
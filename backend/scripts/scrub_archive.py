@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Verify archived audio files against the size/checksum recorded in the DB.
+
+Re-archives damaged files from Suno while the download URL is still valid
+(here, one at a time, rather than through the background queue the cron
+job uses) and prints a JSON report. The scheduled version of this is the cron job
+POST /api/v1/songs/archive/scrub; use this script for a full pass, e.g.
+after restoring the data volume.
+
+Run inside the aiamusic container:
+    docker exec aiamusic python scripts/scrub_archive.py --all
+    docker exec aiamusic python scripts/scrub_archive.py --batch-size 50 --max-mb-per-sec 2
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+# Add the backend app to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Song
+from app.services.archive_scheduler import get_archive_scheduler
+from app.services.archiver import archive_song_to_storage
+from app.services.archive_scrubber import scrub_archive, SCRUB_BATCH_SIZE, SCRUB_MAX_BYTES_PER_SEC
+
+
+def merge_reports(total, report):
+    """Fold one batch report into the running total."""
+    for key, value in report.items():
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, list):
+            total.setdefault(key, []).extend(value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=SCRUB_BATCH_SIZE,
+                        help='songs per batch (default: %(default)s)')
+    parser.add_argument('--max-mb-per-sec', type=float,
+                        default=SCRUB_MAX_BYTES_PER_SEC / (1024 * 1024),
+                        help='read throttle in MB/s, 0 for unlimited (default: %(default)s)')
+    parser.add_argument('--all', action='store_true',
+                        help='keep going until every archived file has been checked in this run')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    max_bytes_per_sec = int(args.max_mb_per_sec * 1024 * 1024)
+
+    with app.app_context():
+        started_at = datetime.utcnow()
+        total = {}
+
+        while True:
+            report = scrub_archive(
+                batch_size=args.batch_size,
+                max_bytes_per_sec=max_bytes_per_sec,
+                # --all re-checks everything not verified during this run
+                verified_before=started_at if args.all else None,
+                logger=app.logger,
+                enqueue=False
+            )
+            merge_reports(total, report)
+
+            for song_id in report['requeued']:
+                song = db.session.get(Song, song_id)
+                ok = archive_song_to_storage(song, throttle=get_archive_scheduler().throttle)
+                total.setdefault('rearchived' if ok else 'rearchive_failed', []).append(song_id)
+            print(f"Checked {total['checked']} files...", file=sys.stderr)
+
+            if not args.all or report['checked'] < args.batch_size:
+                break
+
+        print(json.dumps(total, indent=2))
+
+
+if __name__ == '__main__':
+    main()
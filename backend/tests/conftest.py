@@ -53,3 +53,34 @@ def client(app):
 def runner(app):
     """Create test CLI runner."""
     return app.test_cli_runner()
+
+
+@pytest.fixture
+def create_user(request):
+    """Return a helper that adds a user, logs in and gives (user_id, auth headers).
+
+    It uses the `app` and `client` fixtures unless another app is passed,
+    e.g. create_user(app=replica_app, client=replica_client).
+    """
+    def create(username="alice", email="alice@example.com", app=None, client=None):
+        from app import db
+        from app.models import User
+        from flask_bcrypt import generate_password_hash
+
+        if app is None:
+            app = request.getfixturevalue("app")
+        if client is None:
+            client = request.getfixturevalue("client")
+
+        with app.app_context():
+            user = User(username=username, email=email,
+                        password_hash=generate_password_hash("hunter22").decode("utf-8"))
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+        resp = client.post("/api/v1/auth/login", json={"username": username, "password": "hunter22"})
+        token = resp.get_json()["access_token"]
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return create
@@ -0,0 +1,159 @@
+# Proactive Archival Tests for AIAMusic
+# =====================================
+import time
+import requests
+from datetime import datetime, timedelta
+
+AUDIO = b"ID3" + b"\x00" * 4096
+
+
+class _FakeDownload:
+    """Minimal stand-in for a streamed requests.Response from Suno."""
+
+    def __init__(self, body):
+        self.body = body
+        self.headers = {"Content-Length": str(len(body))}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+def _make_completed_song(app, age_days=0, url="https://cdn.example.com/track.mp3", archived=False):
+    from app import db
+    from app.models import User, Song
+
+    with app.app_context():
+        user = User.query.first()
+        if not user:
+            user = User(username="alice", email="alice@example.com", password_hash="x")
+            db.session.add(user)
+            db.session.commit()
+
+        song = Song(user_id=user.id, specific_title="Psalm 23", status="completed",
+                    download_url=url, is_archived=archived,
+                    created_at=datetime.utcnow() - timedelta(days=age_days))
+        db.session.add(song)
+        db.session.commit()
+        return song.id
+
+
+def _cleanup(*song_ids):
+    from app.services.audio_storage import get_storage_service
+    for song_id in song_ids:
+        get_storage_service().delete_song_files(song_id)
+
+
+def test_sweep_orders_by_remaining_url_lifetime(app):
+    from app.services.archive_scheduler import _sweep_candidates
+
+    fresh_id = _make_completed_song(app, age_days=1)
+    urgent_id = _make_completed_song(app, age_days=14)
+    expired_id = _make_completed_song(app, age_days=20)
+    long_expired_id = _make_completed_song(app, age_days=40)
+    _make_completed_song(app, age_days=14, archived=True)
+    _make_completed_song(app, age_days=14, url=None)
+
+    with app.app_context():
+        ids = [s.id for s in _sweep_candidates(10, datetime.utcnow())]
+
+    assert ids == [urgent_id, fresh_id, expired_id, long_expired_id]
+
+
+def test_sweep_archives_songs_and_reports_failures(app, monkeypatch):
+    from app import db
+    from app.models import Song
+    from app.services.archive_scheduler import run_archive_sweep
+
+    good_id = _make_completed_song(app, age_days=14)
+    bad_id = _make_completed_song(app, age_days=3, url="https://cdn.example.com/gone.mp3")
+
+    def fake_get(self, url, stream, timeout):
+        if "gone" in url:
+            raise requests.HTTPError("404")
+        return _FakeDownload(AUDIO)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+
+    with app.app_context():
+        report = run_archive_sweep(limit=10, concurrency=1)
+        assert report["candidates"] == 2
+        assert report["archived"] == 1
+        assert report["failed"] == [bad_id]
+        assert report["remaining"] == 0
+        assert report["expiring_within_day"] == 1
+
+        song = db.session.get(Song, good_id)
+        assert song.is_archived is True
+        assert song.archive_checksum is not None
+
+    _cleanup(good_id, bad_id)
+
+
+def test_sweep_stops_starting_downloads_at_its_time_budget(app, monkeypatch):
+    from app.services import archive_scheduler
+
+    song_ids = [_make_completed_song(app, age_days=day) for day in (14, 13, 12)]
+    started = []
+
+    def slow_archive(app, song_id, throttle):
+        started.append(song_id)
+        time.sleep(0.2)
+        return True
+
+    monkeypatch.setattr(archive_scheduler, "_archive_by_id", slow_archive)
+
+    with app.app_context():
+        # Downloads would start at 0, 0.2 and 0.4 s; the last is past the budget
+        report = archive_scheduler.run_archive_sweep(limit=10, concurrency=1, time_budget=0.3)
+    assert (report["archived"], report["failed"], report["remaining"]) == (2, [], 1)
+    assert started == song_ids[:2]
+
+    _cleanup(*song_ids)
+
+
+def test_completed_songs_are_archived_in_background(app, monkeypatch):
+    from app import db
+    from app.models import Song
+    from app.services import archive_scheduler
+
+    song_id = _make_completed_song(app, age_days=2)
+    monkeypatch.setattr(requests.Session, "get", lambda self, url, stream, timeout: _FakeDownload(AUDIO))
+    monkeypatch.setattr(archive_scheduler, "_archive_scheduler",
+                        archive_scheduler.ArchiveScheduler(concurrency=1, max_bytes_per_sec=0))
+
+    with app.app_context():
+        song = db.session.get(Song, song_id)
+
+        # Off in the test config: nothing is queued
+        assert archive_scheduler.enqueue_completed_songs([song]) == 0
+
+        app.config["ARCHIVE_ON_COMPLETE"] = True
+        try:
+            assert archive_scheduler.enqueue_completed_songs([song]) == 1
+        finally:
+            app.config["ARCHIVE_ON_COMPLETE"] = False
+
+    scheduler = archive_scheduler.get_archive_scheduler()
+    deadline = time.time() + 5
+    while time.time() < deadline and (scheduler.pending() or song_id in scheduler._queued):
+        time.sleep(0.01)
+
+    with app.app_context():
+        assert db.session.get(Song, song_id).is_archived is True
+
+    _cleanup(song_id)
+
+
+def test_sweep_endpoint_requires_cron_key(client, monkeypatch):
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+    for key in ("wrong-key", "cl\u00e9"):
+        resp = client.post("/api/v1/songs/archive/sweep", headers={"X-Reconcile-Key": key})
+        assert resp.status_code == 403
+
+    resp = client.post("/api/v1/songs/archive/sweep", headers={"X-Reconcile-Key": "correct-key"})
+    assert resp.status_code == 200
+    assert resp.get_json()["candidates"] == 0
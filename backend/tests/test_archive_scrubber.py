@@ -0,0 +1,177 @@
+# Archive Integrity Scrubber Tests for AIAMusic
+# ==============================================
+import hashlib
+import requests
+from datetime import datetime, timedelta
+
+AUDIO = b"ID3" + b"\x00" * 4096
+
+
+class _FakeDownload:
+    """Minimal stand-in for a streamed requests.Response from Suno."""
+
+    def __init__(self, body):
+        self.body = body
+        self.headers = {"Content-Length": str(len(body))}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+def _make_archived_song(app, created_at=None, checksum=True, size=None):
+    from app import db
+    from app.models import User, Song
+    from app.services.audio_storage import get_storage_service
+
+    with app.app_context():
+        user = User.query.first()
+        if not user:
+            user = User(username="alice", email="alice@example.com", password_hash="x")
+            db.session.add(user)
+            db.session.commit()
+
+        song = Song(user_id=user.id, specific_title="Psalm 23", status="completed", is_archived=True,
+                    download_url="https://cdn.example.com/track.mp3",
+                    file_size_bytes=len(AUDIO) if size is None else size,
+                    archive_checksum=hashlib.sha256(AUDIO).hexdigest() if checksum else None,
+                    created_at=created_at or datetime.utcnow())
+        db.session.add(song)
+        db.session.commit()
+        song.archived_url = f"/audio/songs/{song.id}/track_1.mp3"
+        db.session.commit()
+        song_id = song.id
+
+    storage = get_storage_service()
+    storage.get_song_dir(song_id).mkdir(parents=True, exist_ok=True)
+    (storage.get_song_dir(song_id) / "track_1.mp3").write_bytes(AUDIO)
+    return song_id
+
+
+def _cleanup(*song_ids):
+    from app.services.audio_storage import get_storage_service
+    for song_id in song_ids:
+        get_storage_service().delete_song_files(song_id)
+
+
+def test_scrub_passes_intact_files_and_backfills_legacy_checksums(app):
+    from app import db
+    from app.models import Song
+    from app.services.archive_scrubber import scrub_archive
+
+    intact_id = _make_archived_song(app)
+    legacy_id = _make_archived_song(app, checksum=False)
+
+    with app.app_context():
+        report = scrub_archive(max_bytes_per_sec=0)
+        assert report["checked"] == 2
+        assert report["ok"] == 2
+        assert report["backfilled"] == 1
+
+        legacy = db.session.get(Song, legacy_id)
+        assert legacy.archive_checksum == hashlib.sha256(AUDIO).hexdigest()
+        assert legacy.archive_verified_at is not None
+
+        # Freshly verified files are skipped until the interval has passed
+        assert scrub_archive(max_bytes_per_sec=0)["checked"] == 0
+
+    _cleanup(intact_id, legacy_id)
+
+
+def test_scrub_requeues_damaged_file_while_suno_url_is_valid(app, monkeypatch):
+    from app import db
+    from app.models import Song
+    from app.services import archive_scrubber, audio_storage
+    from app.services.archive_scheduler import get_archive_scheduler, run_archive_sweep
+    from app.services.archive_scrubber import scrub_archive
+
+    song_id = _make_archived_song(app)
+    file_path = audio_storage.get_storage_service().get_song_dir(song_id) / "track_1.mp3"
+    file_path.write_bytes(AUDIO[:100])  # truncated on disk
+
+    queued = []
+    monkeypatch.setitem(app.config, "ARCHIVE_ON_COMPLETE", True)
+    monkeypatch.setattr(get_archive_scheduler(), "enqueue",
+                        lambda app, song_id, expires_at=None: queued.append(song_id) or True)
+    invalidated = []
+    monkeypatch.setattr(archive_scrubber, "invalidate_songs",
+                        lambda songs: invalidated.extend(s.id for s in songs))
+
+    with app.app_context():
+        report = scrub_archive(max_bytes_per_sec=0)
+        assert report["size_mismatch"] == [song_id]
+        assert report["requeued"] == [song_id]
+        # Handed off, not downloaded inside the scrub
+        assert queued == [song_id]
+        assert invalidated == [song_id]
+        assert db.session.get(Song, song_id).is_archived is False
+        assert file_path.read_bytes() == AUDIO[:100]
+
+        # The queue (or the sweep backstop) downloads it again
+        monkeypatch.setattr(requests.Session, "get", lambda self, url, stream, timeout: _FakeDownload(AUDIO))
+        assert run_archive_sweep()["archived"] == 1
+        assert db.session.get(Song, song_id).is_archived is True
+        assert file_path.read_bytes() == AUDIO
+
+    _cleanup(song_id)
+
+
+def test_scrub_reports_damage_after_suno_url_expired(app):
+    from app.services.audio_storage import get_storage_service
+    from app.services.archive_scrubber import scrub_archive
+
+    corrupt_id = _make_archived_song(app, created_at=datetime.utcnow() - timedelta(days=30))
+    (get_storage_service().get_song_dir(corrupt_id) / "track_1.mp3").write_bytes(b"X" * len(AUDIO))
+    missing_id = _make_archived_song(app, created_at=datetime.utcnow() - timedelta(days=30))
+    _cleanup(missing_id)
+
+    with app.app_context():
+        report = scrub_archive(max_bytes_per_sec=0)
+        assert report["checksum_mismatch"] == [corrupt_id]
+        assert report["missing"] == [missing_id]
+        assert sorted(report["unrecoverable"]) == sorted([corrupt_id, missing_id])
+        assert report["requeued"] == []
+
+    _cleanup(corrupt_id)
+
+
+def test_scrub_stops_at_its_time_budget(app):
+    from app.services.archive_scrubber import scrub_archive
+
+    song_ids = [_make_archived_song(app) for _ in range(3)]
+
+    with app.app_context():
+        report = scrub_archive(max_bytes_per_sec=0, time_budget=0)
+        assert report["checked"] == 1 and report["stopped_early"] is True
+
+        report = scrub_archive(max_bytes_per_sec=0)
+        assert report["checked"] == 2 and report["stopped_early"] is False
+
+    _cleanup(*song_ids)
+
+
+def test_scrub_endpoint_requires_cron_key(client, monkeypatch):
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+    resp = client.post("/api/v1/songs/archive/scrub", headers={"X-Reconcile-Key": "wrong-key"})
+    assert resp.status_code == 403
+
+    resp = client.post("/api/v1/songs/archive/scrub", headers={"X-Reconcile-Key": "correct-key"})
+    assert resp.status_code == 200
+    assert resp.get_json()["checked"] == 0
+
+
+def test_rate_limiter_waits_once_burst_is_spent(monkeypatch):
+    from app.services import throttle
+
+    sleeps = []
+    monkeypatch.setattr(throttle.time, "sleep", sleeps.append)
+
+    limiter = throttle.RateLimiter(1000)
+    assert limiter.consume(1000) == 0.0
+    limiter.consume(500)
+    assert sleeps and 0.45 < sleeps[0] <= 0.5
+
+    assert throttle.RateLimiter(0).consume(10 ** 9) == 0.0
@@ -0,0 +1,182 @@
+# Upstream-Bound View and ASGI Tests for AIAMusic
+# ==============================================
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+
+
+def _make_submitted_song(app, user_id, task_id, age_minutes=0):
+    from app import db
+    from app.models import Song
+
+    with app.app_context():
+        song = Song(user_id=user_id, specific_title=task_id, status="submitted", suno_task_id=task_id,
+                    created_at=datetime.utcnow() - timedelta(minutes=age_minutes))
+        db.session.add(song)
+        db.session.commit()
+        return song.id
+
+
+def _mock_suno(monkeypatch, module, records, delay=0.0):
+    """Route the view's httpx client to a fake Suno; returns peak concurrency."""
+    in_flight = {"now": 0, "peak": 0}
+
+    async def handler(request):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(delay)
+        in_flight["now"] -= 1
+        record = records.get(request.url.params["taskId"])
+        if record is None:
+            return httpx.Response(502)
+        return httpx.Response(200, json={"code": 200, "data": record})
+
+    monkeypatch.setenv("SUNO_API_KEY", "test-key")
+    monkeypatch.setattr(module, "async_http_client",
+                        lambda timeout=30: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return in_flight
+
+
+def test_check_submitted_queries_suno_concurrently(app, client, monkeypatch, create_user):
+    from app import db
+    from app.models import Song
+    from app.routes import songs
+
+    user_id, headers = create_user()
+    done_id = _make_submitted_song(app, user_id, "task-done")
+    pending_id = _make_submitted_song(app, user_id, "task-pending")
+    broken_id = _make_submitted_song(app, user_id, "task-broken")
+
+    in_flight = _mock_suno(monkeypatch, songs, {
+        "task-done": {"status": "SUCCESS", "response": {"sunoData": [{"audioUrl": "https://cdn.example.com/a.mp3"}]}},
+        "task-pending": {"status": "PENDING"},
+    }, delay=0.05)
+
+    resp = client.post("/api/v1/songs/check-submitted", headers=headers)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["total_checked"] == 3
+    assert body["updated"] == 1
+    assert body["errors"] == 1
+
+    statuses = {r["song_id"]: r["status"] for r in body["results"]}
+    assert statuses == {done_id: "completed", pending_id: "pending", broken_id: "error"}
+    assert in_flight["peak"] == 3
+
+    with app.app_context():
+        assert db.session.get(Song, done_id).download_url == "https://cdn.example.com/a.mp3"
+
+
+def test_reconcile_times_out_songs_suno_cannot_resolve(app, client, monkeypatch, create_user):
+    from app import db
+    from app.models import Song
+    from app.routes import songs
+
+    user_id, _ = create_user()
+    stale_id = _make_submitted_song(app, user_id, "task-lost", age_minutes=45)
+    _mock_suno(monkeypatch, songs, {})
+
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+    resp = client.post("/api/v1/songs/reconcile", headers={"X-Reconcile-Key": "correct-key"})
+    assert resp.status_code == 200
+    assert resp.get_json() == {"candidates": 1, "checked": 1, "updated": 0, "timed_out": 1, "errors": 1}
+
+    with app.app_context():
+        assert db.session.get(Song, stale_id).status == "failed"
+
+
+def test_synthesize_speech_streams_azure_audio(app, client, monkeypatch, create_user):
+    from app.routes import speech
+
+    _, headers = create_user()
+    monkeypatch.setenv("AZURE_SPEECH_KEY", "test-key")
+
+    def handler(request):
+        assert request.headers["X-Microsoft-OutputFormat"] == "audio-16khz-128kbitrate-mono-mp3"
+        return httpx.Response(200, content=b"ID3audio")
+
+    monkeypatch.setattr(speech, "async_http_client",
+                        lambda timeout=30: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    resp = client.post("/api/v1/speech/synthesize", json={"text": "Hello"}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.mimetype == "audio/mpeg"
+    assert resp.data == b"ID3audio"
+
+
+def test_microsoft_callback_redirects_with_a_login_code(app, client, monkeypatch, create_user):
+    from app.models import OAuthLoginCode
+    from app.routes import auth
+
+    user_id, _ = create_user(email="ms@example.com")
+
+    def handler(request):
+        if request.url.host == "login.microsoftonline.com":
+            return httpx.Response(200, json={"access_token": "ms-token"})
+        assert request.headers["Authorization"] == "Bearer ms-token"
+        return httpx.Response(200, json={"id": "ms-123", "mail": "ms@example.com", "displayName": "MS"})
+
+    monkeypatch.setattr(auth, "async_http_client",
+                        lambda timeout=30: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    resp = client.get("/api/v1/auth/microsoft/callback?code=abc")
+    assert resp.status_code == 302
+    assert "login_code=" in resp.headers["Location"]
+
+    with app.app_context():
+        assert OAuthLoginCode.query.filter_by(user_id=user_id).count() == 1
+
+
+def test_asgi_app_serves_routes_and_status_fan_out(app, monkeypatch, create_user):
+    from app.asgi import FlaskAsgi
+    from app.routes import songs
+
+    user_id, _ = create_user()
+    _make_submitted_song(app, user_id, "task-pending", age_minutes=5)
+    _mock_suno(monkeypatch, songs, {"task-pending": {"status": "PENDING"}})
+    asgi_app = FlaskAsgi(app, threads=4)
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+
+    async def run():
+        transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+            return await asyncio.gather(
+                http.get("/health"),
+                http.post("/api/v1/songs/reconcile", headers={"X-Reconcile-Key": "correct-key"}),
+                http.post("/api/v1/songs/reconcile", headers={"X-Reconcile-Key": "wrong-key"}),
+            )
+
+    health, reconcile, forbidden = asyncio.run(run())
+    assert health.status_code == 200
+    assert health.json()["status"] == "healthy"
+    assert reconcile.status_code == 200
+    assert reconcile.json() == {"candidates": 1, "checked": 1, "updated": 0, "timed_out": 0, "errors": 0}
+    assert forbidden.status_code == 403
+
+
+def test_asgi_native_views_do_not_wait_for_a_wsgi_thread(app, monkeypatch, create_user):
+    from app.asgi import FlaskAsgi
+    from app.routes import songs
+
+    user_id, headers = create_user()
+    for n in range(3):
+        _make_submitted_song(app, user_id, f"task-{n}")
+    in_flight = _mock_suno(monkeypatch, songs, {f"task-{n}": {"status": "PENDING"} for n in range(3)}, delay=0.1)
+    asgi_app = FlaskAsgi(app, threads=1)
+
+    async def run():
+        transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+            # Take the only WSGI slot; a request that needed one would hang
+            async with asgi_app.wsgi_slots:
+                unauthorized = await asyncio.wait_for(http.post("/api/v1/songs/check-submitted"), 5)
+                checked = await asyncio.wait_for(http.post("/api/v1/songs/check-submitted", headers=headers), 5)
+            return unauthorized, checked
+
+    unauthorized, checked = asyncio.run(run())
+    assert unauthorized.status_code == 401
+    assert checked.status_code == 200
+    assert checked.json()["total_checked"] == 3
+    assert {r["status"] for r in checked.json()["results"]} == {"pending"}
+    assert in_flight["peak"] == 3
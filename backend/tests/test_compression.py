@@ -0,0 +1,96 @@
+# Response Compression and JSON Provider Tests for AIAMusic
+# =========================================================
+import gzip
+import zlib
+from datetime import datetime
+
+import pytest
+from flask import Response, jsonify, request
+
+
+def _add_routes(app):
+    """Unauthenticated routes returning known bodies (call before any request)."""
+
+    @app.route("/_test/big")
+    def big():
+        return jsonify({"lyrics": ["Hallelujah, praise the Lord"] * 200})
+
+    @app.route("/_test/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/_test/binary")
+    def binary():
+        return Response(b"\x00" * 4096, mimetype="application/octet-stream")
+
+    @app.route("/_test/stream")
+    def stream():
+        def rows():
+            yield "["
+            for i in range(50):
+                yield ("," if i else "") + f'{{"id": {i}, "title": "Song {i}"}}'
+            yield "]"
+        return Response(rows(), mimetype="application/json")
+
+    @app.route("/_test/echo", methods=["POST"])
+    def echo():
+        return jsonify({"received": request.get_json(), "at": datetime(2024, 5, 1, 12, 30)})
+
+
+def test_large_json_is_gzipped(app, client):
+    _add_routes(app)
+
+    resp = client.get("/_test/big", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert int(resp.headers["Content-Length"]) == len(resp.data)
+    assert len(gzip.decompress(resp.data)) > 5 * len(resp.data)
+
+
+def test_brotli_preferred_when_accepted(app, client):
+    brotli = pytest.importorskip("brotli")
+    _add_routes(app)
+
+    resp = client.get("/_test/big", headers={"Accept-Encoding": "gzip, deflate, br"})
+    assert resp.headers["Content-Encoding"] == "br"
+    assert b"Hallelujah" in brotli.decompress(resp.data)
+
+
+def test_small_binary_or_unaccepted_bodies_pass_through(app, client):
+    _add_routes(app)
+
+    assert "Content-Encoding" not in client.get("/_test/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/_test/binary", headers={"Accept-Encoding": "gzip"}).headers
+    plain = client.get("/_test/big")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_json()["lyrics"][0] == "Hallelujah, praise the Lord"
+
+
+def test_streamed_response_is_compressed_incrementally(app, client):
+    _add_routes(app)
+
+    resp = client.get("/_test/stream", headers={"Accept-Encoding": "gzip"}, buffered=False)
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in resp.headers
+
+    decompressor = zlib.decompressobj(31)
+    pieces = [decompressor.decompress(chunk) for chunk in resp.response]
+    resp.close()
+    # Each flushed chunk decodes on arrival, not only at the end
+    assert pieces[0] == b"["
+    assert b"".join(pieces).endswith(b'"title": "Song 49"}]')
+
+
+def test_orjson_provider_round_trip(app, client):
+    from app.services.json_provider import OrjsonProvider
+
+    assert isinstance(app.json, OrjsonProvider)
+    _add_routes(app)
+
+    resp = client.post("/_test/echo", json={"title": "שיר חדש"})
+    assert resp.status_code == 200
+    assert "שיר חדש".encode() in resp.data
+    assert resp.get_json() == {"received": {"title": "שיר חדש"}, "at": "2024-05-01T12:30:00"}
+
+    bad = client.post("/_test/echo", data="{not json", content_type="application/json")
+    assert bad.status_code == 400
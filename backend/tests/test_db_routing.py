@@ -0,0 +1,181 @@
+# Read-Replica Routing Tests for AIAMusic
+# =======================================
+# The "replica" is a second SQLite file holding different rows from the
+# primary, so every response shows which database it was read from.
+import pytest
+
+
+@pytest.fixture
+def replica_app(monkeypatch, tmp_path):
+    from app import create_app, db
+    from config import TestingConfig
+
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_BINDS", {"replica": f"sqlite:///{tmp_path / 'replica.db'}"})
+    monkeypatch.setattr(TestingConfig, "CACHE_BACKEND", "none", raising=False)
+    monkeypatch.setattr(TestingConfig, "REPLICA_LAG_CHECK_SECONDS", 0, raising=False)
+    flask_app = create_app("testing")
+
+    with flask_app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines["replica"])
+    # No app context held open: each request gets its own session, as in production,
+    # rather than one identity map that hides which database a row came from
+    yield flask_app
+    with flask_app.app_context():
+        db.metadata.drop_all(db.engines["replica"])
+        db.drop_all()
+    # init_app registers a metadata per bind on the shared db; later apps have no replica
+    db.metadatas.pop("replica", None)
+
+
+@pytest.fixture
+def replica_client(replica_app):
+    return replica_app.test_client()
+
+
+def _song(app, user_id, title, on="primary"):
+    """Add a song to one database only."""
+    from app import db
+    from app.models import Song, User
+
+    with app.app_context():
+        if on == "primary":
+            db.session.add(Song(user_id=user_id, specific_title=title, status="completed"))
+            db.session.commit()
+            return
+        with db.engines["replica"].begin() as conn:
+            if not conn.execute(User.__table__.select().where(User.id == user_id)).first():
+                conn.execute(User.__table__.insert().values(id=user_id, username=f"user{user_id}",
+                                                             email=f"user{user_id}@example.com", is_active=True))
+            conn.execute(Song.__table__.insert().values(user_id=user_id, specific_title=title, status="completed",
+                                                        source_type="suno", version="v1"))
+
+
+def _titles(client, headers):
+    # Closing the streamed listing pops its request context now, not at some later GC
+    with client.get("/api/v1/songs/", headers=headers) as resp:
+        assert resp.status_code == 200
+        return [s["specific_title"] for s in resp.get_json()["songs"]]
+
+
+def test_get_requests_read_from_the_replica(replica_app, replica_client, create_user):
+    user_id, headers = create_user(app=replica_app, client=replica_client)
+    _song(replica_app, user_id, "Only on primary")
+    _song(replica_app, user_id, "Only on replica", on="replica")
+
+    assert _titles(replica_client, headers) == ["Only on replica"]
+
+
+def test_write_keeps_the_client_on_the_primary(replica_app, replica_client, create_user):
+    from app.services.db_routing import STICKY_COOKIE
+
+    user_id, headers = create_user(app=replica_app, client=replica_client)
+    _song(replica_app, user_id, "Only on primary")
+    _song(replica_app, user_id, "Only on replica", on="replica")
+
+    resp = replica_client.post("/api/v1/styles/", json={"name": "Hymn"}, headers=headers)
+    assert resp.status_code == 201
+    assert STICKY_COOKIE in resp.headers["Set-Cookie"]
+
+    # Reads its own write...
+    assert _titles(replica_client, headers) == ["Only on primary"]
+    resp = replica_client.get("/api/v1/styles/", headers=headers)
+    assert [s["name"] for s in resp.get_json()["styles"]] == ["Hymn"]
+
+    # ...until the cookie expires
+    replica_client.delete_cookie(STICKY_COOKIE)
+    assert _titles(replica_client, headers) == ["Only on replica"]
+
+
+def test_reads_do_not_set_the_sticky_cookie(replica_app, replica_client, create_user):
+    _, headers = create_user(app=replica_app, client=replica_client)
+
+    with replica_client.get("/api/v1/songs/", headers=headers) as resp:
+        assert "Set-Cookie" not in resp.headers
+
+
+@pytest.mark.parametrize("lag", [60.0, ConnectionError("replica down")])
+def test_lagging_or_unreachable_replica_falls_back_to_the_primary(replica_app, replica_client, monkeypatch, lag, create_user):
+    from app.services import db_routing
+
+    def measure_lag(engine):
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+    user_id, headers = create_user(app=replica_app, client=replica_client)
+    _song(replica_app, user_id, "Only on primary")
+    _song(replica_app, user_id, "Only on replica", on="replica")
+
+    monkeypatch.setattr(db_routing, "measure_lag", measure_lag)
+    assert _titles(replica_client, headers) == ["Only on primary"]
+
+    monkeypatch.setattr(db_routing, "measure_lag", lambda engine: 0.0)
+    assert _titles(replica_client, headers) == ["Only on replica"]
+
+
+def test_locking_reads_and_writes_use_the_primary(replica_app):
+    from flask import g
+    from sqlalchemy import select
+
+    from app import db
+    from app.models import Song, Style
+
+    with replica_app.test_request_context("/"):
+        g._db_read_replica = True
+        replica, primary = db.engines["replica"], db.engines[None]
+
+        assert db.session.get_bind(clause=select(Song)) is replica
+        assert db.session.get_bind(clause=select(Song).with_for_update()) is primary
+
+        db.session.add(Style(name="Chant"))
+        db.session.flush()
+        # The rest of the request reads around its own change otherwise
+        assert db.session.get_bind(clause=select(Song)) is primary
+        assert g._db_wrote
+        db.session.rollback()
+        db.session.remove()
+
+
+def test_primary_db_views_read_from_the_primary(replica_app):
+    from app.services.db_routing import primary_db
+
+    @replica_app.route("/primary-only")
+    @primary_db
+    def primary_only():
+        from flask import g
+        return {"replica": g.get("_db_read_replica", False)}
+
+    @replica_app.route("/any")
+    def any_database():
+        from flask import g
+        return {"replica": g.get("_db_read_replica", False)}
+
+    client = replica_app.test_client()
+    assert client.get("/primary-only").get_json() == {"replica": False}
+    assert client.get("/any").get_json() == {"replica": True}
+
+
+def test_read_replica_block_routes_script_reads(replica_app, replica_client, create_user):
+    from app.models import Song
+    from app.services.db_routing import read_replica
+
+    user_id, _ = create_user(app=replica_app, client=replica_client)
+    _song(replica_app, user_id, "Only on primary")
+    _song(replica_app, user_id, "Only on replica", on="replica")
+
+    with replica_app.app_context():
+        with read_replica():
+            assert [s.specific_title for s in Song.query.all()] == ["Only on replica"]
+        assert [s.specific_title for s in Song.query.all()] == ["Only on primary"]
+
+
+def test_without_a_replica_nothing_changes(app, client, create_user):
+    from app.services.db_routing import STICKY_COOKIE
+
+    _, headers = create_user()
+    assert "db_routing" not in app.extensions
+
+    resp = client.post("/api/v1/styles/", json={"name": "Hymn"}, headers=headers)
+    assert resp.status_code == 201
+    assert STICKY_COOKIE not in resp.headers.get("Set-Cookie", "")
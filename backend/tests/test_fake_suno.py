@@ -0,0 +1,99 @@
+# Fake Suno Pipeline Tests for AIAMusic
+# =====================================
+# The app's Suno client against loadtest/fake_suno.py: submit, status
+# polling through SUNO_STATUS_URL, injected errors and archiving the
+# streamed MP3.
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "loadtest"))
+
+from fake_suno import MP3_FRAME, FakeSuno, FakeSunoConfig  # noqa: E402
+
+
+@pytest.fixture
+def fake_suno(monkeypatch):
+    def start(**options):
+        options = {"latency": 0, "jitter": 0, "text_after": 0.05, "first_after": 0.1,
+                   "complete_after": 0.15, "mp3_kb": 64, **options}
+        fake = FakeSuno(FakeSunoConfig(**options))
+        base_url = fake.start()
+        started.append(fake)
+        monkeypatch.setenv("SUNO_API_KEY", "test-key")
+        monkeypatch.setenv("SUNO_API_URL", f"{base_url}/api/v1/generate")
+        monkeypatch.setenv("SUNO_STATUS_URL", f"{base_url}/api/v1/generate/record-info")
+        return fake
+
+    started = []
+    yield start
+    for fake in started:
+        fake.stop()
+
+
+def _create_song(client, headers):
+    return client.post("/api/v1/songs/", json={"specific_title": "Psalm", "specific_lyrics": "Lift up your eyes"},
+                       headers=headers)
+
+
+def test_song_completes_and_archives_through_the_fake(client, fake_suno, create_user):
+    fake = fake_suno()
+    _, headers = create_user()
+
+    resp = _create_song(client, headers)
+    assert resp.status_code == 201
+    song = resp.get_json()["song"]
+    assert song["status"] == "submitted"
+    assert song["suno_task_id"] in fake.tasks
+
+    assert client.post(f"/api/v1/songs/{song['id']}/check-status", headers=headers).get_json()["status"] == "pending"
+    assert fake.stats["status_polls"] == 1
+
+    time.sleep(0.2)
+    result = client.post(f"/api/v1/songs/{song['id']}/check-status", headers=headers).get_json()
+    assert result["status"] == "completed"
+    assert [s["download_url"] for s in result["songs"]] == [
+        f"{fake.base_url}/audio/{song['suno_task_id']}-{n}.mp3" for n in (1, 2)]
+
+    resp = client.post(f"/api/v1/songs/{song['id']}/archive", headers=headers)
+    assert resp.status_code == 200, resp.get_json()
+    archived = client.get(f"/api/v1/songs/{song['id']}", headers=headers).get_json()
+    archived = archived.get("song", archived)
+    assert archived["is_archived"]
+    assert archived["file_size_bytes"] == 64 * 1024 // len(MP3_FRAME) * len(MP3_FRAME)
+    assert fake.stats["downloads"] == 1
+
+
+def test_rate_limited_submit_is_reported(client, fake_suno, create_user):
+    fake_suno(rate_limit_rate=1.0)
+    _, headers = create_user()
+
+    resp = _create_song(client, headers)
+
+    assert resp.status_code == 500
+    assert "rate limit" in resp.get_json()["error"]
+
+
+def test_sensitive_word_error_fails_the_song(client, fake_suno, create_user):
+    fake_suno(sensitive_rate=1.0)
+    _, headers = create_user()
+    song_id = _create_song(client, headers).get_json()["song"]["id"]
+
+    time.sleep(0.1)
+    result = client.post(f"/api/v1/songs/{song_id}/check-status", headers=headers).get_json()
+
+    assert result["status"] == "failed"
+    assert "sensitive" in result["error"]
+
+
+def test_callbacks_only_go_to_loopback_hosts():
+    fake = FakeSuno(FakeSunoConfig(latency=0, jitter=0))
+    try:
+        fake.start()
+        fake.accept({"callBackUrl": "https://music.example.com/api/v1/webhooks/suno-callback"})
+        fake.accept({"callBackUrl": "http://127.0.0.1:9/api/v1/webhooks/suno-callback"})
+        assert len(fake._timers) == 3
+    finally:
+        fake.stop()
@@ -0,0 +1,29 @@
+# Worker Concurrency Tests for AIAMusic
+# =====================================
+
+
+def test_http_session_is_shared_and_rebuilt_after_fork(monkeypatch):
+    from app.services import http
+
+    monkeypatch.setattr(http, "_session", None)
+    session = http.get_http_session()
+    assert http.get_http_session() is session
+    assert session.get_adapter("https://api.sunoapi.org")._pool_maxsize == http.HTTP_POOL_MAXSIZE
+
+    # A forked worker must not reuse the parent's connection pool
+    monkeypatch.setattr(http.os, "getpid", lambda: -1)
+    assert http.get_http_session() is not session
+
+
+def test_db_pool_is_sized_to_worker_class(monkeypatch):
+    from config import _default_db_pool_size
+
+    monkeypatch.setenv("GUNICORN_WORKER_CLASS", "gthread")
+    monkeypatch.setenv("GUNICORN_THREADS", "16")
+    assert _default_db_pool_size() == 16
+
+    monkeypatch.setenv("GUNICORN_WORKER_CLASS", "gevent")
+    assert _default_db_pool_size() == 10
+
+    monkeypatch.setenv("GUNICORN_WORKER_CLASS", "sync")
+    assert _default_db_pool_size() == 2
@@ -0,0 +1,137 @@
+# Request Instrumentation Tests for AIAMusic
+# ==========================================
+import logging
+import time
+
+import pytest
+from flask import Response, jsonify
+
+
+def _add_routes(app):
+    """Unauthenticated routes with known SQL and HTTP work (call before any request)."""
+    from app import db
+    from app.services.http import get_http_session
+
+    @app.route("/_test/queries")
+    def queries():
+        for _ in range(3):
+            db.session.execute(db.text("SELECT 1"))
+        return jsonify({"ok": True})
+
+    @app.route("/_test/failing")
+    def failing():
+        from sqlalchemy.exc import OperationalError
+        try:
+            db.session.execute(db.text("SELECT * FROM no_such_table"))
+        except OperationalError:
+            db.session.rollback()
+        db.session.execute(db.text("SELECT 1"))
+        return jsonify({"ok": True})
+
+    @app.route("/_test/outbound")
+    def outbound():
+        get_http_session().get("https://suno.example.com/status", timeout=5)
+        return jsonify({"ok": True})
+
+    @app.route("/_test/stream")
+    def stream():
+        def rows():
+            for i in range(10):
+                yield f"{i:04d}\n"
+        return Response(rows(), mimetype="text/plain")
+
+
+def _metrics(caplog, path):
+    records = [r for r in caplog.records if getattr(r, "request_metrics", {}).get("path") == path]
+    assert records
+    return records[0].request_metrics
+
+
+def test_server_timing_and_log_fields(app, client, caplog):
+    _add_routes(app)
+    caplog.set_level(logging.INFO, logger=app.logger.name)
+
+    resp = client.get("/_test/queries")
+    timing = resp.headers["Server-Timing"]
+    assert 'sql;dur=' in timing and 'desc="3 queries"' in timing and "app;dur=" in timing
+    resp.close()
+
+    fields = _metrics(caplog, "/_test/queries")
+    assert fields["sql_count"] == 3
+    assert fields["status"] == 200
+    assert fields["response_bytes"] == len(resp.get_data())
+
+
+def test_failed_statements_leave_no_start_time_behind(app, client, caplog):
+    from app import db
+
+    _add_routes(app)
+    caplog.set_level(logging.INFO, logger=app.logger.name)
+
+    client.get("/_test/failing").close()
+
+    assert _metrics(caplog, "/_test/failing")["sql_count"] == 2
+    with db.engine.connect() as conn:
+        assert not conn.info.get("_query_start")
+
+
+def test_streamed_body_is_measured_when_closed(app, client, caplog):
+    _add_routes(app)
+    caplog.set_level(logging.INFO, logger=app.logger.name)
+
+    resp = client.get("/_test/stream")
+    assert len(resp.get_data()) == 50
+    resp.close()
+    assert _metrics(caplog, "/_test/stream")["response_bytes"] == 50
+
+
+def test_outbound_http_is_timed(app, client, caplog, monkeypatch):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    def fake_send(self, request, **kwargs):
+        time.sleep(0.01)
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, "send", fake_send)
+    _add_routes(app)
+    caplog.set_level(logging.INFO, logger=app.logger.name)
+
+    resp = client.get("/_test/outbound")
+    assert 'desc="1 calls"' in resp.headers["Server-Timing"]
+    resp.close()
+    fields = _metrics(caplog, "/_test/outbound")
+    assert fields["http_count"] == 1 and fields["http_ms"] >= 10
+
+
+@pytest.fixture
+def slow_app(monkeypatch):
+    from config import TestingConfig
+    from app import create_app, db
+
+    monkeypatch.setattr(TestingConfig, "SLOW_REQUEST_MS", 1)
+    flask_app = create_app("testing")
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_slow_requests_dump_their_sql(slow_app, caplog):
+    from app import db
+
+    @slow_app.route("/_test/slow")
+    def slow():
+        db.session.execute(db.text("SELECT 42"))
+        time.sleep(0.01)
+        return jsonify({"ok": True})
+
+    caplog.set_level(logging.INFO, logger=slow_app.logger.name)
+    slow_app.test_client().get("/_test/slow").close()
+
+    warnings = [r for r in caplog.records if r.levelno == logging.WARNING and "Slow request" in r.getMessage()]
+    assert len(warnings) == 1
+    assert "SELECT 42" in warnings[0].getMessage()
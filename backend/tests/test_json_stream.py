@@ -0,0 +1,83 @@
+# Streaming JSON Tests for AIAMusic
+# =================================
+import json
+
+
+def _make_songs(app, user_id, count, playlist_name=None):
+    from app import db
+    from app.models import Playlist, Song
+
+    with app.app_context():
+        playlist = Playlist(name=playlist_name, created_by=user_id) if playlist_name else None
+        for i in range(count):
+            song = Song(user_id=user_id, specific_title=f"Song {i:03d}", status="completed",
+                        download_url=f"https://cdn.example.com/{i}.mp3")
+            if playlist:
+                song.playlists.append(playlist)
+            db.session.add(song)
+        db.session.commit()
+        return playlist.id if playlist else None
+
+
+def test_get_songs_streams_all_rows(app, client, create_user):
+    user_id, headers = create_user()
+    _make_songs(app, user_id, 450, playlist_name="Morning")
+
+    resp = client.get("/api/v1/songs", headers=headers, buffered=False)
+    assert resp.is_streamed
+    assert "Content-Length" not in resp.headers
+    body = json.loads(b"".join(resp.response))
+    resp.close()
+
+    assert body["total"] == 450
+    assert len(body["songs"]) == 450
+    assert body["songs"][0]["playlists"][0]["name"] == "Morning"
+
+
+def test_playlist_detail_streams_songs_inside_playlist(app, client, create_user):
+    user_id, headers = create_user()
+    playlist_id = _make_songs(app, user_id, 3, playlist_name="Evening")
+
+    body = client.get(f"/api/v1/playlists/{playlist_id}", headers=headers).get_json()
+    assert body["playlist"]["name"] == "Evening"
+    assert body["playlist"]["song_count"] == 3
+    assert sorted(s["specific_title"] for s in body["playlist"]["songs"]) == ["Song 000", "Song 001", "Song 002"]
+    assert body["playlist"]["songs"][0]["creator"] == "alice"
+
+
+def test_roku_feeds_stream_with_total(app, client, monkeypatch, create_user):
+    user_id, _ = create_user()
+    playlist_id = _make_songs(app, user_id, 5, playlist_name="Roku")
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+
+    songs = client.get("/api/v1/roku/correct-key/songs").get_json()
+    assert songs["total"] == 5
+    assert [s["title"] for s in songs["songs"]] == [f"Song {i:03d}" for i in range(5)]
+    assert songs["songs"][0]["artist"] == "alice"
+
+    nested = client.get(f"/api/v1/roku/correct-key/playlists/{playlist_id}/songs").get_json()
+    assert nested["total"] == 5
+    assert len(nested["playlist"]["songs"]) == 5
+
+
+def test_streamed_array_is_consumed_lazily(app):
+    from app.services.json_stream import StreamedArray, stream_json
+
+    pulled = {"n": 0}
+
+    def rows():
+        for i in range(20000):
+            pulled["n"] += 1
+            yield {"id": i, "title": "x" * 20}
+
+    with app.test_request_context():
+        items = StreamedArray(rows())
+        resp = stream_json({"songs": items, "total": items.length})
+        chunks = iter(resp.response)
+        first = next(chunks)
+        # One ~64 KB chunk is encoded, not the whole listing
+        assert 0 < pulled["n"] < 20000
+        body = json.loads(first + b"".join(chunks))
+
+    assert body["total"] == 20000
+    assert body["songs"][-1]["id"] == 19999
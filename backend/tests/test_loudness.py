@@ -0,0 +1,85 @@
+# Loudness Analysis Tests for AIAMusic
+# =====================================
+
+import numpy as np
+
+SAMPLE_RATE = 32000
+
+
+def _sine(amplitude, seconds=5, freq=997):
+    t = np.arange(SAMPLE_RATE * seconds) / SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * freq * t)
+
+
+def test_full_scale_sine_matches_bs1770_reference():
+    """BS.1770's calibration signal: a 997 Hz 0 dBFS sine in one channel
+    reads -3.01 LUFS."""
+    from app.services.loudness import integrated_loudness
+
+    assert abs(integrated_loudness(_sine(1.0), SAMPLE_RATE) - (-3.01)) < 0.1
+
+
+def test_loudness_tracks_level_and_channel_count():
+    from app.services.loudness import integrated_loudness
+
+    mono = integrated_loudness(_sine(0.1), SAMPLE_RATE)
+    stereo = integrated_loudness(np.stack([_sine(0.1), _sine(0.1)], axis=1), SAMPLE_RATE)
+
+    assert abs(mono - (-23.01)) < 0.1
+    # Two equal channels sum their energy: +3 dB
+    assert abs(stereo - mono - 3.01) < 0.05
+
+
+def test_gating_ignores_silence_and_short_input():
+    from app.services.loudness import integrated_loudness
+
+    padded = np.concatenate([np.zeros(SAMPLE_RATE * 20), _sine(0.1)])
+    assert abs(integrated_loudness(padded, SAMPLE_RATE) - integrated_loudness(_sine(0.1), SAMPLE_RATE)) < 0.5
+
+    assert integrated_loudness(np.zeros(SAMPLE_RATE * 2), SAMPLE_RATE) is None
+    assert integrated_loudness(np.ones(100), SAMPLE_RATE) is None
+
+
+def test_analyze_job_stores_replay_gain(app, client, monkeypatch):
+    from app import db
+    from app.models import User, Song
+    from app.services import loudness
+    from app.services.audio_storage import get_storage_service
+
+    with app.app_context():
+        user = User(username="alice", email="alice@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        song = Song(user_id=user.id, specific_title="Psalm 23", status="completed", is_archived=True)
+        db.session.add(song)
+        db.session.commit()
+        song.archived_url = f"/audio/songs/{song.id}/track_1.mp3"
+        db.session.commit()
+        song_id = song.id
+
+    storage = get_storage_service()
+    storage.get_song_dir(song_id).mkdir(parents=True, exist_ok=True)
+    (storage.get_song_dir(song_id) / "track_1.mp3").write_bytes(b"fake mp3")
+
+    # No ffmpeg in the test environment; feed the analysis a known signal.
+    tone = _sine(0.1)
+    monkeypatch.setattr(loudness, "ffmpeg_available", lambda: True)
+    monkeypatch.setattr(loudness, "decode_to_pcm",
+                        lambda path, sample_rate, channels: np.stack([tone, tone], axis=1))
+
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+    resp = client.post("/api/v1/songs/loudness/analyze", headers={"X-Reconcile-Key": "correct-key"})
+    assert resp.status_code == 200
+    assert resp.get_json() == {"analyzed": 1, "failed": 0}
+
+    with app.app_context():
+        data = db.session.get(Song, song_id).to_dict()
+        assert abs(data["loudness_lufs"] - (-20.0)) < 0.1
+        assert abs(data["replay_gain_db"] - 2.0) < 0.1
+        assert abs(data["replay_gain_peak"] - 0.1) < 0.001
+
+    # Already analyzed songs are skipped on the next tick
+    resp = client.post("/api/v1/songs/loudness/analyze", headers={"X-Reconcile-Key": "correct-key"})
+    assert resp.get_json() == {"analyzed": 0, "failed": 0}
+
+    storage.delete_song_files(song_id)
@@ -0,0 +1,114 @@
+# Prometheus Metrics Tests for AIAMusic
+# =====================================
+import os
+import subprocess
+import sys
+
+import pytest
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _sample(name, labels=None):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+def test_request_latency_is_recorded_per_endpoint(app, client):
+    labels = {"endpoint": "health_check", "method": "GET", "status": "200"}
+    before = _sample("aiamusic_request_duration_seconds_count", labels)
+
+    client.get("/health").close()
+
+    assert _sample("aiamusic_request_duration_seconds_count", labels) == before + 1
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'aiamusic_request_duration_seconds_bucket{endpoint="health_check"' in body
+    assert "aiamusic_db_pool_checked_out" in body
+
+
+def test_metrics_token(app, client, monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-me")
+
+    assert client.get("/metrics").status_code == 401
+    for wrong in ("Bearer wrong", "Bearer cl\u00e9"):
+        assert client.get("/metrics", headers={"Authorization": wrong}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-me"}).status_code == 200
+
+
+def test_production_requires_a_metrics_token(app, client, monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "")
+    monkeypatch.setitem(app.config, "METRICS_REQUIRE_TOKEN", True)
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-me")
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-me"}).status_code == 200
+
+
+def test_suno_call_outcomes():
+    import requests
+    from app.services.metrics import suno_call
+
+    def count(outcome):
+        return _sample("aiamusic_suno_requests_total", {"operation": "submit", "outcome": outcome})
+
+    before = {outcome: count(outcome) for outcome in ("2xx", "5xx", "timeout")}
+    with suno_call("submit") as call:
+        call.status_code = 200
+    with suno_call("submit") as call:
+        call.status_code = 503
+    with pytest.raises(requests.exceptions.Timeout):
+        with suno_call("submit"):
+            raise requests.exceptions.Timeout()
+
+    assert {outcome: count(outcome) - before[outcome] for outcome in before} == {"2xx": 1, "5xx": 1, "timeout": 1}
+
+
+def test_webhook_processing_time(app, client):
+    labels = {"webhook": "suno", "status": "4xx"}
+    before = _sample("aiamusic_webhook_duration_seconds_count", labels)
+
+    assert client.post("/api/v1/webhooks/suno-callback", json={}).status_code == 400
+
+    assert _sample("aiamusic_webhook_duration_seconds_count", labels) == before + 1
+
+
+def test_archive_throughput(app, tmp_path, monkeypatch):
+    from app.services import audio_storage
+
+    class FakeResponse:
+        headers = {}
+
+        def raise_for_status(self):
+            pass
+
+        def iter_content(self, chunk_size):
+            yield b"\xff" * 3000
+
+    class FakeSession:
+        def get(self, url, **kwargs):
+            return FakeResponse()
+
+    monkeypatch.setattr(audio_storage, "get_http_session", lambda: FakeSession())
+    storage = audio_storage.AudioStorageService()
+    storage.base_path = tmp_path
+    monkeypatch.setattr(storage, "is_configured", lambda: True)
+    before = _sample("aiamusic_archive_bytes_total")
+
+    storage.archive_song(1, "https://cdn.example.com/1.mp3", 1)
+
+    assert _sample("aiamusic_archive_bytes_total") == before + 3000
+    assert _sample("aiamusic_archive_files_total", {"outcome": "ok"}) >= 1
+
+
+def test_samples_from_every_worker_process_are_summed(tmp_path):
+    from prometheus_client import CollectorRegistry, multiprocess
+
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    worker = "from app.services.metrics import record_archive; record_archive(1000, 0.5)"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], cwd=BACKEND_DIR, env=env, check=True)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+    assert registry.get_sample_value("aiamusic_archive_bytes_total") == 2000
@@ -0,0 +1,140 @@
+# Bulk Playlist Membership Tests for AIAMusic
+# ===========================================
+from sqlalchemy import event
+
+
+def _make(app, user_id, playlists, songs):
+    """Create playlists and songs owned by user_id; returns (playlist_ids, song_ids)."""
+    from app import db
+    from app.models import Playlist, Song
+
+    with app.app_context():
+        pls = [Playlist(name=f"Playlist {i}", created_by=user_id) for i in range(playlists)]
+        sgs = [Song(user_id=user_id, specific_title=f"Song {i}", status="completed") for i in range(songs)]
+        db.session.add_all(pls + sgs)
+        db.session.commit()
+        return [p.id for p in pls], [s.id for s in sgs]
+
+
+def _order(app, playlist_id):
+    from app.services.playlist_order import ordered_song_ids
+
+    with app.app_context():
+        return ordered_song_ids(playlist_id)
+
+
+class _StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def _statements(app, fn):
+    from app import db
+
+    with app.app_context():
+        engine = db.engine
+    with _StatementCounter(engine) as counter:
+        fn()
+    return counter.count
+
+
+def test_bulk_add_appends_in_request_order_and_skips_existing(app, client, create_user):
+    user_id, headers = create_user()
+    (p1, p2), (s1, s2, s3) = _make(app, user_id, 2, 3)
+    client.post(f"/api/v1/playlists/{p1}/songs", json={"song_id": s2}, headers=headers)
+
+    resp = client.post("/api/v1/playlists/bulk/add", json={"playlist_ids": [p1, p2], "song_ids": [s3, s2, s1]},
+                       headers=headers)
+    assert resp.status_code == 200
+    assert resp.get_json()["added"] == 5
+
+    assert _order(app, p1) == [s2, s3, s1]
+    assert _order(app, p2) == [s3, s2, s1]
+
+
+def test_bulk_statement_count_does_not_grow_with_input(app, client, create_user):
+    user_id, headers = create_user()
+    small = _make(app, user_id, 1, 2)
+    large = _make(app, user_id, 10, 60)
+
+    def bulk(playlist_ids, song_ids):
+        return lambda: client.post("/api/v1/playlists/bulk/add",
+                                   json={"playlist_ids": playlist_ids, "song_ids": song_ids}, headers=headers)
+
+    assert _statements(app, bulk(*large)) == _statements(app, bulk(*small))
+    assert len(_order(app, large[0][9])) == 60
+
+
+def test_bulk_remove(app, client, create_user):
+    user_id, headers = create_user()
+    (p1, p2), (s1, s2, s3) = _make(app, user_id, 2, 3)
+    client.post("/api/v1/playlists/bulk/add", json={"playlist_ids": [p1, p2], "song_ids": [s1, s2, s3]},
+                headers=headers)
+
+    resp = client.post("/api/v1/playlists/bulk/remove", json={"playlist_ids": [p1, p2], "song_ids": [s1, s3]},
+                       headers=headers)
+    assert resp.get_json()["removed"] == 4
+    assert _order(app, p1) == [s2]
+    assert _order(app, p2) == [s2]
+
+
+def test_bulk_assign_replaces_only_the_users_playlists(app, client, create_user):
+    user_id, headers = create_user()
+    bob_id, _ = create_user(username="bob", email="bob@example.com")
+    (p1, p2, p3), (s1, s2) = _make(app, user_id, 3, 2)
+    (bob_playlist,), _ = _make(app, bob_id, 1, 0)
+
+    client.post("/api/v1/playlists/bulk/add", json={"playlist_ids": [p1, p2], "song_ids": [s1, s2]}, headers=headers)
+    with app.app_context():
+        from app import db
+        from app.services import playlist_membership
+        playlist_membership.add_songs([bob_playlist], [s1])
+        db.session.commit()
+
+    resp = client.put("/api/v1/playlists/bulk/assign", json={"playlist_ids": [p2, p3], "song_ids": [s1]},
+                      headers=headers)
+    assert resp.get_json()["added"] == 1 and resp.get_json()["removed"] == 1
+    assert _order(app, p1) == [s2]
+    assert _order(app, p2) == [s1, s2]  # kept its position
+    assert _order(app, p3) == [s1]
+    assert _order(app, bob_playlist) == [s1]
+
+
+def test_bulk_request_validation(app, client, create_user):
+    user_id, headers = create_user()
+    bob_id, _ = create_user(username="bob", email="bob@example.com")
+    (p1,), (s1,) = _make(app, user_id, 1, 1)
+    (bob_playlist,), _ = _make(app, bob_id, 1, 0)
+    url = "/api/v1/playlists/bulk/add"
+
+    assert client.post(url, json={"playlist_ids": p1, "song_ids": [s1]}, headers=headers).status_code == 400
+    assert client.post(url, json={"playlist_ids": [p1], "song_ids": ["x"]}, headers=headers).status_code == 400
+    assert client.post(url, json={"playlist_ids": [bob_playlist], "song_ids": [s1]}, headers=headers).status_code == 403
+    assert client.post(url, json={"playlist_ids": [p1], "song_ids": [s1, 9999]}, headers=headers).status_code == 404
+    assert _order(app, p1) == []
+
+
+def test_single_song_assign_uses_the_same_path(app, client, create_user):
+    user_id, headers = create_user()
+    (p1, p2), (s1, s2) = _make(app, user_id, 2, 2)
+    client.post("/api/v1/playlists/bulk/add", json={"playlist_ids": [p1], "song_ids": [s1, s2]}, headers=headers)
+
+    resp = client.post(f"/api/v1/playlists/song/{s1}/assign", json={"playlist_ids": [p1, p2]}, headers=headers)
+    assert resp.status_code == 200
+    assert _order(app, p1) == [s1, s2]
+    assert _order(app, p2) == [s1]
+
+    assert client.post(f"/api/v1/playlists/{p2}/songs", json={"song_id": s1}, headers=headers).status_code == 409
+    assert client.delete(f"/api/v1/playlists/{p2}/songs/{s1}", headers=headers).status_code == 200
+    assert client.delete(f"/api/v1/playlists/{p2}/songs/{s1}", headers=headers).status_code == 404
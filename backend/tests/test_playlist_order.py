@@ -0,0 +1,115 @@
+# Playlist Ordering Tests for AIAMusic
+# ====================================
+
+
+def _playlist_with_songs(app, client, headers, user_id, count):
+    """Create a playlist and add `count` songs to it through the API; returns (playlist_id, song_ids)."""
+    from app import db
+    from app.models import Song
+
+    playlist_id = client.post("/api/v1/playlists", json={"name": "Ordered"}, headers=headers).get_json()["playlist"]["id"]
+    with app.app_context():
+        songs = [Song(user_id=user_id, specific_title=f"Song {i}", status="completed",
+                      download_url=f"https://cdn.example.com/{i}.mp3") for i in range(count)]
+        db.session.add_all(songs)
+        db.session.commit()
+        song_ids = [s.id for s in songs]
+
+    # Added newest-id first, so play order differs from id order
+    for song_id in reversed(song_ids):
+        resp = client.post(f"/api/v1/playlists/{playlist_id}/songs", json={"song_id": song_id}, headers=headers)
+        assert resp.status_code == 200
+    return playlist_id, list(reversed(song_ids))
+
+
+def _order(client, headers, playlist_id):
+    body = client.get(f"/api/v1/playlists/{playlist_id}", headers=headers).get_json()
+    return [s["id"] for s in body["playlist"]["songs"]]
+
+
+def test_songs_play_in_the_order_they_were_added(app, client, create_user):
+    user_id, headers = create_user()
+    playlist_id, order = _playlist_with_songs(app, client, headers, user_id, 4)
+
+    assert _order(client, headers, playlist_id) == order
+
+
+def test_move_by_index_and_after_song(app, client, create_user):
+    user_id, headers = create_user()
+    playlist_id, (a, b, c, d) = _playlist_with_songs(app, client, headers, user_id, 4)
+    url = f"/api/v1/playlists/{playlist_id}/songs"
+
+    assert client.put(f"{url}/{d}/position", json={"index": 0}, headers=headers).status_code == 200
+    assert _order(client, headers, playlist_id) == [d, a, b, c]
+
+    client.put(f"{url}/{d}/position", json={"after_song_id": b}, headers=headers)
+    assert _order(client, headers, playlist_id) == [a, b, d, c]
+
+    client.put(f"{url}/{c}/position", json={"after_song_id": None}, headers=headers)
+    assert _order(client, headers, playlist_id) == [c, a, b, d]
+
+    client.put(f"{url}/{c}/position", json={"index": 99}, headers=headers)
+    assert _order(client, headers, playlist_id) == [a, b, d, c]
+
+    assert client.put(f"{url}/{c}/position", json={"after_song_id": 12345}, headers=headers).status_code == 400
+    assert client.put(f"{url}/{c}/position", json={}, headers=headers).status_code == 400
+
+
+def test_repeated_inserts_into_one_gap_rebalance_in_order(app, client, create_user):
+    from app import db
+    from app.models import Song, playlist_songs
+    from app.services import playlist_order
+
+    user_id, headers = create_user()
+    playlist_id, (first, last) = _playlist_with_songs(app, client, headers, user_id, 2)
+
+    with app.app_context():
+        inserted = []
+        for i in range(15):
+            song = Song(user_id=user_id, specific_title=f"Insert {i}", status="completed")
+            db.session.add(song)
+            db.session.flush()
+            # Always directly after `first`: bisects the same gap until it's used up
+            playlist_order.add_song(playlist_id, song.id, after_song_id=first)
+            inserted.insert(0, song.id)
+        db.session.commit()
+
+        assert playlist_order.ordered_song_ids(playlist_id) == [first] + inserted + [last]
+        positions = db.session.execute(
+            db.select(playlist_songs.c.position).where(playlist_songs.c.playlist_id == playlist_id)
+        ).scalars().all()
+        assert len(set(positions)) == len(positions)
+
+
+def test_reorder_requires_every_song_once(app, client, create_user):
+    user_id, headers = create_user()
+    playlist_id, (a, b, c) = _playlist_with_songs(app, client, headers, user_id, 3)
+    url = f"/api/v1/playlists/{playlist_id}/order"
+
+    assert client.put(url, json={"song_ids": [c, a]}, headers=headers).status_code == 400
+    assert client.put(url, json={"song_ids": [c, a, a]}, headers=headers).status_code == 400
+
+    assert client.put(url, json={"song_ids": [c, a, b]}, headers=headers).status_code == 200
+    assert _order(client, headers, playlist_id) == [c, a, b]
+
+
+def test_only_owner_can_reorder(app, client, create_user):
+    user_id, headers = create_user()
+    playlist_id, order = _playlist_with_songs(app, client, headers, user_id, 2)
+    _, other = create_user(username="bob", email="bob@example.com")
+
+    resp = client.put(f"/api/v1/playlists/{playlist_id}/order", json={"song_ids": order[::-1]}, headers=other)
+    assert resp.status_code == 403
+
+
+def test_roku_playlist_feed_follows_playlist_order(app, client, monkeypatch, create_user):
+    user_id, headers = create_user()
+    playlist_id, (a, b, c) = _playlist_with_songs(app, client, headers, user_id, 3)
+    client.put(f"/api/v1/playlists/{playlist_id}/order", json={"song_ids": [b, c, a]}, headers=headers)
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+
+    nested = client.get(f"/api/v1/roku/correct-key/playlists/{playlist_id}/songs").get_json()
+    assert [s["id"] for s in nested["playlist"]["songs"]] == [b, c, a]
+
+    flat = client.get(f"/api/v1/roku/correct-key/songs?playlist_id={playlist_id}").get_json()
+    assert [s["id"] for s in flat["songs"]] == [b, c, a]
@@ -0,0 +1,110 @@
+# Playlist Detail Pagination Tests for AIAMusic
+# =============================================
+from sqlalchemy import event
+
+
+def _playlist(app, user_id, count):
+    """A playlist of `count` songs, each with a style; returns (playlist_id, song_ids in play order)."""
+    from app import db
+    from app.models import Playlist, Song, Style
+    from app.services import playlist_membership
+
+    with app.app_context():
+        style = Style(name="Lo-fi", style_prompt="lo-fi beats", created_by=user_id)
+        playlist = Playlist(name="Long", created_by=user_id)
+        db.session.add_all([style, playlist])
+        db.session.flush()
+        songs = [Song(user_id=user_id, specific_title=f"Song {i}", specific_lyrics=f"la la {i}",
+                      status="completed", style_id=style.id) for i in range(count)]
+        db.session.add_all(songs)
+        db.session.flush()
+        song_ids = [s.id for s in reversed(songs)]
+        playlist_membership.add_songs([playlist.id], song_ids)
+        db.session.commit()
+        return playlist.id, song_ids
+
+
+def _get(client, headers, playlist_id, query):
+    resp = client.get(f"/api/v1/playlists/{playlist_id}?{query}", headers=headers)
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def test_cursor_windows_walk_the_whole_playlist(app, client, create_user):
+    user_id, headers = create_user()
+    playlist_id, order = _playlist(app, user_id, 7)
+
+    seen, query = [], "limit=3"
+    while True:
+        body = _get(client, headers, playlist_id, query)
+        assert body["pagination"]["total"] == 7
+        assert body["playlist"]["song_count"] == 7
+        seen += [s["id"] for s in body["playlist"]["songs"]]
+        cursor = body["pagination"]["next_cursor"]
+        if cursor is None:
+            break
+        query = f"limit=3&cursor={cursor}"
+
+    assert seen == order
+
+
+def test_offset_window(app, client, create_user):
+    user_id, headers = create_user()
+    playlist_id, order = _playlist(app, user_id, 5)
+
+    body = _get(client, headers, playlist_id, "limit=2&offset=2")
+    assert [s["id"] for s in body["playlist"]["songs"]] == order[2:4]
+    assert body["pagination"]["offset"] == 2
+    assert body["pagination"]["next_cursor"] is not None
+
+    body = _get(client, headers, playlist_id, "limit=2&offset=4")
+    assert [s["id"] for s in body["playlist"]["songs"]] == order[4:]
+    assert body["pagination"]["next_cursor"] is None
+
+
+def test_lyrics_can_be_left_out(app, client, create_user):
+    user_id, headers = create_user()
+    playlist_id, _ = _playlist(app, user_id, 2)
+
+    full = _get(client, headers, playlist_id, "limit=10")["playlist"]["songs"]
+    assert all(s["specific_lyrics"].startswith("la la") for s in full)
+
+    for query in ("limit=10&lyrics=false", "lyrics=false"):
+        songs = _get(client, headers, playlist_id, query)["playlist"]["songs"]
+        assert songs and all("specific_lyrics" not in s for s in songs)
+        assert songs[0]["style"]["name"] == "Lo-fi"
+
+
+def test_window_query_count_does_not_grow_with_page_size(app, client, create_user):
+    from app import db
+
+    user_id, headers = create_user()
+    playlist_id, _ = _playlist(app, user_id, 40)
+    with app.app_context():
+        engine = db.engine
+
+    def statements(query):
+        count = 0
+
+        def _count(*args):
+            nonlocal count
+            count += 1
+
+        event.listen(engine, "before_cursor_execute", _count)
+        try:
+            _get(client, headers, playlist_id, query)
+        finally:
+            event.remove(engine, "before_cursor_execute", _count)
+        return count
+
+    statements("limit=2")  # warm-up
+    assert statements("limit=40") == statements("limit=2")
+
+
+def test_bad_pagination_params(app, client, create_user):
+    user_id, headers = create_user()
+    playlist_id, _ = _playlist(app, user_id, 2)
+    url = f"/api/v1/playlists/{playlist_id}"
+
+    assert client.get(f"{url}?limit=0", headers=headers).status_code == 400
+    assert client.get(f"{url}?limit=2&cursor=abc", headers=headers).status_code == 400
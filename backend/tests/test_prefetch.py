@@ -0,0 +1,100 @@
+# Prefetch Manifest Tests for AIAMusic
+# ====================================
+
+
+def _songs(app, user_id, *fields):
+    """One completed song per dict of column values; returns their ids."""
+    from app import db
+    from app.models import Song
+
+    with app.app_context():
+        songs = [Song(user_id=user_id, specific_title=f"Song {i}", status="completed", **f)
+                 for i, f in enumerate(fields)]
+        db.session.add_all(songs)
+        db.session.commit()
+        return [s.id for s in songs]
+
+
+def _playlist(app, user_id, song_ids, is_public=True):
+    from app import db
+    from app.models import Playlist
+    from app.services import playlist_order
+
+    with app.app_context():
+        playlist = Playlist(name="Mix", created_by=user_id, is_public=is_public)
+        db.session.add(playlist)
+        db.session.flush()
+        for song_id in song_ids:
+            playlist_order.add_song(playlist.id, song_id)
+        db.session.commit()
+        return playlist.id
+
+
+ARCHIVED = {"archived_url": "/audio/songs/1/track_1.mp3", "archive_checksum": "ab" * 32,
+            "file_size_bytes": 4096}
+REMOTE = {"download_url": "https://cdn1.suno.ai/a.mp3"}
+
+
+def test_manifest_entries(app, client, create_user):
+    from app import db
+    from app.models import SongRendition
+
+    user_id, headers = create_user()
+    archived, remote = _songs(app, user_id, ARCHIVED, REMOTE)
+    with app.app_context():
+        db.session.add(SongRendition(song_id=archived, bitrate_kbps=64,
+                                     url="/audio/songs/1/track_1_64k.mp3", file_size_bytes=1024))
+        db.session.commit()
+
+    resp = client.get(f"/api/v1/songs/prefetch?ids={archived},{remote}", headers=headers)
+    assert resp.status_code == 200
+    original, suno = resp.get_json()["tracks"]
+    assert original == {"song_id": archived, "url": ARCHIVED["archived_url"], "size_bytes": 4096,
+                        "etag": f'"{"ab" * 32}"', "sha256": "ab" * 32}
+    assert suno == {"song_id": remote, "url": REMOTE["download_url"], "size_bytes": None,
+                    "etag": None, "sha256": None}
+
+    low = client.get(f"/api/v1/songs/prefetch?ids={archived}&quality=low", headers=headers).get_json()["tracks"]
+    assert low[0]["url"].endswith("_64k.mp3")
+    assert low[0]["size_bytes"] == 1024
+    assert low[0]["etag"].startswith(f'"{archived}-64k-') and low[0]["sha256"] is None
+
+
+def test_queue_keeps_order_and_drops_unplayable(app, client, create_user):
+    user_id, headers = create_user()
+    a, b, silent = _songs(app, user_id, REMOTE, ARCHIVED, {})
+
+    resp = client.get(f"/api/v1/songs/prefetch?ids={b},{silent},999,{a},{b}", headers=headers)
+    assert [t["song_id"] for t in resp.get_json()["tracks"]] == [b, a]
+
+    assert client.get("/api/v1/songs/prefetch?ids=1,x", headers=headers).status_code == 400
+    too_many = ",".join(str(i) for i in range(1, 60))
+    assert client.get(f"/api/v1/songs/prefetch?ids={too_many}", headers=headers).status_code == 400
+
+
+def test_playlist_manifest_follows_play_order(app, client, create_user):
+    user_id, headers = create_user()
+    a, silent, b, c = _songs(app, user_id, REMOTE, {}, ARCHIVED, REMOTE)
+    playlist = _playlist(app, user_id, [c, a, silent, b])
+
+    def tracks(**params):
+        resp = client.get(f"/api/v1/playlists/{playlist}/prefetch", query_string=params, headers=headers)
+        assert resp.status_code == 200
+        return [t["song_id"] for t in resp.get_json()["tracks"]]
+
+    assert tracks() == [c, a, b]
+    assert tracks(after_song_id=a) == [b]
+    assert tracks(after_song_id=c, count=1) == [a]
+    assert tracks(after_song_id=b) == []
+
+
+def test_playlist_manifest_errors(app, client, create_user):
+    alice_id, alice = create_user()
+    _, bob = create_user(username="bob", email="bob@example.com")
+    (song,) = _songs(app, alice_id, REMOTE)
+    private = _playlist(app, alice_id, [song], is_public=False)
+
+    assert client.get(f"/api/v1/playlists/{private}/prefetch", headers=bob).status_code == 403
+    assert client.get("/api/v1/playlists/999/prefetch", headers=alice).status_code == 404
+    assert client.get(f"/api/v1/playlists/{private}/prefetch?after_song_id=999", headers=alice).status_code == 404
+    assert client.get(f"/api/v1/playlists/{private}/prefetch?count=0", headers=alice).status_code == 400
@@ -0,0 +1,91 @@
+# Preload/Fork Warm-up Tests for AIAMusic
+# =======================================
+import pytest
+
+
+@pytest.fixture
+def file_app(monkeypatch, tmp_path):
+    """App on a SQLite file, so the engine has a real connection pool."""
+    from app import create_app, db
+    from config import TestingConfig
+
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_ENGINE_OPTIONS", {"pool_size": 5})
+    monkeypatch.setattr(TestingConfig, "DB_POOL_WARM", 2)
+    flask_app = create_app("testing")
+    yield flask_app
+    with flask_app.app_context():
+        db.engine.dispose()
+
+
+def test_reset_after_fork_replaces_the_inherited_pool(file_app):
+    from app import db
+    from app.services.prefork import reset_after_fork
+
+    with file_app.app_context():
+        with db.engine.connect() as conn:
+            inherited = conn.connection.dbapi_connection
+        old_pool = db.engine.pool
+
+        reset_after_fork(file_app)
+
+        assert db.engine.pool is not old_pool
+        assert db.engine.pool.checkedin() == 2
+        with db.engine.connect() as conn:
+            assert conn.connection.dbapi_connection is not inherited
+        # Not closed: in a real fork it's still the master's connection
+        inherited.execute("SELECT 1")
+
+
+def test_reset_after_fork_survives_an_unreachable_database(file_app, monkeypatch, caplog):
+    from app import db
+    from app.services.prefork import reset_after_fork
+
+    def refuse(self):
+        raise ConnectionRefusedError("database is down")
+
+    with file_app.app_context():
+        monkeypatch.setattr(type(db.engine), "connect", refuse)
+        reset_after_fork(file_app)
+
+    assert "Could not pre-open connections" in caplog.text
+
+
+def test_warm_up_prepares_login(app, client):
+    from app.services.prefork import warm_up
+
+    warm_up(app)
+
+    from app.models import Song
+    assert Song.__mapper__.configured
+
+    resp = client.post("/api/v1/auth/login", json={"username": "nobody", "password": "x"})
+    assert resp.status_code == 401
+
+
+def test_flask_app_unwraps_the_asgi_adapter(app):
+    from app.asgi import FlaskAsgi
+    from app.services.prefork import flask_app
+
+    assert flask_app(app) is app
+    assert flask_app(FlaskAsgi(app, threads=1)) is app
+
+
+def test_missing_signup_access_code_fails_app_creation(monkeypatch):
+    from app import create_app
+    from config import TestingConfig
+
+    monkeypatch.setattr(TestingConfig, "SIGNUP_ACCESS_CODE", None)
+    with pytest.raises(RuntimeError, match="SIGNUP_ACCESS_CODE"):
+        create_app("testing")
+
+
+def test_complete_signup_checks_the_configured_access_code(app, client):
+    body = {"ms_id": "ms-1", "email": "new@example.com", "name": "New User"}
+
+    resp = client.post("/api/v1/auth/microsoft/complete-signup", json={**body, "access_code": "wrong"})
+    assert resp.status_code == 403
+
+    resp = client.post("/api/v1/auth/microsoft/complete-signup",
+                       json={**body, "access_code": app.config["SIGNUP_ACCESS_CODE"]})
+    assert resp.status_code == 201
@@ -0,0 +1,97 @@
+# Request Profiling Tests for AIAMusic
+# ====================================
+import json
+
+import pytest
+from flask import Response, jsonify
+
+KEY = "profile-secret"
+
+
+@pytest.fixture
+def profiled_app(monkeypatch, tmp_path):
+    from config import TestingConfig
+    from app import create_app, db
+
+    monkeypatch.setattr(TestingConfig, "PROFILE_KEY", KEY)
+    monkeypatch.setattr(TestingConfig, "PROFILE_RATE_PER_MIN", 60)
+    monkeypatch.setattr(TestingConfig, "PROFILE_BURST", 3)
+    monkeypatch.setattr(TestingConfig, "PROFILE_DIR", str(tmp_path))
+    flask_app = create_app("testing")
+
+    @flask_app.route("/_test/work")
+    def work():
+        db.session.execute(db.text("SELECT 7"))
+        return jsonify({"total": sum(i * i for i in range(20000))}), 201
+
+    @flask_app.route("/_test/stream")
+    def stream():
+        def rows():
+            for _ in range(3):
+                yield db.session.execute(db.text("SELECT 'streamed'")).scalar() + "\n"
+        return Response(rows(), mimetype="text/plain")
+
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_requests_without_the_key_are_untouched(profiled_app):
+    client = profiled_app.test_client()
+
+    for headers in ({}, {"X-Profile": "wrong"}, {"X-Profile": "cl\u00e9"}):
+        resp = client.get("/_test/work", headers=headers)
+        assert resp.status_code == 201 and resp.get_json()["total"] > 0
+        assert "X-Profile-Status" not in resp.headers
+
+    # The key in the query string would be written to the access log
+    resp = client.get(f"/_test/work?_profile={KEY}")
+    assert resp.status_code == 201 and "X-Profile-Status" not in resp.headers
+
+
+def test_html_profile_includes_the_sql_timeline(profiled_app):
+    resp = profiled_app.test_client().get("/_test/work", headers={"X-Profile": KEY})
+
+    assert resp.status_code == 200
+    assert resp.headers["X-Profile-Status"] == "201"
+    assert resp.mimetype == "text/html"
+    page = resp.get_data(as_text=True)
+    assert "SQL timeline (1 statements)" in page and "SELECT 7" in page
+
+
+def test_speedscope_profile_has_an_sql_lane(profiled_app):
+    pytest.importorskip("pyinstrument")
+
+    resp = profiled_app.test_client().get("/_test/stream?_profile_format=speedscope", headers={"X-Profile": KEY})
+    profile = json.loads(resp.get_data())
+    sql = [p for p in profile["profiles"] if p["name"] == "SQL"][0]
+    assert len(sql["events"]) == 6  # the streamed body's queries, open + close each
+    names = {profile["shared"]["frames"][e["frame"]]["name"] for e in sql["events"]}
+    assert names == {"SELECT 'streamed'"}
+
+
+def test_stored_profile_keeps_the_normal_response(profiled_app, tmp_path):
+    resp = profiled_app.test_client().get("/_test/work", headers={
+        "X-Profile": KEY, "X-Profile-Mode": "store", "X-Profile-Format": "text"})
+
+    assert resp.status_code == 201 and resp.get_json()["total"] > 0
+    stored = tmp_path / resp.headers["X-Profile-File"]
+    assert "SELECT 7" in stored.read_text()
+
+
+def test_profiles_are_rate_limited(profiled_app):
+    client = profiled_app.test_client()
+
+    statuses = [client.get("/_test/work", headers={"X-Profile": KEY}).headers.get("X-Profile") for _ in range(5)]
+    assert statuses[:3] == [None, None, None]
+    assert statuses[3:] == ["rate-limited", "rate-limited"]
+
+
+def test_rate_limiter_try_consume():
+    from app.services.throttle import RateLimiter
+
+    limiter = RateLimiter(1, burst=2)
+    assert [limiter.try_consume() for _ in range(3)] == [True, True, False]
+    assert RateLimiter(0).try_consume(100)
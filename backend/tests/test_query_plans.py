@@ -0,0 +1,185 @@
+# Query Plan Regression Tests for AIAMusic
+# ========================================
+# Runs the hot song queries against a real Postgres and fails if EXPLAIN
+# shows a sequential scan of songs, or the index meant for the query
+# isn't used. The statements are captured from the endpoints themselves,
+# so a change to a query's shape is caught as well as a dropped index.
+#
+# Skipped unless TEST_POSTGRES_URL points at a throwaway database (its
+# tables are dropped and recreated):
+#     TEST_POSTGRES_URL=postgresql://postgres@localhost/plans python -m pytest tests/test_query_plans.py
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+
+MIGRATION = Path(__file__).resolve().parents[2] / "database" / "migrations" / "012_add_query_shape_indexes.sql"
+
+USERS = 50
+SONGS = 60000
+
+ENUMS = {
+    "status_enum": ("create", "submitted", "completed", "failed", "unspecified"),
+    "vocal_gender_enum": ("male", "female", "other"),
+    "source_type_enum": ("suno", "uploaded"),
+}
+
+# Each user owns 1/USERS of the songs; 1% are submitted, 20% have no audio yet
+SEED = f"""
+INSERT INTO users (username, email, password_hash, is_active, created_at)
+SELECT 'user' || g, 'user' || g || '@example.com', 'x', true, now() FROM generate_series(1, {USERS}) g;
+
+INSERT INTO songs (user_id, source_type, status, specific_title, version, star_rating, vocal_gender,
+                   download_url, archived_url, track_number, created_at, updated_at)
+SELECT 1 + g % {USERS}, 'suno',
+       (CASE WHEN g % 100 = 0 THEN 'submitted' WHEN g % 10 = 1 THEN 'failed'
+             WHEN g % 10 = 2 THEN 'create' ELSE 'completed' END)::status_enum,
+       'Song ' || md5(g::text), 'v1', g % 6, 'female',
+       CASE WHEN g % 10 > 2 THEN 'https://cdn1.suno.ai/' || g || '.mp3' END,
+       CASE WHEN g % 20 > 10 THEN '/audio/songs/' || g || '/track_1.mp3' END,
+       1, now() - g * interval '1 minute', now()
+FROM generate_series(1, {SONGS}) g;
+
+ANALYZE;
+"""
+
+
+@pytest.fixture(scope="module")
+def pg_app():
+    from sqlalchemy import text
+
+    from app import create_app, db
+    from config import TestingConfig, config
+
+    class PlanTestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = POSTGRES_URL
+        CACHE_BACKEND = "none"
+
+    config["plan_test"] = PlanTestConfig
+    app = create_app("plan_test")
+
+    with app.app_context():
+        db.drop_all()
+        with db.engine.begin() as conn:
+            for name, values in ENUMS.items():
+                conn.execute(text(f"DROP TYPE IF EXISTS {name} CASCADE"))
+                conn.execute(text(f"CREATE TYPE {name} AS ENUM ({', '.join(repr(v) for v in values)})"))
+        db.create_all()
+        with db.engine.begin() as conn:
+            # Raw DBAPI cursor: no parameters, so '%' in the SQL is literal
+            cursor = conn.connection.cursor()
+            # The migration must apply cleanly on top of the models' schema
+            cursor.execute(MIGRATION.read_text())
+            cursor.execute(SEED)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def pg_client(pg_app):
+    return pg_app.test_client()
+
+
+def _token(pg_app, user_id=7):
+    from flask_jwt_extended import create_access_token
+
+    with pg_app.app_context():
+        return {"Authorization": f"Bearer {create_access_token(identity=user_id)}"}
+
+
+@contextmanager
+def _captured_song_queries(pg_app):
+    """Collect (statement, parameters, streamed) for every SELECT touching songs."""
+    from sqlalchemy import event
+
+    from app import db
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "songs" in statement:
+            streamed = bool(context and context.execution_options.get("stream_results"))
+            captured.append((statement, parameters, streamed))
+
+    with pg_app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _explain(pg_app, captured):
+    """(seq scans of songs, index names used) over the captured statements."""
+    from app import db
+
+    seq_scans, indexes = [], set()
+    with pg_app.app_context(), db.engine.connect() as conn:
+        for statement, parameters, streamed in captured:
+            # Streamed listings run as server-side cursors, planned for fast start
+            sql = f"DECLARE plan_check CURSOR FOR {statement}" if streamed else statement
+            plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", parameters).scalar()[0]["Plan"]
+            for node in _plan_nodes(plan):
+                if node.get("Index Name"):
+                    indexes.add(node["Index Name"])
+                if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "songs":
+                    seq_scans.append(statement)
+        conn.rollback()
+    return seq_scans, indexes
+
+
+def _check(pg_app, captured, index):
+    assert captured, "no song queries were captured"
+    seq_scans, indexes = _explain(pg_app, captured)
+    assert not seq_scans, "sequential scan of songs in:\n" + "\n\n".join(seq_scans)
+    assert index in indexes, f"{index} not used; plans used {sorted(indexes)}"
+
+
+def test_own_song_listing_uses_user_created_index(pg_app, pg_client):
+    with _captured_song_queries(pg_app) as captured:
+        resp = pg_client.get("/api/v1/songs/", headers=_token(pg_app))
+        assert resp.status_code == 200
+        assert resp.get_json()["total"] == SONGS // USERS
+
+    _check(pg_app, captured, "idx_songs_user_created")
+
+
+def test_stats_use_user_status_index(pg_app, pg_client):
+    with _captured_song_queries(pg_app) as captured:
+        resp = pg_client.get("/api/v1/songs/stats", headers=_token(pg_app))
+        assert resp.status_code == 200
+        assert resp.get_json()["total"] == SONGS // USERS
+
+    _check(pg_app, captured, "idx_songs_user_status")
+
+
+def test_reconcile_uses_submitted_partial_index(pg_app, pg_client, monkeypatch):
+    monkeypatch.setenv("ROKU_SECRET_KEY", "plan-key")
+    with _captured_song_queries(pg_app) as captured:
+        resp = pg_client.post("/api/v1/songs/reconcile", headers={"X-Reconcile-Key": "plan-key"})
+        assert resp.status_code == 200
+        assert resp.get_json()["candidates"] > 0
+
+    _check(pg_app, captured, "idx_songs_submitted_created")
+
+
+def test_roku_song_feed_uses_playable_index(pg_app, pg_client, monkeypatch):
+    monkeypatch.setenv("ROKU_SECRET_KEY", "plan-key")
+    with _captured_song_queries(pg_app) as captured:
+        resp = pg_client.get("/api/v1/roku/plan-key/songs")
+        assert resp.status_code == 200
+        assert resp.get_json()["total"] > 0
+
+    _check(pg_app, captured, "idx_songs_playable_title")
@@ -0,0 +1,135 @@
+# Transcoded Rendition Tests for AIAMusic
+# ========================================
+
+
+def _make_song_with_renditions(app, user_id, bitrates=(64, 128)):
+    from app import db
+    from app.models import Song, SongRendition
+
+    with app.app_context():
+        song = Song(user_id=user_id, specific_title="Psalm 23", status="completed", is_archived=True)
+        db.session.add(song)
+        db.session.commit()
+        song.archived_url = f"/audio/songs/{song.id}/track_1.mp3"
+        for bitrate in bitrates:
+            db.session.add(SongRendition(song_id=song.id, bitrate_kbps=bitrate,
+                                         url=f"/audio/songs/{song.id}/track_1_{bitrate}k.mp3"))
+        db.session.commit()
+        return song.id
+
+
+def test_parse_quality_hint():
+    from app.services.transcoder import parse_quality_hint
+
+    assert parse_quality_hint("low") == 64
+    assert parse_quality_hint("Medium") == 128
+    assert parse_quality_hint("original") is None
+    assert parse_quality_hint("96k") == 96
+    assert parse_quality_hint(None, save_data=True) == 64
+    assert parse_quality_hint("original", save_data=True) is None
+    assert parse_quality_hint("bogus") is None
+
+
+def test_song_api_picks_rendition_by_hint(app, client, create_user):
+    user_id, headers = create_user()
+    song_id = _make_song_with_renditions(app, user_id)
+
+    original = client.get(f"/api/v1/songs/{song_id}", headers=headers).get_json()["song"]
+    assert original["stream_url"] == f"/audio/songs/{song_id}/track_1.mp3"
+    assert [r["bitrate_kbps"] for r in original["renditions"]] == [64, 128]
+
+    low = client.get(f"/api/v1/songs/{song_id}?quality=low", headers=headers).get_json()["song"]
+    assert low["stream_url"] == f"/audio/songs/{song_id}/track_1_64k.mp3"
+
+    # 96 kbps hint falls back to the highest rendition that fits under it
+    hinted = client.get(f"/api/v1/songs/{song_id}?quality=96", headers=headers).get_json()["song"]
+    assert hinted["stream_url"] == f"/audio/songs/{song_id}/track_1_64k.mp3"
+
+    save_data = client.get(f"/api/v1/songs/{song_id}", headers={**headers, "Save-Data": "on"})
+    assert save_data.get_json()["song"]["stream_url"].endswith("_64k.mp3")
+
+
+def test_roku_feed_uses_rendition_for_quality_hint(app, client, create_user, monkeypatch):
+    monkeypatch.setenv("ROKU_SECRET_KEY", "roku-key")
+    user_id, _ = create_user()
+    song_id = _make_song_with_renditions(app, user_id, bitrates=(128,))
+
+    resp = client.get("/api/v1/roku/roku-key/songs?quality=medium")
+    assert resp.status_code == 200
+    song = resp.get_json()["songs"][0]
+    assert song["url"].endswith(f"/audio/songs/{song_id}/track_1_128k.mp3")
+
+    resp = client.get("/api/v1/roku/roku-key/songs")
+    assert resp.get_json()["songs"][0]["url"].endswith(f"/audio/songs/{song_id}/track_1.mp3")
+
+
+def test_transcode_job_records_missing_renditions(app, client, monkeypatch, create_user):
+    from app import db
+    from app.models import Song
+    from app.services import transcoder
+    from app.services.audio_storage import get_storage_service
+
+    user_id, _ = create_user()
+    song_id = _make_song_with_renditions(app, user_id, bitrates=(64,))
+
+    storage = get_storage_service()
+    storage.get_song_dir(song_id).mkdir(parents=True, exist_ok=True)
+    (storage.get_song_dir(song_id) / "track_1.mp3").write_bytes(b"fake mp3")
+
+    encoded = []
+
+    def fake_transcode(source_path, dest_path, bitrate_kbps):
+        encoded.append(bitrate_kbps)
+        return 1234
+
+    monkeypatch.setattr(transcoder, "ffmpeg_available", lambda: True)
+    monkeypatch.setattr(transcoder, "transcode", fake_transcode)
+
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+    resp = client.post("/api/v1/songs/renditions/transcode", headers={"X-Reconcile-Key": "correct-key"})
+    assert resp.status_code == 200
+    assert resp.get_json() == {"transcoded": 1, "failed": 0}
+    assert encoded == [128]
+
+    with app.app_context():
+        song = db.session.get(Song, song_id)
+        assert {r.bitrate_kbps: r.file_size_bytes for r in song.renditions} == {64: None, 128: 1234}
+
+    storage.delete_song_files(song_id)
+
+
+def test_hint_below_every_rendition_gets_the_lowest(app, client, create_user):
+    user_id, headers = create_user()
+    song_id = _make_song_with_renditions(app, user_id, bitrates=(64, 128))
+
+    song = client.get(f"/api/v1/songs/{song_id}?quality=32", headers=headers).get_json()["song"]
+    assert song["stream_url"] == f"/audio/songs/{song_id}/track_1_64k.mp3"
+
+
+def test_failed_transcode_is_not_retried(app, monkeypatch, create_user):
+    from app.services import transcoder
+    from app.services.audio_decode import AudioDecodeError
+    from app.services.audio_storage import get_storage_service
+
+    user_id, _ = create_user()
+    broken = _make_song_with_renditions(app, user_id, bitrates=())
+    storage = get_storage_service()
+    storage.get_song_dir(broken).mkdir(parents=True, exist_ok=True)
+    (storage.get_song_dir(broken) / "track_1.mp3").write_bytes(b"not audio")
+
+    attempts = []
+
+    def failing_transcode(source_path, dest_path, bitrate_kbps):
+        attempts.append(bitrate_kbps)
+        raise AudioDecodeError("bad input")
+
+    monkeypatch.setattr(transcoder, "ffmpeg_available", lambda: True)
+    monkeypatch.setattr(transcoder, "transcode", failing_transcode)
+
+    with app.app_context():
+        assert transcoder.transcode_pending_renditions() == {"transcoded": 0, "failed": 2}
+        assert storage.get_rendition_path(broken, 64).stat().st_size == 0
+        assert transcoder._pending_jobs(20) == []
+    assert attempts == [64, 128]
+
+    storage.delete_song_files(broken)
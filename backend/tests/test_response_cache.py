@@ -0,0 +1,167 @@
+# Response Cache Tests for AIAMusic
+# =================================
+import fnmatch
+import time
+
+
+class _FakeRedis:
+    """Just enough of redis-py for RedisCache (no expiry)."""
+
+    def __init__(self):
+        self.data = {}
+
+    def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    def incr(self, key):
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    def scan_iter(self, match):
+        return [k for k in list(self.data) if fnmatch.fnmatch(k, match)]
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_styles_list_is_cached_until_a_style_is_created(client, create_user):
+    _, headers = create_user()
+
+    first = client.get("/api/v1/styles", headers=headers)
+    second = client.get("/api/v1/styles", headers=headers)
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.get_json() == first.get_json()
+
+    resp = client.post("/api/v1/styles", json={"name": "Lo-fi"}, headers=headers)
+    assert resp.status_code == 201
+
+    third = client.get("/api/v1/styles", headers=headers)
+    assert third.headers["X-Cache"] == "MISS"
+    assert [s["name"] for s in third.get_json()["styles"]] == ["Lo-fi"]
+
+
+def test_playlists_list_is_cached_per_user(client, create_user):
+    _, alice = create_user()
+    _, bob = create_user(username="bob", email="bob@example.com")
+
+    assert client.get("/api/v1/playlists", headers=alice).headers["X-Cache"] == "MISS"
+    assert client.get("/api/v1/playlists", headers=bob).headers["X-Cache"] == "MISS"
+    assert client.get("/api/v1/playlists", headers=alice).headers["X-Cache"] == "HIT"
+
+    client.post("/api/v1/playlists", json={"name": "Shabbat"}, headers=bob)
+    resp = client.get("/api/v1/playlists", headers=alice)
+    assert resp.headers["X-Cache"] == "MISS"
+
+
+def test_song_detail_is_invalidated_by_update(app, client, create_user):
+    from app import db
+    from app.models import Song
+
+    user_id, headers = create_user()
+    with app.app_context():
+        song = Song(user_id=user_id, specific_title="Before", status="completed")
+        db.session.add(song)
+        db.session.commit()
+        song_id = song.id
+
+    client.get(f"/api/v1/songs/{song_id}", headers=headers)
+    assert client.get(f"/api/v1/songs/{song_id}", headers=headers).headers["X-Cache"] == "HIT"
+    # Save-Data changes the stream_url rendition, so it is a separate entry
+    low = client.get(f"/api/v1/songs/{song_id}", headers={**headers, "Save-Data": "on"})
+    assert low.headers["X-Cache"] == "MISS"
+
+    client.put(f"/api/v1/songs/{song_id}", json={"specific_title": "After"}, headers=headers)
+    resp = client.get(f"/api/v1/songs/{song_id}", headers=headers)
+    assert resp.headers["X-Cache"] == "MISS"
+    assert resp.get_json()["song"]["specific_title"] == "After"
+
+
+def test_error_responses_are_not_cached(client, create_user):
+    _, headers = create_user()
+
+    assert client.get("/api/v1/songs/999", headers=headers).status_code == 404
+    resp = client.get("/api/v1/songs/999", headers=headers)
+    assert resp.status_code == 404
+    assert resp.headers["X-Cache"] == "MISS"
+
+
+def test_memory_cache_evicts_least_recently_used_and_expired():
+    from app.services.cache import MemoryCache
+
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", b"1", ttl=60)
+    cache.set("b", b"2", ttl=60)
+    cache.get_many(["a"])
+    cache.set("c", b"3", ttl=60)
+    assert cache.get_many(["a", "b", "c"]) == [b"1", None, b"3"]
+
+    cache.set("d", b"4", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get_many(["d"]) == [None]
+
+
+def test_generation_counters_survive_lru_eviction():
+    from app.services.cache import MemoryCache, ResponseCache
+
+    cache = ResponseCache(MemoryCache(max_entries=1))
+    key = cache.key(["styles"], "/api/v1/styles")
+    cache.set(key, b"{}")
+    cache.invalidate("styles")
+    for i in range(5):
+        cache.set(f"filler-{i}", b"x")
+    assert cache.key(["styles"], "/api/v1/styles") != key
+
+
+def test_redis_backend_shares_invalidation(app, client, create_user):
+    from app.services.cache import RedisCache, init_cache
+
+    redis = _FakeRedis()
+    init_cache(app, RedisCache(redis))
+    _, headers = create_user()
+
+    client.get("/api/v1/auth/users", headers=headers)
+    assert client.get("/api/v1/auth/users", headers=headers).headers["X-Cache"] == "HIT"
+    assert any(k.startswith("aiamusic:cache:resp:users@") for k in redis.data)
+
+    client.post("/api/v1/auth/register",
+                json={"username": "bob", "email": "bob@example.com", "password": "hunter22"})
+    resp = client.get("/api/v1/auth/users", headers=headers)
+    assert resp.headers["X-Cache"] == "MISS"
+    assert len(resp.get_json()["users"]) == 2
+
+
+def test_memory_cache_is_refused_with_several_workers(monkeypatch, tmp_path):
+    import os
+    import runpy
+    from types import SimpleNamespace
+
+    import pytest
+    from config import TestingConfig
+
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config_files = [os.path.join(backend, "gunicorn_config.py")]
+    deploy = os.path.join(os.path.dirname(backend), "deploy", "gunicorn_config.py")
+    if os.path.exists(deploy):  # not in the backend-only test image
+        config_files.append(deploy)
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setenv("FLASK_ENV", "testing")  # CACHE_BACKEND = 'memory'
+
+    def start(config_file, workers):
+        hooks = runpy.run_path(config_file)
+        hooks["on_starting"](SimpleNamespace(cfg=SimpleNamespace(workers=workers)))
+
+    for config_file in config_files:
+        start(config_file, 1)
+        with pytest.raises(RuntimeError):
+            start(config_file, 4)
+
+    monkeypatch.setattr(TestingConfig, "CACHE_BACKEND", "redis")
+    start(config_files[-1], 4)
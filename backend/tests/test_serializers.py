@@ -0,0 +1,100 @@
+# Song Serializer Tests for AIAMusic
+# ==================================
+import json
+from datetime import datetime
+
+
+def _make_song_variants(app, user_id):
+    """A current song with style/renditions/playlist, a legacy two-track song, a bare one."""
+    from app import db
+    from app.models import Playlist, Song, SongRendition, Style
+
+    with app.app_context():
+        style = Style(name="Worship", style_prompt="warm piano", created_by=user_id)
+        playlist = Playlist(name="Sunday", created_by=user_id)
+        db.session.add_all([style, playlist])
+        db.session.flush()
+
+        current = Song(user_id=user_id, specific_title="Current", status="completed", style_id=style.id,
+                       download_url="https://cdn.example.com/c.mp3", archived_url="/audio/c.mp3",
+                       is_archived=True, archived_at=datetime(2024, 3, 1, 8, 15, 30, 123456),
+                       replay_gain_db=-2.5, replay_gain_peak=0.9)
+        current.renditions.append(SongRendition(bitrate_kbps=64, url="/audio/c_64.mp3", file_size_bytes=10))
+        current.playlists.append(playlist)
+        legacy = Song(user_id=user_id, specific_title="Legacy", status="completed",
+                      download_url_1="https://cdn.example.com/l1.mp3",
+                      download_url_2="https://cdn.example.com/l2.mp3", archived_url_2="/audio/l2.mp3")
+        bare = Song(user_id=user_id, status="create")
+        db.session.add_all([current, legacy, bare])
+        db.session.commit()
+        return [current.id, legacy.id, bare.id]
+
+
+def _as_json(app, value):
+    return json.loads(app.json.dumps(value))
+
+
+def test_v1_schema_matches_to_dict(app, create_user):
+    from app import db
+    from app.models import Song
+    from app.serializers import song_serializer
+
+    user_id, _ = create_user()
+    song_ids = _make_song_variants(app, user_id)
+
+    with app.app_context():
+        for song_id in song_ids:
+            song = db.session.get(Song, song_id)
+            for options in ({}, {"include_user": True}, {"include_style": False},
+                            {"include_user": True, "include_playlists": True}):
+                for bitrate_kbps in (None, 64):
+                    expected = song.to_dict(bitrate_kbps=bitrate_kbps, **options)
+                    actual = song_serializer("v1", **options)(song, bitrate_kbps)
+                    assert _as_json(app, actual) == _as_json(app, expected), (song_id, options)
+
+            # Expired columns aren't in __dict__; the serializer reloads them
+            db.session.expire(song)
+            assert _as_json(app, song_serializer("v1")(song)) == _as_json(app, song.to_dict())
+
+
+def test_v2_schema_drops_legacy_duplicates(app, create_user):
+    from app import db
+    from app.models import Song
+    from app.serializers import song_serializer
+
+    user_id, _ = create_user()
+    current_id, legacy_id, _ = _make_song_variants(app, user_id)
+
+    with app.app_context():
+        lean = song_serializer("v2", include_style=True)(db.session.get(Song, current_id))
+        assert "download_url_1" not in lean and "archived_url_2" not in lean and "style" not in lean
+        assert lean["style_name"] == "Worship"
+        assert lean["archived_at"] == datetime(2024, 3, 1, 8, 15, 30, 123456)
+
+        # Old two-track rows still expose their first track under the new keys
+        legacy = song_serializer("v2")(db.session.get(Song, legacy_id))
+        assert legacy["download_url"] == "https://cdn.example.com/l1.mp3"
+        assert "download_url_2" not in legacy
+
+
+def test_schema_query_parameter(app, client, create_user):
+    user_id, headers = create_user()
+    current_id, _, _ = _make_song_variants(app, user_id)
+
+    v2 = client.get(f"/api/v1/songs/{current_id}?schema=v2", headers=headers).get_json()["song"]
+    assert "download_url_1" not in v2
+    assert v2["archived_at"] == "2024-03-01T08:15:30.123456"
+
+    unknown = client.get(f"/api/v1/songs/{current_id}?schema=v9", headers=headers).get_json()["song"]
+    assert unknown["download_url_1"] == "https://cdn.example.com/c.mp3"
+
+    listing = client.get("/api/v1/songs?schema=v2", headers=headers).get_json()
+    assert listing["total"] == 3
+    assert all("archived_url_1" not in s for s in listing["songs"])
+
+
+def test_stdlib_provider_fallback_encodes_iso_datetimes(app):
+    from app.services.json_provider import IsoJSONProvider
+
+    provider = IsoJSONProvider(app)
+    assert json.loads(provider.dumps({"at": datetime(2024, 3, 1, 8, 15)})) == {"at": "2024-03-01T08:15:00"}
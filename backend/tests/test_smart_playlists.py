@@ -0,0 +1,182 @@
+# Smart Playlist Tests for AIAMusic
+# =================================
+
+
+def _songs(app, user_id, ratings, status="completed", first_day=0):
+    """Songs with the given star ratings, a day apart, oldest first; returns their ids."""
+    from datetime import datetime, timedelta
+    from app import db
+    from app.models import Song
+
+    with app.app_context():
+        start = datetime(2026, 1, 1)
+        songs = [Song(user_id=user_id, specific_title=f"Song {i}", status=status, star_rating=rating,
+                      created_at=start + timedelta(days=first_day + i)) for i, rating in enumerate(ratings)]
+        db.session.add_all(songs)
+        db.session.commit()
+        return [s.id for s in songs]
+
+
+def _order(app, playlist_id):
+    from app.services.playlist_order import ordered_song_ids
+
+    with app.app_context():
+        return ordered_song_ids(playlist_id)
+
+
+def _smart(client, headers, spec):
+    resp = client.post("/api/v1/playlists", json={"name": "Smart", "smart_filter": spec}, headers=headers)
+    assert resp.status_code == 201
+    return resp.get_json()["playlist"]
+
+
+def test_snapshot_holds_matching_songs_in_spec_order(app, client, create_user):
+    user_id, headers = create_user()
+    a, b, c, d = _songs(app, user_id, [5, 2, 4, 5])
+    _songs(app, user_id, [5], status="failed", first_day=5)
+    bob_id, _ = create_user(username="bob", email="bob@example.com")
+    (bobs,) = _songs(app, bob_id, [5], first_day=10)
+
+    playlist = _smart(client, headers, {"status": "completed", "min_star_rating": 4, "order": "rating"})
+    assert playlist["is_smart"] and playlist["song_count"] == 3
+    assert _order(app, playlist["id"]) == [d, a, c]
+
+    everyone = _smart(client, headers, {"min_star_rating": 5, "status": "completed", "all_users": True})
+    assert _order(app, everyone["id"]) == [bobs, d, a]
+
+    body = client.get(f"/api/v1/playlists/{playlist['id']}?limit=2", headers=headers).get_json()
+    assert [s["id"] for s in body["playlist"]["songs"]] == [d, a]
+
+
+def test_song_writes_update_the_snapshot_incrementally(app, client, create_user):
+    from app import db
+    from app.models import Song
+
+    user_id, headers = create_user()
+    a, b, c = _songs(app, user_id, [5, 3, 4])
+    playlist = _smart(client, headers, {"min_star_rating": 4})  # newest first
+    assert _order(app, playlist["id"]) == [c, a]
+
+    # Starts matching: goes to its place in the order, not the end
+    client.put(f"/api/v1/songs/{b}", json={"star_rating": 4}, headers=headers)
+    assert _order(app, playlist["id"]) == [c, b, a]
+
+    # Stops matching
+    client.put(f"/api/v1/songs/{c}", json={"star_rating": 1}, headers=headers)
+    assert _order(app, playlist["id"]) == [b, a]
+
+    # A new matching song is the newest
+    (new,) = _songs(app, user_id, [5], first_day=10)
+    assert _order(app, playlist["id"]) == [new, b, a]
+
+    # Unwatched columns don't touch the snapshot; rolled-back writes neither
+    with app.app_context():
+        song = db.session.get(Song, a)
+        song.star_rating = 0
+        db.session.flush()
+        db.session.rollback()
+        db.session.get(Song, a).voice_name = "Aria"
+        db.session.commit()
+    assert _order(app, playlist["id"]) == [new, b, a]
+
+    listed = client.get("/api/v1/playlists", headers=headers).get_json()
+    assert listed["playlists"][0]["song_count"] == 3
+
+
+def test_bulk_style_reassignment_updates_the_snapshot(app, client, create_user):
+    from app import db
+    from app.models import Song, Style
+
+    user_id, headers = create_user()
+    with app.app_context():
+        old, new = Style(name="Old", style_prompt="x"), Style(name="New", style_prompt="y")
+        db.session.add_all([old, new])
+        db.session.commit()
+        old_id, new_id = old.id, new.id
+    songs = _songs(app, user_id, [5, 4, 3])
+    with app.app_context():
+        Song.query.filter(Song.id.in_(songs)).update({"style_id": old_id})
+        db.session.commit()
+
+    by_old = _smart(client, headers, {"style_id": old_id})
+    by_new = _smart(client, headers, {"style_id": new_id})
+    assert len(_order(app, by_old["id"])) == 3
+
+    resp = client.delete(f"/api/v1/styles/{old_id}", json={"reassign_to": new_id}, headers=headers)
+    assert resp.status_code == 200
+    assert _order(app, by_old["id"]) == []
+    assert _order(app, by_new["id"]) == songs[::-1]
+
+
+def test_song_changes_only_touch_playlists_they_concern(app, client, monkeypatch, create_user):
+    from app import db
+    from app.models import Song
+    from app.services import playlist_order, smart_playlists
+
+    alice_id, alice = create_user()
+    bob_id, bob = create_user(username="bob", email="bob@example.com")
+    a, b = _songs(app, alice_id, [5, 4])
+    mine = _smart(client, alice, {"min_star_rating": 4})
+    everyone = _smart(client, bob, {"min_star_rating": 4, "all_users": True})
+    bobs_own = _smart(client, bob, {"min_star_rating": 4})
+
+    with app.app_context():
+        candidates = {p.id for p in smart_playlists._candidate_playlists([a])}
+    assert candidates == {mine["id"], everyone["id"]}
+    assert bobs_own["id"] not in candidates
+
+    # A title edit leaves the song where it is: nothing is moved
+    moves = []
+    monkeypatch.setattr(playlist_order, "move_song", lambda *args: moves.append(args))
+    with app.app_context():
+        db.session.get(Song, b).specific_title = "Retitled"
+        db.session.commit()
+    assert moves == []
+    assert _order(app, mine["id"]) == [b, a]
+
+
+def test_manual_membership_changes_are_rejected(app, client, create_user):
+    user_id, headers = create_user()
+    a, b = _songs(app, user_id, [5, 1])
+    playlist = _smart(client, headers, {"min_star_rating": 4})
+    static = client.post("/api/v1/playlists", json={"name": "Static"}, headers=headers).get_json()["playlist"]
+    url = f"/api/v1/playlists/{playlist['id']}"
+
+    assert client.post(f"{url}/songs", json={"song_id": b}, headers=headers).status_code == 409
+    assert client.delete(f"{url}/songs/{a}", headers=headers).status_code == 409
+    assert client.put(f"{url}/order", json={"song_ids": [a]}, headers=headers).status_code == 409
+    assert client.post("/api/v1/playlists/bulk/add", json={"playlist_ids": [playlist["id"]], "song_ids": [b]},
+                       headers=headers).status_code == 409
+
+    # Assigning a song to other playlists leaves its smart playlists alone
+    resp = client.post(f"/api/v1/playlists/song/{a}/assign", json={"playlist_ids": [static["id"]]}, headers=headers)
+    assert resp.status_code == 200
+    assert _order(app, playlist["id"]) == [a]
+
+
+def test_filter_changes_and_refresh(app, client, create_user):
+    user_id, headers = create_user()
+    a, b = _songs(app, user_id, [5, 1])
+    playlist = _smart(client, headers, {"min_star_rating": 4})
+    url = f"/api/v1/playlists/{playlist['id']}"
+
+    resp = client.put(url, json={"smart_filter": {"min_star_rating": 0, "order": "oldest"}}, headers=headers)
+    assert resp.status_code == 200
+    assert _order(app, playlist["id"]) == [a, b]
+
+    resp = client.post(f"{url}/refresh", headers=headers)
+    assert resp.status_code == 200 and resp.get_json()["song_count"] == 2
+
+    # Back to a hand-made playlist, keeping its songs
+    client.put(url, json={"smart_filter": None}, headers=headers)
+    assert client.post(f"{url}/songs", json={"song_id": a}, headers=headers).status_code == 409  # already in it
+    assert client.post(f"{url}/refresh", headers=headers).status_code == 400
+    assert _order(app, playlist["id"]) == [a, b]
+
+
+def test_invalid_specs(client, create_user):
+    _, headers = create_user()
+
+    for spec in ({"colour": "blue"}, {"min_star_rating": "4"}, {"order": "random"}, {"style_id": True}, []):
+        resp = client.post("/api/v1/playlists", json={"name": "Bad", "smart_filter": spec}, headers=headers)
+        assert resp.status_code == 400
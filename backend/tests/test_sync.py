@@ -0,0 +1,269 @@
+# Delta Sync Tests for AIAMusic
+# =============================
+
+
+def _sync(client, headers, since=None, **params):
+    if since is not None:
+        params["since"] = since
+    resp = client.get("/api/v1/sync/", query_string=params, headers=headers)
+    assert resp.status_code == 200, resp.get_json()
+    return resp.get_json()
+
+
+def _song(client, headers, title="Song", **fields):
+    resp = client.post("/api/v1/songs/", json={"specific_title": title, "status": "completed", **fields},
+                       headers=headers)
+    assert resp.status_code == 201
+    return resp.get_json()["song"]["id"]
+
+
+def _playlist(client, headers, name="Mix", **fields):
+    resp = client.post("/api/v1/playlists", json={"name": name, **fields}, headers=headers)
+    assert resp.status_code == 201
+    return resp.get_json()["playlist"]["id"]
+
+
+def _add(client, headers, playlist, song_ids):
+    for song_id in song_ids:
+        resp = client.post(f"/api/v1/playlists/{playlist}/songs", json={"song_id": song_id}, headers=headers)
+        assert resp.status_code in (200, 201), resp.get_json()
+
+
+def test_first_sync_returns_everything_and_next_sync_nothing(client, create_user):
+    _, headers = create_user()
+    style = client.post("/api/v1/styles/", json={"name": "Lo-fi", "style_prompt": "chill"},
+                        headers=headers).get_json()["style"]["id"]
+    song = _song(client, headers, style_id=style)
+    playlist = _playlist(client, headers)
+
+    first = _sync(client, headers)
+    assert first["since"] == 0 and not first["has_more"]
+    assert [s["id"] for s in first["songs"]] == [song]
+    assert [s["id"] for s in first["styles"]] == [style]
+    assert [p["id"] for p in first["playlists"]] == [playlist]
+    assert first["deleted"] == {"song": [], "style": [], "playlist": []}
+
+    again = _sync(client, headers, first["next_seq"])
+    assert again["next_seq"] == first["next_seq"]
+    assert again["songs"] == again["styles"] == again["playlists"] == []
+
+
+def test_changes_are_compacted_to_the_latest_op(client, create_user):
+    _, headers = create_user()
+    kept = _song(client, headers, "Kept")
+    gone = _song(client, headers, "Gone")
+    since = _sync(client, headers)["next_seq"]
+
+    for title in ("Renamed", "Renamed again"):
+        assert client.put(f"/api/v1/songs/{kept}", json={"specific_title": title},
+                          headers=headers).status_code == 200
+    assert client.put(f"/api/v1/songs/{gone}", json={"specific_title": "x"}, headers=headers).status_code == 200
+    assert client.delete(f"/api/v1/songs/{gone}", headers=headers).status_code == 200
+
+    delta = _sync(client, headers, since)
+    assert [(s["id"], s["specific_title"]) for s in delta["songs"]] == [(kept, "Renamed again")]
+    assert delta["deleted"]["song"] == [gone]
+
+
+def test_paging_with_limit(client, create_user):
+    _, headers = create_user()
+    songs = [_song(client, headers, f"Song {i}") for i in range(5)]
+
+    seen, since = [], 0
+    for _ in range(3):
+        page = _sync(client, headers, since, limit=2)
+        seen += [s["id"] for s in page["songs"]]
+        since = page["next_seq"]
+        if not page["has_more"]:
+            break
+    assert seen == songs
+    assert not page["has_more"]
+    assert _sync(client, headers, since)["songs"] == []
+
+
+def test_other_users_songs_are_left_out(client, create_user):
+    _, alice = create_user()
+    _, bob = create_user(username="bob", email="bob@example.com")
+    mine = _song(client, alice, "Mine")
+    theirs = _song(client, bob, "Theirs")
+
+    assert [s["id"] for s in _sync(client, alice)["songs"]] == [mine]
+    assert [s["id"] for s in _sync(client, alice, all_users="true")["songs"]] == [mine, theirs]
+
+
+def test_reassigned_song_is_a_delete_for_its_previous_owner(create_user, client):
+    _, alice = create_user()
+    bob_id, bob = create_user(username="bob", email="bob@example.com")
+    song = _song(client, alice, "Moving")
+    alice_since = _sync(client, alice)["next_seq"]
+    bob_since = _sync(client, bob)["next_seq"]
+
+    assert client.put(f"/api/v1/songs/{song}", json={"user_id": bob_id}, headers=alice).status_code == 200
+
+    alice_delta = _sync(client, alice, alice_since)
+    assert alice_delta["songs"] == [] and alice_delta["deleted"]["song"] == [song]
+    bob_delta = _sync(client, bob, bob_since)
+    assert [s["id"] for s in bob_delta["songs"]] == [song] and bob_delta["deleted"]["song"] == []
+    everyone = _sync(client, alice, alice_since, all_users="true")
+    assert [s["id"] for s in everyone["songs"]] == [song] and everyone["deleted"]["song"] == []
+
+
+def test_playlist_made_private_is_a_delete_for_others(client, create_user):
+    _, alice = create_user()
+    _, bob = create_user(username="bob", email="bob@example.com")
+    playlist = _playlist(client, alice, is_public=True)
+    since = _sync(client, bob)["next_seq"]
+
+    assert client.put(f"/api/v1/playlists/{playlist}", json={"is_public": False},
+                      headers=alice).status_code == 200
+
+    assert _sync(client, bob, since)["deleted"]["playlist"] == [playlist]
+    assert [p["id"] for p in _sync(client, alice, since)["playlists"]] == [playlist]
+
+
+def test_membership_and_order_changes_resend_the_playlist(client, create_user):
+    _, headers = create_user()
+    a, b, c = (_song(client, headers, t) for t in "abc")
+    playlist = _playlist(client, headers)
+    since = _sync(client, headers)["next_seq"]
+
+    _add(client, headers, playlist, [a, b, c])
+    delta = _sync(client, headers, since)
+    assert [(p["id"], p["song_ids"]) for p in delta["playlists"]] == [(playlist, [a, b, c])]
+    assert delta["songs"] == []
+
+    since = delta["next_seq"]
+    assert client.put(f"/api/v1/playlists/{playlist}/order", json={"song_ids": [c, a, b]},
+                      headers=headers).status_code == 200
+    assert _sync(client, headers, since)["playlists"][0]["song_ids"] == [c, a, b]
+
+
+def test_bulk_style_reassignment_logs_the_songs(client, create_user):
+    _, headers = create_user()
+    old = client.post("/api/v1/styles/", json={"name": "Old", "style_prompt": "x"},
+                      headers=headers).get_json()["style"]["id"]
+    songs = [_song(client, headers, f"Song {i}", style_id=old) for i in range(2)]
+    since = _sync(client, headers)["next_seq"]
+
+    resp = client.delete(f"/api/v1/styles/{old}", json={"reassign_to": 0}, headers=headers)
+    assert resp.status_code == 200
+
+    delta = _sync(client, headers, since)
+    assert sorted(s["id"] for s in delta["songs"]) == songs
+    assert all(s["style_id"] is None for s in delta["songs"])
+    assert delta["deleted"]["style"] == [old]
+
+
+def test_rolled_back_writes_are_not_logged(app):
+    from app import db
+    from app.models import ChangeLog, Style
+
+    with app.app_context():
+        db.session.add(Style(name="Never", style_prompt="x"))
+        db.session.flush()
+        db.session.rollback()
+        db.session.add(Style(name="Kept", style_prompt="x"))
+        db.session.commit()
+
+        assert [(row.entity, row.op) for row in ChangeLog.query.all()] == [("style", "upsert")]
+
+
+def test_bad_arguments(client, create_user):
+    _, headers = create_user()
+
+    for params in ({"since": "abc"}, {"since": -1}, {"limit": 0}):
+        assert client.get("/api/v1/sync/", query_string=params, headers=headers).status_code == 400
+
+    resp = client.get("/api/v1/sync/", query_string={"since": 10**6}, headers=headers)
+    assert resp.status_code == 410
+    assert resp.get_json()["resync"] is True
+
+
+def test_roku_sync_sends_playable_songs_and_public_playlists(app, client, monkeypatch, create_user):
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+    _, headers = create_user()
+    playable = _song(client, headers, "Playable")
+    silent = _song(client, headers, "No audio yet")
+    with app.app_context():
+        from app import db
+        from app.models import Song
+        db.session.get(Song, playable).download_url = "https://cdn.example.com/a.mp3"
+        db.session.commit()
+    public = _playlist(client, headers, "Public", is_public=True)
+    private = _playlist(client, headers, "Private", is_public=False)
+    _add(client, headers, public, [silent, playable])
+
+    assert client.get("/api/v1/roku/wrong-key/sync").status_code == 403
+    resp = client.get("/api/v1/roku/correct-key/sync")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert [s["id"] for s in body["songs"]] == [playable]
+    assert body["deleted"]["song"] == [silent]
+    assert [(p["id"], p["song_ids"]) for p in body["playlists"]] == [(public, [playable])]
+    assert body["deleted"]["playlist"] == [private]
+
+
+def _age_log(app):
+    """Backdate every change_log row past the retention window."""
+    from datetime import datetime, timedelta
+    from app import db
+    from app.models import ChangeLog
+    from app.services import change_log
+
+    old = datetime.utcnow() - timedelta(days=change_log.CHANGE_LOG_RETENTION_DAYS + 1)
+    with app.app_context():
+        ChangeLog.query.update({ChangeLog.changed_at: old})
+        db.session.commit()
+
+
+def test_prune_compacts_the_log_and_keeps_full_sync_whole(app, client, monkeypatch, create_user):
+    from app.models import ChangeLog
+
+    monkeypatch.setenv("ROKU_SECRET_KEY", "cron-key")
+    _, headers = create_user()
+    song = _song(client, headers, "Song")
+    for title in ("Renamed", "Renamed again"):
+        assert client.put(f"/api/v1/songs/{song}", json={"specific_title": title},
+                          headers=headers).status_code == 200
+    before = _sync(client, headers)
+
+    cron = {"X-Reconcile-Key": "cron-key"}
+    assert client.post("/api/v1/sync/prune").status_code == 403
+    assert client.post("/api/v1/sync/prune", headers=cron).get_json()["removed"] == 0
+
+    _age_log(app)
+    resp = client.post("/api/v1/sync/prune", headers=cron)
+    assert resp.status_code == 200
+    assert resp.get_json()["removed"] == 2
+
+    with app.app_context():
+        assert [(row.entity, row.entity_id) for row in ChangeLog.query.all()] == [("song", song)]
+    after = _sync(client, headers)
+    assert after["songs"] == before["songs"] and after["next_seq"] == before["next_seq"]
+
+
+def test_sync_older_than_retention_must_start_over(app, client, create_user):
+    from app.services import change_log
+
+    _, headers = create_user()
+    gone = _song(client, headers, "Gone")
+    since = _sync(client, headers)["next_seq"]
+    assert client.delete(f"/api/v1/songs/{gone}", headers=headers).status_code == 200
+    _age_log(app)
+    kept = _song(client, headers, "Kept")
+    current = _sync(client, headers)["next_seq"]
+
+    with app.app_context():
+        assert change_log.prune() == 2
+        assert change_log.floor() == current - 1
+
+    resp = client.get("/api/v1/sync/", query_string={"since": since}, headers=headers)
+    assert resp.status_code == 410
+    assert resp.get_json()["resync"] is True
+    assert [s["id"] for s in _sync(client, headers, current - 1)["songs"]] == [kept]
+    assert [s["id"] for s in _sync(client, headers, 0)["songs"]] == [kept]
+
+
+def test_sync_views_read_the_primary(app):
+    assert app.view_functions["sync.sync"]._primary_db
+    assert app.view_functions["roku.sync"]._primary_db
@@ -0,0 +1,111 @@
+# Waveform Peak Tests for AIAMusic
+# =================================
+
+import numpy as np
+
+
+def _make_archived_song(app, user_id, field="archived_url"):
+    from app import db
+    from app.models import Song
+
+    with app.app_context():
+        song = Song(user_id=user_id, specific_title="Psalm 23", status="completed", is_archived=True)
+        db.session.add(song)
+        db.session.commit()
+        setattr(song, field, f"/audio/songs/{song.id}/track_1.mp3")
+        db.session.commit()
+        return song.id
+
+
+def test_compute_peaks_interleaves_min_max_per_bin():
+    from app.services.waveform import compute_peaks
+
+    samples = np.concatenate([np.full(100, -0.5), np.full(100, 1.0)])
+    peaks = compute_peaks(samples, bins=2)
+
+    assert peaks.dtype == np.int8
+    assert peaks.tolist() == [-64, -64, 127, 127]
+
+
+def test_compute_peaks_handles_short_and_empty_input():
+    from app.services.waveform import compute_peaks
+
+    assert compute_peaks(np.array([0.5, -0.5]), bins=1000).size == 4
+    assert compute_peaks(np.array([]), bins=1000).size == 0
+
+
+def test_get_waveform_serves_cacheable_peaks(app, client, create_user):
+    from app.services.audio_storage import get_storage_service
+
+    user_id, headers = create_user()
+    song_id = _make_archived_song(app, user_id)
+
+    storage = get_storage_service()
+    storage.get_song_dir(song_id).mkdir(parents=True, exist_ok=True)
+    storage.get_waveform_path(song_id).write_bytes(np.array([-1, 1, -2, 2], dtype=np.int8).tobytes())
+
+    resp = client.get(f"/api/v1/songs/{song_id}/waveform", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["X-Waveform-Bins"] == "2"
+    assert "private" in resp.headers["Cache-Control"]
+    assert np.frombuffer(resp.data, dtype=np.int8).tolist() == [-1, 1, -2, 2]
+
+    etag = resp.headers["ETag"]
+    cached = client.get(f"/api/v1/songs/{song_id}/waveform",
+                        headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    storage.delete_song_files(song_id)
+
+
+def test_get_waveform_missing_or_failed_returns_404(app, client, create_user):
+    from app.services.audio_storage import get_storage_service
+
+    user_id, headers = create_user()
+    song_id = _make_archived_song(app, user_id)
+
+    resp = client.get(f"/api/v1/songs/{song_id}/waveform", headers=headers)
+    assert resp.status_code == 404
+
+    # An empty file marks a track that failed to decode
+    storage = get_storage_service()
+    storage.get_song_dir(song_id).mkdir(parents=True, exist_ok=True)
+    storage.get_waveform_path(song_id).touch()
+
+    resp = client.get(f"/api/v1/songs/{song_id}/waveform", headers=headers)
+    assert resp.status_code == 404
+
+    storage.delete_song_files(song_id)
+
+
+def test_generate_waveforms_requires_cron_key(client, monkeypatch):
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+    resp = client.post("/api/v1/songs/waveforms/generate", headers={"X-Reconcile-Key": "wrong-key"})
+    assert resp.status_code == 403
+
+
+def test_generate_waveforms_writes_peaks_next_to_audio(app, client, monkeypatch, create_user):
+    from app.services import waveform
+    from app.services.audio_storage import get_storage_service
+
+    user_id, _ = create_user()
+    song_id = _make_archived_song(app, user_id)
+    legacy_id = _make_archived_song(app, user_id, field="archived_url_1")  # two-track song
+
+    storage = get_storage_service()
+    for song in (song_id, legacy_id):
+        storage.get_song_dir(song).mkdir(parents=True, exist_ok=True)
+        (storage.get_song_dir(song) / "track_1.mp3").write_bytes(b"fake mp3")
+
+    # No ffmpeg in the test environment — decoding itself is ffmpeg's job,
+    # what's under test is the job wiring around it.
+    monkeypatch.setattr(waveform, "ffmpeg_available", lambda: True)
+    monkeypatch.setattr(waveform, "decode_to_pcm", lambda path, sample_rate: np.linspace(-1, 1, 8000))
+
+    monkeypatch.setenv("ROKU_SECRET_KEY", "correct-key")
+    resp = client.post("/api/v1/songs/waveforms/generate", headers={"X-Reconcile-Key": "correct-key"})
+    assert resp.status_code == 200
+    assert resp.get_json() == {"generated": 2, "failed": 0}
+    for song in (song_id, legacy_id):
+        assert storage.get_waveform_path(song).stat().st_size == 2 * waveform.WAVEFORM_BINS
+        storage.delete_song_files(song)
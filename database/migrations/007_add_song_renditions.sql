@@ -0,0 +1,12 @@
+-- Low-bitrate transcodes of archived songs (64/128 kbps) so Roku and the
+-- PWA on mobile data can stream a smaller file than the Suno original.
+-- Produced by the transcode cron job; one row per song per bitrate.
+CREATE TABLE IF NOT EXISTS song_renditions (
+    id SERIAL PRIMARY KEY,
+    song_id INTEGER NOT NULL REFERENCES songs(id) ON DELETE CASCADE,
+    bitrate_kbps INTEGER NOT NULL,
+    url VARCHAR(1000) NOT NULL,
+    file_size_bytes INTEGER,
+    created_at TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT uq_song_renditions_song_bitrate UNIQUE (song_id, bitrate_kbps)
+);
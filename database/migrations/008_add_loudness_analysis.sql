@@ -0,0 +1,7 @@
+-- Integrated loudness (EBU R128 / BS.1770) and ReplayGain 2.0 per song,
+-- filled in by the loudness cron job after archival so players can
+-- normalize volume without decoding the track themselves.
+ALTER TABLE songs ADD COLUMN IF NOT EXISTS loudness_lufs DOUBLE PRECISION;
+ALTER TABLE songs ADD COLUMN IF NOT EXISTS replay_gain_db DOUBLE PRECISION;
+ALTER TABLE songs ADD COLUMN IF NOT EXISTS replay_gain_peak DOUBLE PRECISION;
+ALTER TABLE songs ADD COLUMN IF NOT EXISTS loudness_analyzed_at TIMESTAMP;
@@ -0,0 +1,7 @@
+-- Integrity metadata for archived audio. archive_checksum is the SHA-256
+-- recorded when the file was written; the archive scrubber re-hashes files
+-- oldest-verified first and stamps archive_verified_at.
+ALTER TABLE songs ADD COLUMN IF NOT EXISTS archive_checksum VARCHAR(64);
+ALTER TABLE songs ADD COLUMN IF NOT EXISTS archive_verified_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_songs_archive_verified_at ON songs(archive_verified_at) WHERE is_archived;
@@ -0,0 +1,14 @@
+-- Give existing playlist entries real positions (they were all 0) in the
+-- order they were added, spaced 1024 apart like services/playlist_order.py
+-- assigns them, and index (playlist_id, position) so a playlist loads in
+-- order with one range scan.
+UPDATE playlist_songs ps
+SET position = ranked.rn * 1024
+FROM (
+    SELECT playlist_id, song_id,
+           ROW_NUMBER() OVER (PARTITION BY playlist_id ORDER BY added_at, song_id) AS rn
+    FROM playlist_songs
+) ranked
+WHERE ps.playlist_id = ranked.playlist_id AND ps.song_id = ranked.song_id;
+
+CREATE INDEX IF NOT EXISTS idx_playlist_songs_playlist_position ON playlist_songs(playlist_id, position);
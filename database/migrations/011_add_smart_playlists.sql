@@ -0,0 +1,6 @@
+-- Smart playlists: a saved filter spec per playlist (NULL for hand-made
+-- ones). Matching songs are materialized into playlist_songs by
+-- services/smart_playlists.py, so readers need no changes.
+ALTER TABLE playlists ADD COLUMN IF NOT EXISTS smart_filter JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_playlists_smart ON playlists(id) WHERE smart_filter IS NOT NULL;
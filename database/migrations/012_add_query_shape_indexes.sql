@@ -0,0 +1,25 @@
+-- Indexes matched to the hot song queries, replacing the single-column
+-- user index from 006:
+--   get_songs           WHERE user_id = ? ORDER BY created_at DESC
+--   get_stats           WHERE user_id = ? AND status = ? (counts)
+--   reconcile           WHERE status = 'submitted' AND created_at < ?
+--   Roku feeds / stats  WHERE status = 'completed' AND <has any audio URL>
+-- has_audio is generated from the four URL columns so "has any audio URL"
+-- is one indexable column instead of a four-way OR. Adding it rewrites
+-- the songs table; run this off-peak.
+-- tests/test_query_plans.py checks the plans against a real Postgres.
+ALTER TABLE songs ADD COLUMN IF NOT EXISTS has_audio BOOLEAN GENERATED ALWAYS AS (
+    archived_url_1 IS NOT NULL OR archived_url IS NOT NULL
+    OR download_url_1 IS NOT NULL OR download_url IS NOT NULL
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_songs_user_created ON songs(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_songs_user_status ON songs(user_id, status);
+CREATE INDEX IF NOT EXISTS idx_songs_submitted_created ON songs(created_at) WHERE status = 'submitted';
+CREATE INDEX IF NOT EXISTS idx_songs_playable_title ON songs(specific_title)
+    WHERE status = 'completed' AND has_audio;
+
+-- (user_id, created_at) and (user_id, status) both serve user_id lookups
+DROP INDEX IF EXISTS idx_songs_user_id;
+
+ANALYZE songs;
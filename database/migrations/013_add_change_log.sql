@@ -0,0 +1,27 @@
+-- Change log behind GET /sync: one row per song, style or playlist write,
+-- appended by services/change_log.py in the writing transaction. Clients
+-- keep the highest seq they've seen and fetch only what changed since.
+CREATE TABLE IF NOT EXISTS change_log (
+    seq BIGSERIAL PRIMARY KEY,
+    entity VARCHAR(16) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    op VARCHAR(8) NOT NULL,
+    user_id INTEGER,
+    changed_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+-- Per-entity lookups when POST /sync/prune compacts the log, and the
+-- retention cutoff
+CREATE INDEX IF NOT EXISTS idx_change_log_entity ON change_log(entity, entity_id, seq);
+CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log(changed_at);
+
+-- Start the log with everything that already exists, so since=0 is a full sync
+INSERT INTO change_log (entity, entity_id, op, user_id)
+SELECT 'style', id, 'upsert', NULL FROM styles
+WHERE NOT EXISTS (SELECT 1 FROM change_log)
+UNION ALL
+SELECT 'song', id, 'upsert', user_id FROM songs
+WHERE NOT EXISTS (SELECT 1 FROM change_log)
+UNION ALL
+SELECT 'playlist', id, 'upsert', NULL FROM playlists
+WHERE NOT EXISTS (SELECT 1 FROM change_log);
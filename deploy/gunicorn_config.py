@@ -1,18 +1,42 @@
 # Gunicorn configuration file for AIA Music
 
 import multiprocessing
+import os
+import shutil
 
 # Server socket
 bind = '127.0.0.1:5000'
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = 'sync'
-worker_connections = 1000
+# GUNICORN_WORKER_CLASS picks the concurrency model:
+#   gthread (default)  GUNICORN_THREADS threads per worker, so a slow Suno or
+#                      Azure call ties up one thread instead of a whole worker
+#   gevent             GUNICORN_WORKER_CONNECTIONS greenlets per worker; best
+#                      when most request time is spent waiting on upstreams
+#   sync               one request per worker (the old behaviour)
+# config.py sizes each worker's DB pool from the same variables, so keep
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under Postgres max_connections.
+# backend/loadtest/mixed_workload.py compares the profiles.
+# Threaded/async workers each serve many requests, so one per core is enough.
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() + 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 200))
 timeout = 30
 keepalive = 2
 
+if worker_class == 'gevent':
+    # Patch before the app is imported so requests/ssl/threading cooperate
+    from gevent import monkey
+    monkey.patch_all()
+
+# Prometheus metrics (app/services/metrics.py): each worker writes its
+# samples here and /metrics sums them. Set before the app (and so
+# prometheus_client) is imported, which preload_app does in the master.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/aiamusic-metrics')
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
 # Logging
 accesslog = '/srv/apps/aiamusic/logs/gunicorn_access.log'
 errorlog = '/srv/apps/aiamusic/logs/gunicorn_error.log'
@@ -33,3 +57,31 @@ tmp_upload_dir = None
 limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # Make psycopg2's socket waits yield to other greenlets
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def on_starting(server):
+    # config.py is importable here: gunicorn puts its working directory
+    # (backend/) on sys.path before reading this file
+    from config import check_cache_workers
+    check_cache_workers(server.cfg.workers)
+
+    # Samples left by a previous run would be added to this one's
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges (DB pool) from /metrics
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -19,6 +19,9 @@ const STATIC_ASSETS = [
 // Maximum number of audio files to cache (each ~10MB)
 const MAX_AUDIO_CACHE_ITEMS = 50;
 
+// Header on cached audio holding the manifest etag it was stored under
+const PREFETCH_ETAG_HEADER = 'X-Prefetch-ETag';
+
 // Install event - cache static assets
 self.addEventListener('install', (event) => {
   console.log('[SW] Installing service worker...');
@@ -227,6 +230,14 @@ self.addEventListener('message', (event) => {
       self.skipWaiting();
       break;
 
+    case 'PREFETCH':
+      // Download ahead from a prefetch manifest (GET /playlists/:id/prefetch
+      // or /songs/prefetch); the page fetches it, since it holds the token
+      if (payload && payload.tracks) {
+        event.waitUntil(prefetchTracks(payload.tracks));
+      }
+      break;
+
     case 'CACHE_AUDIO':
       // Pre-cache specific audio URLs
       if (payload && payload.urls) {
@@ -271,3 +282,111 @@ async function clearAudioCache() {
   console.log('[SW] Clearing audio cache');
   await caches.delete(AUDIO_CACHE);
 }
+
+// Bumped by every PREFETCH message, so an older prefetch run stops early
+let prefetchGeneration = 0;
+
+/**
+ * Bring the audio cache up to date with a prefetch manifest, in order.
+ *
+ * A cached file stored under the same etag is current and skipped. Other
+ * cached same-origin files are revalidated with a conditional request,
+ * so an unchanged file costs a 304 instead of a download.
+ */
+async function prefetchTracks(tracks) {
+  const generation = ++prefetchGeneration;
+  const connection = self.navigator.connection;
+  if (connection && (connection.saveData || /2g/.test(connection.effectiveType || ''))) {
+    console.log('[SW] Skipping prefetch on a constrained connection');
+    return;
+  }
+
+  const cache = await caches.open(AUDIO_CACHE);
+
+  for (const track of tracks) {
+    if (generation !== prefetchGeneration) {
+      return;
+    }
+    if (!track || !track.url) continue;
+
+    try {
+      const cached = await cache.match(track.url);
+      if (cached && track.etag && cached.headers.get(PREFETCH_ETAG_HEADER) === track.etag) {
+        continue;
+      }
+
+      const sameOrigin = new URL(track.url, self.location.href).origin === self.location.origin;
+      if (cached && !sameOrigin && !track.etag) {
+        // Suno's CDN files never change, and conditional headers would need CORS
+        continue;
+      }
+
+      const headers = {};
+      if (cached && sameOrigin) {
+        const validator = cached.headers.get('ETag');
+        const modified = cached.headers.get('Last-Modified');
+        if (validator) {
+          headers['If-None-Match'] = validator;
+        } else if (modified) {
+          headers['If-Modified-Since'] = modified;
+        }
+      }
+
+      const response = await fetch(track.url, { headers });
+      if (response.status === 304 && cached) {
+        console.log('[SW] Prefetch still current:', track.url);
+        await cache.put(track.url, await withPrefetchEtag(cached, track.etag));
+        continue;
+      }
+      if (!response.ok) {
+        console.log('[SW] Prefetch failed:', track.url, response.status);
+        continue;
+      }
+
+      const body = await response.clone().arrayBuffer();
+      if (track.size_bytes && body.byteLength !== track.size_bytes) {
+        console.log('[SW] Prefetch size mismatch, not caching:', track.url);
+        continue;
+      }
+      if (track.sha256 && await sha256Hex(body) !== track.sha256) {
+        console.log('[SW] Prefetch checksum mismatch, not caching:', track.url);
+        continue;
+      }
+
+      if (!cached) {
+        await manageAudioCacheSize(cache);
+      }
+      await cache.put(track.url, await withPrefetchEtag(response, track.etag));
+      console.log('[SW] Prefetched audio:', track.url);
+    } catch (error) {
+      console.log('[SW] Failed to prefetch:', track.url, error);
+    }
+  }
+}
+
+/**
+ * Copy of a response carrying the manifest etag it was checked against
+ */
+async function withPrefetchEtag(response, etag) {
+  const headers = new Headers(response.headers);
+  if (etag) {
+    headers.set(PREFETCH_ETAG_HEADER, etag);
+  } else {
+    headers.delete(PREFETCH_ETAG_HEADER);
+  }
+  return new Response(await response.blob(), {
+    status: response.status,
+    statusText: response.statusText,
+    headers
+  });
+}
+
+/**
+ * Hex SHA-256 of a buffer, to compare with a manifest's sha256
+ */
+async function sha256Hex(buffer) {
+  const digest = await crypto.subtle.digest('SHA-256', buffer);
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+}
@@ -188,7 +188,7 @@ function MusicPlayer({ onLogout, autoResume = false }) {
       const song = currentPlaylist.songs[currentSongIndex];
       if (song) {
         const url = currentTrack === 1
-          ? (song.archived_url_1 || song.download_url_1)
+          ? (song.stream_url || song.archived_url_1 || song.download_url_1)
           : (song.archived_url_2 || song.download_url_2);
         trace(`SRC effect: idx=${currentSongIndex} track=${currentTrack} url=${url?.substring(0,60)} isPlaying=${isPlaying} isRestoring=${isRestoring}`);
         if (audioRef.current && url) {
@@ -380,7 +380,7 @@ function MusicPlayer({ onLogout, autoResume = false }) {
     if (nextIndex === null) { setIsPlaying(false); return; }
 
     const nextSong = songs[nextIndex];
-    const nextUrl = nextSong.archived_url_1 || nextSong.download_url_1;
+    const nextUrl = nextSong.stream_url || nextSong.archived_url_1 || nextSong.download_url_1;
     const resolvedUrl = new URL(nextUrl, window.location.origin).href;
 
     // ── Critical: advance audio directly on DOM element ──────────────────